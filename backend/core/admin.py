@@ -832,7 +832,8 @@ class PageSEOAdmin(ModelAdmin):
                 result = ai.generate(
                     prompt=prompt,
                     system_prompt="You are an SEO expert. Use the ACTUAL keyword research data provided - do not make up keywords. Focus on the highest-value keywords from the Ubersuggest data.",
-                    temperature=0.2
+                    temperature=0.2,
+                    cache=True,
                 )
 
                 if not result.get("success"):
@@ -960,7 +961,8 @@ URL: /blog/{page_seo.blog_post.slug}
                 result = ai.generate(
                     prompt=prompt,
                     system_prompt="You are an SEO expert. Generate compelling, accurate meta tags optimized for search and social sharing.",
-                    temperature=0.3
+                    temperature=0.3,
+                    cache=True,
                 )
 
                 if not result.get("success"):
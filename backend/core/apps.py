@@ -8,4 +8,9 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         """Import signals to register them when Django starts."""
+        from django.db.backends.signals import connection_created
+
         import core.signals  # noqa: F401
+        from core.db import configure_sqlite
+
+        connection_created.connect(configure_sqlite, dispatch_uid='core-configure-sqlite')
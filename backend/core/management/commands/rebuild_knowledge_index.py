@@ -0,0 +1,18 @@
+"""
+Management command to rebuild the chatbot knowledge search index.
+
+Usage:
+    python manage.py rebuild_knowledge_index
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.services.knowledge_index import KnowledgeSearchIndex
+
+
+class Command(BaseCommand):
+    help = 'Re-tokenize all published knowledge articles for ranked chatbot retrieval'
+
+    def handle(self, *args, **options):
+        indexed = KnowledgeSearchIndex.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} knowledge articles'))
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0033_service_relevance_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KnowledgeSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('terms', models.JSONField(default=dict, help_text='Field-weighted term frequencies')),
+                ('length', models.PositiveIntegerField(default=0, help_text='Weighted token count')),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='core.knowledgearticle')),
+            ],
+            options={
+                'verbose_name': 'Knowledge Search Document',
+            },
+        ),
+    ]
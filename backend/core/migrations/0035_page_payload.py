@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0034_knowledge_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('revision', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Content Revision',
+            },
+        ),
+        migrations.CreateModel(
+            name='PagePayload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page', models.CharField(max_length=50, unique=True)),
+                ('body', models.TextField(help_text='Serialized API response')),
+                ('body_gzip', models.BinaryField(help_text='Gzipped body')),
+                ('etag', models.CharField(max_length=64)),
+                ('source_version', models.BigIntegerField(default=0, help_text='Content revision the body was built from')),
+                ('modified_at', models.DateTimeField(help_text='When the body last changed')),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Page Payload',
+            },
+        ),
+    ]
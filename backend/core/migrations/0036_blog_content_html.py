@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:56
+
+from django.db import migrations, models
+
+
+def render_existing_posts(apps, schema_editor):
+    """Store rendered HTML for posts written before content_html existed."""
+    from core.services.blog import content_hash, render_content
+
+    BlogPost = apps.get_model('core', 'BlogPost')
+    for post in BlogPost.objects.only('id', 'content').iterator():
+        BlogPost.objects.filter(pk=post.pk).update(
+            content_html=render_content(post.content),
+            content_hash=content_hash(post.content),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0035_page_payload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(render_existing_posts, migrations.RunPython.noop),
+    ]
@@ -1081,6 +1081,10 @@ class BlogPost(TimestampedModel):
     reading_time_minutes = models.PositiveIntegerField(default=5, help_text="Estimated reading time in minutes")
     views_count = models.PositiveIntegerField(default=0)
 
+    # Rendered once per content change (core.services.blog), not on every read
+    content_html = models.TextField(blank=True, editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+
     # Content source (for Ubersuggest integration)
     source_cluster = models.ForeignKey(
         'SEOKeywordCluster', on_delete=models.SET_NULL, null=True, blank=True,
@@ -1095,6 +1099,19 @@ class BlogPost(TimestampedModel):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        from core.services.blog import content_hash, render_content
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "content" in update_fields:
+            digest = content_hash(self.content)
+            if digest != self.content_hash:
+                self.content_html = render_content(self.content)
+                self.content_hash = digest
+                if update_fields is not None:
+                    kwargs["update_fields"] = {*update_fields, "content_html", "content_hash"}
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return f"/blog/{self.slug}/"
 
@@ -1576,6 +1593,69 @@ class KnowledgeArticle(TimestampedModel):
         return [tag.strip() for tag in (self.tags or "").split(",") if tag.strip()]
 
 
+class KnowledgeSearchDocument(models.Model):
+    """
+    Tokenized form of a published KnowledgeArticle for ranked chatbot retrieval.
+
+    Maintained by core.services.knowledge_index on article save/delete; the
+    in-memory inverted index used for BM25 scoring is built from these rows.
+    """
+
+    article = models.OneToOneField(
+        KnowledgeArticle, related_name="search_document", on_delete=models.CASCADE
+    )
+    terms = models.JSONField(default=dict, help_text="Field-weighted term frequencies")
+    length = models.PositiveIntegerField(default=0, help_text="Weighted token count")
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Knowledge Search Document"
+
+    def __str__(self):
+        return f"Index for {self.article_id}"
+
+
+class ContentRevision(models.Model):
+    """
+    Counter bumped by every marketing content edit (core.signals).
+
+    PagePayload rows record the revision they were built from. It lives in
+    the database, not the cache, so web and Celery processes agree on it
+    even when the cache is per-process memory.
+    """
+
+    revision = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Content Revision"
+
+    def __str__(self):
+        return f"content revision {self.revision}"
+
+
+class PagePayload(models.Model):
+    """
+    Precompiled JSON for an aggregate marketing page (home, services).
+
+    Rebuilt in the background by core.services.page_payloads when content
+    changes and served as-is, with a gzipped copy and a content-hash ETag.
+    """
+
+    page = models.CharField(max_length=50, unique=True)
+    body = models.TextField(help_text="Serialized API response")
+    body_gzip = models.BinaryField(help_text="Gzipped body")
+    etag = models.CharField(max_length=64)
+    source_version = models.BigIntegerField(default=0, help_text="Content revision the body was built from")
+    modified_at = models.DateTimeField(help_text="When the body last changed")
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Page Payload"
+
+    def __str__(self):
+        return f"{self.page} payload"
+
+
 class KnowledgeFAQ(TimestampedModel):
     article = models.ForeignKey(
         KnowledgeArticle, related_name="faqs", on_delete=models.CASCADE
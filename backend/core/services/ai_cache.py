@@ -0,0 +1,284 @@
+"""
+Response cache and request coalescing for AIContentEngine.
+
+Opt-in per engine (``AIContentEngine(cache=True)``) or per call
+(``generate(..., cache=True)``). Responses are content-addressed by
+(model, system prompt, prompt, temperature) and stored:
+
+- in a per-process LRU with TTL (always on, bounded by MAX_ENTRIES), and
+- optionally in a shared backend: the Django cache or an on-disk store.
+
+Concurrent identical requests in the same process share a single upstream
+call. Hit/miss/coalesced counts and upstream latency are kept in the Django
+cache so the admin dashboard can show them across workers.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+
+STATS_KEY_PREFIX = "ai-cache:stats:"
+STAT_FIELDS = ("hits", "misses", "coalesced", "stores", "upstream_ms", "saved_ms")
+
+DEFAULTS = {
+    "ENABLED": True,
+    "BACKEND": "local",  # local | django | disk
+    "TTL": 24 * 60 * 60,
+    "MAX_ENTRIES": 1000,
+    "LOCATION": "",  # disk backend directory
+    "COALESCE_TIMEOUT": 120,
+}
+
+
+def cache_settings() -> dict:
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "AI_RESPONSE_CACHE", {}) or {})
+    return config
+
+
+class LocalLRUBackend:
+    """Thread-safe in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCacheBackend:
+    """Shared store on a Django cache alias (eviction is the cache's own)."""
+
+    def __init__(self, alias: str = "default"):
+        from django.core.cache import caches
+
+        self.cache = caches[alias]
+
+    def get(self, key: str) -> dict | None:
+        return self.cache.get(f"ai-cache:{key}")
+
+    def set(self, key: str, value: dict, ttl: int) -> None:
+        self.cache.set(f"ai-cache:{key}", value, ttl)
+
+    def clear(self) -> None:  # pragma: no cover - shared cache is not flushed wholesale
+        pass
+
+
+class DiskBackend:
+    """
+    One JSON file per response, sharded by key prefix.
+
+    Reads touch the file's mtime so eviction (oldest mtime first, once the
+    store exceeds max_entries) is least-recently-used.
+    """
+
+    def __init__(self, location: str | Path, max_entries: int):
+        self.root = Path(location)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> dict | None:
+        path = self._path(key)
+        try:
+            with path.open("r", encoding="utf-8") as handle:
+                entry = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires_at", 0) < time.time():
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get("value")
+
+    def set(self, key: str, value: dict, ttl: int) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with tmp.open("w", encoding="utf-8") as handle:
+            json.dump({"expires_at": time.time() + ttl, "value": value}, handle)
+        os.replace(tmp, path)
+        with self._lock:
+            self._writes += 1
+            # Amortise the directory scan over several writes
+            if self._writes % 50 == 0:
+                self._evict()
+
+    def _evict(self) -> None:
+        files = sorted(self.root.glob("*/*.json"), key=lambda p: p.stat().st_mtime)
+        for path in files[: max(0, len(files) - self.max_entries)]:
+            path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        for path in self.root.glob("*/*.json"):
+            path.unlink(missing_ok=True)
+
+
+class _InFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: dict | None = None
+
+
+class AIResponseCache:
+    """Content-addressed cache with in-flight de-duplication."""
+
+    def __init__(self, *, backend=None, ttl: int | None = None, max_entries: int | None = None,
+                 coalesce_timeout: int | None = None):
+        config = cache_settings()
+        self.ttl = ttl if ttl is not None else config["TTL"]
+        self.local = LocalLRUBackend(max_entries if max_entries is not None else config["MAX_ENTRIES"])
+        self.backend = backend
+        self.coalesce_timeout = coalesce_timeout if coalesce_timeout is not None else config["COALESCE_TIMEOUT"]
+        self._inflight: dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*, model: str, system_prompt: str, prompt: str, temperature: float) -> str:
+        raw = json.dumps([model, system_prompt, prompt, round(float(temperature), 3)], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> dict | None:
+        value = self.local.get(key)
+        if value is None and self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                self.local.set(key, value, self.ttl)
+        return value
+
+    def _store(self, key: str, value: dict) -> None:
+        self.local.set(key, value, self.ttl)
+        if self.backend is not None:
+            self.backend.set(key, value, self.ttl)
+        record_stat("stores")
+
+    def get_or_generate(self, key: str, producer: Callable[[], dict]) -> dict:
+        """
+        Return a cached response for key, or call producer() once.
+
+        Only successful responses are stored. Callers that arrive while the
+        same key is already being generated wait for that call instead of
+        issuing their own.
+        """
+        cached = self._lookup(key)
+        if cached is not None:
+            record_stat("hits")
+            record_stat("saved_ms", cached.get("latency_ms", 0))
+            return {**cached, "cached": True}
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _InFlight()
+
+        if not leader:
+            if call.event.wait(self.coalesce_timeout) and call.result is not None:
+                record_stat("coalesced")
+                return {**call.result, "cached": True}
+            # Leader timed out or died; fall through to our own call
+            return producer()
+
+        record_stat("misses")
+        try:
+            started = time.monotonic()
+            result = producer()
+            latency_ms = int((time.monotonic() - started) * 1000)
+            record_stat("upstream_ms", latency_ms)
+            if result.get("success"):
+                self._store(key, {**result, "latency_ms": latency_ms})
+            call.result = result
+            return result
+        finally:
+            call.event.set()
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        self.local.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+
+def record_stat(field: str, amount: int = 1) -> None:
+    """Increment a shared counter; never let stats break generation."""
+    if not amount:
+        return
+    key = f"{STATS_KEY_PREFIX}{field}"
+    try:
+        if not django_cache.add(key, amount, None):
+            django_cache.incr(key, amount)
+    except Exception:
+        pass
+
+
+def get_cache_stats() -> dict:
+    """Counters for the admin dashboard."""
+    try:
+        values = django_cache.get_many([f"{STATS_KEY_PREFIX}{f}" for f in STAT_FIELDS])
+    except Exception:
+        values = {}
+    stats = {f: int(values.get(f"{STATS_KEY_PREFIX}{f}", 0) or 0) for f in STAT_FIELDS}
+    lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+    stats["hit_rate"] = round((stats["hits"] + stats["coalesced"]) / lookups, 3) if lookups else 0.0
+    stats["avg_upstream_ms"] = stats["upstream_ms"] // stats["misses"] if stats["misses"] else 0
+    return stats
+
+
+_response_cache: AIResponseCache | None = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> AIResponseCache:
+    """Process-wide cache built from settings.AI_RESPONSE_CACHE."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                config = cache_settings()
+                backend = None
+                if config["BACKEND"] == "django":
+                    backend = DjangoCacheBackend(config.get("ALIAS", "default"))
+                elif config["BACKEND"] == "disk":
+                    location = config["LOCATION"] or Path(settings.BASE_DIR) / "ai_cache"
+                    backend = DiskBackend(location, config["MAX_ENTRIES"])
+                _response_cache = AIResponseCache(backend=backend)
+    return _response_cache
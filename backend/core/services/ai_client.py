@@ -1,14 +1,25 @@
 from __future__ import annotations
 
+from typing import Iterator
+
 from django.conf import settings
 
 
+def _cached_tokens(usage) -> int:
+    """Prompt tokens the provider served from its prompt cache (0 if not reported)."""
+    details = getattr(usage, "prompt_tokens_details", None) if usage else None
+    return getattr(details, "cached_tokens", 0) or 0
+
+
 class AIContentEngine:
     """
     Lightweight wrapper around OpenAI chat completions.
 
     Centralised here so other services (SEO automation, blog generator, chatbot)
     can share API key/config handling.
+
+    Pass ``cache=True`` (per engine or per ``generate`` call) to serve repeated
+    identical prompts from the shared response cache (see ``ai_cache``).
     """
 
     DEFAULT_SYSTEM_PROMPT = (
@@ -16,8 +27,9 @@ class AIContentEngine:
         "draft marketing insights, and respond with confident, actionable copy."
     )
 
-    def __init__(self, model: str | None = None):
+    def __init__(self, model: str | None = None, *, cache: bool = False):
         self.model = model or getattr(settings, "OPENAI_SEO_MODEL", "gpt-4o-mini")
+        self.cache = cache
         self.api_key = getattr(settings, "OPENAI_API_KEY", "")
         self.client = None
         if self.api_key:
@@ -38,9 +50,12 @@ class AIContentEngine:
         prompt: str,
         temperature: float = 0.2,
         system_prompt: str | None = None,
+        cache: bool | None = None,
     ) -> dict:
         """
         Execute a chat completion and return a normalised payload describing the output.
+
+        ``cache`` overrides the engine default; cached payloads carry ``"cached": True``.
         """
         if not self.enabled:
             return {
@@ -52,6 +67,23 @@ class AIContentEngine:
             }
 
         system_prompt = system_prompt or self.DEFAULT_SYSTEM_PROMPT
+        use_cache = self.cache if cache is None else cache
+        if use_cache:
+            from .ai_cache import AIResponseCache, cache_settings, get_response_cache
+
+            if cache_settings()["ENABLED"]:
+                key = AIResponseCache.make_key(
+                    model=self.model,
+                    system_prompt=system_prompt,
+                    prompt=prompt,
+                    temperature=temperature,
+                )
+                return get_response_cache().get_or_generate(
+                    key, lambda: self._complete(prompt, temperature, system_prompt)
+                )
+        return self._complete(prompt, temperature, system_prompt)
+
+    def _complete(self, prompt: str, temperature: float, system_prompt: str) -> dict:
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
@@ -79,5 +111,59 @@ class AIContentEngine:
             "usage": {
                 "prompt_tokens": getattr(usage, "prompt_tokens", 0) if usage else 0,
                 "completion_tokens": getattr(usage, "completion_tokens", 0) if usage else 0,
+                "cached_tokens": _cached_tokens(usage),
+            },
+        }
+
+    def stream(
+        self,
+        *,
+        prompt: str,
+        temperature: float = 0.2,
+        system_prompt: str | None = None,
+    ) -> Iterator[dict]:
+        """
+        Stream a chat completion as events.
+
+        Yields ``{"type": "delta", "text": ...}`` for each content chunk as it
+        arrives, then exactly one terminal event: ``{"type": "done", "model",
+        "usage"}`` or ``{"type": "error", "error"}``.
+        """
+        if not self.enabled:
+            yield {"type": "error", "error": "missing_api_key"}
+            return
+
+        system_prompt = system_prompt or self.DEFAULT_SYSTEM_PROMPT
+        usage = None
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                temperature=temperature,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt},
+                ],
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in response:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                text = getattr(chunk.choices[0].delta, "content", None)
+                if text:
+                    yield {"type": "delta", "text": text}
+        except Exception as exc:  # pragma: no cover - external API call
+            yield {"type": "error", "error": str(exc)}
+            return
+
+        yield {
+            "type": "done",
+            "model": self.model,
+            "usage": {
+                "prompt_tokens": getattr(usage, "prompt_tokens", 0) if usage else 0,
+                "completion_tokens": getattr(usage, "completion_tokens", 0) if usage else 0,
+                "cached_tokens": _cached_tokens(usage),
             },
         }
@@ -0,0 +1,115 @@
+"""
+Blog - Stored HTML rendering and buffered view counting for blog posts.
+
+BlogPost.content is rendered to HTML (markdown with extra, codehilite,
+tables, toc) once, when the content changes, and kept in content_html, so
+BlogDetailAPIView never runs markdown on a read.
+
+Views are counted without writing the post row on the request path:
+- with BLOG_VIEW_BUFFER_URL set, record_view() does HINCRBY on a Redis hash
+- otherwise (or if Redis is unreachable) it falls back to a single atomic
+  UPDATE ... SET views_count = views_count + 1
+
+flush_view_counts() (Celery beat) renames the hash to a processing key,
+applies the accumulated counts with one UPDATE per distinct increment in a
+single transaction, and deletes the processing key only after that
+commits; counts from a failed flush are applied by the next one.
+"""
+
+import hashlib
+import logging
+from collections import defaultdict
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .redis_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = "blog:views"
+# Counts being applied; survives a failed flush
+PROCESSING_KEY = "blog:views:processing"
+# One flusher at a time owns the processing key
+FLUSH_LOCK_KEY = "blog:views:flush-lock"
+FLUSH_LOCK_TIMEOUT = 60
+
+MARKDOWN_EXTENSIONS = ["extra", "codehilite", "tables", "toc"]
+
+def render_content(content: str) -> str:
+    import markdown
+
+    return markdown.markdown(content, extensions=MARKDOWN_EXTENSIONS) if content else ""
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+
+def _buffer_client():
+    """Redis client for the view counter, or None when counting in the table."""
+    return get_client(getattr(settings, "BLOG_VIEW_BUFFER_URL", ""))
+
+
+def record_view(post_id) -> None:
+    """Count one view of a post."""
+    from core.models import BlogPost
+
+    client = _buffer_client()
+    if client is not None:
+        try:
+            client.hincrby(REDIS_KEY, str(post_id), 1)
+            return
+        except redis.RedisError as e:
+            logger.warning(f"Blog view buffer unavailable, counting in database: {e}")
+
+    BlogPost.objects.filter(pk=post_id).update(views_count=F("views_count") + 1)
+
+
+def flush_view_counts() -> int:
+    """Apply buffered view counts to BlogPost.views_count. Returns views applied."""
+    from core.models import BlogPost
+
+    client = _buffer_client()
+    if client is None:
+        return 0
+
+    try:
+        lock = client.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TIMEOUT)
+        if not lock.acquire(blocking=False):
+            return 0  # Another flush is running
+    except redis.RedisError as e:
+        logger.warning(f"Could not flush blog view counts: {e}")
+        return 0
+
+    try:
+        # Counts left by a failed flush go first; views counted from here land in a fresh hash
+        if not client.exists(PROCESSING_KEY):
+            try:
+                client.rename(REDIS_KEY, PROCESSING_KEY)
+            except redis.ResponseError:
+                return 0  # No views since the last flush
+        counts = client.hgetall(PROCESSING_KEY)
+
+        by_increment = defaultdict(list)
+        for post_id, views in counts.items():
+            by_increment[int(views)].append(int(post_id))
+        with transaction.atomic():
+            for views, post_ids in by_increment.items():
+                BlogPost.objects.filter(pk__in=post_ids).update(views_count=F("views_count") + views)
+        client.delete(PROCESSING_KEY)
+    except redis.RedisError as e:
+        logger.warning(f"Could not flush blog view counts: {e}")
+        return 0
+    finally:
+        try:
+            lock.release()
+        except redis.RedisError:
+            pass  # Expired; the next flush takes it over
+
+    total = sum(views * len(post_ids) for views, post_ids in by_increment.items())
+    if total:
+        logger.info(f"Blog views flushed: {total} across {len(counts)} posts")
+    return total
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import hashlib
+import json
 from dataclasses import dataclass
 
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
 from ..models import (
     AITool,
     AIToolsSection,
@@ -12,6 +18,24 @@ from ..models import (
     Testimonial,
 )
 
+SNAPSHOT_VERSION_KEY = "chat-knowledge:version"
+SNAPSHOT_KEY_PREFIX = "chat-knowledge:snapshot:"
+SNAPSHOT_TTL = 7 * 24 * 60 * 60
+
+# Saving or deleting any of these invalidates the snapshot (wired in core.signals)
+SOURCE_MODELS = (
+    "core.HeroSection",
+    "core.Service",
+    "core.ServiceOutcome",
+    "core.FAQCategory",
+    "core.FAQItem",
+    "core.Testimonial",
+    "core.AITool",
+    "core.AIToolsSection",
+    "core.SiteSettings",
+    "core.BusinessHours",
+)
+
 
 @dataclass
 class ChatKnowledgeBuilder:
@@ -148,3 +172,47 @@ class ChatKnowledgeBuilder:
             sections.append("\n".join(hours_lines))
 
         return "\n\n".join(sections)
+
+
+def knowledge_version() -> int:
+    cache.add(SNAPSHOT_VERSION_KEY, 1, None)
+    return cache.get(SNAPSHOT_VERSION_KEY) or 1
+
+
+def invalidate_knowledge_snapshot() -> None:
+    """Bump the snapshot version once the current transaction commits."""
+
+    def bump():
+        try:
+            cache.incr(SNAPSHOT_VERSION_KEY)
+        except ValueError:
+            cache.set(SNAPSHOT_VERSION_KEY, 2, None)
+
+    # Rebuilding before commit could cache the old content under the new version
+    transaction.on_commit(bump)
+
+
+def get_knowledge_snapshot() -> dict:
+    """
+    Materialized chatbot knowledge: ``{"version", "etag", "builtAt", "data", "prompt"}``.
+
+    Built once per version and served from the cache until a source model
+    changes. The ETag is a content hash so it is stable across workers.
+    """
+    version = knowledge_version()
+    key = f"{SNAPSHOT_KEY_PREFIX}{version}"
+    snapshot = cache.get(key)
+    if snapshot is None:
+        builder = ChatKnowledgeBuilder()
+        data = builder.build()
+        snapshot = {
+            "version": version,
+            "etag": hashlib.sha256(
+                json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()[:32],
+            "builtAt": timezone.now().isoformat(),
+            "data": data,
+            "prompt": builder.to_prompt_block(data),
+        }
+        cache.set(key, snapshot, SNAPSHOT_TTL)
+    return snapshot
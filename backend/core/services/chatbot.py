@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from typing import Dict
+import time
+from typing import Dict, Iterator
 
 from ..models import ChatConversation, ChatLead, ChatMessage, ChatbotSettings
 from .ai_client import AIContentEngine
 from .knowledge_base import KnowledgeBaseService
-from .chat_knowledge import ChatKnowledgeBuilder
+from .chat_knowledge import get_knowledge_snapshot
 
 
 class ChatbotService:
@@ -45,11 +46,11 @@ class ChatbotService:
     ):
         self.conversation = conversation
         self.settings = ChatbotSettings.objects.order_by("-updated_at").first()
-        self.ai_engine = ai_engine or AIContentEngine()
+        self.ai_engine = ai_engine or AIContentEngine(cache=True)
         self.knowledge = KnowledgeBaseService(limit=knowledge_limit)
-        self.knowledge_builder = ChatKnowledgeBuilder()
-        self.dynamic_knowledge = self.knowledge_builder.build()
-        self.dynamic_context_text = self.knowledge_builder.to_prompt_block(self.dynamic_knowledge)
+        snapshot = get_knowledge_snapshot()
+        self.dynamic_knowledge = snapshot["data"]
+        self.dynamic_context_text = snapshot["prompt"]
 
     def _system_prompt(self) -> str:
         brand = self.settings.brand_voice if self.settings else "Confident & helpful"
@@ -84,8 +85,16 @@ class ChatbotService:
         if "email" in ai_response.lower() or "contact" in ai_response.lower():
             ChatLead.objects.create(conversation=self.conversation)
 
-    def reply(self, user_message: str) -> Dict[str, object]:
-        user_entry = self._create_chat_message(ChatMessage.ROLE_USER, user_message)
+    def _fallback_text(self) -> str:
+        return (
+            self.settings.fallback_message
+            if self.settings
+            else "Let me hand this to a teammate and we’ll reply ASAP."
+        )
+
+    def _start_turn(self, user_message: str):
+        """Persist the user message and build the prompt. Returns (articles, prompt)."""
+        self._create_chat_message(ChatMessage.ROLE_USER, user_message)
         self.conversation.last_user_message = user_message
         self.conversation.save(update_fields=["last_user_message", "updated_at"])
 
@@ -96,33 +105,26 @@ class ChatbotService:
             knowledge_context=context_block,
             dynamic_context=self.dynamic_context_text,
         )
+        return articles, prompt
 
-        ai_result = self.ai_engine.generate(
-            prompt=prompt,
-            temperature=0.3,
-            system_prompt=self._system_prompt(),
-        )
-        if not ai_result.get("success"):
-            fallback = (
-                self.settings.fallback_message
-                if self.settings
-                else "Let me hand this to a teammate and we’ll reply ASAP."
-            )
-            response_text = fallback
-        else:
-            response_text = ai_result.get("output", "")
-
+    def _finish_turn(
+        self, response_text: str, articles, *, model, usage, timings, error: str | None = None,
+    ) -> Dict[str, object]:
+        """Persist the assistant message, sync leads and build the API payload."""
+        extra = {"failed": True, "error": error} if error is not None else {}
         assistant_entry = self._create_chat_message(
             ChatMessage.ROLE_ASSISTANT,
             response_text,
             context_articles=[article.slug for article in articles],
-            model=ai_result.get("model"),
+            model=model,
+            **timings,
+            **extra,
         )
 
-        if ai_result.get("usage"):
+        if usage:
             assistant_entry.token_count = (
-                ai_result["usage"].get("prompt_tokens", 0)
-                + ai_result["usage"].get("completion_tokens", 0)
+                usage.get("prompt_tokens", 0)
+                + usage.get("completion_tokens", 0)
             )
             assistant_entry.save(update_fields=["token_count", "metadata", "updated_at"])
 
@@ -141,12 +143,112 @@ class ChatbotService:
                 }
                 for article in articles
             ],
-            "usage": ai_result.get("usage", {}),
+            "usage": usage or {},
         }
         if not self.ai_engine.enabled:
             payload["notice"] = "AI disabled; served fallback copy."
         return payload
 
+    def reply(self, user_message: str) -> Dict[str, object]:
+        started = time.monotonic()
+        articles, prompt = self._start_turn(user_message)
+
+        ai_result = self.ai_engine.generate(
+            prompt=prompt,
+            temperature=0.3,
+            system_prompt=self._system_prompt(),
+        )
+        if not ai_result.get("success"):
+            response_text = self._fallback_text()
+        else:
+            response_text = ai_result.get("output", "")
+
+        latency_ms = int((time.monotonic() - started) * 1000)
+        return self._finish_turn(
+            response_text,
+            articles,
+            model=ai_result.get("model"),
+            usage=ai_result.get("usage"),
+            timings={"latency_ms": latency_ms},
+        )
+
+    def stream_reply(self, user_message: str) -> Iterator[Dict[str, object]]:
+        """
+        Streaming variant of reply().
+
+        Yields ``start``, then one ``token`` event per chunk as the model
+        produces it, then ``done`` carrying the same payload reply() returns.
+        The assistant ChatMessage is saved once the stream completes, with
+        time-to-first-token and total latency in its metadata.
+
+        If the provider fails mid-stream, an ``error`` event follows the
+        tokens received so far, the fallback text is streamed after them,
+        and the saved message is flagged ``failed`` in its metadata.
+        """
+        started = time.monotonic()
+        articles, prompt = self._start_turn(user_message)
+        yield {"event": "start", "conversationId": str(self.conversation.conversation_id)}
+
+        stream = getattr(self.ai_engine, "stream", None)
+        if stream is None:
+            events = self._generate_as_stream(prompt)
+        else:
+            events = stream(prompt=prompt, temperature=0.3, system_prompt=self._system_prompt())
+
+        parts = []
+        ttft_ms = None
+        model = getattr(self.ai_engine, "model", None)
+        usage = {}
+        error = None
+        for event in events:
+            if event["type"] == "delta":
+                if ttft_ms is None:
+                    ttft_ms = int((time.monotonic() - started) * 1000)
+                parts.append(event["text"])
+                yield {"event": "token", "text": event["text"]}
+            elif event["type"] == "done":
+                model = event.get("model", model)
+                usage = event.get("usage") or {}
+            elif event["type"] == "error":
+                error = event.get("error") or "stream_failed"
+                break
+
+        response_text = "".join(parts)
+        if error is not None:
+            yield {"event": "error", "error": "The reply was interrupted."}
+        if error is not None or not response_text:
+            fallback = self._fallback_text()
+            if response_text:
+                fallback = "\n\n" + fallback
+            if ttft_ms is None:
+                ttft_ms = int((time.monotonic() - started) * 1000)
+            response_text += fallback
+            yield {"event": "token", "text": fallback}
+
+        latency_ms = int((time.monotonic() - started) * 1000)
+        payload = self._finish_turn(
+            response_text,
+            articles,
+            model=model,
+            usage=usage,
+            timings={"ttft_ms": ttft_ms, "latency_ms": latency_ms, "streamed": True},
+            error=error,
+        )
+        yield {"event": "done", **payload}
+
+    def _generate_as_stream(self, prompt: str) -> Iterator[dict]:
+        """Adapt engines without stream() to the streaming event shape."""
+        result = self.ai_engine.generate(
+            prompt=prompt,
+            temperature=0.3,
+            system_prompt=self._system_prompt(),
+        )
+        if not result.get("success"):
+            yield {"type": "error", "error": result.get("error", "")}
+            return
+        yield {"type": "delta", "text": result.get("output", "")}
+        yield {"type": "done", "model": result.get("model"), "usage": result.get("usage", {})}
+
     def _build_prompt(self, user_message: str, *, knowledge_context: str, dynamic_context: str) -> str:
         intro = (
             "Use the following knowledge snippets to answer the user. "
@@ -0,0 +1,164 @@
+"""
+Content Cache - Shared, versioned response cache for the marketing API.
+
+Marketing endpoints (home, services, FAQ, footer, ...) cache their JSON
+responses with cache_content() instead of cache_page:
+
+- entries live in the default Django cache, which is Redis when CACHE_URL
+  is set, so every gunicorn worker serves the same copy
+- a per-process LRU (L1) in front of it answers repeat hits without a
+  network round trip
+- keys embed a content version; saving or deleting any model in
+  CONTENT_MODELS bumps it (one hook, wired in core.signals), so admin edits
+  show on the next request in every worker instead of after the TTL
+
+Only the version is read from the shared cache on every request. A
+versioned entry never changes, so L1 can hold it without going stale;
+superseded versions are never deleted, they just expire.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_response_headers
+
+from core.services.ai_cache import LocalLRUBackend
+
+VERSION_KEY = "content:version"
+KEY_PREFIX = "content:"
+
+# Marketing content served by the cached API views. Saving or deleting any
+# of these invalidates every cached payload (wired in core.signals).
+CONTENT_MODELS = (
+    "core.HeroSection",
+    "core.HeroMetric",
+    "core.HeroPartnerLogo",
+    "core.BusinessImpactSection",
+    "core.BusinessImpactMetric",
+    "core.BusinessImpactLogo",
+    "core.Service",
+    "core.ServiceOutcome",
+    "core.ServiceFeature",
+    "core.ServiceCapability",
+    "core.ServiceBenefit",
+    "core.ServiceProcess",
+    "core.ServiceProcessStep",
+    "core.FAQPageSection",
+    "core.FAQPageStat",
+    "core.FAQCategory",
+    "core.FAQItem",
+    "core.ContactMethod",
+    "core.ROICalculatorSection",
+    "core.ROICalculatorStat",
+    "core.ROICalculatorTool",
+    "core.AIToolsSection",
+    "core.AITool",
+    "core.WhyChooseSection",
+    "core.WhyChooseReason",
+    "core.FooterSection",
+    "core.FooterLink",
+    "core.SiteSettings",
+    "core.SocialLink",
+    "core.BusinessHours",
+    "core.PageSEO",
+    "core.Testimonial",
+    "core.CTASection",
+    "core.DemoShowcase",
+    "core.DemoImage",
+    "core.PricingPlan",
+    "core.PricingFeature",
+    "core.StatMetric",
+    "core.NavigationMenu",
+    "core.NavigationItem",
+    "core.BlogCategory",
+    "core.BlogPost",
+)
+
+# Saves that only touch these fields aren't content edits (e.g. blog view counts)
+COUNTER_FIELDS = frozenset({"views_count"})
+
+_local = LocalLRUBackend(max_entries=getattr(settings, "CONTENT_CACHE_L1_ENTRIES", 500))
+
+
+def content_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seeded from the clock, not 1: after a cache flush, versions handed
+        # out before it must not come round again while L1 still holds them
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate_content() -> None:
+    """Bump the content version once the current transaction commits."""
+
+    def bump():
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, time.time_ns(), None)
+
+    # Rebuilding before commit could cache the old content under the new version
+    transaction.on_commit(bump)
+
+
+def content_key(path: str) -> str:
+    path_hash = hashlib.md5(path.encode("utf-8")).hexdigest()
+    return f"{KEY_PREFIX}{content_version()}:{path_hash}"
+
+
+def get_content(key: str):
+    """Versioned entry from L1, falling back to the shared cache."""
+    value = _local.get(key)
+    if value is None:
+        value = cache.get(key)
+        if value is not None:
+            _local.set(key, value, getattr(settings, "CONTENT_CACHE_L1_TTL", 30))
+    return value
+
+
+def set_content(key: str, value, timeout: int) -> None:
+    cache.set(key, value, timeout)
+    _local.set(key, value, min(timeout, getattr(settings, "CONTENT_CACHE_L1_TTL", 30)))
+
+
+def clear_local() -> None:
+    """Drop this process's L1 (tests; the shared cache is untouched)."""
+    _local.clear()
+
+
+def cache_content(timeout: int):
+    """
+    View decorator: cache successful GET responses per URL under the current
+    content version. Use with method_decorator(..., name='dispatch').
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view_func(request, *args, **kwargs)
+
+            key = content_key(request.get_full_path())
+            cached = get_content(key)
+            if cached is not None:
+                content_type, content = cached
+                response = HttpResponse(content, content_type=content_type)
+            else:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                set_content(key, (response["Content-Type"], response.content), timeout)
+
+            patch_response_headers(response, timeout)
+            return response
+
+        return wrapper
+
+    return decorator
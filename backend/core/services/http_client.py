@@ -0,0 +1,225 @@
+"""
+Shared outbound HTTP transport for provider clients.
+
+Every service that talks to an external API (Zoho/ZeptoMail, Meta WhatsApp,
+Google Places, PageSpeed, prospect crawls) goes through ``http`` instead of
+module-level ``requests.get/post`` so that:
+
+- connections are pooled and kept alive in one ``requests.Session`` per host
+  (the number of host sessions is bounded; least recently used are closed)
+- 429/503 responses are retried with exponential backoff, honouring
+  ``Retry-After``; other 5xx and read timeouts are only retried for
+  idempotent methods, so a POST that may have been processed is never resent
+- per-host request/error/retry counts and latency are kept for diagnostics
+
+Pool sizes and retry policy come from ``settings.HTTP_TRANSPORT``. Errors
+surface exactly as they would from ``requests`` (responses are returned,
+network failures raise ``requests.RequestException``).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError, NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "POOL_CONNECTIONS": 4,
+    "POOL_MAXSIZE": 16,  # Concurrent connections per host (campaign workers share these)
+    "MAX_HOSTS": 64,  # Host sessions kept open
+    "RETRIES": 3,
+    "BACKOFF": 0.5,  # Seconds; doubles per attempt
+    "MAX_RETRY_AFTER": 30,  # Cap on a server-requested wait
+}
+
+ALWAYS_RETRY_STATUSES = frozenset({429, 503})
+IDEMPOTENT_RETRY_STATUSES = frozenset({500, 502, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+def transport_settings() -> dict:
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "HTTP_TRANSPORT", {}) or {})
+    return config
+
+
+@dataclass
+class HostStats:
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    statuses: dict = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": round(self.total_ms / self.requests, 1) if self.requests else 0.0,
+            "max_ms": round(self.max_ms, 1),
+            "statuses": dict(self.statuses),
+        }
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def _never_sent(exc: requests.RequestException) -> bool:
+    """True if the request failed while connecting (DNS, refused, connect timeout)."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = exc.args[0] if exc.args else None
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+class HTTPTransport:
+    """Per-host pooled sessions with retry and metrics."""
+
+    def __init__(self, config: dict | None = None, sleep=time.sleep):
+        self.config = config or transport_settings()
+        self._sleep = sleep
+        self._sessions: OrderedDict[str, requests.Session] = OrderedDict()
+        self._stats: dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.config["POOL_CONNECTIONS"],
+            pool_maxsize=self.config["POOL_MAXSIZE"],
+            max_retries=0,  # Retries are handled in request() so they can be counted
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def session_for(self, host: str) -> requests.Session:
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._sessions[host] = self._new_session()
+                while len(self._sessions) > self.config["MAX_HOSTS"]:
+                    _, evicted = self._sessions.popitem(last=False)
+                    evicted.close()
+            else:
+                self._sessions.move_to_end(host)
+            return session
+
+    def _record(self, host: str, elapsed_ms: float, status: int | None = None,
+                error: bool = False, retried: bool = False) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(host, HostStats())
+            stats.requests += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            if status is not None:
+                stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if error or (status is not None and status >= 500):
+                stats.errors += 1
+            if retried:
+                stats.retries += 1
+
+    def _backoff(self, attempt: int, response: requests.Response | None = None) -> float:
+        delay = self.config["BACKOFF"] * (2 ** attempt)
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                delay = retry_after
+        return min(delay, self.config["MAX_RETRY_AFTER"])
+
+    def request(self, method: str, url: str, *, retries: int | None = None, **kwargs) -> requests.Response:
+        """
+        Send a request through the host's pooled session.
+
+        ``retries`` overrides the configured retry count (0 disables retries,
+        e.g. for one-off crawls of third-party sites).
+        """
+        method = method.upper()
+        host = urlsplit(url).netloc.lower()
+        session = self.session_for(host)
+        max_retries = self.config["RETRIES"] if retries is None else retries
+        idempotent = method in IDEMPOTENT_METHODS
+
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                elapsed_ms = (time.monotonic() - started) * 1000
+                # A failed connect never reached the server; anything later
+                # might have, so only idempotent calls retry those
+                will_retry = (idempotent or _never_sent(exc)) and attempt < max_retries
+                self._record(host, elapsed_ms, error=True, retried=will_retry)
+                if not will_retry:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"HTTP {method} {host} failed ({exc}); retrying in {delay:.1f}s")
+                self._sleep(delay)
+                attempt += 1
+                continue
+
+            elapsed_ms = (time.monotonic() - started) * 1000
+            status = response.status_code
+            retryable = status in ALWAYS_RETRY_STATUSES or (idempotent and status in IDEMPOTENT_RETRY_STATUSES)
+            will_retry = retryable and attempt < max_retries
+            self._record(host, elapsed_ms, status=status, retried=will_retry)
+            if not will_retry:
+                return response
+
+            delay = self._backoff(attempt, response)
+            logger.warning(f"HTTP {method} {host} returned {status}; retrying in {delay:.1f}s")
+            response.close()
+            self._sleep(delay)
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        """Per-host metrics for this process."""
+        with self._lock:
+            return {host: stats.as_dict() for host, stats in self._stats.items()}
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+# Shared per-process transport
+http = HTTPTransport()
+
+
+def get_http_stats() -> dict:
+    return http.stats()
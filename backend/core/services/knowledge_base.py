@@ -1,36 +1,35 @@
 from __future__ import annotations
 
-from django.db.models import Q
-
 from ..models import KnowledgeArticle
+from .knowledge_index import knowledge_index
 
 
 class KnowledgeBaseService:
     """
     Lightweight retrieval layer for chatbot responses.
 
-    Currently uses keyword-based filtering. The interface keeps room for future
-    upgrades (vector search, embeddings, etc.) without rewriting the chatbot service.
+    Queries are ranked with BM25 over a tokenized index of published articles
+    (see ``knowledge_index``). The interface keeps room for future upgrades
+    (vector search, embeddings, etc.) without rewriting the chatbot service.
     """
 
     def __init__(self, limit: int = 3):
         self.limit = limit
 
-    def search(self, query: str | None) -> list[KnowledgeArticle]:
-        queryset = (
-            KnowledgeArticle.objects.filter(status=KnowledgeArticle.STATUS_PUBLISHED)
-            .select_related("category")
-            .order_by("-is_featured", "-published_at", "-updated_at")
-        )
-        if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query)
-                | Q(summary__icontains=query)
-                | Q(content__icontains=query)
-                | Q(keywords__icontains=query)
-                | Q(tags__icontains=query)
-            )
-        return list(queryset[: self.limit])
+    def _published(self):
+        return KnowledgeArticle.objects.filter(status=KnowledgeArticle.STATUS_PUBLISHED).select_related("category")
+
+    def search(self, query: str | None, limit: int | None = None) -> list[KnowledgeArticle]:
+        limit = limit or self.limit
+        if not query:
+            return list(self._published().order_by("-is_featured", "-published_at", "-updated_at")[:limit])
+
+        ranked = knowledge_index.rank(query, limit)
+        if not ranked:
+            return []
+        articles = self._published().in_bulk([article_id for article_id, _ in ranked])
+        # Index may briefly trail unpublishing in another process; skip missing rows
+        return [articles[article_id] for article_id, _ in ranked if article_id in articles]
 
     def to_context_block(self, articles: list[KnowledgeArticle]) -> str:
         blocks = []
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from html import unescape
+
+from django.core.cache import cache
+
+from ..models import KnowledgeArticle, KnowledgeSearchDocument
+
+VERSION_CACHE_KEY = "knowledge-index:version"
+
+# Field weights: a term in the title counts three times as much as one in the body
+FIELD_WEIGHTS = {
+    "title": 3,
+    "keywords": 3,
+    "tags": 2,
+    "summary": 2,
+    "content": 1,
+}
+
+STOPWORDS = frozenset(
+    """
+    a about an and any are as at be but by can could do does for from get got had has have
+    how i if in into is it its me my of on or our please should so that the their them then
+    there these they this to us was we what when where which who why will with would you your
+    """.split()
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _stem(token: str) -> str:
+    """
+    Very light suffix stripping so 'automate', 'automated', 'automating',
+    'automation' and 'automations' all become 'automat'.
+    """
+    for suffix in ("ations", "ation", "ings", "ing", "ies", "es", "s", "ed"):
+        if len(token) > len(suffix) + 2 and token.endswith(suffix):
+            if suffix == "ies":
+                return token[: -len(suffix)] + "y"
+            if suffix in ("ations", "ation"):
+                return token[: -len(suffix)] + "at"
+            token = token[: -len(suffix)]
+            break
+    # A final silent 'e' goes too, so 'price' meets 'pricing' and 'priced'
+    if len(token) > 4 and token.endswith("e"):
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Lowercase, strip HTML, drop stopwords and stem."""
+    if not text:
+        return []
+    text = unescape(_TAG_RE.sub(" ", text)).lower()
+    return [_stem(tok) for tok in _TOKEN_RE.findall(text) if tok not in STOPWORDS and len(tok) > 1]
+
+
+def document_terms(article: KnowledgeArticle) -> tuple[dict[str, int], int]:
+    """Field-weighted term frequencies and weighted length for an article."""
+    counts: Counter[str] = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(getattr(article, field, "")):
+            counts[token] += weight
+    return dict(counts), sum(counts.values())
+
+
+class KnowledgeSearchIndex:
+    """
+    BM25 ranking over published knowledge articles.
+
+    Documents are persisted in KnowledgeSearchDocument and updated
+    incrementally from article save/delete signals. Each process keeps an
+    in-memory inverted index built from those rows and reloads it when the
+    shared index version changes (or after MAX_AGE seconds as a backstop).
+    """
+
+    K1 = 1.5
+    B = 0.75
+    MAX_AGE = 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded_at = 0.0
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._lengths: dict[int, int] = {}
+        self._avg_length = 0.0
+
+    # -- maintenance -------------------------------------------------------
+
+    @staticmethod
+    def bump_version():
+        cache.set(VERSION_CACHE_KEY, time.time_ns(), None)
+
+    @classmethod
+    def update_article(cls, article: KnowledgeArticle):
+        """Re-index one article (or drop it if it's no longer published)."""
+        if article.status != KnowledgeArticle.STATUS_PUBLISHED:
+            cls.remove_article(article.pk)
+            return
+        terms, length = document_terms(article)
+        KnowledgeSearchDocument.objects.update_or_create(
+            article_id=article.pk,
+            defaults={"terms": terms, "length": length},
+        )
+        cls.bump_version()
+
+    @classmethod
+    def remove_article(cls, article_id: int):
+        KnowledgeSearchDocument.objects.filter(article_id=article_id).delete()
+        cls.bump_version()
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """Re-index every published article. Returns the number indexed."""
+        published = KnowledgeArticle.objects.filter(status=KnowledgeArticle.STATUS_PUBLISHED)
+        KnowledgeSearchDocument.objects.exclude(article__in=published).delete()
+        indexed = 0
+        for article in published.iterator():
+            terms, length = document_terms(article)
+            KnowledgeSearchDocument.objects.update_or_create(
+                article_id=article.pk,
+                defaults={"terms": terms, "length": length},
+            )
+            indexed += 1
+        cls.bump_version()
+        return indexed
+
+    # -- loading -----------------------------------------------------------
+
+    def _ensure_loaded(self):
+        version = cache.get(VERSION_CACHE_KEY)
+        fresh = time.monotonic() - self._loaded_at < self.MAX_AGE
+        if self._loaded_at and version == self._version and fresh:
+            return
+        with self._lock:
+            version = cache.get(VERSION_CACHE_KEY)
+            if self._loaded_at and version == self._version and time.monotonic() - self._loaded_at < self.MAX_AGE:
+                return
+            rows = list(KnowledgeSearchDocument.objects.values_list("article_id", "terms", "length"))
+            if not rows and KnowledgeArticle.objects.filter(status=KnowledgeArticle.STATUS_PUBLISHED).exists():
+                # First use on an existing database: build the index once
+                self.rebuild()
+                version = cache.get(VERSION_CACHE_KEY)
+                rows = list(KnowledgeSearchDocument.objects.values_list("article_id", "terms", "length"))
+
+            postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+            lengths = {}
+            for article_id, terms, length in rows:
+                lengths[article_id] = length
+                for term, freq in terms.items():
+                    postings[term].append((article_id, freq))
+
+            self._postings = dict(postings)
+            self._lengths = lengths
+            self._avg_length = (sum(lengths.values()) / len(lengths)) if lengths else 0.0
+            self._version = version
+            self._loaded_at = time.monotonic()
+
+    # -- querying ----------------------------------------------------------
+
+    def rank(self, query: str, limit: int) -> list[tuple[int, float]]:
+        """Return up to ``limit`` (article_id, score) pairs, best first."""
+        self._ensure_loaded()
+        terms = set(tokenize(query))
+        if not terms or not self._lengths:
+            return []
+
+        total_docs = len(self._lengths)
+        scores: dict[int, float] = defaultdict(float)
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for article_id, freq in postings:
+                norm = self.K1 * (1 - self.B + self.B * self._lengths[article_id] / self._avg_length)
+                scores[article_id] += idf * freq * (self.K1 + 1) / (freq + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+# Shared per-process index
+knowledge_index = KnowledgeSearchIndex()
@@ -0,0 +1,220 @@
+"""
+Page Payloads - Precompiled JSON for the home and services page APIs.
+
+Each aggregate page (a dozen serializers and their queries) is built into a
+PagePayload row: the exact response body, a gzipped copy and a content-hash
+ETag, tagged with the content revision it was built from.
+
+- content edits bump the ContentRevision counter and schedule
+  rebuild_page_payloads on Celery, debounced so an admin save with inlines
+  queues one rebuild
+- reads serve the stored document directly; a document built from an older
+  revision is still served while a rebuild is queued (stale-while-revalidate),
+  so no request ever waits on the serializers once a page has been built
+- fresh documents are kept in the content cache under the current revision
+
+The revision is a database row rather than a cache key: with the default
+per-process cache, a version bumped by the web process would never reach
+the Celery worker that rebuilds, nor the other web workers.
+
+Responses carry ETag/Last-Modified (304 on revalidation), the gzipped body
+when the client accepts it, and Cache-Control stale-while-revalidate.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from core.services.content_cache import get_content, set_content
+
+logger = logging.getLogger(__name__)
+
+REBUILD_LOCK_KEY = "page-payloads:rebuild-queued"
+
+_accepts_gzip = re.compile(r"\bgzip\b")
+
+
+def build_home() -> dict:
+    from core import views
+
+    services_data = views._serialize_services_section()
+    return {
+        "seo": views._serialize_page_seo("home"),
+        "hero": views._serialize_hero_section() or {},
+        "brand": views.BRAND_TOKENS,
+        "impact": views._serialize_business_impact_section(),
+        "services": services_data.get("services", []),
+        "serviceStats": services_data.get("stats", []),
+        "serviceProcess": services_data.get("process", []),
+        "aiTools": views._serialize_ai_tools_section(),
+        "roiCalculator": views._serialize_roi_calculator_content(),
+        "whyChoose": views._serialize_why_choose_section(),
+        "stats": views._serialize_stats("home"),
+        "testimonials": views._serialize_testimonials(),
+        "ctaSections": views._serialize_cta_sections("home"),
+        "demos": views._serialize_demos(),
+    }
+
+
+def build_services() -> dict:
+    from core import views
+
+    services_data = views._serialize_services_section()
+    return {
+        "seo": views._serialize_page_seo("services"),
+        "services": services_data.get("services", []),
+        "stats": services_data.get("stats", []),
+        "process": services_data.get("process", []),
+        "ctaSections": views._serialize_cta_sections("services"),
+        "testimonials": views._serialize_testimonials(),
+    }
+
+
+PAGE_BUILDERS = {
+    "home": build_home,
+    "services": build_services,
+}
+
+
+def content_revision() -> int:
+    from core.models import ContentRevision
+
+    return ContentRevision.objects.filter(pk=1).values_list("revision", flat=True).first() or 0
+
+
+def content_changed() -> None:
+    """Mark every stored page stale and queue a rebuild (wired in core.signals)."""
+    from core.models import ContentRevision
+
+    # Bumped inside the edit's transaction, so it commits (or rolls back) with it
+    if not ContentRevision.objects.filter(pk=1).update(revision=F("revision") + 1):
+        ContentRevision.objects.get_or_create(pk=1, defaults={"revision": 1})
+    schedule_rebuild()
+
+
+def rebuild_page(page: str):
+    """Build one page's document and store it. Returns the PagePayload."""
+    from core.models import PagePayload
+
+    # Read before building: an edit made mid-build leaves the row stale
+    version = content_revision()
+    body = json.dumps({"data": PAGE_BUILDERS[page]()}, cls=DjangoJSONEncoder)
+    etag = hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]
+
+    row = PagePayload.objects.filter(page=page).first()
+    if row is None:
+        row = PagePayload(page=page)
+    if row.etag != etag:
+        row.body = body
+        row.body_gzip = gzip.compress(body.encode("utf-8"), mtime=0)
+        row.etag = etag
+        row.modified_at = timezone.now()
+    row.source_version = version
+    row.save()
+    return row
+
+
+def rebuild_stale_pages(pages=None) -> list:
+    """Rebuild pages whose document predates the current content revision."""
+    from core.models import PagePayload
+
+    pages = list(pages or PAGE_BUILDERS)
+    version = content_revision()
+    current = dict(PagePayload.objects.filter(page__in=pages).values_list("page", "source_version"))
+    rebuilt = []
+    for page in pages:
+        if current.get(page) != version:
+            rebuild_page(page)
+            rebuilt.append(page)
+    return rebuilt
+
+
+def schedule_rebuild() -> None:
+    """Queue one background rebuild once the current transaction commits."""
+
+    def enqueue():
+        delay = getattr(settings, "CONTENT_PAYLOAD_REBUILD_DELAY", 5)
+        # Edits within the delay are picked up by the queued rebuild
+        if not cache.add(REBUILD_LOCK_KEY, 1, delay):
+            return
+        try:
+            from core.tasks import rebuild_page_payloads
+            # No publish retries: a down broker must not stall the admin save
+            rebuild_page_payloads.apply_async(countdown=delay, retry=False)
+        except Exception as e:
+            # The lock stays until it expires, so a down broker costs one attempt per delay
+            logger.warning(f"Could not queue page payload rebuild: {e}")
+
+    transaction.on_commit(enqueue)
+
+
+def _document(row) -> dict:
+    return {
+        "body": row.body,
+        "body_gzip": bytes(row.body_gzip),
+        "etag": row.etag,
+        "modified_at": row.modified_at,
+    }
+
+
+def get_page_payload(page: str) -> dict:
+    """Stored document for `page`: {'body', 'body_gzip', 'etag', 'modified_at'}."""
+    from core.models import PagePayload
+
+    version = content_revision()
+    key = f"page-payload:{page}:{version}"
+    document = get_content(key)
+    if document is not None:
+        return document
+
+    row = PagePayload.objects.filter(page=page).first()
+    if row is None:
+        # Never built: the one time a request pays for the serializers
+        row = rebuild_page(page)
+    elif row.source_version != version:
+        schedule_rebuild()
+        return _document(row)
+
+    document = _document(row)
+    if row.source_version == version:
+        set_content(key, document, getattr(settings, "CACHE_TIMEOUT_LONG", 900))
+    return document
+
+
+def payload_response(request, document: dict) -> HttpResponse:
+    """Serve a document with validators, gzip negotiation and cache headers."""
+    use_gzip = bool(_accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+    # Each encoding is its own representation, so it gets its own validator
+    etag = quote_etag(document["etag"] + ("-gz" if use_gzip else ""))
+    last_modified = int(document["modified_at"].timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if use_gzip:
+            response = HttpResponse(document["body_gzip"], content_type="application/json")
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(document["body"], content_type="application/json")
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_vary_headers(response, ("Accept-Encoding",))
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=getattr(settings, "CONTENT_PAYLOAD_MAX_AGE", 60),
+        stale_while_revalidate=getattr(settings, "CONTENT_PAYLOAD_STALE_WHILE_REVALIDATE", 300),
+    )
+    return response
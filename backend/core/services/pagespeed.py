@@ -25,6 +25,8 @@ from typing import Optional
 from django.conf import settings
 from django.utils import timezone
 
+from .http_client import http
+
 logger = logging.getLogger(__name__)
 
 
@@ -79,7 +81,7 @@ class PageSpeedService:
             }
 
             logger.info(f"Running PageSpeed analysis for {url}")
-            response = requests.get(self.API_URL, params=params, timeout=60)
+            response = http.get(self.API_URL, params=params, timeout=60)
 
             if response.status_code != 200:
                 error_data = response.json() if response.content else {}
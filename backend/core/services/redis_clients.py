@@ -0,0 +1,34 @@
+"""
+Redis Clients - Shared connections for services that keep data in Redis directly.
+
+The email tracking buffer, the blog view counter and the WhatsApp turn
+state use their own Redis keys rather than Django's cache, each at the URL
+from its own setting (REDIS_STATE_URL by default). get_client() returns
+one client, and so one connection pool, per URL and timeout. The client is
+created on first use and shared by every thread in the process.
+"""
+
+from __future__ import annotations
+
+import threading
+
+import redis
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(url: str, timeout: float = 0.25) -> redis.Redis | None:
+    """
+    Client for ``url``, or None when ``url`` is blank (the feature is off).
+
+    The short default timeout suits callers on the request path, which fall
+    back to the database rather than wait on a slow Redis.
+    """
+    if not url:
+        return None
+    key = (url, timeout)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        return _clients[key]
@@ -1,10 +1,16 @@
 """
 Django signals for auto-creating PageSEO entries when new Services or BlogPosts are created.
 This ensures all pages have SEO settings automatically.
+
+Also keeps the chatbot's knowledge index and knowledge snapshot, and the marketing
+API's cached payloads, in sync with admin edits.
 """
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from core.services.chat_knowledge import SOURCE_MODELS as CHAT_KNOWLEDGE_SOURCES
+from core.services.content_cache import CONTENT_MODELS, COUNTER_FIELDS
+
 
 @receiver(post_save, sender='core.Service')
 def create_service_seo(sender, instance, created, **kwargs):
@@ -37,3 +43,42 @@ def create_blog_seo(sender, instance, created, **kwargs):
                 'target_keyword': instance.title.lower()[:100],
             }
         )
+
+
+@receiver(post_save, sender='core.KnowledgeArticle')
+def index_knowledge_article(sender, instance, **kwargs):
+    """Keep the chatbot's ranked knowledge index in step with article edits."""
+    from core.services.knowledge_index import KnowledgeSearchIndex
+    KnowledgeSearchIndex.update_article(instance)
+
+
+@receiver(post_delete, sender='core.KnowledgeArticle')
+def unindex_knowledge_article(sender, instance, **kwargs):
+    from core.services.knowledge_index import KnowledgeSearchIndex
+    KnowledgeSearchIndex.remove_article(instance.pk)
+
+
+def invalidate_chat_knowledge(sender, **kwargs):
+    """Any edit to chatbot source content (hero, services, FAQs...) invalidates its snapshot."""
+    from core.services.chat_knowledge import invalidate_knowledge_snapshot
+    invalidate_knowledge_snapshot()
+
+
+for _model in CHAT_KNOWLEDGE_SOURCES:
+    post_save.connect(invalidate_chat_knowledge, sender=_model, dispatch_uid=f'chat-knowledge-save:{_model}')
+    post_delete.connect(invalidate_chat_knowledge, sender=_model, dispatch_uid=f'chat-knowledge-delete:{_model}')
+
+
+def invalidate_content_cache(sender, update_fields=None, **kwargs):
+    """Any marketing content edit invalidates every cached API payload."""
+    if update_fields and set(update_fields) <= COUNTER_FIELDS:
+        return
+    from core.services.content_cache import invalidate_content
+    from core.services.page_payloads import content_changed
+    invalidate_content()
+    content_changed()
+
+
+for _model in CONTENT_MODELS:
+    post_save.connect(invalidate_content_cache, sender=_model, dispatch_uid=f'content-cache-save:{_model}')
+    post_delete.connect(invalidate_content_cache, sender=_model, dispatch_uid=f'content-cache-delete:{_model}')
@@ -3,6 +3,9 @@ Celery tasks for background processing of SEO audits.
 
 These tasks run asynchronously to prevent request timeouts when
 auditing multiple URLs with Lighthouse.
+
+Also rebuilds the precompiled marketing page payloads after content edits
+and flushes buffered blog view counts.
 """
 
 import logging
@@ -232,3 +235,27 @@ def generate_ai_analysis_task(self, audit_id: int) -> dict:
     except Exception as e:
         logger.exception(f"Error generating AI analysis: {e}")
         return {"success": False, "error": str(e)}
+
+
+@shared_task
+def rebuild_page_payloads(pages=None) -> dict:
+    """
+    Rebuild precompiled page payloads that predate the current content revision.
+
+    Queued (debounced) by core.services.page_payloads.schedule_rebuild after
+    content edits and when a stale document is served.
+    """
+    from .services.page_payloads import rebuild_stale_pages
+
+    rebuilt = rebuild_stale_pages(pages)
+    if rebuilt:
+        logger.info(f"Rebuilt page payloads: {', '.join(rebuilt)}")
+    return {"rebuilt": rebuilt}
+
+
+@shared_task
+def flush_blog_view_counts() -> dict:
+    """Apply buffered blog views to BlogPost.views_count (beat, every 5 minutes)."""
+    from .services.blog import flush_view_counts
+
+    return {"views": flush_view_counts()}
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core.services import ai_cache
+from core.services.ai_cache import AIResponseCache, DiskBackend, LocalLRUBackend, get_cache_stats
+from core.services.ai_client import AIContentEngine
+
+
+class FakeCompletions:
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def create(self, *, model, temperature, messages):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f"reply to {messages[-1]['content']}"))],
+            usage=SimpleNamespace(prompt_tokens=5, completion_tokens=7),
+        )
+
+
+def _engine(completions: FakeCompletions, cache_enabled: bool = True) -> AIContentEngine:
+    engine = AIContentEngine(model="test-model", cache=cache_enabled)
+    engine.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return engine
+
+
+class LocalLRUBackendTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        lru = LocalLRUBackend(max_entries=2)
+        lru.set("a", {"v": 1}, 60)
+        lru.set("b", {"v": 2}, 60)
+        lru.get("a")
+        lru.set("c", {"v": 3}, 60)
+        self.assertIsNotNone(lru.get("a"))
+        self.assertIsNone(lru.get("b"))
+
+    def test_expired_entries_are_dropped(self):
+        lru = LocalLRUBackend(max_entries=2)
+        lru.set("a", {"v": 1}, -1)
+        self.assertIsNone(lru.get("a"))
+
+
+class DiskBackendTests(SimpleTestCase):
+    def test_round_trip_and_eviction(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            disk = DiskBackend(tmp, max_entries=1)
+            disk.set("aa11", {"output": "one"}, 60)
+            self.assertEqual(disk.get("aa11"), {"output": "one"})
+            disk.set("bb22", {"output": "two"}, 60)
+            disk._evict()
+            remaining = [disk.get("aa11"), disk.get("bb22")]
+            self.assertEqual(sum(1 for item in remaining if item), 1)
+
+
+class AIResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.response_cache = AIResponseCache(ttl=60, max_entries=10)
+        patcher = patch.object(ai_cache, "_response_cache", self.response_cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_prompt_served_from_cache(self):
+        completions = FakeCompletions()
+        engine = _engine(completions)
+
+        first = engine.generate(prompt="hello")
+        second = engine.generate(prompt="hello")
+
+        self.assertEqual(completions.calls, 1)
+        self.assertEqual(first["output"], second["output"])
+        self.assertTrue(second["cached"])
+        self.assertNotIn("cached", first)
+
+    def test_key_includes_temperature_and_system_prompt(self):
+        completions = FakeCompletions()
+        engine = _engine(completions)
+
+        engine.generate(prompt="hello", temperature=0.2)
+        engine.generate(prompt="hello", temperature=0.7)
+        engine.generate(prompt="hello", system_prompt="Other persona")
+
+        self.assertEqual(completions.calls, 3)
+
+    def test_cache_is_opt_in(self):
+        completions = FakeCompletions()
+        engine = _engine(completions, cache_enabled=False)
+
+        engine.generate(prompt="hello")
+        engine.generate(prompt="hello")
+        engine.generate(prompt="hello", cache=True)
+        engine.generate(prompt="hello", cache=True)
+
+        self.assertEqual(completions.calls, 3)
+
+    def test_concurrent_identical_requests_share_one_call(self):
+        completions = FakeCompletions(delay=0.2)
+        engine = _engine(completions)
+        results = []
+
+        def worker():
+            results.append(engine.generate(prompt="burst"))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(completions.calls, 1)
+        self.assertEqual(len({r["output"] for r in results}), 1)
+
+    def test_stats_counted(self):
+        engine = _engine(FakeCompletions())
+        engine.generate(prompt="stats")
+        engine.generate(prompt="stats")
+
+        stats = get_cache_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_failures_are_not_cached(self):
+        calls = []
+
+        def producer():
+            calls.append(1)
+            return {"success": False, "output": "", "error": "boom"}
+
+        self.response_cache.get_or_generate("k", producer)
+        self.response_cache.get_or_generate("k", producer)
+        self.assertEqual(len(calls), 2)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import redis
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+
+from core.models import BlogPost
+from core.services.blog import PROCESSING_KEY, flush_view_counts
+
+
+class FakeLock:
+    def __init__(self, fake, name):
+        self.fake, self.name = fake, name
+
+    def acquire(self, blocking=True):
+        if self.name in self.fake.locks:
+            return False
+        self.fake.locks.add(self.name)
+        return True
+
+    def release(self):
+        self.fake.locks.discard(self.name)
+
+
+class FakeRedis:
+    """Just enough of redis.Redis for the view counter hash."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.locks = set()
+
+    def hincrby(self, key, field, amount):
+        counts = self.hashes.setdefault(key, {})
+        counts[field.encode()] = counts.get(field.encode(), 0) + amount
+
+    def hgetall(self, key):
+        return {k: str(v).encode() for k, v in self.hashes.get(key, {}).items()}
+
+    def exists(self, key):
+        return int(key in self.hashes)
+
+    def rename(self, src, dst):
+        if src not in self.hashes:
+            raise redis.ResponseError("no such key")
+        self.hashes[dst] = self.hashes.pop(src)
+
+    def delete(self, key):
+        return self.hashes.pop(key, None) is not None
+
+    def lock(self, name, timeout=None):
+        return FakeLock(self, name)
+
+
+class BlogRenderingTests(TestCase):
+    def test_html_stored_and_rerendered_only_on_content_change(self):
+        with patch("core.services.blog.render_content", wraps=lambda content: f"<p>{content}</p>") as render:
+            post = BlogPost.objects.create(title="Post", slug="render-post", excerpt="x", content="Hello")
+            self.assertEqual(post.content_html, "<p>Hello</p>")
+
+            post.title = "Renamed"
+            post.save()
+            post.save(update_fields=["views_count"])
+            self.assertEqual(render.call_count, 1)
+
+            post.content = "Updated"
+            post.save(update_fields=["content"])
+            self.assertEqual(render.call_count, 2)
+
+        post.refresh_from_db()
+        self.assertEqual(post.content_html, "<p>Updated</p>")
+
+    def test_markdown_rendering(self):
+        post = BlogPost.objects.create(title="Post", slug="markdown-post", excerpt="x", content="## Heading\n\nBody")
+
+        self.assertIn("<h2", post.content_html)
+        self.assertIn("<p>Body</p>", post.content_html)
+
+
+@override_settings(BLOG_VIEW_BUFFER_URL="")
+class BlogDetailTests(TestCase):
+    def setUp(self):
+        self.post = BlogPost.objects.create(
+            title="Post", slug="detail-post", excerpt="x", content="Hello", status=BlogPost.STATUS_PUBLISHED,
+        )
+        self.url = f"/api/blog/{self.post.slug}/"
+
+    def test_serves_stored_html_without_rendering(self):
+        with patch("core.services.blog.render_content") as render:
+            response = self.client.get(self.url)
+
+        render.assert_not_called()
+        self.assertEqual(response.json()["data"]["post"]["contentHtml"], "<p>Hello</p>")
+        self.assertTrue(response["ETag"])
+
+    def test_conditional_get(self):
+        first = self.client.get(self.url)
+
+        since = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(since.status_code, 304)
+        self.assertEqual(since.content, b"")
+
+    def test_views_counted_without_redis(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 2)
+
+
+@override_settings(BLOG_VIEW_BUFFER_URL="redis://buffer")
+class BlogViewBufferTests(TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch("core.services.blog._buffer_client", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.first = BlogPost.objects.create(
+            title="First", slug="first", excerpt="x", content="x", status=BlogPost.STATUS_PUBLISHED,
+        )
+        self.second = BlogPost.objects.create(
+            title="Second", slug="second", excerpt="x", content="x", status=BlogPost.STATUS_PUBLISHED,
+        )
+
+    def test_views_buffered_then_flushed_in_batches(self):
+        with self.assertNumQueries(3):
+            for _ in range(3):
+                self.client.get("/api/blog/first/")  # one SELECT each, no writes
+        self.client.get("/api/blog/second/")
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.views_count, 0)
+
+        with self.assertNumQueries(4):  # Two UPDATEs inside a savepoint
+            self.assertEqual(flush_view_counts(), 4)
+
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.views_count, self.second.views_count), (3, 1))
+        self.assertEqual(flush_view_counts(), 0)
+
+    def test_counts_kept_when_update_fails(self):
+        self.client.get("/api/blog/first/")
+        with patch("django.db.models.query.QuerySet.update", side_effect=OperationalError("database is locked")):
+            with self.assertRaises(OperationalError):
+                flush_view_counts()
+        self.assertIn(PROCESSING_KEY, self.redis.hashes)
+        self.assertFalse(self.redis.locks)
+
+        self.client.get("/api/blog/first/")  # Counted in a fresh hash meanwhile
+        self.assertEqual(flush_view_counts(), 1)
+        self.assertEqual(flush_view_counts(), 1)
+
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.views_count, 2)
+
+    def test_etag_revalidates_until_counts_flush(self):
+        first = self.client.get("/api/blog/first/")
+        self.assertEqual(self.client.get("/api/blog/first/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+        flush_view_counts()
+        self.assertEqual(self.client.get("/api/blog/first/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import json
+from unittest.mock import patch
+
+from django.core.cache import cache
 from django.test import TestCase
 
 from core.models import (
@@ -7,7 +11,9 @@ from core.models import (
     ChatbotSettings,
     KnowledgeArticle,
     KnowledgeCategory,
+    Service,
 )
+from core.services.chat_knowledge import get_knowledge_snapshot
 from core.services.chatbot import ChatbotService
 
 
@@ -26,6 +32,19 @@ class StubAIEngine:
         }
 
 
+class StreamingStubAIEngine(StubAIEngine):
+    def stream(self, *, prompt: str, temperature: float = 0.2, system_prompt: str | None = None):
+        for word in self.response.split(" "):
+            yield {"type": "delta", "text": word + " "}
+        yield {"type": "done", "model": self.model, "usage": {"prompt_tokens": 3, "completion_tokens": 4}}
+
+
+class FailingStreamStubAIEngine(StubAIEngine):
+    def stream(self, *, prompt: str, temperature: float = 0.2, system_prompt: str | None = None):
+        yield {"type": "delta", "text": "Partial "}
+        yield {"type": "error", "error": "connection reset"}
+
+
 class ChatbotServiceTests(TestCase):
     def setUp(self):
         category = KnowledgeCategory.objects.create(name="General", slug="general")
@@ -55,3 +74,100 @@ class ChatbotServiceTests(TestCase):
         self.assertIn("response", payload)
         self.assertEqual(payload["response"], "Hello from stub")
         self.assertTrue(conversation.messages.filter(role="assistant").exists())
+
+    def test_stream_reply_yields_tokens_then_persists(self):
+        conversation = ChatConversation.objects.create(visitor_name="Test User")
+        service = ChatbotService(conversation, ai_engine=StreamingStubAIEngine("Hello from stream"))
+
+        events = list(service.stream_reply("Tell me about AI copilots"))
+
+        self.assertEqual(events[0]["event"], "start")
+        tokens = [e["text"] for e in events if e["event"] == "token"]
+        self.assertEqual("".join(tokens), "Hello from stream ")
+        self.assertEqual(events[-1]["event"], "done")
+        self.assertEqual(events[-1]["response"], "Hello from stream ")
+
+        assistant = conversation.messages.get(role="assistant")
+        self.assertEqual(assistant.content, "Hello from stream ")
+        self.assertEqual(assistant.token_count, 7)
+        self.assertIn("ttft_ms", assistant.metadata)
+        self.assertIn("latency_ms", assistant.metadata)
+
+    def test_stream_error_after_tokens_marks_reply_failed(self):
+        conversation = ChatConversation.objects.create(visitor_name="Test User")
+        service = ChatbotService(conversation, ai_engine=FailingStreamStubAIEngine())
+
+        events = list(service.stream_reply("Hi"))
+
+        self.assertEqual([e["event"] for e in events], ["start", "token", "error", "token", "done"])
+        fallback = service._fallback_text()
+        self.assertEqual(events[-1]["response"], f"Partial \n\n{fallback}")
+        assistant = conversation.messages.get(role="assistant")
+        self.assertEqual(assistant.content, f"Partial \n\n{fallback}")
+        self.assertTrue(assistant.metadata["failed"])
+        self.assertEqual(assistant.metadata["error"], "connection reset")
+
+    def test_stream_reply_falls_back_to_generate(self):
+        conversation = ChatConversation.objects.create(visitor_name="Test User")
+        service = ChatbotService(conversation, ai_engine=StubAIEngine("Whole reply"))
+
+        events = list(service.stream_reply("Hi"))
+
+        self.assertEqual(events[-1]["response"], "Whole reply")
+
+    def test_message_endpoint_streams_sse(self):
+        conversation = ChatConversation.objects.create(visitor_name="Test User")
+        with patch("core.services.chatbot.AIContentEngine", lambda **kwargs: StreamingStubAIEngine("Streamed hi")):
+            response = self.client.post(
+                "/api/chatbot/message/",
+                data=json.dumps({
+                    "message": "Hi",
+                    "conversationId": str(conversation.conversation_id),
+                    "stream": True,
+                }),
+                content_type="application/json",
+            )
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        body = b"".join(response.streaming_content).decode()
+        self.assertIn("event: token", body)
+        self.assertIn("event: done", body)
+        self.assertTrue(conversation.messages.filter(role="assistant", content="Streamed hi ").exists())
+
+
+class ChatKnowledgeSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Content saves queue a page payload rebuild; there's no broker here
+        rebuild = patch("core.tasks.rebuild_page_payloads.apply_async")
+        rebuild.start()
+        self.addCleanup(rebuild.stop)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service = Service.objects.create(title="Snapshot Test Service", slug="snapshot-test-service", description="Copilots")
+
+    def test_snapshot_built_once_until_source_changes(self):
+        first = get_knowledge_snapshot()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_knowledge_snapshot()["etag"], first["etag"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.description = "Copilots and chatbots"
+            self.service.save()
+
+        second = get_knowledge_snapshot()
+        self.assertNotEqual(second["etag"], first["etag"])
+        self.assertIn("Copilots and chatbots", second["prompt"])
+
+    def test_chatbot_service_uses_snapshot_prompt(self):
+        snapshot = get_knowledge_snapshot()
+        conversation = ChatConversation.objects.create(visitor_name="Test User")
+        service = ChatbotService(conversation, ai_engine=StubAIEngine())
+        self.assertEqual(service.dynamic_context_text, snapshot["prompt"])
+
+    def test_knowledge_endpoint_honours_etag(self):
+        response = self.client.get("/api/chatbot/knowledge/")
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        cached = self.client.get("/api/chatbot/knowledge/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.models import BlogPost, Service
+from core.services import content_cache
+
+
+class ContentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        content_cache.clear_local()
+        self.service = Service.objects.create(title="SEO Audits", slug="cache-test-seo", description="Find issues.")
+
+    def _titles(self):
+        response = self.client.get("/api/services/")
+        self.assertEqual(response.status_code, 200)
+        return [s["title"] for s in response.json()["data"]["services"]]
+
+    def test_repeat_requests_served_from_cache(self):
+        self.assertIn("SEO Audits", self._titles())
+
+        with self.assertNumQueries(0):
+            self.assertIn("SEO Audits", self._titles())
+
+    def test_l1_answers_without_shared_cache(self):
+        self._titles()
+        # The shared copy is gone (evicted) but this process's L1 still holds it
+        cache.delete(content_cache.content_key("/api/services/"))
+
+        with self.assertNumQueries(0):
+            self.assertIn("SEO Audits", self._titles())
+
+    @patch("core.tasks.rebuild_page_payloads.apply_async")
+    def test_content_save_invalidates(self, apply_async):
+        self._titles()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.title = "Technical SEO"
+            self.service.save()
+
+        self.assertIn("Technical SEO", self._titles())
+
+    def test_counter_updates_do_not_invalidate(self):
+        post = BlogPost.objects.create(title="Post", slug="post", excerpt="x", content="x")
+        version = content_cache.content_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.views_count = 5
+            post.save(update_fields=["views_count"])
+
+        self.assertEqual(content_cache.content_version(), version)
+
+    def test_flush_does_not_revive_old_versions(self):
+        self._titles()
+        Service.objects.filter(pk=self.service.pk).update(title="Technical SEO")
+        cache.clear()
+
+        self.assertIn("Technical SEO", self._titles())
+
+    def test_errors_not_cached(self):
+        self.assertEqual(self.client.get("/api/services/missing/").status_code, 404)
+
+        Service.objects.create(title="Missing", slug="missing", description="Now exists.")
+        self.assertEqual(self.client.get("/api/services/missing/").status_code, 200)
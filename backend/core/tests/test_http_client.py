@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import requests
+from django.test import SimpleTestCase
+
+from core.services.http_client import DEFAULTS, HTTPTransport, parse_retry_after
+
+
+def _response(status: int, headers: dict | None = None) -> MagicMock:
+    response = MagicMock(status_code=status)
+    response.headers = headers or {}
+    return response
+
+
+class HTTPTransportTests(SimpleTestCase):
+    def setUp(self):
+        self.sleeps = []
+        self.transport = HTTPTransport(config=dict(DEFAULTS), sleep=self.sleeps.append)
+        self.session = MagicMock()
+        self.transport.session_for = lambda host: self.session
+
+    def test_retries_429_honouring_retry_after(self):
+        self.session.request.side_effect = [_response(429, {"Retry-After": "2"}), _response(200)]
+
+        response = self.transport.post("https://api.zeptomail.com/v1.1/email", json={})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.sleeps, [2.0])
+        stats = self.transport.stats()["api.zeptomail.com"]
+        self.assertEqual(stats["requests"], 2)
+        self.assertEqual(stats["retries"], 1)
+        self.assertEqual(stats["statuses"], {429: 1, 200: 1})
+
+    def test_post_5xx_is_not_retried(self):
+        self.session.request.return_value = _response(500)
+
+        response = self.transport.post("https://graph.facebook.com/v21.0/1/messages")
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(self.session.request.call_count, 1)
+
+    def test_get_5xx_retried_with_backoff_until_exhausted(self):
+        self.session.request.return_value = _response(502)
+
+        response = self.transport.get("https://www.googleapis.com/pagespeedonline")
+
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(self.session.request.call_count, DEFAULTS["RETRIES"] + 1)
+        self.assertEqual(self.sleeps, [0.5, 1.0, 2.0])
+        self.assertEqual(self.transport.stats()["www.googleapis.com"]["errors"], 4)
+
+    def test_post_read_timeout_is_not_retried(self):
+        self.session.request.side_effect = requests.ReadTimeout("slow")
+
+        with self.assertRaises(requests.ReadTimeout):
+            self.transport.post("https://mail.zoho.com/api")
+        self.assertEqual(self.session.request.call_count, 1)
+
+    def test_post_connect_timeout_is_retried(self):
+        self.session.request.side_effect = [requests.ConnectTimeout("connect"), _response(200)]
+
+        self.assertEqual(self.transport.post("https://mail.zoho.com/api").status_code, 200)
+
+    def test_retries_can_be_disabled_per_call(self):
+        self.session.request.return_value = _response(503)
+
+        self.transport.get("https://example.com", retries=0)
+
+        self.assertEqual(self.session.request.call_count, 1)
+
+
+class SessionPoolTests(SimpleTestCase):
+    def test_sessions_reused_per_host_and_bounded(self):
+        transport = HTTPTransport(config={**DEFAULTS, "MAX_HOSTS": 2})
+        first = transport.session_for("a.example")
+        self.assertIs(transport.session_for("a.example"), first)
+        transport.session_for("b.example")
+        transport.session_for("c.example")
+        self.assertIsNot(transport.session_for("a.example"), first)
+        transport.close()
+
+
+class RetryAfterTests(SimpleTestCase):
+    def test_parses_seconds_and_dates(self):
+        self.assertEqual(parse_retry_after("5"), 5.0)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import KnowledgeArticle, KnowledgeCategory, KnowledgeSearchDocument
+from core.services.knowledge_base import KnowledgeBaseService
+from core.services.knowledge_index import KnowledgeSearchIndex, tokenize
+
+
+class TokenizeTests(TestCase):
+    def test_strips_html_stopwords_and_suffixes(self):
+        self.assertEqual(tokenize("<p>How do the automations work?</p>"), ["automat", "work"])
+
+    def test_word_forms_share_a_stem(self):
+        forms = "automate automates automated automating automation automations"
+        self.assertEqual(set(tokenize(forms)), {"automat"})
+        self.assertEqual(set(tokenize("price prices priced pricing")), {"pric"})
+
+
+class KnowledgeBaseSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = KnowledgeCategory.objects.create(name="General", slug="general")
+        self.seo = self._article(
+            "SEO Audits", "seo-audits",
+            summary="Technical SEO reviews for local businesses.",
+            content="<p>We crawl your site and fix ranking issues.</p>",
+            tags="seo,audit",
+        )
+        self.chatbot = self._article(
+            "AI Chatbots", "ai-chatbots",
+            summary="Website chatbots that answer pricing questions.",
+            content="<p>Chatbots trained on your knowledge base. Mentions SEO once.</p>",
+            tags="ai,chatbot",
+            is_featured=True,
+        )
+
+    def _article(self, title, slug, **kwargs):
+        return KnowledgeArticle.objects.create(
+            category=self.category,
+            title=title,
+            slug=slug,
+            status=KnowledgeArticle.STATUS_PUBLISHED,
+            **kwargs,
+        )
+
+    def test_ranks_title_matches_above_passing_mentions(self):
+        results = KnowledgeBaseService(limit=3).search("seo audit pricing")
+        self.assertEqual(results[0], self.seo)
+        self.assertIn(self.chatbot, results)
+
+    def test_multi_word_query_matches_across_fields(self):
+        # The old icontains filter needed the whole phrase in one field
+        results = KnowledgeBaseService().search("chatbot for pricing")
+        self.assertEqual(results[0], self.chatbot)
+
+    def test_empty_query_keeps_featured_ordering(self):
+        results = KnowledgeBaseService().search("")
+        self.assertEqual(results[0], self.chatbot)
+
+    def test_signals_keep_index_current(self):
+        self.seo.status = KnowledgeArticle.STATUS_DRAFT
+        self.seo.save()
+        self.assertFalse(KnowledgeSearchDocument.objects.filter(article=self.seo).exists())
+        self.assertNotIn(self.seo, KnowledgeBaseService().search("seo audit"))
+
+        self.chatbot.title = "WhatsApp Assistants"
+        self.chatbot.save()
+        self.assertEqual(KnowledgeBaseService().search("whatsapp"), [self.chatbot])
+
+        self.chatbot.delete()
+        self.assertEqual(KnowledgeBaseService().search("whatsapp"), [])
+
+    def test_builds_index_on_first_use(self):
+        KnowledgeSearchDocument.objects.all().delete()
+        KnowledgeSearchIndex.bump_version()
+        self.assertEqual(KnowledgeBaseService().search("crawl")[0], self.seo)
+        self.assertEqual(KnowledgeSearchDocument.objects.count(), 2)
+
+    def test_rebuild_command(self):
+        KnowledgeSearchDocument.objects.all().delete()
+        call_command("rebuild_knowledge_index", stdout=open("/dev/null", "w"))
+        self.assertEqual(KnowledgeSearchDocument.objects.count(), 2)
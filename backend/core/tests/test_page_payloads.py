@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import gzip
+import json
+from contextlib import ExitStack, contextmanager
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase
+
+from core.models import PagePayload, Service
+from core.services import content_cache
+from core.services.page_payloads import rebuild_stale_pages
+
+
+class PagePayloadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        content_cache.clear_local()
+        self.service = Service.objects.create(title="SEO Audits", slug="payload-test-seo", description="Find issues.")
+
+    def _titles(self, response):
+        return [s["title"] for s in json.loads(response.content)["data"]["services"]]
+
+    def test_built_once_then_served_from_store(self):
+        response = self.client.get("/api/pages/services/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("SEO Audits", self._titles(response))
+        self.assertTrue(PagePayload.objects.filter(page="services").exists())
+        self.assertIn("stale-while-revalidate=300", response["Cache-Control"])
+
+        # Only the content revision is read
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/api/pages/services/").content, response.content)
+
+    def test_home_payload_shape(self):
+        data = self.client.get("/api/pages/home/").json()["data"]
+
+        self.assertIn("hero", data)
+        self.assertIn("SEO Audits", [s["title"] for s in data["services"]])
+
+    def test_conditional_get(self):
+        first = self.client.get("/api/pages/services/")
+
+        revalidated = self.client.get("/api/pages/services/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(revalidated.status_code, 304)
+        since = self.client.get("/api/pages/services/", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(since.status_code, 304)
+
+    def test_gzip_body(self):
+        plain = self.client.get("/api/pages/services/")
+        compressed = self.client.get("/api/pages/services/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertNotEqual(compressed["ETag"], plain["ETag"])
+        self.assertIn("Accept-Encoding", compressed["Vary"])
+
+    @patch("core.tasks.rebuild_page_payloads.apply_async")
+    def test_stale_served_while_rebuild_queued(self, apply_async):
+        self.client.get("/api/pages/services/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.title = "Technical SEO"
+            self.service.save()
+        apply_async.assert_called_once()
+
+        # Served from the stored document until the rebuild runs
+        self.assertIn("SEO Audits", self._titles(self.client.get("/api/pages/services/")))
+
+        self.assertEqual(rebuild_stale_pages(), ["home", "services"])
+        self.assertIn("Technical SEO", self._titles(self.client.get("/api/pages/services/")))
+        self.assertEqual(rebuild_stale_pages(), [])
+
+    @contextmanager
+    def _process(self, backend):
+        """Run as a process whose Django cache is its own per-process memory."""
+        content_cache.clear_local()
+        with ExitStack() as stack:
+            stack.enter_context(patch("core.services.content_cache.cache", backend))
+            stack.enter_context(patch("core.services.page_payloads.cache", backend))
+            yield
+
+    @patch("core.tasks.rebuild_page_payloads.apply_async")
+    def test_edit_reaches_rebuild_in_another_process(self, apply_async):
+        web, worker = LocMemCache("payload-web", {}), LocMemCache("payload-worker", {})
+        with self._process(web):
+            self.client.get("/api/pages/home/")
+            self.client.get("/api/pages/services/")
+        with self._process(worker):
+            self.assertEqual(rebuild_stale_pages(), [])
+
+        with self._process(web), self.captureOnCommitCallbacks(execute=True):
+            self.service.title = "Technical SEO"
+            self.service.save()
+        with self._process(worker):
+            self.assertEqual(rebuild_stale_pages(), ["home", "services"])
+
+        with self._process(web):
+            self.assertIn("Technical SEO", self._titles(self.client.get("/api/pages/services/")))
+        apply_async.assert_called_once()
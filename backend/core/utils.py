@@ -50,7 +50,6 @@ def dashboard_callback(request, context):
     """
     from django.urls import reverse
     from django.utils import timezone
-    from datetime import timedelta
     import pytz
 
     from .models import (
@@ -60,7 +59,8 @@ def dashboard_callback(request, context):
 
     # Import CRM models
     try:
-        from crm.models import Deal, Contact, EmailDraft, EmailLog, Pipeline
+        from crm.models import Deal, Contact, EmailLog, Pipeline
+        from crm.services.stats_rollup import get_crm_stats, pipeline_counts
         crm_available = True
     except ImportError:
         crm_available = False
@@ -106,14 +106,11 @@ def dashboard_callback(request, context):
 
     # CRM Stats
     if crm_available:
-        today = timezone.now().date()
-        week_ago = today - timedelta(days=7)
-
-        active_deals = Deal.objects.filter(status='active').count()
-        total_contacts = Contact.objects.count()
-        scheduled_emails = EmailDraft.objects.filter(schedule_status='scheduled').count()
-        emails_sent_today = EmailLog.objects.filter(sent_at__date=today).count()
-        emails_sent_week = EmailLog.objects.filter(sent_at__date__gte=week_ago).count()
+        stats = get_crm_stats()
+        active_deals = stats['deals']['by_status'].get('active', 0)
+        total_contacts = stats['contacts']['total']
+        scheduled_emails = stats['drafts']['scheduled']
+        emails_sent_week = stats['emails']['sent_week']
 
         context["crm_cards"] = [
             {
@@ -164,7 +161,7 @@ def dashboard_callback(request, context):
         for pipeline in Pipeline.objects.filter(is_active=True)[:4]:
             pipeline_stats.append({
                 'name': pipeline.name,
-                'active_deals': Deal.objects.filter(pipeline=pipeline, status='active').count(),
+                'active_deals': pipeline_counts(stats, pipeline.id)['active'],
                 'url': f"/admin/crm/board/{pipeline.id}/",
             })
         context["pipeline_stats"] = pipeline_stats
@@ -182,10 +179,7 @@ def dashboard_callback(request, context):
                 # Try to find contact name
                 contact_name = None
                 try:
-                    contact = Contact.objects.filter(phone=phone).first()
-                    if not contact:
-                        # Try matching last 10 digits
-                        contact = Contact.objects.filter(phone__endswith=phone[-10:]).first()
+                    contact = Contact.objects.by_phone(phone).first()
                     if contact:
                         contact_name = contact.name
                 except Exception:
@@ -225,4 +219,10 @@ def dashboard_callback(request, context):
         "testimonials": Testimonial.objects.filter(is_active=True).count(),
     }
 
+    # AI response cache counters (shared across workers via the Django cache)
+    from .services.ai_cache import get_cache_stats
+    ai_cache_stats = get_cache_stats()
+    if ai_cache_stats["hits"] or ai_cache_stats["misses"]:
+        context["ai_cache_stats"] = ai_cache_stats
+
     return context
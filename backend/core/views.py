@@ -1,15 +1,18 @@
 from __future__ import annotations
 
+import hashlib
 import json
 
 from django.conf import settings
 from django.core.cache import cache
 from django.db import models
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views import View
-from django.views.decorators.cache import cache_page
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import etag
+from django.utils.cache import get_conditional_response
 from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
 from django.views.generic import TemplateView
 
 from .models import (
@@ -41,8 +44,11 @@ from .models import (
     Testimonial,
     WhyChooseSection,
 )
+from .services.blog import record_view
 from .services.chatbot import ChatbotService
-from .services.chat_knowledge import ChatKnowledgeBuilder
+from .services.chat_knowledge import get_knowledge_snapshot
+from .services.content_cache import cache_content
+from .services.page_payloads import get_page_payload, payload_response
 
 BRAND_TOKENS = {
     "name": "Codeteki Digital Services",
@@ -646,7 +652,7 @@ class JSONAPIView(View):
         return JsonResponse({self.payload_key: payload}, status=status, safe=False)
 
 
-@method_decorator(cache_page(getattr(settings, 'CACHE_TIMEOUT_MEDIUM', 300)), name='dispatch')
+@method_decorator(cache_content(getattr(settings, 'CACHE_TIMEOUT_MEDIUM', 300)), name='dispatch')
 class ServicesAPIView(JSONAPIView):
     def get(self, request):
         featured_flag = (request.GET.get("featured") or "").strip().lower()
@@ -659,7 +665,7 @@ class ServicesAPIView(JSONAPIView):
         ))
 
 
-@method_decorator(cache_page(getattr(settings, 'CACHE_TIMEOUT_MEDIUM', 300)), name='dispatch')
+@method_decorator(cache_content(getattr(settings, 'CACHE_TIMEOUT_MEDIUM', 300)), name='dispatch')
 class ServiceDetailAPIView(JSONAPIView):
     """Get a single service with full detail page content."""
     def get(self, request, slug):
@@ -669,7 +675,7 @@ class ServiceDetailAPIView(JSONAPIView):
         return self.render({"service": service_data})
 
 
-@method_decorator(cache_page(getattr(settings, 'CACHE_TIMEOUT_LONG', 900)), name='dispatch')
+@method_decorator(cache_content(getattr(settings, 'CACHE_TIMEOUT_LONG', 900)), name='dispatch')
 class FAQAPIView(JSONAPIView):
     def get(self, request):
         return self.render({
@@ -909,6 +915,7 @@ class GetStartedAPIView(JSONAPIView):
                     f"Return ONLY a JSON array of 4 strings, no explanation."
                 ),
                 system_prompt="You are a business advisor. Return valid JSON only — an array of 4 strings.",
+                cache=True,
             )
             import json as json_mod
             output = result.get('output', '').strip()
@@ -981,7 +988,7 @@ class GetStartedAPIView(JSONAPIView):
 
             # Try phone lookup
             if not contact and phone:
-                contact = Contact.objects.filter(brand=brand, phone=phone).first()
+                contact = Contact.objects.by_phone(phone).filter(brand=brand).first()
 
             # Try email lookup
             if not contact:
@@ -1135,7 +1142,7 @@ class GetStartedAPIView(JSONAPIView):
             return self.render({'error': 'Something went wrong. Please try again.'}, status=500)
 
 
-@method_decorator(cache_page(getattr(settings, 'CACHE_TIMEOUT_MEDIUM', 300)), name='dispatch')
+@method_decorator(cache_content(getattr(settings, 'CACHE_TIMEOUT_MEDIUM', 300)), name='dispatch')
 class HeroContentAPIView(JSONAPIView):
     def get(self, request):
         page = request.GET.get("page", "home")
@@ -1244,7 +1251,7 @@ class WhyChooseContentAPIView(JSONAPIView):
         return self.render({"whyChoose": _serialize_why_choose_section()})
 
 
-@method_decorator(cache_page(getattr(settings, 'CACHE_TIMEOUT_LONG', 900)), name='dispatch')
+@method_decorator(cache_content(getattr(settings, 'CACHE_TIMEOUT_LONG', 900)), name='dispatch')
 class FooterContentAPIView(JSONAPIView):
     """Footer section content."""
     def get(self, request):
@@ -1284,7 +1291,7 @@ class FooterContentAPIView(JSONAPIView):
         return self.render({"footer": payload})
 
 
-@method_decorator(cache_page(getattr(settings, 'CACHE_TIMEOUT_LONG', 900)), name='dispatch')
+@method_decorator(cache_content(getattr(settings, 'CACHE_TIMEOUT_LONG', 900)), name='dispatch')
 class SiteSettingsAPIView(JSONAPIView):
     """Site-wide settings."""
     def get(self, request):
@@ -1507,51 +1514,28 @@ class NavigationAPIView(JSONAPIView):
         return self.render({"navigation": root_items})
 
 
-@method_decorator(cache_page(getattr(settings, 'CACHE_TIMEOUT_MEDIUM', 300)), name='dispatch')
-class HomePageAPIView(JSONAPIView):
-    """Aggregate payload for the marketing home page."""
+class PagePayloadAPIView(View):
+    """Serves a precompiled page payload (see core.services.page_payloads)."""
+
+    page = None
 
     def get(self, request):
-        services_data = _serialize_services_section()
-        return self.render(
-            {
-                "seo": _serialize_page_seo("home"),
-                "hero": _serialize_hero_section() or {},
-                "brand": BRAND_TOKENS,
-                "impact": _serialize_business_impact_section(),
-                "services": services_data.get("services", []),
-                "serviceStats": services_data.get("stats", []),
-                "serviceProcess": services_data.get("process", []),
-                "aiTools": _serialize_ai_tools_section(),
-                "roiCalculator": _serialize_roi_calculator_content(),
-                "whyChoose": _serialize_why_choose_section(),
-                "stats": _serialize_stats("home"),
-                "testimonials": _serialize_testimonials(),
-                "ctaSections": _serialize_cta_sections("home"),
-                "demos": _serialize_demos(),
-            }
-        )
+        return payload_response(request, get_page_payload(self.page))
+
+
+class HomePageAPIView(PagePayloadAPIView):
+    """Aggregate payload for the marketing home page."""
 
+    page = "home"
 
-@method_decorator(cache_page(getattr(settings, 'CACHE_TIMEOUT_MEDIUM', 300)), name='dispatch')
-class ServicesPageAPIView(JSONAPIView):
+
+class ServicesPageAPIView(PagePayloadAPIView):
     """Aggregate payload for the services page."""
 
-    def get(self, request):
-        services_data = _serialize_services_section()
-        return self.render(
-            {
-                "seo": _serialize_page_seo("services"),
-                "services": services_data.get("services", []),
-                "stats": services_data.get("stats", []),
-                "process": services_data.get("process", []),
-                "ctaSections": _serialize_cta_sections("services"),
-                "testimonials": _serialize_testimonials(),
-            }
-        )
+    page = "services"
 
 
-@method_decorator(cache_page(getattr(settings, 'CACHE_TIMEOUT_MEDIUM', 300)), name='dispatch')
+@method_decorator(cache_content(getattr(settings, 'CACHE_TIMEOUT_MEDIUM', 300)), name='dispatch')
 class AIToolsPageAPIView(JSONAPIView):
     """Aggregate payload for the AI tools showcase page."""
 
@@ -1566,7 +1550,7 @@ class AIToolsPageAPIView(JSONAPIView):
         )
 
 
-@method_decorator(cache_page(getattr(settings, 'CACHE_TIMEOUT_MEDIUM', 300)), name='dispatch')
+@method_decorator(cache_content(getattr(settings, 'CACHE_TIMEOUT_MEDIUM', 300)), name='dispatch')
 class DemosPageAPIView(JSONAPIView):
     """Aggregate payload for the demos page."""
 
@@ -1643,35 +1627,36 @@ class BlogDetailAPIView(JSONAPIView):
 
             post = BlogPost.objects.select_related('blog_category').get(slug=slug, status='published')
 
-            # Increment view count
-            post.views_count = (post.views_count or 0) + 1
-            post.save(update_fields=['views_count'])
-
-            # Convert markdown content to HTML if needed
-            import markdown
-            content_html = markdown.markdown(
-                post.content,
-                extensions=['extra', 'codehilite', 'tables', 'toc']
-            ) if post.content else ''
-
-            return self.render({
-                "post": {
-                    "title": post.title,
-                    "slug": post.slug,
-                    "excerpt": post.excerpt,
-                    "content": post.content,
-                    "contentHtml": content_html,
-                    "featuredImage": post.featured_image.url if post.featured_image else None,
-                    "author": post.author,
-                    "category": post.blog_category.name if post.blog_category else post.category,
-                    "tags": post.tags.split(",") if post.tags else [],
-                    "metaTitle": post.meta_title,
-                    "metaDescription": post.meta_description,
-                    "publishedAt": post.published_at.isoformat() if post.published_at else None,
-                    "viewsCount": post.views_count,
-                    "readingTime": post.reading_time_minutes,
-                }
-            })
+            # Buffered; flushed to views_count by core.tasks.flush_blog_view_counts
+            record_view(post.pk)
+
+            etag = quote_etag(hashlib.md5(
+                f"{post.pk}:{post.updated_at.isoformat()}:{post.views_count}".encode()
+            ).hexdigest())
+            last_modified = int(post.updated_at.timestamp())
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = self.render({
+                    "post": {
+                        "title": post.title,
+                        "slug": post.slug,
+                        "excerpt": post.excerpt,
+                        "content": post.content,
+                        "contentHtml": post.content_html,
+                        "featuredImage": post.featured_image.url if post.featured_image else None,
+                        "author": post.author,
+                        "category": post.blog_category.name if post.blog_category else post.category,
+                        "tags": post.tags.split(",") if post.tags else [],
+                        "metaTitle": post.meta_title,
+                        "metaDescription": post.meta_description,
+                        "publishedAt": post.published_at.isoformat() if post.published_at else None,
+                        "viewsCount": post.views_count,
+                        "readingTime": post.reading_time_minutes,
+                    }
+                })
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+            return response
         except BlogPost.DoesNotExist:
             # Log more details about why it failed
             logger.warning(f"BlogPost not found for slug: '{slug}'")
@@ -1721,13 +1706,13 @@ class KnowledgeBaseAPIView(JSONAPIView):
         return self.render({"articles": payload})
 
 
+@method_decorator(etag(lambda request, *args, **kwargs: get_knowledge_snapshot()["etag"]), name='get')
 class ChatbotKnowledgeAPIView(JSONAPIView):
-    """Aggregated marketing knowledge for the chatbot widget."""
+    """Aggregated marketing knowledge for the chatbot widget (cached snapshot, ETag-validated)."""
 
     def get(self, request):
-        builder = ChatKnowledgeBuilder()
-        data = builder.build()
-        return self.render({"knowledge": data})
+        snapshot = get_knowledge_snapshot()
+        return self.render({"knowledge": snapshot["data"]})
 
 
 class ChatbotConfigAPIView(JSONAPIView):
@@ -1761,7 +1746,12 @@ class ChatConversationAPIView(JSONAPIView):
 
 @method_decorator(csrf_exempt, name='dispatch')
 class ChatbotMessageAPIView(JSONAPIView):
-    """Handle user messages and stream back AI replies."""
+    """
+    Handle user messages and reply with the AI answer.
+
+    Send ``"stream": true`` (or ``Accept: text/event-stream``) to receive the
+    reply as Server-Sent Events: ``start``, ``token`` per chunk, ``done``.
+    """
 
     def post(self, request):
         try:
@@ -1787,10 +1777,26 @@ class ChatbotMessageAPIView(JSONAPIView):
             )
 
         service = ChatbotService(conversation)
+        if data.get("stream") or "text/event-stream" in request.headers.get("Accept", ""):
+            response = StreamingHttpResponse(
+                (_sse_frame(event) for event in service.stream_reply(message)),
+                content_type="text/event-stream",
+            )
+            response["Cache-Control"] = "no-cache"
+            response["X-Accel-Buffering"] = "no"  # Don't let nginx buffer the stream
+            return response
+
         payload = service.reply(message)
         return self.render(payload)
 
 
+def _sse_frame(event: dict) -> str:
+    """Encode a ChatbotService.stream_reply event as a Server-Sent Events frame."""
+    name = event.get("event", "message")
+    data = {key: value for key, value in event.items() if key != "event"}
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
 class ReactAppView(TemplateView):
     """
     Serves the compiled React SPA (frontend/dist/index.html).
@@ -36,6 +36,14 @@ from .models import (
     ProspectScan,
     LeadSearch,
     WhatsAppConversation,
+    WebhookEvent,
+)
+from .services.contact_search import refresh_active_deal_flags
+from .services.recipient_resolver import (
+    STATUS_BLOCKED,
+    STATUS_PIPELINE,
+    resolve_recipients,
+    sendable_recipients,
 )
 
 
@@ -269,7 +277,7 @@ class ContactAdminForm(forms.ModelForm):
             email = Contact.normalize_email(email) if hasattr(Contact, 'normalize_email') else email.lower().strip()
 
             # Check for existing contact with same email + brand (exclude current instance)
-            qs = Contact.objects.filter(email__iexact=email, brand=brand)
+            qs = Contact.objects.by_email(email).filter(brand=brand)
             if self.instance.pk:
                 qs = qs.exclude(pk=self.instance.pk)
 
@@ -421,6 +429,8 @@ class ContactAdmin(ModelAdmin):
                 lost_reason='unsubscribed'
             ).update(status='active', lost_reason='')
             deals_reactivated += reactivated
+            if reactivated:
+                refresh_active_deal_flags([contact.id])
 
         msg = f"Resubscribed {updated} contact(s)."
         if deals_reactivated:
@@ -551,7 +561,7 @@ class CodetekiContactAdminForm(forms.ModelForm):
                 return email
 
             # Check for existing contact
-            qs = Contact.objects.filter(email__iexact=email, brand=brand)
+            qs = Contact.objects.by_email(email).filter(brand=brand)
             if self.instance.pk:
                 qs = qs.exclude(pk=self.instance.pk)
 
@@ -1032,7 +1042,7 @@ class DesiFirmsContactAdminForm(forms.ModelForm):
                 return email
 
             # Check for existing contact
-            qs = Contact.objects.filter(email__iexact=email, brand=brand)
+            qs = Contact.objects.by_email(email).filter(brand=brand)
             if self.instance.pk:
                 qs = qs.exclude(pk=self.instance.pk)
 
@@ -2027,14 +2037,19 @@ class DealAdmin(ModelAdmin):
     @action(description="⏸️ Pause automation")
     def pause_deals(self, request, queryset):
         """Pause selected deals to stop automated emails."""
+        contact_ids = list(queryset.values_list('contact_id', flat=True))
         updated = queryset.update(status='paused')
+        refresh_active_deal_flags(contact_ids)
         self.message_user(request, f"⏸️ Paused {updated} deal(s). They won't receive automated emails.")
 
     @action(description="▶️ Resume automation")
     def resume_deals(self, request, queryset):
         """Resume paused deals."""
         from django.utils import timezone
-        updated = queryset.filter(status='paused').update(status='active', next_action_date=timezone.now())
+        paused = queryset.filter(status='paused')
+        contact_ids = list(paused.values_list('contact_id', flat=True))
+        updated = paused.update(status='active', next_action_date=timezone.now())
+        refresh_active_deal_flags(contact_ids)
         self.message_user(request, f"▶️ Resumed {updated} deal(s). They will be processed in next cycle.")
 
     # =========================================================================
@@ -2722,7 +2737,7 @@ class EmailDraftAdmin(ModelAdmin):
             'description': 'Schedule email to send at peak business hours (Australia/Sydney timezone)'
         }),
         ('Status', {
-            'fields': ('sent_count', 'deals_created', 'total_recipients', 'is_sent', 'sent_at'),
+            'fields': ('sent_count', 'failed_count', 'deals_created', 'total_recipients', 'is_sent', 'sent_at', 'send_progress_at'),
             'classes': ['collapse'],
         }),
         ('Template', {
@@ -2730,7 +2745,7 @@ class EmailDraftAdmin(ModelAdmin):
             'classes': ['collapse'],
         }),
     )
-    readonly_fields = ['is_sent', 'sent_at', 'sent_count', 'total_recipients', 'deals_created', 'schedule_status', 'schedule_error']
+    readonly_fields = ['is_sent', 'sent_at', 'sent_count', 'failed_count', 'total_recipients', 'deals_created', 'send_progress_at', 'schedule_status', 'schedule_error']
 
     class Media:
         css = {
@@ -2805,7 +2820,7 @@ class EmailDraftAdmin(ModelAdmin):
         if obj.schedule_status == 'scheduled' and obj.scheduled_for:
             return f"📅 {obj.get_scheduled_time_display()}", "info"
         elif obj.schedule_status == 'sending':
-            return "Sending...", "warning"
+            return f"Sending... {obj.sent_count} sent, {obj.failed_count} failed", "warning"
         elif obj.schedule_status == 'completed':
             return "Sent", "success"
         elif obj.schedule_status == 'cancelled':
@@ -2932,82 +2947,20 @@ class EmailDraftAdmin(ModelAdmin):
             return
 
         # Categorize recipients for preview
-        recipients_preview = []
-        valid_recipients = []
-        in_pipeline_count = 0
-        blocked_count = 0
-
-        if is_phone:
-            for recipient in all_recipients:
-                phone = recipient.get('phone', '')
-                if not phone:
-                    continue
-
-                contact = recipient.get('contact')
-                if not contact:
-                    contact = Contact.objects.filter(phone=phone, brand=draft.brand).first()
-
-                status = 'ok'
-                if contact and contact.sms_opted_out:
-                    status = 'blocked'
-                    blocked_count += 1
-                elif contact and not draft.send_to_pipeline_contacts:
-                    if Deal.objects.filter(contact=contact, status='active').exists():
-                        status = 'pipeline'
-                        in_pipeline_count += 1
-
-                if status == 'ok':
-                    valid_recipients.append({
-                        'phone': phone,
-                        'name': recipient.get('name', ''),
-                        'company': recipient.get('company', ''),
-                        'contact': contact,
-                    })
-
-                recipients_preview.append({
-                    'phone': phone,
-                    'name': recipient.get('name', ''),
-                    'company': recipient.get('company', ''),
-                    'status': status,
-                })
-        else:
-            for recipient in all_recipients:
-                recipient_email = Contact.normalize_email(recipient['email'])
-                if not recipient_email:
-                    continue
-
-                contact = recipient.get('contact')
-                if not contact:
-                    contact = Contact.objects.filter(email__iexact=recipient_email, brand=draft.brand).first()
-
-                brand_slug = draft.brand.slug if draft.brand else None
-                status = 'ok'
-
-                # Check unsubscribed
-                if contact and (contact.is_unsubscribed or contact.is_unsubscribed_from_brand(brand_slug)):
-                    status = 'blocked'
-                    blocked_count += 1
-                # Check in pipeline
-                elif contact and not draft.send_to_pipeline_contacts:
-                    if Deal.objects.filter(contact=contact, status='active').exists():
-                        status = 'pipeline'
-                        in_pipeline_count += 1
-
-                if status == 'ok':
-                    valid_recipients.append({
-                        'email': recipient_email,
-                        'name': recipient.get('name', ''),
-                        'company': recipient.get('company', ''),
-                        'website': recipient.get('website', ''),
-                        'contact': contact,
-                    })
-
-                recipients_preview.append({
-                    'email': recipient_email,
-                    'name': recipient.get('name', ''),
-                    'company': recipient.get('company', ''),
-                    'status': status,
-                })
+        resolved = resolve_recipients(draft, all_recipients)
+        address_key = 'phone' if is_phone else 'email'
+        recipients_preview = [
+            {
+                address_key: recipient[address_key],
+                'name': recipient['name'],
+                'company': recipient['company'],
+                'status': recipient['status'],
+            }
+            for recipient in resolved
+        ]
+        valid_recipients = sendable_recipients(resolved)
+        in_pipeline_count = sum(1 for r in resolved if r['status'] == STATUS_PIPELINE)
+        blocked_count = sum(1 for r in resolved if r['status'] == STATUS_BLOCKED)
 
         # If confirmation received, send
         if 'confirm_send' in request.POST:
@@ -3265,7 +3218,7 @@ class EmailDraftAdmin(ModelAdmin):
 
                 # Get or create contact
                 if not contact:
-                    contact = Contact.objects.filter(email__iexact=recipient_email, brand=draft.brand).first()
+                    contact = Contact.objects.by_email(recipient_email).filter(brand=draft.brand).first()
 
                 if not contact:
                     from django.db import transaction
@@ -3283,7 +3236,7 @@ class EmailDraftAdmin(ModelAdmin):
                                 source='email_composer'
                             )
                     except Exception:
-                        contact = Contact.objects.filter(email__iexact=recipient_email, brand=draft.brand).first()
+                        contact = Contact.objects.by_email(recipient_email).filter(brand=draft.brand).first()
                         if contact:
                             contact.last_emailed_at = timezone.now()
                             contact.email_count = (contact.email_count or 0) + 1
@@ -3530,80 +3483,20 @@ class EmailDraftAdmin(ModelAdmin):
             return HttpResponseRedirect(request.path)
 
         # Categorize recipients for preview
-        recipients_preview = []
-        valid_recipients = []
-        in_pipeline_count = 0
-        blocked_count = 0
-
-        if is_phone:
-            for recipient in all_recipients:
-                phone = recipient.get('phone', '')
-                if not phone:
-                    continue
-
-                contact = recipient.get('contact')
-                if not contact:
-                    contact = Contact.objects.filter(phone=phone, brand=draft.brand).first()
-
-                status = 'ok'
-                if contact and contact.sms_opted_out:
-                    status = 'blocked'
-                    blocked_count += 1
-                elif contact and not draft.send_to_pipeline_contacts:
-                    if Deal.objects.filter(contact=contact, status='active').exists():
-                        status = 'pipeline'
-                        in_pipeline_count += 1
-
-                if status == 'ok':
-                    valid_recipients.append({
-                        'phone': phone,
-                        'name': recipient.get('name', ''),
-                        'company': recipient.get('company', ''),
-                        'contact': contact,
-                    })
-
-                recipients_preview.append({
-                    'phone': phone,
-                    'name': recipient.get('name', ''),
-                    'company': recipient.get('company', ''),
-                    'status': status,
-                })
-        else:
-            for recipient in all_recipients:
-                recipient_email = Contact.normalize_email(recipient['email'])
-                if not recipient_email:
-                    continue
-
-                contact = recipient.get('contact')
-                if not contact:
-                    contact = Contact.objects.filter(email__iexact=recipient_email, brand=draft.brand).first()
-
-                brand_slug = draft.brand.slug if draft.brand else None
-                status = 'ok'
-
-                if contact and (contact.is_unsubscribed or contact.is_unsubscribed_from_brand(brand_slug)):
-                    status = 'blocked'
-                    blocked_count += 1
-                elif contact and not draft.send_to_pipeline_contacts:
-                    if Deal.objects.filter(contact=contact, status='active').exists():
-                        status = 'pipeline'
-                        in_pipeline_count += 1
-
-                if status == 'ok':
-                    valid_recipients.append({
-                        'email': recipient_email,
-                        'name': recipient.get('name', ''),
-                        'company': recipient.get('company', ''),
-                        'website': recipient.get('website', ''),
-                        'contact': contact,
-                    })
-
-                recipients_preview.append({
-                    'email': recipient_email,
-                    'name': recipient.get('name', ''),
-                    'company': recipient.get('company', ''),
-                    'status': status,
-                })
+        resolved = resolve_recipients(draft, all_recipients)
+        address_key = 'phone' if is_phone else 'email'
+        recipients_preview = [
+            {
+                address_key: recipient[address_key],
+                'name': recipient['name'],
+                'company': recipient['company'],
+                'status': recipient['status'],
+            }
+            for recipient in resolved
+        ]
+        valid_recipients = sendable_recipients(resolved)
+        in_pipeline_count = sum(1 for r in resolved if r['status'] == STATUS_PIPELINE)
+        blocked_count = sum(1 for r in resolved if r['status'] == STATUS_BLOCKED)
 
         # If confirmation received, send
         if 'confirm_send' in request.POST:
@@ -4253,7 +4146,9 @@ class WhatsAppConversationAdmin(ModelAdmin):
     search_fields = ['phone', 'user_name', 'user_company']
     readonly_fields = ['id', 'phone', 'contact', 'deal', 'message_count', 'ai_message_count',
                        'last_inbound_at', 'last_outbound_at', 'handoff_at', 'handoff_reason',
-                       'conversation_summary', 'detected_intent', 'created_at', 'updated_at']
+                       'conversation_summary', 'summary_through', 'detected_intent',
+                       'last_prompt_tokens', 'last_cached_tokens', 'total_prompt_tokens', 'total_cached_tokens',
+                       'created_at', 'updated_at']
 
     fieldsets = (
         (None, {
@@ -4263,11 +4158,15 @@ class WhatsAppConversationAdmin(ModelAdmin):
             'fields': ('phase', 'user_type', 'ai_active', 'user_name', 'user_company', 'detected_intent'),
         }),
         ('Summary', {
-            'fields': ('conversation_summary',),
+            'fields': ('conversation_summary', 'summary_through'),
         }),
         ('Stats', {
             'fields': ('message_count', 'ai_message_count', 'last_inbound_at', 'last_outbound_at'),
         }),
+        ('Prompt Usage', {
+            'fields': ('last_prompt_tokens', 'last_cached_tokens', 'total_prompt_tokens', 'total_cached_tokens'),
+            'classes': ['collapse'],
+        }),
         ('Handoff', {
             'fields': ('handoff_at', 'handoff_reason'),
             'classes': ['collapse'],
@@ -4283,3 +4182,18 @@ class WhatsAppConversationAdmin(ModelAdmin):
         if obj.ai_active:
             return format_html('<span style="color:#25D366;font-weight:600;">AI Active</span>')
         return format_html('<span style="color:#e74c3c;font-weight:600;">Human</span>')
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(ModelAdmin):
+    list_display = ['provider', 'event_id', 'status', 'attempts', 'received_at', 'processed_at']
+    list_filter = ['status', 'provider']
+    search_fields = ['event_id', 'last_error']
+    readonly_fields = ['provider', 'event_id', 'payload', 'status', 'attempts', 'last_error', 'result',
+                       'received_at', 'next_attempt_at', 'processed_at']
+    actions = ['requeue_events']
+
+    @action(description="Retry (failed and dead-lettered only)")
+    def requeue_events(self, request, queryset):
+        from crm.services.webhook_inbox import requeue
+        self.message_user(request, f"Requeued {requeue(queryset)} webhook event(s).")
@@ -14,6 +14,7 @@ Usage:
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from crm.models import Contact
+from crm.services.contact_search import refresh_active_deal_flags
 
 
 class Command(BaseCommand):
@@ -149,6 +150,7 @@ class Command(BaseCommand):
 
                     # Move deals to primary contact
                     other.deals.all().update(contact=primary)
+                    refresh_active_deal_flags([primary.id])
 
                     # Delete duplicate
                     self.stdout.write(f"  Deleting duplicate: {other.email} (ID: {str(other.id)[:8]}...)")
@@ -177,7 +179,7 @@ class Command(BaseCommand):
                     continue
 
                 # Check if normalized email already exists
-                existing = Contact.objects.filter(email__iexact=normalized_email).exclude(id=contact.id).first()
+                existing = Contact.objects.by_email(normalized_email).exclude(id=contact.id).first()
 
                 if existing:
                     # Merge into existing contact
@@ -203,6 +205,7 @@ class Command(BaseCommand):
 
                     # Move deals to existing contact
                     contact.deals.all().update(contact=existing)
+                    refresh_active_deal_flags([existing.id])
 
                     # Delete malformed contact
                     contact.delete()
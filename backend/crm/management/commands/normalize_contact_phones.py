@@ -0,0 +1,31 @@
+"""
+Management command to recompute Contact.phone_e164 (the by_phone lookup key).
+
+save() keeps it current; run this after changing phones with
+QuerySet.update() or bulk_update(), which bypass save().
+
+Usage:
+    python manage.py normalize_contact_phones
+"""
+
+from django.core.management.base import BaseCommand
+
+from crm.models import Contact
+
+
+class Command(BaseCommand):
+    help = 'Normalize every contact phone to E.164 for inbound phone routing'
+
+    def handle(self, *args, **options):
+        changed = []
+        total = 0
+        for contact in Contact.objects.only('id', 'phone', 'phone_e164').iterator(chunk_size=1000):
+            e164 = Contact.normalize_phone(contact.phone)
+            if e164 != contact.phone_e164:
+                contact.phone_e164 = e164
+                changed.append(contact)
+            if len(changed) >= 1000:
+                total += Contact.objects.bulk_update(changed, ['phone_e164'])
+                changed = []
+        total += Contact.objects.bulk_update(changed, ['phone_e164'])
+        self.stdout.write(self.style.SUCCESS(f'Updated {total} contacts'))
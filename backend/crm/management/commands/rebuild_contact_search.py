@@ -0,0 +1,20 @@
+"""
+Management command to rebuild the contact typeahead index.
+
+Usage:
+    python manage.py rebuild_contact_search
+"""
+
+from django.core.management.base import BaseCommand
+
+from crm.models import Contact
+from crm.services.contact_search import rebuild_index, refresh_active_deal_flags
+
+
+class Command(BaseCommand):
+    help = 'Re-tokenize all contacts and recompute has_active_deal for composer search'
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index()
+        refresh_active_deal_flags(Contact.objects.values_list('id', flat=True))
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} contacts'))
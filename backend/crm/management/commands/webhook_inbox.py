@@ -0,0 +1,46 @@
+"""
+Management command to inspect (and optionally drain) the webhook inbox.
+
+Usage:
+    python manage.py webhook_inbox
+    python manage.py webhook_inbox --drain
+    python manage.py webhook_inbox --requeue-dead
+"""
+
+from django.core.management.base import BaseCommand
+
+from crm.models import WebhookEvent
+from crm.services.webhook_inbox import drain_inbox, inbox_metrics, requeue
+
+
+class Command(BaseCommand):
+    help = 'Show webhook inbox backlog, lag and dead letters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drain', action='store_true', help='Process due events now')
+        parser.add_argument('--requeue-dead', action='store_true', help='Retry dead-lettered events')
+
+    def handle(self, *args, **options):
+        if options['requeue_dead']:
+            count = requeue(WebhookEvent.objects.filter(status='dead'))
+            self.stdout.write(f'Requeued {count} dead-lettered events')
+        if options['drain']:
+            self.stdout.write(f'Drained: {drain_inbox()}')
+
+        metrics = inbox_metrics()
+        for provider, by_status in sorted(metrics['counts'].items()):
+            counts = ', '.join(f'{status}={n}' for status, n in sorted(by_status.items()))
+            self.stdout.write(f'{provider}: {counts}')
+
+        oldest = metrics['oldest_pending_seconds']
+        max_lag = metrics['max_lag_seconds']
+        self.stdout.write(
+            f"Backlog {metrics['backlog']} (oldest {oldest:.0f}s)" if oldest is not None
+            else f"Backlog {metrics['backlog']}"
+        )
+        self.stdout.write(
+            f"Processed in the last hour: {metrics['processed_recently']}"
+            + (f" (max lag {max_lag:.1f}s)" if max_lag is not None else '')
+        )
+        style = self.style.ERROR if metrics['dead'] else self.style.SUCCESS
+        self.stdout.write(style(f"Dead letters: {metrics['dead']}"))
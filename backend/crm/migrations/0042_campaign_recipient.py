@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0041_alter_emaildraft_channel_alter_emaillog_channel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emaildraft',
+            name='failed_count',
+            field=models.IntegerField(default=0, help_text='Sends that failed'),
+        ),
+        migrations.AddField(
+            model_name='emaildraft',
+            name='send_progress_at',
+            field=models.DateTimeField(blank=True, help_text='Last send checkpoint', null=True),
+        ),
+        migrations.AddField(
+            model_name='emaildraft',
+            name='send_run_id',
+            field=models.UUIDField(blank=True, help_text='Current/last scheduled send run', null=True),
+        ),
+        migrations.CreateModel(
+            name='CampaignRecipient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_id', models.UUIDField()),
+                ('address', models.CharField(help_text='Normalized email or E.164 phone', max_length=255)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('company', models.CharField(blank=True, max_length=255)),
+                ('website', models.CharField(blank=True, max_length=500)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('deal_created', models.BooleanField(default=False)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('contact', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='campaign_sends', to='crm.contact')),
+                ('draft', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='campaign_recipients', to='crm.emaildraft')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['draft', 'run_id', 'status'], name='crm_campaig_draft_i_ecd9c3_idx')],
+                'unique_together': {('draft', 'run_id', 'address')},
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:25
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0042_campaign_recipient'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(django.db.models.functions.text.Upper('email'), models.F('brand'), name='crm_contact_email_ci_brand'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['phone'], name='crm_contact_phone'),
+        ),
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['status', 'autopilot_paused', 'next_action_date'], name='crm_deal_autopilot_due'),
+        ),
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['pipeline', 'current_stage', 'status'], name='crm_deal_board'),
+        ),
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['contact', 'status'], name='crm_deal_contact_status'),
+        ),
+        migrations.AddIndex(
+            model_name='emaillog',
+            index=models.Index(fields=['deal', 'sent_at'], name='crm_emaillog_deal_sent'),
+        ),
+        migrations.AddIndex(
+            model_name='emaillog',
+            index=models.Index(fields=['message_sid'], name='crm_emaillog_message_sid'),
+        ),
+        migrations.AddIndex(
+            model_name='emaillog',
+            index=models.Index(fields=['zoho_message_id'], name='crm_emaillog_zoho_msg_id'),
+        ),
+        migrations.AddIndex(
+            model_name='emaillog',
+            index=models.Index(fields=['channel', 'to_phone', 'sent_at'], name='crm_emaillog_thread'),
+        ),
+    ]
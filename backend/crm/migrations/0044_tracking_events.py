@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:28
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0043_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackingEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tracking_id', models.UUIDField(help_text='EmailLog.tracking_id (not a FK so the insert needs no lookup)')),
+                ('kind', models.CharField(choices=[('open', 'Open')], default='open', max_length=10)),
+                ('user_agent', models.CharField(blank=True, max_length=255)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('occurred_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='emaillog',
+            name='machine_open',
+            field=models.BooleanField(default=False, help_text='Only automated opens seen so far (image proxy / scanner prefetch)'),
+        ),
+        migrations.AddField(
+            model_name='emaillog',
+            name='open_count',
+            field=models.PositiveIntegerField(default=0, help_text='Pixel hits, including repeats'),
+        ),
+    ]
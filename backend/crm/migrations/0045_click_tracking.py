@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0044_tracking_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emaillog',
+            name='click_count',
+            field=models.PositiveIntegerField(default=0, help_text='Tracked link clicks, including scanners'),
+        ),
+        migrations.AddField(
+            model_name='trackingevent',
+            name='url',
+            field=models.TextField(blank=True, help_text='Destination for clicks'),
+        ),
+        migrations.AlterField(
+            model_name='dealactivity',
+            name='activity_type',
+            field=models.CharField(choices=[('stage_change', 'Stage Changed'), ('email_sent', 'Email Sent'), ('email_opened', 'Email Opened'), ('email_clicked', 'Email Link Clicked'), ('email_replied', 'Email Replied'), ('note_added', 'Note Added'), ('ai_action', 'AI Action'), ('status_change', 'Status Changed')], max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='trackingevent',
+            name='kind',
+            field=models.CharField(choices=[('open', 'Open'), ('click', 'Click')], default='open', max_length=10),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-16 12:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Exists, OuterRef
+
+
+def backfill_contact_search(apps, schema_editor):
+    """Flag contacts with active deals and tokenize every contact."""
+    from crm.services.contact_search import contact_tokens
+
+    Contact = apps.get_model('crm', 'Contact')
+    ContactSearchToken = apps.get_model('crm', 'ContactSearchToken')
+    Deal = apps.get_model('crm', 'Deal')
+
+    Contact.objects.update(has_active_deal=Exists(
+        Deal.objects.filter(contact_id=OuterRef('pk'), status='active')
+    ))
+
+    rows = []
+    for contact in Contact.objects.only('id', 'brand_id', 'name', 'company', 'email', 'phone').iterator():
+        rows.extend(
+            ContactSearchToken(contact_id=contact.pk, brand_id=contact.brand_id, token=token)
+            for token in contact_tokens(contact)
+        )
+        if len(rows) >= 1000:
+            ContactSearchToken.objects.bulk_create(rows)
+            rows = []
+    ContactSearchToken.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0045_click_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='has_active_deal',
+            field=models.BooleanField(default=False, editable=False, help_text='Contact has an active deal'),
+        ),
+        migrations.CreateModel(
+            name='ContactSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('brand', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crm.brand')),
+                ('contact', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='crm.contact')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['brand', 'token'], name='crm_contact_search_brand', opclasses=['', 'varchar_pattern_ops']), models.Index(fields=['token'], name='crm_contact_search_token', opclasses=['varchar_pattern_ops'])],
+                'unique_together': {('contact', 'token')},
+            },
+        ),
+        migrations.RunPython(backfill_contact_search, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-16 13:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0046_contact_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('provider', models.CharField(choices=[('meta', 'Meta WhatsApp'), ('twilio_status', 'Twilio status'), ('twilio_inbound', 'Twilio inbound'), ('zeptomail', 'ZeptoMail bounce'), ('email_reply', 'Email reply'), ('desifirms', 'Desi Firms')], max_length=20)),
+                ('event_id', models.CharField(help_text="Provider's id for the delivery (or a hash of the body)", max_length=255)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed (will retry)'), ('dead', 'Dead letter')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('result', models.JSONField(blank=True, help_text='What the handler did', null=True)),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='crm_webhook_status_due_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='webhookevent',
+            constraint=models.UniqueConstraint(fields=('provider', 'event_id'), name='crm_webhookevent_provider_event_id'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-16 13:07
+
+from django.db import migrations, models
+
+
+def _normalize_phone(phone):
+    """Contact.normalize_phone as of this migration: E.164, Australian by default, '' if invalid."""
+    import phonenumbers
+
+    try:
+        parsed = phonenumbers.parse(phone.strip(), 'AU')
+        if phonenumbers.is_valid_number(parsed):
+            return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+    except phonenumbers.NumberParseException:
+        pass
+    return ''
+
+
+def backfill_phone_e164(apps, schema_editor):
+    """Normalize every stored phone into phone_e164."""
+    Contact = apps.get_model('crm', 'Contact')
+    batch = []
+    for contact in Contact.objects.exclude(phone='').only('id', 'phone').iterator(chunk_size=1000):
+        contact.phone_e164 = _normalize_phone(contact.phone)
+        if contact.phone_e164:
+            batch.append(contact)
+        if len(batch) >= 1000:
+            Contact.objects.bulk_update(batch, ['phone_e164'])
+            batch = []
+    Contact.objects.bulk_update(batch, ['phone_e164'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0047_webhook_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='phone_e164',
+            field=models.CharField(blank=True, editable=False, help_text="phone normalized to E.164 on save (blank if it doesn't parse)", max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['phone_e164'], name='crm_contact_phone_e164'),
+        ),
+        migrations.RunPython(backfill_phone_e164, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-16 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0048_contact_phone_e164'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='whatsappconversation',
+            name='last_cached_tokens',
+            field=models.PositiveIntegerField(default=0, help_text="Of those, tokens served from the provider's prompt cache"),
+        ),
+        migrations.AddField(
+            model_name='whatsappconversation',
+            name='last_prompt_tokens',
+            field=models.PositiveIntegerField(default=0, help_text='Prompt tokens of the latest AI reply'),
+        ),
+        migrations.AddField(
+            model_name='whatsappconversation',
+            name='summary_through',
+            field=models.DateTimeField(blank=True, help_text='Messages sent up to this time are folded into conversation_summary', null=True),
+        ),
+        migrations.AddField(
+            model_name='whatsappconversation',
+            name='total_cached_tokens',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='whatsappconversation',
+            name='total_prompt_tokens',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 13:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0049_whatsapp_conversation_memory'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['pipeline', 'current_stage', '-updated_at', '-id'], name='crm_deal_board_recent'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils import timezone
 import uuid
 
@@ -102,9 +103,44 @@ class Brand(models.Model):
         return self.name
 
 
+class ContactQuerySet(models.QuerySet):
+    def by_email(self, email: str):
+        """
+        Case-insensitive email match served by the UPPER(email) index.
+
+        Use instead of email__iexact, which SQLite compiles to LIKE and
+        can't answer from an index.
+        """
+        email = (email or '').strip()
+        if not email:
+            return self.none()
+        return self.alias(email_upper=Upper('email')).filter(email_upper=email.upper())
+
+    def by_phone(self, phone: str):
+        """
+        Contacts with this phone number, however it was formatted when stored.
+
+        Normalizes the number (Twilio's "whatsapp:" prefix included) and
+        matches the indexed phone_e164 column; numbers that don't parse
+        fall back to an exact match on phone. Use instead of
+        phone__endswith, which scans the table.
+        """
+        phone = (phone or '').strip()
+        if phone.startswith('whatsapp:'):
+            phone = phone[len('whatsapp:'):]
+        if not phone:
+            return self.none()
+        e164 = self.model.normalize_phone(phone)
+        if e164:
+            return self.filter(phone_e164=e164)
+        return self.filter(phone=phone)
+
+
 class Contact(models.Model):
     """Leads and backlink targets for CRM outreach."""
 
+    objects = ContactQuerySet.as_manager()
+
     CONTACT_TYPE_CHOICES = [
         ('lead', 'Lead'),
         ('backlink_target', 'Backlink Target'),
@@ -142,6 +178,10 @@ class Contact(models.Model):
     company = models.CharField(max_length=255, blank=True)
     website = models.URLField(blank=True)
     phone = models.CharField(max_length=30, blank=True, help_text="Phone number")
+    phone_e164 = models.CharField(
+        max_length=20, blank=True, editable=False,
+        help_text="phone normalized to E.164 on save (blank if it doesn't parse)",
+    )
     industry = models.CharField(max_length=50, blank=True, choices=INDUSTRY_CHOICES)
     address = models.TextField(blank=True, help_text="Business address")
     google_place_id = models.CharField(max_length=300, blank=True, help_text="Google Places ID for dedup")
@@ -185,6 +225,10 @@ class Contact(models.Model):
     sms_count = models.IntegerField(default=0, help_text="Total SMS/WhatsApp messages sent")
     has_whatsapp = models.BooleanField(null=True, blank=True, default=None, help_text="None=unknown, True=confirmed on WhatsApp, False=not on WhatsApp")
 
+    # Maintained from Deal saves/deletes (crm.signals) so search needn't join deals;
+    # bulk status updates call refresh_active_deal_flags()
+    has_active_deal = models.BooleanField(default=False, editable=False, help_text="Contact has an active deal")
+
     # Status tracking (simplified pipeline)
     STATUS_CHOICES = [
         ('new', 'New'),
@@ -226,6 +270,13 @@ class Contact(models.Model):
                 name='unique_brand_email_when_set',
             ),
         ]
+        indexes = [
+            # Contact.objects.by_email(...) (+ brand): webhooks, imports, reply matching
+            models.Index(Upper('email'), 'brand', name='crm_contact_email_ci_brand'),
+            models.Index(fields=['phone'], name='crm_contact_phone'),
+            # Contact.objects.by_phone(...): inbound SMS/WhatsApp routing
+            models.Index(fields=['phone_e164'], name='crm_contact_phone_e164'),
+        ]
 
     def __str__(self):
         if self.email:
@@ -391,7 +442,13 @@ class Contact(models.Model):
     )
 
     def save(self, *args, **kwargs):
-        """Normalize email and auto-extract name/company/website if needed."""
+        """Normalize email and phone, and auto-extract name/company/website if needed."""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'phone' in update_fields:
+            self.phone_e164 = self.normalize_phone(self.phone)
+            if update_fields is not None and 'phone_e164' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'phone_e164']
+
         if self.email:
             self.email = self.normalize_email(self.email)
             email_domain = self.email.split('@')[1] if '@' in self.email else ''
@@ -605,6 +662,16 @@ class Deal(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Deal'
         verbose_name_plural = 'Deals'
+        indexes = [
+            # process_pending_deals: equality on status and autopilot_paused, then the next_action_date range
+            models.Index(fields=['status', 'autopilot_paused', 'next_action_date'], name='crm_deal_autopilot_due'),
+            # Pipeline board columns and stage counts
+            models.Index(fields=['pipeline', 'current_stage', 'status'], name='crm_deal_board'),
+            # Board column pages, newest first by keyset (pipeline_board_deals)
+            models.Index(fields=['pipeline', 'current_stage', '-updated_at', '-id'], name='crm_deal_board_recent'),
+            # "Is this contact in an active deal?" (webhooks, recipient resolution)
+            models.Index(fields=['contact', 'status'], name='crm_deal_contact_status'),
+        ]
 
     def __str__(self):
         stage_name = self.current_stage.name if self.current_stage else 'No Stage'
@@ -711,8 +778,13 @@ class EmailLog(models.Model):
     sent_at = models.DateTimeField(null=True, blank=True)
     opened = models.BooleanField(default=False)
     opened_at = models.DateTimeField(null=True, blank=True)
+    open_count = models.PositiveIntegerField(default=0, help_text="Pixel hits, including repeats")
+    machine_open = models.BooleanField(
+        default=False, help_text="Only automated opens seen so far (image proxy / scanner prefetch)"
+    )
     clicked = models.BooleanField(default=False)
     clicked_at = models.DateTimeField(null=True, blank=True)
+    click_count = models.PositiveIntegerField(default=0, help_text="Tracked link clicks, including scanners")
     replied = models.BooleanField(default=False)
     replied_at = models.DateTimeField(null=True, blank=True)
     reply_content = models.TextField(blank=True)
@@ -728,6 +800,15 @@ class EmailLog(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Message Log'
         verbose_name_plural = 'Message Logs'
+        indexes = [
+            # Per-deal history / engagement profiles
+            models.Index(fields=['deal', 'sent_at'], name='crm_emaillog_deal_sent'),
+            # Twilio/Meta status callbacks and Zoho reply de-duplication
+            models.Index(fields=['message_sid'], name='crm_emaillog_message_sid'),
+            models.Index(fields=['zoho_message_id'], name='crm_emaillog_zoho_msg_id'),
+            # WhatsApp conversation threads
+            models.Index(fields=['channel', 'to_phone', 'sent_at'], name='crm_emaillog_thread'),
+        ]
 
     def __str__(self):
         status = "Sent" if self.sent_at else "Draft"
@@ -898,6 +979,32 @@ class AIPromptTemplate(models.Model):
         return prompt
 
 
+class ContactSearchToken(models.Model):
+    """
+    One normalized search term for a contact (composer typeahead).
+
+    Rows are rebuilt from Contact saves by crm.services.contact_search and
+    matched by prefix; brand is copied from the contact so searches scoped
+    to a brand read a single index range.
+    """
+
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='search_tokens')
+    brand = models.ForeignKey(Brand, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        unique_together = ['contact', 'token']
+        indexes = [
+            # varchar_pattern_ops lets PostgreSQL answer LIKE 'abc%' from the index
+            models.Index(fields=['brand', 'token'], name='crm_contact_search_brand',
+                         opclasses=['', 'varchar_pattern_ops']),
+            models.Index(fields=['token'], name='crm_contact_search_token', opclasses=['varchar_pattern_ops']),
+        ]
+
+    def __str__(self):
+        return self.token
+
+
 class DealActivity(models.Model):
     """Track all activities on a deal for timeline view."""
 
@@ -905,6 +1012,7 @@ class DealActivity(models.Model):
         ('stage_change', 'Stage Changed'),
         ('email_sent', 'Email Sent'),
         ('email_opened', 'Email Opened'),
+        ('email_clicked', 'Email Link Clicked'),
         ('email_replied', 'Email Replied'),
         ('note_added', 'Note Added'),
         ('ai_action', 'AI Action'),
@@ -1130,6 +1238,11 @@ class EmailDraft(models.Model):
     sent_count = models.IntegerField(default=0, help_text="How many emails sent from this draft")
     total_recipients = models.IntegerField(default=0, help_text="Total recipients (contacts + manual)")
     deals_created = models.IntegerField(default=0, help_text="Deals created in pipeline")
+    failed_count = models.IntegerField(default=0, help_text="Sends that failed")
+
+    # Scheduled send run (per-recipient state lives in CampaignRecipient)
+    send_run_id = models.UUIDField(null=True, blank=True, help_text="Current/last scheduled send run")
+    send_progress_at = models.DateTimeField(null=True, blank=True, help_text="Last send checkpoint")
 
     # Legacy fields (for backward compatibility)
     contact = models.ForeignKey(
@@ -1265,6 +1378,7 @@ class EmailDraft(models.Model):
     def get_all_recipients(self):
         """Get all recipients as list of dicts. For email: email, name, contact. For SMS/WhatsApp: phone, name, contact."""
         recipients = []
+        seen = set()
 
         if self.channel == 'phone':
             return self._get_phone_recipients()
@@ -1273,6 +1387,7 @@ class EmailDraft(models.Model):
         # Add contacts from ManyToMany
         for contact in self.contacts.all():
             if not contact.is_unsubscribed:
+                seen.add(contact.email)
                 recipients.append({
                     'email': contact.email,
                     'name': contact.name,
@@ -1297,7 +1412,8 @@ class EmailDraft(models.Model):
                     email = line
                     name = email.split('@')[0]
                 # Check if already in contacts list
-                if not any(r['email'] == email for r in recipients):
+                if email not in seen:
+                    seen.add(email)
                     recipients.append({
                         'email': email,
                         'name': name,
@@ -1308,7 +1424,8 @@ class EmailDraft(models.Model):
 
         # Legacy support
         if self.contact and not self.contact.is_unsubscribed:
-            if not any(r['email'] == self.contact.email for r in recipients):
+            if self.contact.email not in seen:
+                seen.add(self.contact.email)
                 recipients.append({
                     'email': self.contact.email,
                     'name': self.contact.name,
@@ -1317,7 +1434,7 @@ class EmailDraft(models.Model):
                     'contact': self.contact
                 })
 
-        if self.recipient_email and not any(r['email'] == self.recipient_email for r in recipients):
+        if self.recipient_email and self.recipient_email not in seen:
             recipients.append({
                 'email': self.recipient_email,
                 'name': self.recipient_name or self.recipient_email.split('@')[0],
@@ -1332,12 +1449,14 @@ class EmailDraft(models.Model):
         """Get phone recipients for SMS/WhatsApp channels."""
         import re
         recipients = []
+        seen = set()
 
         # Add contacts from ManyToMany that have phone and aren't opted out
         for contact in self.contacts.all():
             if contact.phone and not contact.sms_opted_out:
                 normalized = Contact.normalize_phone(contact.phone)
-                if normalized and not any(r.get('phone') == normalized for r in recipients):
+                if normalized and normalized not in seen:
+                    seen.add(normalized)
                     recipients.append({
                         'phone': normalized,
                         'name': contact.name,
@@ -1361,7 +1480,8 @@ class EmailDraft(models.Model):
                     phone = line
                     name = ''
                 normalized = Contact.normalize_phone(phone)
-                if normalized and not any(r.get('phone') == normalized for r in recipients):
+                if normalized and normalized not in seen:
+                    seen.add(normalized)
                     recipients.append({
                         'phone': normalized,
                         'name': name,
@@ -1416,6 +1536,125 @@ class EmailDraft(models.Model):
         return f"Draft - {self.brand.name} ({self.email_type})"
 
 
+class CampaignRecipient(models.Model):
+    """
+    Per-recipient send state for one scheduled EmailDraft run.
+
+    Rows are created when a run starts and moved pending -> sending -> sent/failed
+    as the campaign executor works through them, so a retried task resumes
+    where the last one stopped instead of re-sending.
+    """
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    draft = models.ForeignKey(EmailDraft, on_delete=models.CASCADE, related_name='campaign_recipients')
+    run_id = models.UUIDField()
+    address = models.CharField(max_length=255, help_text="Normalized email or E.164 phone")
+    name = models.CharField(max_length=255, blank=True)
+    company = models.CharField(max_length=255, blank=True)
+    website = models.CharField(max_length=500, blank=True)
+    contact = models.ForeignKey(
+        Contact, on_delete=models.SET_NULL, null=True, blank=True, related_name='campaign_sends'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    deal_created = models.BooleanField(default=False)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['draft', 'run_id', 'address']
+        indexes = [models.Index(fields=['draft', 'run_id', 'status'])]
+
+    def __str__(self):
+        return f"{self.address} ({self.status})"
+
+
+class TrackingEvent(models.Model):
+    """
+    Raw email tracking hit (pixel open or link click).
+
+    Hits are buffered in Redis when CRM_TRACKING_BUFFER_URL is set and land
+    here when the flusher drains it (or directly, without Redis);
+    crm.services.tracking_buffer folds batches of events into EmailLog and
+    DealActivity and deletes them.
+    """
+
+    KIND_CHOICES = [
+        ('open', 'Open'),
+        ('click', 'Click'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    tracking_id = models.UUIDField(help_text="EmailLog.tracking_id (not a FK so the insert needs no lookup)")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='open')
+    user_agent = models.CharField(max_length=255, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    url = models.TextField(blank=True, help_text="Destination for clicks")
+    occurred_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.kind} {self.tracking_id}"
+
+
+class WebhookEvent(models.Model):
+    """
+    Raw provider webhook delivery, stored before any processing.
+
+    The webhook views check auth, insert one row and answer the provider;
+    crm.services.webhook_inbox drains pending rows in batches through the
+    provider's handler, retrying failures with backoff until they are
+    dead-lettered. (provider, event_id) is the idempotency key, so provider
+    retries of an event already received are dropped at the insert.
+    """
+
+    PROVIDER_CHOICES = [
+        ('meta', 'Meta WhatsApp'),
+        ('twilio_status', 'Twilio status'),
+        ('twilio_inbound', 'Twilio inbound'),
+        ('zeptomail', 'ZeptoMail bounce'),
+        ('email_reply', 'Email reply'),
+        ('desifirms', 'Desi Firms'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed (will retry)'),
+        ('dead', 'Dead letter'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES)
+    event_id = models.CharField(max_length=255, help_text="Provider's id for the delivery (or a hash of the body)")
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True, help_text="What the handler did")
+    received_at = models.DateTimeField(default=timezone.now)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'event_id'], name='crm_webhookevent_provider_event_id'),
+        ]
+        indexes = [
+            # The drain's queue scan
+            models.Index(fields=['status', 'next_attempt_at'], name='crm_webhook_status_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.event_id} ({self.status})"
+
+
 class LeadSearch(models.Model):
     """Stores Google Places search results for lead discovery."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -1478,6 +1717,10 @@ class WhatsAppConversation(models.Model):
     user_company = models.CharField(max_length=200, blank=True)
     detected_intent = models.CharField(max_length=200, blank=True)
     conversation_summary = models.TextField(blank=True)
+    summary_through = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Messages sent up to this time are folded into conversation_summary",
+    )
 
     # Stats
     message_count = models.IntegerField(default=0)
@@ -1485,6 +1728,14 @@ class WhatsAppConversation(models.Model):
     last_inbound_at = models.DateTimeField(null=True, blank=True)
     last_outbound_at = models.DateTimeField(null=True, blank=True)
 
+    # Prompt size of AI replies
+    last_prompt_tokens = models.PositiveIntegerField(default=0, help_text="Prompt tokens of the latest AI reply")
+    last_cached_tokens = models.PositiveIntegerField(
+        default=0, help_text="Of those, tokens served from the provider's prompt cache",
+    )
+    total_prompt_tokens = models.PositiveIntegerField(default=0)
+    total_cached_tokens = models.PositiveIntegerField(default=0)
+
     # Handoff
     handoff_at = models.DateTimeField(null=True, blank=True)
     handoff_reason = models.CharField(max_length=200, blank=True)
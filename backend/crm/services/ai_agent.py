@@ -255,10 +255,13 @@ CRITICAL RULES:
             return f"Hi {company} Team,"
         return "Hi there,"
 
-    def analyze_deal(self, deal, engagement_profile=None) -> dict:
+    def analyze_deal(self, deal, engagement_profile=None, context: str = None) -> dict:
         """
         Analyze a deal and decide the next action.
 
+        Pass a pre-built ``context`` (from build_deal_context) to keep the
+        deal reads out of the AI call, e.g. when batching decisions.
+
         Returns:
             {
                 'action': str,  # 'send_email', 'move_stage', 'wait', 'flag_for_review', 'pause'
@@ -269,7 +272,8 @@ CRITICAL RULES:
         from crm.models import AIDecisionLog
 
         # Build context about the deal
-        context = self._build_deal_context(deal, engagement_profile=engagement_profile)
+        if context is None:
+            context = self.build_deal_context(deal, engagement_profile=engagement_profile)
 
         # Build engagement-aware instructions
         engagement_instructions = ""
@@ -769,7 +773,8 @@ Respond in JSON format:
         result = self.ai_engine.generate(
             prompt=prompt,
             system_prompt=self.SYSTEM_PROMPT,
-            temperature=0.2
+            temperature=0.2,
+            cache=True,
         )
 
         if not result['success']:
@@ -2080,7 +2085,7 @@ Respond in JSON format:
             'success': True
         }
 
-    def _build_deal_context(self, deal, engagement_profile=None) -> str:
+    def build_deal_context(self, deal, engagement_profile=None) -> str:
         """Build a context string for deal analysis."""
         from crm.models import EmailLog
 
@@ -2132,7 +2137,7 @@ Respond in JSON format:
         if engagement_profile:
             from crm.services.engagement_engine import get_engagement_summary_for_ai
             context_parts.append("")
-            context_parts.append(get_engagement_summary_for_ai(deal))
+            context_parts.append(get_engagement_summary_for_ai(deal, profile=engagement_profile))
 
         return "\n".join(context_parts)
 
@@ -0,0 +1,247 @@
+"""
+Campaign Executor - Sends a scheduled EmailDraft run concurrently, with checkpoints.
+
+A run's recipients are stored as CampaignRecipient rows. The executor:
+- shards pending rows into chunks handled by a thread pool
+  (CRM_CAMPAIGN_CONCURRENCY workers, CRM_CAMPAIGN_CHUNK_SIZE per chunk)
+- throttles every send through a per-provider rate limiter
+  (CRM_SEND_RATE_LIMITS, sends/second, shared by all runs in the process)
+- claims each row with a conditional UPDATE before sending, so two tasks
+  working the same run can never send to the same recipient twice
+- bumps sent/failed/deals counters and send_progress_at on the EmailDraft
+  after every recipient
+- stops claiming new rows once the time budget runs out or the draft is
+  cancelled; whatever is still pending is picked up by the next run()
+
+Rows left in 'sending' by a worker that died mid-call are marked failed
+rather than retried, since the provider may already have accepted them.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE_LIMITS = {
+    'zeptomail': 10,
+    'zoho': 2,
+    'twilio': 5,
+    'mock': 0,
+}
+
+# A row still 'sending' after this long belongs to a dead worker
+# (provider calls time out after 30s)
+INTERRUPTED_AFTER = timedelta(minutes=2)
+
+
+class RateLimiter:
+    """
+    Token bucket allowing `rate` acquisitions per second, with bursts up to
+    `burst`. A rate of 0 disables throttling.
+    """
+
+    def __init__(self, rate: float = 0, burst: int = None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, waiting if needed. Returns seconds spent waiting."""
+        if not self.rate:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """Process-wide limiter for a sending provider."""
+    with _limiters_lock:
+        if provider not in _limiters:
+            limits = {**DEFAULT_RATE_LIMITS, **getattr(settings, 'CRM_SEND_RATE_LIMITS', {})}
+            _limiters[provider] = RateLimiter(limits.get(provider, 0))
+        return _limiters[provider]
+
+
+class CampaignExecutor:
+    """
+    Work through one EmailDraft run.
+
+    send_one(recipient) receives the usual recipient dict (email or phone,
+    name, company, website, contact) and returns a dict with 'success' and
+    optionally 'deal_created' / 'error'. It is called from several worker
+    threads at once, so any provider client it uses must be per thread.
+    """
+
+    def __init__(self, draft, send_one, provider: str = 'mock', max_workers: int = None,
+                 chunk_size: int = None, time_budget: float = None, rate_limiter: RateLimiter = None):
+        self.draft = draft
+        self.send_one = send_one
+        self.address_key = 'phone' if draft.channel == 'phone' else 'email'
+        self.max_workers = max(1, max_workers if max_workers is not None
+                               else getattr(settings, 'CRM_CAMPAIGN_CONCURRENCY', 4))
+        self.chunk_size = max(1, chunk_size if chunk_size is not None
+                              else getattr(settings, 'CRM_CAMPAIGN_CHUNK_SIZE', 25))
+        budget = time_budget if time_budget is not None else getattr(settings, 'CRM_CAMPAIGN_TIME_BUDGET', 0)
+        self.deadline = time.monotonic() + budget if budget else None
+        self.limiter = rate_limiter or get_rate_limiter(provider)
+        self._stopped = threading.Event()
+
+    def _rows(self):
+        from crm.models import CampaignRecipient
+        return CampaignRecipient.objects.filter(draft=self.draft, run_id=self.draft.send_run_id)
+
+    def materialize(self, recipients) -> int:
+        """Create pending rows for this run (existing rows are left alone)."""
+        from crm.models import CampaignRecipient
+        CampaignRecipient.objects.bulk_create([
+            CampaignRecipient(
+                draft=self.draft,
+                run_id=self.draft.send_run_id,
+                address=recipient[self.address_key],
+                name=(recipient.get('name') or '')[:255],
+                company=(recipient.get('company') or '')[:255],
+                website=(recipient.get('website') or '')[:500],
+                contact=recipient.get('contact'),
+            )
+            for recipient in recipients
+        ], ignore_conflicts=True, batch_size=500)
+        return self._rows().count()
+
+    def has_rows(self) -> bool:
+        return self._rows().exists()
+
+    def recover_interrupted(self) -> int:
+        """Fail rows a dead worker left mid-send (delivery unknown, never resent)."""
+        stale = self._rows().filter(status='sending', updated_at__lt=timezone.now() - INTERRUPTED_AFTER)
+        recovered = stale.update(status='failed', error='Interrupted mid-send; delivery unknown')
+        if recovered:
+            self._bump_progress(failed=recovered)
+            logger.warning(f"Draft {self.draft.id}: {recovered} interrupted send(s) marked failed")
+        return recovered
+
+    def _bump_progress(self, sent=0, failed=0, deals=0):
+        from crm.models import EmailDraft
+        EmailDraft.objects.filter(pk=self.draft.pk).update(
+            sent_count=F('sent_count') + sent,
+            failed_count=F('failed_count') + failed,
+            deals_created=F('deals_created') + deals,
+            send_progress_at=timezone.now(),
+        )
+
+    def _should_stop(self) -> bool:
+        if self._stopped.is_set():
+            return True
+        if self.deadline and time.monotonic() >= self.deadline:
+            self._stopped.set()
+            return True
+        return False
+
+    def _still_sending(self) -> bool:
+        from crm.models import EmailDraft
+        status = EmailDraft.objects.filter(pk=self.draft.pk).values_list('schedule_status', flat=True).first()
+        if status != 'sending':
+            self._stopped.set()
+            return False
+        return True
+
+    def _send_row(self, row):
+        from crm.models import CampaignRecipient
+
+        claimed = CampaignRecipient.objects.filter(pk=row.pk, status='pending').update(
+            status='sending', attempts=F('attempts') + 1, updated_at=timezone.now(),
+        )
+        if not claimed:
+            return  # Another task got it first
+
+        self.limiter.acquire()
+        recipient = {
+            self.address_key: row.address,
+            'name': row.name,
+            'company': row.company,
+            'website': row.website,
+            'contact': row.contact,
+        }
+        try:
+            result = self.send_one(recipient)
+        except Exception as e:
+            logger.error(f"Error sending to {row.address}: {e}")
+            result = {'success': False, 'error': str(e)}
+
+        if result.get('success'):
+            deal_created = bool(result.get('deal_created'))
+            CampaignRecipient.objects.filter(pk=row.pk).update(
+                status='sent', sent_at=timezone.now(), deal_created=deal_created, error='',
+            )
+            self._bump_progress(sent=1, deals=1 if deal_created else 0)
+        else:
+            CampaignRecipient.objects.filter(pk=row.pk).update(
+                status='failed', error=str(result.get('error') or 'Send failed')[:1000],
+            )
+            self._bump_progress(failed=1)
+
+    def _run_chunk(self, chunk, in_worker: bool):
+        try:
+            if self._should_stop() or not self._still_sending():
+                return
+            for row in chunk:
+                if self._should_stop():
+                    return
+                self._send_row(row)
+        finally:
+            if in_worker:
+                connection.close()
+
+    def run(self) -> dict:
+        """Send every pending row (until stopped) and return the run's counts."""
+        started = time.monotonic()
+        pending = list(self._rows().filter(status='pending').select_related('contact').order_by('id'))
+        chunks = [pending[i:i + self.chunk_size] for i in range(0, len(pending), self.chunk_size)]
+        workers = min(self.max_workers, len(chunks)) or 1
+
+        if workers == 1:
+            for chunk in chunks:
+                self._run_chunk(chunk, in_worker=False)
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='crm-campaign') as pool:
+                list(pool.map(lambda c: self._run_chunk(c, in_worker=True), chunks))
+
+        summary = self.summary()
+        summary['wall_time'] = round(time.monotonic() - started, 3)
+        logger.info(f"Campaign run for draft {self.draft.id}: {summary}")
+        return summary
+
+    def summary(self) -> dict:
+        counts = dict(self._rows().values_list('status').annotate(n=Count('id')))
+        return {
+            'total': sum(counts.values()),
+            'sent': counts.get('sent', 0),
+            'failed': counts.get('failed', 0),
+            'remaining': counts.get('pending', 0) + counts.get('sending', 0),
+            'deals_created': self._rows().filter(deal_created=True).count(),
+        }
@@ -0,0 +1,150 @@
+"""
+Contact Search - Indexed typeahead for the email/SMS composer.
+
+Each contact's name, company and email are normalized (lowercased, accents
+stripped) and split into word tokens; phones add their digits in
+international and national form. Tokens are stored in ContactSearchToken
+with the contact's brand and kept in step with Contact saves (crm.signals).
+
+A query is split the same way and every term must prefix-match one of the
+contact's tokens, so "jo acme" finds "John Smith <john@acme.com.au>" and
+"0412 34" finds +61412345678. Each term is one index range scan
+(brand, token) instead of a leading-wildcard LIKE over the contacts table.
+
+The "not already in an active pipeline" filter reads
+Contact.has_active_deal, which is maintained from Deal saves/deletes.
+"""
+
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Exists, OuterRef
+
+MAX_TOKEN_LENGTH = 64
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents ("José" -> "jose")."""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(text: str) -> list:
+    return [token[:MAX_TOKEN_LENGTH] for token in _WORD_RE.findall(normalize(text))]
+
+
+def phone_tokens(phone: str) -> set:
+    """Digits of a phone in the forms people type: 61412345678, 0412345678, 412345678."""
+    digits = re.sub(r'\D', '', phone or '')
+    if not digits:
+        return set()
+    tokens = {digits}
+    if digits.startswith('61') and len(digits) > 9:
+        tokens.add('0' + digits[2:])
+    if len(digits) > 9:
+        tokens.add(digits[-9:])
+    return tokens
+
+
+def contact_tokens(contact) -> set:
+    tokens = set()
+    for text in (contact.name, contact.company, contact.email):
+        tokens.update(tokenize(text))
+    tokens.update(phone_tokens(contact.phone))
+    return tokens
+
+
+def index_contact(contact) -> None:
+    """Bring a contact's search tokens up to date (writes only the difference)."""
+    from crm.models import ContactSearchToken
+
+    desired = contact_tokens(contact)
+    existing = dict(
+        ContactSearchToken.objects.filter(contact=contact).values_list('token', 'brand_id')
+    )
+    stale = [token for token, brand_id in existing.items()
+             if token not in desired or brand_id != contact.brand_id]
+    if stale:
+        ContactSearchToken.objects.filter(contact=contact, token__in=stale).delete()
+    missing = desired - (existing.keys() - set(stale))
+    if missing:
+        ContactSearchToken.objects.bulk_create([
+            ContactSearchToken(contact=contact, brand_id=contact.brand_id, token=token)
+            for token in missing
+        ], ignore_conflicts=True)
+
+
+def rebuild_index(batch_size: int = 1000) -> int:
+    """Re-index every contact. Returns the number indexed."""
+    from crm.models import Contact, ContactSearchToken
+
+    ContactSearchToken.objects.all().delete()
+    indexed = 0
+    rows = []
+    for contact in Contact.objects.only('id', 'brand_id', 'name', 'company', 'email', 'phone').iterator():
+        rows.extend(
+            ContactSearchToken(contact_id=contact.pk, brand_id=contact.brand_id, token=token)
+            for token in contact_tokens(contact)
+        )
+        indexed += 1
+        if len(rows) >= batch_size:
+            ContactSearchToken.objects.bulk_create(rows, batch_size=batch_size)
+            rows = []
+    ContactSearchToken.objects.bulk_create(rows, batch_size=batch_size)
+    return indexed
+
+
+def refresh_active_deal_flags(contact_ids) -> None:
+    """Recompute Contact.has_active_deal for the given contacts."""
+    from crm.models import Contact, Deal
+
+    contact_ids = [pk for pk in set(contact_ids) if pk]
+    if not contact_ids:
+        return
+    active = Deal.objects.filter(contact_id=OuterRef('pk'), status='active')
+    Contact.objects.filter(pk__in=contact_ids).update(has_active_deal=Exists(active))
+
+
+def _prefix(term: str) -> dict:
+    if connection.vendor == 'sqlite':
+        # SQLite only uses an index for LIKE under case_sensitive_like; a
+        # range over the (binary-collated) token is equivalent
+        return {'token__gte': term, 'token__lt': term + '\uffff'}
+    return {'token__startswith': term}
+
+
+def search_contacts(query: str, brand_id=None, channel: str = 'email', limit: int = 10):
+    """
+    Contacts matching every term of `query`, not unsubscribed and not in an
+    active pipeline, that can be reached on `channel`. Ordered by name.
+    """
+    from crm.models import Contact, ContactSearchToken
+
+    terms = list(dict.fromkeys(tokenize(query)))
+    digits = re.sub(r'\D', '', query)
+    if len(digits) >= 4 and digits not in terms:
+        # "0412 345" should match the phone, not just the words "0412" and "345"
+        terms = [t for t in terms if not t.isdigit()] + [digits]
+    if not terms:
+        return Contact.objects.none()
+
+    contacts = Contact.objects.filter(is_unsubscribed=False, has_active_deal=False)
+    if brand_id:
+        contacts = contacts.filter(brand_id=brand_id)
+    for term in terms:
+        matches = ContactSearchToken.objects.filter(contact_id=OuterRef('pk'), **_prefix(term))
+        if brand_id:
+            matches = matches.filter(brand_id=brand_id)
+        contacts = contacts.filter(Exists(matches))
+
+    if channel == 'phone':
+        contacts = contacts.exclude(phone='').filter(sms_opted_out=False)
+    else:
+        contacts = contacts.exclude(email='')
+
+    return contacts.order_by('name')[:limit]
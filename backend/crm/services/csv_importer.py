@@ -305,7 +305,7 @@ class ContactImporter:
         data['email'] = email
 
         # Check for duplicate within same brand (case-insensitive)
-        existing = Contact.objects.filter(email__iexact=email, brand=self.brand).first()
+        existing = Contact.objects.by_email(email).filter(brand=self.brand).first()
         if existing:
             logger.debug(f"Skipping duplicate email for brand {self.brand}: {email}")
             return 'skipped'
@@ -0,0 +1,223 @@
+"""
+Decision Executor - Runs CRMAIAgent.analyze_deal for a batch of deals in parallel.
+
+Used by process_pending_deals' decide phase. Calls fan out over a thread
+pool with:
+- a global concurrency cap (CRM_AI_CONCURRENCY)
+- a per-brand concurrency cap (CRM_AI_PER_BRAND_CONCURRENCY), so one brand's
+  Monday backlog can't take every slot. The cap is applied when plans are
+  handed to the pool, round-robin across brands, so a worker never sits
+  waiting on a busy brand while another brand's plans are queued
+- a global tokens-per-minute budget (CRM_AI_TOKENS_PER_MINUTE, 0 = unlimited)
+
+Each run returns BatchMetrics comparing batch wall time with the sum of
+individual call latencies.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Rough token cost of an analyze_deal call on top of the deal context
+# (system prompt, engagement instructions, JSON response)
+BASE_TOKENS_PER_CALL = 1500
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class BatchMetrics:
+    """Timing for one batch of AI decisions."""
+
+    calls: int = 0
+    errors: int = 0
+    wall_time: float = 0.0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+    max_workers: int = 1
+    throttled_seconds: float = 0.0
+    latencies: list = field(default_factory=list, repr=False)
+
+    @property
+    def speedup(self) -> float:
+        """Sum of call latencies over wall time (1.0 = sequential)."""
+        if not self.wall_time:
+            return 0.0
+        return self.total_latency / self.wall_time
+
+    def as_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'max_workers': self.max_workers,
+            'wall_time': round(self.wall_time, 3),
+            'total_latency': round(self.total_latency, 3),
+            'max_latency': round(self.max_latency, 3),
+            'throttled_seconds': round(self.throttled_seconds, 3),
+            'speedup': round(self.speedup, 2),
+        }
+
+
+class TokenBudget:
+    """
+    Sliding one-minute token budget shared by all worker threads.
+
+    acquire() blocks until the estimated tokens for a call fit in the
+    current window. A limit of 0 disables throttling.
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(self, tokens_per_minute: int = 0, clock=time.monotonic, sleep=time.sleep):
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._sleep = sleep
+        self._events = deque()  # (timestamp, tokens)
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._events and now - self._events[0][0] >= self.WINDOW_SECONDS:
+            _, tokens = self._events.popleft()
+            self._used -= tokens
+
+    def acquire(self, tokens: int) -> float:
+        """Reserve tokens, waiting if needed. Returns seconds spent waiting."""
+        if not self.tokens_per_minute:
+            return 0.0
+
+        # A single call bigger than the whole budget still has to run eventually
+        tokens = min(tokens, self.tokens_per_minute)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._expire(now)
+                if self._used + tokens <= self.tokens_per_minute:
+                    self._events.append((now, tokens))
+                    self._used += tokens
+                    return waited
+                wait = self.WINDOW_SECONDS - (now - self._events[0][0])
+            wait = max(wait, 0.05)
+            self._sleep(wait)
+            waited += wait
+
+
+class DealDecisionExecutor:
+    """
+    Fan analyze_deal calls for a batch of decision plans out over a thread pool.
+
+    Plans are the dicts built by process_pending_deals' read phase
+    (deal, profile, context, ...). run() stores each outcome on its plan as
+    plan['result'] or plan['error'].
+    """
+
+    def __init__(self, ai_agent, max_workers: int = None, per_brand: int = None,
+                 tokens_per_minute: int = None):
+        self.ai_agent = ai_agent
+        self.max_workers = max(1, max_workers if max_workers is not None
+                               else getattr(settings, 'CRM_AI_CONCURRENCY', 4))
+        self.per_brand = max(1, per_brand if per_brand is not None
+                             else getattr(settings, 'CRM_AI_PER_BRAND_CONCURRENCY', 2))
+        self.budget = TokenBudget(
+            tokens_per_minute if tokens_per_minute is not None
+            else getattr(settings, 'CRM_AI_TOKENS_PER_MINUTE', 0)
+        )
+        self._metrics_lock = threading.Lock()
+
+    @staticmethod
+    def _brand_id(plan):
+        deal = plan['deal']
+        return deal.pipeline.brand_id if deal.pipeline_id else None
+
+    @staticmethod
+    def estimate_tokens(plan) -> int:
+        context = plan.get('context')
+        context_len = len(context) if isinstance(context, str) else 0
+        return BASE_TOKENS_PER_CALL + context_len // CHARS_PER_TOKEN
+
+    def _analyze(self, plan, metrics: BatchMetrics, in_worker: bool):
+        deal = plan['deal']
+        try:
+            waited = self.budget.acquire(self.estimate_tokens(plan))
+            started = time.monotonic()
+            try:
+                plan['result'] = self.ai_agent.analyze_deal(
+                    deal, engagement_profile=plan['profile'], context=plan['context'],
+                )
+            except Exception as e:
+                logger.error(f"Error analyzing deal {deal.id}: {e}")
+                plan['error'] = str(e)
+            latency = time.monotonic() - started
+
+            with self._metrics_lock:
+                metrics.calls += 1
+                metrics.errors += 1 if 'error' in plan else 0
+                metrics.total_latency += latency
+                metrics.max_latency = max(metrics.max_latency, latency)
+                metrics.throttled_seconds += waited
+                metrics.latencies.append(latency)
+        finally:
+            if in_worker:
+                # Worker threads get their own DB connection (AIDecisionLog write)
+                connection.close()
+
+    def run(self, plans) -> BatchMetrics:
+        """Analyze every plan and return timing metrics for the batch."""
+        workers = min(self.max_workers, len(plans)) or 1
+        metrics = BatchMetrics(max_workers=workers)
+        started = time.monotonic()
+
+        if workers == 1:
+            for plan in plans:
+                self._analyze(plan, metrics, in_worker=False)
+        else:
+            self._run_pool(plans, metrics, workers)
+
+        metrics.wall_time = time.monotonic() - started
+        logger.info(f"AI decision batch: {metrics.as_dict()}")
+        return metrics
+
+    def _run_pool(self, plans, metrics: BatchMetrics, workers: int):
+        """
+        Keep up to `workers` plans running, at most per_brand of them per brand.
+
+        Plans wait in per-brand queues and are submitted round-robin across
+        brands with a free slot; each finished call frees a slot for the next.
+        """
+        queues = {}
+        for plan in plans:
+            queues.setdefault(self._brand_id(plan), deque()).append(plan)
+
+        running = {}  # future -> brand_id
+        in_flight = Counter()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='crm-ai') as pool:
+            while queues or running:
+                submitted = True
+                while submitted and len(running) < workers:
+                    submitted = False
+                    for brand_id in list(queues):
+                        if len(running) >= workers:
+                            break
+                        if in_flight[brand_id] >= self.per_brand:
+                            continue
+                        # Re-insert at the end so brands take turns
+                        queue = queues.pop(brand_id)
+                        future = pool.submit(self._analyze, queue.popleft(), metrics, True)
+                        running[future] = brand_id
+                        in_flight[brand_id] += 1
+                        submitted = True
+                        if queue:
+                            queues[brand_id] = queue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight[running.pop(future)] -= 1
+                    future.result()
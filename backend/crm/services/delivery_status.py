@@ -0,0 +1,114 @@
+"""
+Delivery Status - Coalesced EmailLog.delivery_status updates from status callbacks.
+
+Twilio and Meta send one callback per status change of every message
+(sent, delivered, read, ...), so a 1,000-message WhatsApp campaign produces
+3,000+ callbacks within a minute. Instead of one UPDATE per callback, the
+webhook inbox (crm.services.webhook_inbox) collects the statuses of a drain
+batch in a StatusBatch and applies them together:
+- per message SID only the furthest status is kept (STATUS_RANK), so
+  sent → delivered → read in one window is a single write of 'read'
+- one UPDATE ... SET delivery_status = CASE WHEN message_sid = ... END
+  covers every SID in the batch (CHUNK_SIZE SIDs per statement); the CASE also refuses to move a log backwards
+  (a 'sent' callback arriving after 'read')
+- failed Meta deliveries demote their recipients to has_whatsapp=False in
+  one UPDATE, so future sends route to SMS
+"""
+
+import logging
+
+from django.db.models import Case, F, Q, Value, When
+
+logger = logging.getLogger(__name__)
+
+# How far along a message is. Callbacks never move a log to a lower rank;
+# 'received' marks inbound logs, which status callbacks must not touch.
+STATUS_RANK = {
+    'queued': 0,
+    'accepted': 0,
+    'scheduled': 0,
+    'sending': 1,
+    'sent': 2,
+    'failed': 3,
+    'undelivered': 3,
+    'delivered': 4,
+    'read': 5,
+    'received': 9,
+}
+
+# SIDs per UPDATE (keeps the CASE within database parameter limits)
+CHUNK_SIZE = 500
+
+
+def status_rank(status: str) -> int:
+    return STATUS_RANK.get(status, 0)
+
+
+def _ranked_above(status: str) -> list:
+    rank = status_rank(status)
+    return [s for s, r in STATUS_RANK.items() if r > rank]
+
+
+class StatusBatch:
+    """Latest delivery status per message SID, applied with apply()."""
+
+    def __init__(self):
+        self.latest = {}
+        self.demote = set()  # SIDs whose failure means the recipient isn't on WhatsApp
+
+    def __len__(self):
+        return len(self.latest)
+
+    def add(self, message_sid: str, status: str, demote_on_failure: bool = False) -> None:
+        if not (message_sid and status):
+            return
+        current = self.latest.get(message_sid)
+        if current is None or status_rank(status) >= status_rank(current):
+            self.latest[message_sid] = status
+        if demote_on_failure and status == 'failed':
+            self.demote.add(message_sid)
+
+    def merge(self, other: 'StatusBatch') -> None:
+        for message_sid, status in other.latest.items():
+            self.add(message_sid, status)
+        self.demote |= other.demote
+
+    def apply(self) -> dict:
+        """Write the batch: EmailLog UPDATEs per chunk of SIDs, one Contact UPDATE for demotions."""
+        from crm.models import Contact, EmailLog
+
+        totals = {'logs_updated': 0, 'contacts_demoted': 0}
+        latest = list(self.latest.items())
+        for start in range(0, len(latest), CHUNK_SIZE):
+            chunk = latest[start:start + CHUNK_SIZE]
+            totals['logs_updated'] += EmailLog.objects.filter(message_sid__in=[sid for sid, _ in chunk]).update(
+                delivery_status=Case(
+                    *[
+                        When(
+                            Q(message_sid=message_sid) & ~Q(delivery_status__in=_ranked_above(status)),
+                            then=Value(status),
+                        )
+                        for message_sid, status in chunk
+                    ],
+                    default=F('delivery_status'),
+                )
+            )
+
+        # Only SIDs whose log actually ended up failed (not delivered later in the window)
+        failed = [sid for sid in self.demote if self.latest.get(sid) == 'failed']
+        if failed:
+            phones = EmailLog.objects.filter(
+                message_sid__in=failed, channel='whatsapp', delivery_status='failed',
+            ).exclude(to_phone='').values('to_phone')
+            totals['contacts_demoted'] = Contact.objects.filter(
+                phone_e164__in=phones, has_whatsapp=True,
+            ).update(has_whatsapp=False)
+            if totals['contacts_demoted']:
+                logger.info(
+                    f"WhatsApp delivery failed for {totals['contacts_demoted']} contact(s) — "
+                    f"marked has_whatsapp=False, future sends will use SMS"
+                )
+
+        if totals['logs_updated']:
+            logger.info(f"Delivery statuses applied: {len(self.latest)} messages, {totals}")
+        return totals
@@ -15,6 +15,8 @@ from datetime import datetime, timedelta
 from django.conf import settings
 from django.utils import timezone
 
+from core.services.http_client import http
+
 if TYPE_CHECKING:
     from crm.models import Brand, Deal
 
@@ -71,6 +73,8 @@ class ZohoEmailService:
     Otherwise falls back to global settings.
     """
 
+    provider = 'zoho'  # Rate-limit bucket for campaign sends
+
     def __init__(self, brand: Optional['Brand'] = None):
         import os
         from dotenv import load_dotenv
@@ -152,7 +156,7 @@ class ZohoEmailService:
 
         # Refresh the token
         try:
-            response = requests.post(
+            response = http.post(
                 self.TOKEN_URL,
                 data={
                     'refresh_token': self.refresh_token,
@@ -194,7 +198,7 @@ class ZohoEmailService:
 
         try:
             logger.info(f"Zoho Mail: Making {method} request to {endpoint}")
-            response = requests.request(
+            response = http.request(
                 method,
                 url,
                 headers=headers,
@@ -272,7 +276,7 @@ class ZohoEmailService:
 
         # Check if recipient is unsubscribed or bounced (brand-specific)
         from crm.models import Contact
-        contact = Contact.objects.filter(email__iexact=to).first()
+        contact = Contact.objects.by_email(to).first()
         if contact:
             if contact.email_bounced:
                 logger.info(f"Skipping email to {to} - recipient email has bounced")
@@ -310,10 +314,9 @@ class ZohoEmailService:
         # Add unsubscribe footer to email
         body = self._add_unsubscribe_footer(body, to)
 
-        # Add tracking pixel if tracking_id provided
+        # Add click tracking and pixel if tracking_id provided
         if tracking_id:
-            tracking_url = self._get_tracking_url(tracking_id)
-            body = self._inject_tracking_pixel(body, tracking_url)
+            body = self._add_tracking(body, tracking_id)
 
         # Prepare email data
         email_data = {
@@ -705,13 +708,20 @@ This email was sent by {brand_name}. We respect your privacy."""
 
         return None
 
+    def _tracking_base_url(self) -> str:
+        if self.brand:
+            return self.brand.website
+        return getattr(settings, 'SITE_URL', 'https://www.codeteki.au')
+
     def _get_tracking_url(self, tracking_id: str) -> str:
         """Generate a tracking pixel URL."""
-        if self.brand:
-            site_url = self.brand.website
-        else:
-            site_url = getattr(settings, 'SITE_URL', 'https://www.codeteki.au')
-        return f"{site_url}/api/crm/track/{tracking_id}/open.gif"
+        return f"{self._tracking_base_url()}/api/crm/track/{tracking_id}/open.gif"
+
+    def _add_tracking(self, body: str, tracking_id: str) -> str:
+        """Rewrite links through the click redirect and add the open pixel."""
+        from crm.services.click_tracking import rewrite_links
+        body = rewrite_links(body, self._tracking_base_url(), tracking_id)
+        return self._inject_tracking_pixel(body, self._get_tracking_url(tracking_id))
 
     def _inject_tracking_pixel(self, body: str, tracking_url: str) -> str:
         """Inject tracking pixel into email body."""
@@ -789,6 +799,8 @@ class ZeptoMailService(ZohoEmailService):
     Used for brands that need higher volume (e.g., Desi Firms outreach).
     """
 
+    provider = 'zeptomail'  # Rate-limit bucket for campaign sends
+
     def __init__(self, brand: Optional['Brand'] = None):
         import os
         from dotenv import load_dotenv
@@ -856,7 +868,7 @@ class ZeptoMailService(ZohoEmailService):
 
         # Check if recipient is unsubscribed or bounced (brand-specific)
         from crm.models import Contact
-        contact = Contact.objects.filter(email__iexact=to).first()
+        contact = Contact.objects.by_email(to).first()
         if contact:
             if contact.email_bounced:
                 logger.info(f"Skipping email to {to} - recipient email has bounced")
@@ -893,10 +905,9 @@ class ZeptoMailService(ZohoEmailService):
         # Add unsubscribe footer (inherited from ZohoEmailService)
         body = self._add_unsubscribe_footer(body, to)
 
-        # Add tracking pixel if tracking_id provided
+        # Add click tracking and pixel if tracking_id provided
         if tracking_id:
-            tracking_url = self._get_tracking_url(tracking_id)
-            body = self._inject_tracking_pixel(body, tracking_url)
+            body = self._add_tracking(body, tracking_id)
 
         # Build ZeptoMail API payload
         payload = {
@@ -936,7 +947,7 @@ class ZeptoMailService(ZohoEmailService):
 
         try:
             logger.info(f"ZeptoMail: Sending to {to}, subject: {subject[:50]}...")
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
+            response = http.post(url, json=payload, headers=headers, timeout=30)
             response_data = response.json()
 
             if response.status_code == 200 or response_data.get('message') == 'OK':
@@ -994,6 +1005,8 @@ class MockEmailService:
     Logs all email operations instead of sending.
     """
 
+    provider = 'mock'  # Rate-limit bucket for campaign sends
+
     def __init__(self, brand: Optional['Brand'] = None):
         self.brand = brand
         self.sent_emails = []
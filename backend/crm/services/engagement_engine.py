@@ -54,6 +54,16 @@ class EngagementProfile:
     recommended_wait_days: int = 0
 
 
+# Row shape read from EmailLog by the engine (one narrow projection, no model instances)
+_PROFILE_FIELDS = (
+    'deal_id', 'channel', 'opened', 'opened_at',
+    'clicked', 'clicked_at', 'replied', 'replied_at', 'machine_open',
+)
+
+# Deals per EmailLog query when batching (keeps IN (...) under SQLite's variable limit)
+PROFILE_BATCH_SIZE = 500
+
+
 def get_engagement_profile(deal) -> EngagementProfile:
     """
     Compute an engagement profile for a deal from its EmailLog data.
@@ -64,64 +74,114 @@ def get_engagement_profile(deal) -> EngagementProfile:
     Returns:
         EngagementProfile with computed metrics
     """
+    return get_engagement_profiles([deal])[deal.pk]
+
+
+def get_engagement_profiles(deals, now=None) -> dict:
+    """
+    Compute engagement profiles for many deals with set-based EmailLog reads.
+
+    Sent logs for each batch of deals are fetched in one ordered query and
+    folded per deal in Python, so the cost is one round trip per
+    PROFILE_BATCH_SIZE deals instead of ~10 per deal. Results are identical
+    to the per-deal path (both go through _build_profile).
+
+    Args:
+        deals: iterable of Deal instances or deal ids
+        now: reference time for "days ago" signals (defaults to timezone.now())
+
+    Returns:
+        dict mapping deal id -> EngagementProfile (deals without sent
+        emails get the default cold profile)
+    """
+    from itertools import groupby
     from crm.models import EmailLog
 
-    now = timezone.now()
-    profile = EngagementProfile()
+    now = now or timezone.now()
+    deal_ids = list(dict.fromkeys(getattr(d, 'pk', d) for d in deals))
+    rows_by_deal = {}
+
+    for i in range(0, len(deal_ids), PROFILE_BATCH_SIZE):
+        chunk = deal_ids[i:i + PROFILE_BATCH_SIZE]
+        rows = EmailLog.objects.filter(
+            deal_id__in=chunk,
+            sent_at__isnull=False,
+        ).order_by('deal_id', '-sent_at').values_list(*_PROFILE_FIELDS)
+
+        for deal_id, group in groupby(rows.iterator(), key=lambda r: r[0]):
+            rows_by_deal[deal_id] = list(group)
 
-    # Get all sent emails for this deal
-    emails = EmailLog.objects.filter(
-        deal=deal,
-        sent_at__isnull=False,
-    ).order_by('-sent_at')
+    return {
+        deal_id: _build_profile(rows_by_deal.get(deal_id, []), now)
+        for deal_id in deal_ids
+    }
 
-    if not emails.exists():
+
+def _build_profile(rows, now) -> EngagementProfile:
+    """
+    Fold a deal's sent EmailLog rows (newest sent_at first) into a profile.
+
+    Each row is a tuple in _PROFILE_FIELDS order.
+    """
+    profile = EngagementProfile()
+
+    if not rows:
         profile.tier = 'cold'
         profile.recommended_action = 'send_now'
         return profile
 
-    profile.total_sent = emails.count()
-    profile.total_opened = emails.filter(opened=True).count()
-    profile.total_clicked = emails.filter(clicked=True).count()
-    profile.total_replied = emails.filter(replied=True).count()
+    seven_days_ago = now - timezone.timedelta(days=7)
+    channels = set()
+    last_opened_at = last_clicked_at = last_replied_at = None
+    consecutive = 0
+    counting_unopened = True
+
+    for _deal_id, channel, opened, opened_at, clicked, clicked_at, replied, replied_at, machine_open in rows:
+        # Privacy-proxy/scanner prefetches say nothing about the reader
+        opened = opened and not machine_open
+        profile.total_sent += 1
+        channels.add(channel)
+
+        if opened:
+            profile.total_opened += 1
+            # "Last" means the most recently *sent* email with the signal
+            if opened_at is not None:
+                if last_opened_at is None:
+                    last_opened_at = opened_at
+                if opened_at >= seven_days_ago:
+                    profile.opens_last_7_days += 1
+        if clicked:
+            profile.total_clicked += 1
+            if clicked_at is not None and last_clicked_at is None:
+                last_clicked_at = clicked_at
+        if replied:
+            profile.total_replied += 1
+            if replied_at is not None and last_replied_at is None:
+                last_replied_at = replied_at
+
+        # Consecutive unopened (count from most recent backwards)
+        if counting_unopened:
+            if opened:
+                counting_unopened = False
+            else:
+                consecutive += 1
 
     # Detect SMS-only deals (no email-channel logs at all)
-    has_email_logs = emails.filter(channel='email').exists()
-    if not has_email_logs and emails.filter(channel__in=['sms', 'whatsapp']).exists():
+    if 'email' not in channels and channels & {'sms', 'whatsapp'}:
         profile.is_sms_only = True
 
     # Rates
-    if profile.total_sent > 0:
-        profile.open_rate = profile.total_opened / profile.total_sent
-        profile.click_rate = profile.total_clicked / profile.total_sent
+    profile.open_rate = profile.total_opened / profile.total_sent
+    profile.click_rate = profile.total_clicked / profile.total_sent
 
     # Last open/click/reply days ago
-    last_opened = emails.filter(opened=True, opened_at__isnull=False).first()
-    if last_opened and last_opened.opened_at:
-        profile.last_open_days_ago = (now - last_opened.opened_at).days
-
-    last_clicked = emails.filter(clicked=True, clicked_at__isnull=False).first()
-    if last_clicked and last_clicked.clicked_at:
-        profile.last_click_days_ago = (now - last_clicked.clicked_at).days
+    if last_opened_at:
+        profile.last_open_days_ago = (now - last_opened_at).days
+    if last_clicked_at:
+        profile.last_click_days_ago = (now - last_clicked_at).days
+    if last_replied_at:
+        profile.last_reply_days_ago = (now - last_replied_at).days
 
-    last_replied = emails.filter(replied=True, replied_at__isnull=False).first()
-    if last_replied and last_replied.replied_at:
-        profile.last_reply_days_ago = (now - last_replied.replied_at).days
-
-    # Opens in last 7 days
-    seven_days_ago = now - timezone.timedelta(days=7)
-    profile.opens_last_7_days = emails.filter(
-        opened=True,
-        opened_at__gte=seven_days_ago,
-    ).count()
-
-    # Consecutive unopened (count from most recent backwards)
-    consecutive = 0
-    for email in emails:
-        if not email.opened:
-            consecutive += 1
-        else:
-            break
     profile.consecutive_unopened = consecutive
 
     # Burnout risk: 3+ consecutive unopened
@@ -262,17 +322,19 @@ def compute_preferred_send_hour(contact) -> int | None:
     return hour_counts.most_common(1)[0][0]
 
 
-def get_engagement_summary_for_ai(deal) -> str:
+def get_engagement_summary_for_ai(deal, profile: EngagementProfile = None) -> str:
     """
     Get a formatted engagement summary string for inclusion in AI prompts.
 
     Args:
         deal: Deal instance
+        profile: Already-computed profile for the deal (computed if omitted)
 
     Returns:
         Multi-line string with engagement data for AI consumption
     """
-    profile = get_engagement_profile(deal)
+    if profile is None:
+        profile = get_engagement_profile(deal)
 
     if profile.is_sms_only:
         lines = [
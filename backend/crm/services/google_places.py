@@ -9,9 +9,10 @@ Details fetched at search time now — free tier is generous enough.
 import logging
 import re
 import time
-import requests
 from django.conf import settings
 
+from core.services.http_client import http
+
 logger = logging.getLogger(__name__)
 
 
@@ -51,7 +52,7 @@ class GooglePlacesService:
             'region': 'au',
         }
         try:
-            resp = requests.get(self.GEOCODE_URL, params=params, timeout=10)
+            resp = http.get(self.GEOCODE_URL, params=params, timeout=10)
             data = resp.json()
             if data.get('status') == 'OK' and data.get('results'):
                 loc = data['results'][0]['geometry']['location']
@@ -150,7 +151,7 @@ class GooglePlacesService:
             'X-Goog-FieldMask': 'nationalPhoneNumber,websiteUri,formattedAddress',
         }
         try:
-            resp = requests.get(url, headers=headers, timeout=10)
+            resp = http.get(url, headers=headers, timeout=10)
             if resp.status_code == 200:
                 data = resp.json()
                 return {
@@ -220,7 +221,7 @@ class GooglePlacesService:
     def _scrape_email(self, url: str) -> str:
         """Try to find a contact email from the business website homepage."""
         try:
-            resp = requests.get(url, timeout=5, headers={
+            resp = http.get(url, timeout=5, retries=0, headers={
                 'User-Agent': 'Mozilla/5.0 (compatible; Googlebot/2.1)',
             })
             if resp.status_code != 200:
@@ -275,7 +276,7 @@ class GooglePlacesService:
         }
         results = []
         try:
-            resp = requests.post(url, headers=headers, json=body, timeout=15)
+            resp = http.post(url, headers=headers, json=body, timeout=15)
             if resp.status_code == 200:
                 data = resp.json()
                 for place in data.get('places', []):
@@ -307,7 +308,7 @@ class GooglePlacesService:
         }
         results = []
         try:
-            resp = requests.post(url, headers=headers, json=body, timeout=15)
+            resp = http.post(url, headers=headers, json=body, timeout=15)
             if resp.status_code == 200:
                 data = resp.json()
                 for place in data.get('places', []):
@@ -11,10 +11,11 @@ Handles SMS and WhatsApp sending for CRM outreach:
 
 import json
 import logging
-import requests
 from typing import Optional, TYPE_CHECKING
 from django.conf import settings
 
+from core.services.http_client import http
+
 if TYPE_CHECKING:
     from crm.models import Brand
 
@@ -102,7 +103,7 @@ class MetaWhatsAppService:
         }
 
         try:
-            resp = requests.post(self._api_url(), headers=self._headers(), json=payload, timeout=30)
+            resp = http.post(self._api_url(), headers=self._headers(), json=payload, timeout=30)
             data = resp.json()
 
             if resp.status_code == 200 and 'messages' in data:
@@ -173,7 +174,7 @@ class MetaWhatsAppService:
         }
 
         try:
-            resp = requests.post(self._api_url(), headers=self._headers(), json=payload, timeout=30)
+            resp = http.post(self._api_url(), headers=self._headers(), json=payload, timeout=30)
             data = resp.json()
 
             if resp.status_code == 200 and 'messages' in data:
@@ -240,6 +241,8 @@ class MessagingService:
     - has_whatsapp=None  -> try Meta WhatsApp, cache result, SMS fallback
     """
 
+    provider = 'twilio'  # Rate-limit bucket for campaign sends
+
     def __init__(self, brand: Optional['Brand'] = None):
         import os
         from dotenv import load_dotenv
@@ -288,10 +291,7 @@ class MessagingService:
     def _lookup_contact(self, phone: str):
         """Find Contact by phone number."""
         from crm.models import Contact
-        contact = Contact.objects.filter(phone=phone).first()
-        if not contact:
-            contact = Contact.objects.filter(phone__endswith=phone[-10:]).first()
-        return contact
+        return Contact.objects.by_phone(phone).first()
 
     def _check_opt_out(self, to: str) -> tuple:
         """Check if contact has opted out. Returns (contact, opted_out)."""
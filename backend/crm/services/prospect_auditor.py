@@ -19,9 +19,10 @@ import logging
 import re
 from urllib.parse import urlparse
 
-import requests
 from bs4 import BeautifulSoup
 
+from core.services.http_client import http
+
 logger = logging.getLogger(__name__)
 
 
@@ -163,7 +164,7 @@ class ProspectAuditor:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         }
-        resp = requests.get(url, headers=headers, timeout=15, allow_redirects=True)
+        resp = http.get(url, headers=headers, timeout=15, allow_redirects=True, retries=0)
         resp.raise_for_status()
 
         html = resp.text
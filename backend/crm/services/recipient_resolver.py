@@ -0,0 +1,107 @@
+"""
+Recipient Resolver - Bulk eligibility check for EmailDraft campaigns.
+
+Takes the raw list from EmailDraft.get_all_recipients() and, in a fixed
+number of queries regardless of list size:
+- normalizes addresses (emails lowercased, phones already E.164) and
+  drops duplicates
+- matches recipients without a contact to the brand's existing contacts
+- flags unsubscribed / SMS opted-out contacts as 'blocked'
+- flags contacts with an active deal as 'pipeline' (unless the draft
+  sends to pipeline contacts)
+
+Used by send_scheduled_draft and the admin send preview so both agree on
+who actually gets the message.
+"""
+
+from django.db.models.functions import Upper
+
+STATUS_OK = 'ok'
+STATUS_BLOCKED = 'blocked'
+STATUS_PIPELINE = 'pipeline'
+
+
+def resolve_recipients(draft, recipients=None) -> list:
+    """
+    Resolve a draft's recipients.
+
+    Returns one dict per unique address with the usual recipient keys
+    (email or phone, name, company, website, contact) plus 'status'.
+    """
+    from crm.models import Contact, Deal
+
+    if recipients is None:
+        recipients = draft.get_all_recipients()
+    is_phone = draft.channel == 'phone'
+    key = 'phone' if is_phone else 'email'
+
+    # Normalize and de-duplicate (first occurrence wins, as before)
+    unique = {}
+    for recipient in recipients:
+        address = recipient.get(key, '') if is_phone else Contact.normalize_email(recipient.get('email', ''))
+        if address and address not in unique:
+            unique[address] = recipient
+
+    # Match recipients that came without a contact, newest contact first
+    # (Contact's default ordering, same as the old per-row .first())
+    unmatched = [address for address, r in unique.items() if not r.get('contact')]
+    matched = {}
+    if unmatched:
+        if is_phone:
+            rows = Contact.objects.filter(brand=draft.brand, phone__in=unmatched)
+            for contact in rows:
+                matched.setdefault(contact.phone, contact)
+        else:
+            rows = Contact.objects.annotate(email_upper=Upper('email')).filter(
+                email_upper__in=[address.upper() for address in unmatched], brand=draft.brand
+            )
+            for contact in rows:
+                matched.setdefault(contact.email_upper.lower(), contact)
+
+    resolved = []
+    for address, recipient in unique.items():
+        resolved.append({
+            key: address,
+            'name': recipient.get('name', ''),
+            'company': recipient.get('company', ''),
+            'website': recipient.get('website', ''),
+            'contact': recipient.get('contact') or matched.get(address),
+        })
+
+    in_pipeline = set()
+    if not draft.send_to_pipeline_contacts:
+        contact_ids = {r['contact'].pk for r in resolved if r['contact']}
+        if contact_ids:
+            in_pipeline = set(
+                Deal.objects.filter(contact_id__in=contact_ids, status='active')
+                .values_list('contact_id', flat=True)
+            )
+
+    brand_slug = draft.brand.slug if draft.brand else None
+    for recipient in resolved:
+        contact = recipient['contact']
+        if contact and _is_blocked(contact, is_phone, brand_slug):
+            recipient['status'] = STATUS_BLOCKED
+        elif contact and contact.pk in in_pipeline:
+            recipient['status'] = STATUS_PIPELINE
+        else:
+            recipient['status'] = STATUS_OK
+
+    return resolved
+
+
+def _is_blocked(contact, is_phone: bool, brand_slug) -> bool:
+    if is_phone:
+        return contact.sms_opted_out
+    if contact.is_unsubscribed:
+        return True
+    return bool(brand_slug) and contact.is_unsubscribed_from_brand(brand_slug)
+
+
+def sendable_recipients(resolved: list) -> list:
+    """Recipients that should actually be sent to (status dropped)."""
+    return [
+        {k: v for k, v in recipient.items() if k != 'status'}
+        for recipient in resolved
+        if recipient['status'] == STATUS_OK
+    ]
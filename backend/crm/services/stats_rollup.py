@@ -0,0 +1,122 @@
+"""
+Stats Rollup - CRM counts for the stats API and admin dashboards.
+
+Computes, in five GROUP BY / aggregate queries regardless of how many
+pipelines and stages exist:
+- deal counts per pipeline, per stage (active deals) and per status
+- contact totals per contact_type
+- email totals (sent, opened, replied, sent today / this week)
+- AI decision totals and scheduled draft count
+
+The result is cached for CRM_STATS_TTL seconds under a versioned key.
+Saves/deletes of deals, contacts, email logs, drafts and pipelines bump the
+version (wired in crm.signals), so dashboards reflect edits immediately;
+bulk updates that skip signals are covered by the TTL.
+
+Used by CRMStatsView, pipeline_dashboard and core.utils.dashboard_callback.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+VERSION_KEY = 'crm:stats:version'
+KEY_PREFIX = 'crm:stats:'
+
+# Saving or deleting any of these invalidates the rollup (wired in crm.signals)
+SOURCE_MODELS = (
+    'crm.Deal',
+    'crm.Contact',
+    'crm.EmailLog',
+    'crm.EmailDraft',
+    'crm.Pipeline',
+    'crm.PipelineStage',
+)
+
+
+def compute_crm_stats() -> dict:
+    """Build the rollup from the database (uncached)."""
+    from crm.models import AIDecisionLog, Contact, Deal, EmailDraft, EmailLog
+
+    today = timezone.now().date()
+    week_ago = today - timedelta(days=7)
+
+    pipelines = {}
+    by_status = {}
+    rows = Deal.objects.order_by().values_list('pipeline_id', 'current_stage_id', 'status').annotate(n=Count('id'))
+    for pipeline_id, stage_id, status, n in rows:
+        entry = pipelines.setdefault(pipeline_id, {'statuses': {}, 'stages': {}})
+        entry['statuses'][status] = entry['statuses'].get(status, 0) + n
+        if status == 'active' and stage_id is not None:
+            entry['stages'][stage_id] = entry['stages'].get(stage_id, 0) + n
+        by_status[status] = by_status.get(status, 0) + n
+
+    contacts_by_type = dict(
+        Contact.objects.order_by().values_list('contact_type').annotate(n=Count('id'))
+    )
+
+    emails = EmailLog.objects.aggregate(
+        total_sent=Count('id', filter=Q(sent_at__isnull=False)),
+        opened=Count('id', filter=Q(opened=True)),
+        replied=Count('id', filter=Q(replied=True)),
+        sent_today=Count('id', filter=Q(sent_at__date=today)),
+        sent_week=Count('id', filter=Q(sent_at__date__gte=week_ago)),
+    )
+
+    ai = AIDecisionLog.objects.aggregate(
+        total_decisions=Count('id'),
+        today=Count('id', filter=Q(created_at__date=today)),
+    )
+
+    return {
+        'deals': {'by_status': by_status, 'pipelines': pipelines},
+        'contacts': {'total': sum(contacts_by_type.values()), 'by_type': contacts_by_type},
+        'emails': emails,
+        'ai': ai,
+        'drafts': {'scheduled': EmailDraft.objects.filter(schedule_status='scheduled').count()},
+        'computed_at': timezone.now().isoformat(),
+    }
+
+
+def get_crm_stats() -> dict:
+    """Cached rollup (rebuilt after invalidation or CRM_STATS_TTL seconds)."""
+    key = f"{KEY_PREFIX}{cache.get(VERSION_KEY, 1)}"
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_crm_stats()
+        cache.set(key, stats, getattr(settings, 'CRM_STATS_TTL', 60))
+    return stats
+
+
+def invalidate_crm_stats() -> None:
+    """Bump the rollup version once the current transaction commits."""
+
+    def bump():
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 2, None)
+
+    # Rebuilding before commit could cache the old counts under the new version
+    transaction.on_commit(bump)
+
+
+def pipeline_counts(stats: dict, pipeline_id) -> dict:
+    """
+    Counts for one pipeline: {'total', 'active', 'won', 'lost', 'paused',
+    'stages': {stage_id: active deals}}.
+    """
+    entry = stats['deals']['pipelines'].get(pipeline_id, {'statuses': {}, 'stages': {}})
+    statuses = entry['statuses']
+    return {
+        'total': sum(statuses.values()),
+        'active': statuses.get('active', 0),
+        'won': statuses.get('won', 0),
+        'lost': statuses.get('lost', 0),
+        'paused': statuses.get('paused', 0),
+        'stages': entry['stages'],
+    }
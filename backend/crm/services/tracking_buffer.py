@@ -0,0 +1,302 @@
+"""
+Tracking Buffer - Cheap ingestion of email tracking hits, folded in batches.
+
+The tracking pixel and click redirect only append the hit to a buffer (no
+EmailLog read, no row lock), so bursts from image-prefetching clients and
+link scanners don't contend with sends and reply processing:
+- with CRM_TRACKING_BUFFER_URL set, hits are pushed onto a Redis list and
+  the request never touches the database
+- otherwise (or if Redis is unreachable) a TrackingEvent row is inserted
+
+flush_tracking_events() moves the Redis list into TrackingEvent, one batch
+at a time through a processing list that is only deleted once the batch's
+rows are committed (a failed insert is retried by the next flush), and
+then, per batch:
+- groups events by tracking_id and loads the matching EmailLogs in one query
+- sets opened/opened_at and clicked/clicked_at on the first hit only;
+  repeats just add to open_count/click_count
+- flags hits that look automated (mail privacy proxies, security scanners,
+  hits within seconds of sending): machine opens set machine_open, machine
+  clicks are counted but never mark the email clicked
+- writes EmailLog changes with bulk_update and DealActivity rows with
+  bulk_create, then deletes the folded events
+
+Settings: CRM_TRACKING_BUFFER_URL (Redis URL, blank to disable),
+CRM_TRACKING_FLUSH_BATCH (events per batch), CRM_MACHINE_OPEN_WINDOW
+(seconds after sent_at treated as prefetch).
+"""
+
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+
+import redis
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.services.redis_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = 'crm:tracking-events'
+# Batch being moved into TrackingEvent; survives a failed insert
+PROCESSING_KEY = 'crm:tracking-events:processing'
+# One drainer at a time owns the processing list
+DRAIN_LOCK_KEY = 'crm:tracking-events:drain-lock'
+DRAIN_LOCK_TIMEOUT = 60
+
+# User agents of scanners and link/image prefetchers (lowercase substrings)
+MACHINE_UA_MARKERS = (
+    'bot', 'crawler', 'spider', 'scanner', 'preview',
+    'proofpoint', 'mimecast', 'barracuda', 'symantec', 'forcepoint',
+    'python-requests', 'curl/', 'wget/',
+)
+
+# Apple Mail Privacy Protection fetches with a bare UA, whether or not the
+# message is ever read
+APPLE_MPP_USER_AGENT = 'mozilla/5.0'
+
+def _buffer_client():
+    """Redis client for the hit buffer, or None when buffering to the table."""
+    return get_client(getattr(settings, 'CRM_TRACKING_BUFFER_URL', ''))
+
+
+def _client_ip(request):
+    ip = request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[0].strip() or request.META.get('REMOTE_ADDR', '')
+    return ip or None
+
+
+def buffer_event(kind: str, tracking_id, request, url: str = ''):
+    """Append one tracking hit to the buffer."""
+    from crm.models import TrackingEvent
+
+    event = {
+        'tracking_id': str(tracking_id),
+        'kind': kind,
+        'user_agent': request.META.get('HTTP_USER_AGENT', '')[:255],
+        'ip_address': _client_ip(request),
+        'url': url,
+        'occurred_at': timezone.now().isoformat(),
+    }
+    client = _buffer_client()
+    if client is not None:
+        try:
+            # Newest at the head; the drain pops from the tail, oldest first
+            client.lpush(REDIS_KEY, json.dumps(event))
+            return
+        except redis.RedisError as e:
+            logger.warning(f"Tracking buffer unavailable, writing {kind} to database: {e}")
+
+    event['occurred_at'] = datetime.fromisoformat(event['occurred_at'])
+    TrackingEvent.objects.create(**event)
+
+
+def record_open(tracking_id, request):
+    buffer_event('open', tracking_id, request)
+
+
+def record_click(tracking_id, url: str, request):
+    buffer_event('click', tracking_id, request, url=url)
+
+
+def is_machine_hit(user_agent: str, occurred_at, sent_at=None) -> bool:
+    """Best-effort guess whether a hit was a prefetch/scan rather than a reader."""
+    ua = (user_agent or '').strip().lower()
+    if not ua or ua == APPLE_MPP_USER_AGENT:
+        return True
+    if any(marker in ua for marker in MACHINE_UA_MARKERS):
+        return True
+    window = getattr(settings, 'CRM_MACHINE_OPEN_WINDOW', 10)
+    if sent_at and window and (occurred_at - sent_at).total_seconds() < window:
+        return True
+    return False
+
+
+def _first_human(email_log, events):
+    human = [e.occurred_at for e in events if not is_machine_hit(e.user_agent, e.occurred_at, email_log.sent_at)]
+    return min(human) if human else None
+
+
+def _fold_opens(email_log, events):
+    """Apply one log's open events. Returns a DealActivity (type, description, metadata) if one is due."""
+    first_human = _first_human(email_log, events)
+    first_any = min(e.occurred_at for e in events)
+
+    email_log.open_count += len(events)
+    if not email_log.opened:
+        email_log.opened = True
+        email_log.opened_at = first_human or first_any
+        email_log.machine_open = first_human is None
+        description = f"Email opened: {email_log.subject}"
+        if email_log.machine_open:
+            description += " (likely automated)"
+    elif email_log.machine_open and first_human:
+        # First real read after a prefetch
+        email_log.opened_at = first_human
+        email_log.machine_open = False
+        description = f"Email opened: {email_log.subject}"
+    else:
+        return None
+
+    metadata = {'opened_at': email_log.opened_at.isoformat(), 'machine_open': email_log.machine_open}
+    return 'email_opened', description, metadata
+
+
+def _fold_clicks(email_log, events):
+    """Apply one log's click events. Returns a DealActivity (type, description, metadata) if one is due."""
+    email_log.click_count += len(events)
+    human = [e for e in events if not is_machine_hit(e.user_agent, e.occurred_at, email_log.sent_at)]
+    if not human or email_log.clicked:
+        return None
+
+    first = min(human, key=lambda e: e.occurred_at)
+    email_log.clicked = True
+    email_log.clicked_at = first.occurred_at
+    # A click proves a person read the email
+    if not email_log.opened or email_log.machine_open:
+        email_log.opened = True
+        email_log.opened_at = first.occurred_at
+        email_log.machine_open = False
+
+    metadata = {'clicked_at': email_log.clicked_at.isoformat(), 'url': first.url}
+    return 'email_clicked', f"Link clicked in: {email_log.subject}", metadata
+
+
+def _drain_redis(batch_size: int) -> int:
+    """
+    Move buffered hits from Redis into TrackingEvent. Returns the number moved.
+
+    Each batch is popped onto PROCESSING_KEY (RPOPLPUSH, atomically per hit)
+    and removed only after its rows commit, so a failed insert leaves the
+    batch for the next drain instead of losing it. A crash between the
+    commit and the delete inserts that batch twice, which at worst adds to
+    open_count/click_count.
+    """
+    from crm.models import TrackingEvent
+
+    client = _buffer_client()
+    if client is None:
+        return 0
+
+    try:
+        lock = client.lock(DRAIN_LOCK_KEY, timeout=DRAIN_LOCK_TIMEOUT)
+        if not lock.acquire(blocking=False):
+            return 0  # Another flusher is draining
+    except redis.RedisError as e:
+        logger.warning(f"Could not drain tracking buffer: {e}")
+        return 0
+
+    moved = 0
+    try:
+        while True:
+            # A batch left by a drain whose insert failed goes first
+            items = client.lrange(PROCESSING_KEY, 0, -1)
+            if not items:
+                pipe = client.pipeline()
+                for _ in range(batch_size):
+                    pipe.rpoplpush(REDIS_KEY, PROCESSING_KEY)
+                if not [item for item in pipe.execute() if item is not None]:
+                    return moved
+                items = client.lrange(PROCESSING_KEY, 0, -1)
+
+            events = []
+            for item in reversed(items):  # Oldest first
+                data = json.loads(item)
+                data['occurred_at'] = datetime.fromisoformat(data['occurred_at'])
+                events.append(TrackingEvent(**data))
+            with transaction.atomic():
+                TrackingEvent.objects.bulk_create(events, batch_size=500)
+            client.delete(PROCESSING_KEY)
+
+            moved += len(events)
+            if len(events) < batch_size:
+                return moved
+    except redis.RedisError as e:
+        logger.warning(f"Could not drain tracking buffer: {e}")
+        return moved
+    finally:
+        try:
+            lock.release()
+        except redis.RedisError:
+            pass  # Expired; the next drain takes it over
+
+
+def flush_tracking_events(batch_size: int = None, max_batches: int = 50) -> dict:
+    """
+    Fold buffered tracking events into EmailLog/DealActivity.
+
+    Works through up to max_batches batches of batch_size events, oldest
+    first. Returns counts of events processed and logs/activities written.
+    """
+    from crm.models import DealActivity, EmailLog, TrackingEvent
+
+    batch_size = batch_size or getattr(settings, 'CRM_TRACKING_FLUSH_BATCH', 1000)
+    totals = {'events': 0, 'logs_updated': 0, 'activities': 0}
+    _drain_redis(batch_size)
+
+    for _ in range(max_batches):
+        with transaction.atomic():
+            events = TrackingEvent.objects.order_by('id')
+            if connection.features.has_select_for_update_skip_locked:
+                # Concurrent flushers take disjoint batches
+                events = events.select_for_update(skip_locked=True)
+            events = list(events[:batch_size])
+            if not events:
+                break
+
+            by_tracking_id = defaultdict(lambda: defaultdict(list))
+            for event in events:
+                by_tracking_id[event.tracking_id][event.kind].append(event)
+
+            logs = EmailLog.objects.filter(tracking_id__in=list(by_tracking_id)).only(
+                'id', 'tracking_id', 'deal_id', 'subject', 'sent_at',
+                'opened', 'opened_at', 'open_count', 'machine_open',
+                'clicked', 'clicked_at', 'click_count',
+            )
+            changed = []
+            activities = []
+            for email_log in logs:
+                hits = by_tracking_id[email_log.tracking_id]
+                due = []
+                if hits['open']:
+                    due.append(_fold_opens(email_log, hits['open']))
+                if hits['click']:
+                    due.append(_fold_clicks(email_log, hits['click']))
+                changed.append(email_log)
+                if email_log.deal_id:
+                    activities.extend((email_log, activity) for activity in due if activity)
+
+            if changed:
+                EmailLog.objects.bulk_update(changed, [
+                    'opened', 'opened_at', 'open_count', 'machine_open',
+                    'clicked', 'clicked_at', 'click_count',
+                ], batch_size=500)
+            if activities:
+                DealActivity.objects.bulk_create([
+                    DealActivity(
+                        deal_id=email_log.deal_id,
+                        activity_type=activity_type,
+                        description=description,
+                        metadata={'email_log_id': str(email_log.id), **metadata},
+                    )
+                    for email_log, (activity_type, description, metadata) in activities
+                ], batch_size=500)
+
+            # Events for unknown tracking ids are dropped along with the rest
+            TrackingEvent.objects.filter(id__in=[e.id for e in events]).delete()
+
+        totals['events'] += len(events)
+        totals['logs_updated'] += len(changed)
+        totals['activities'] += len(activities)
+        if len(events) < batch_size:
+            break
+
+    if totals['logs_updated']:
+        # bulk_update skips signals; refresh the opened counts on dashboards
+        from crm.services.stats_rollup import invalidate_crm_stats
+        invalidate_crm_stats()
+    if totals['events']:
+        logger.info(f"Tracking flush: {totals}")
+    return totals
@@ -0,0 +1,748 @@
+"""
+Webhook Handlers - Per-provider processing of stored webhook deliveries.
+
+Each handler takes the payload a webhook view stored in the inbox
+(crm.services.webhook_inbox) and a StatusBatch, and returns a JSON-able
+summary of what it did, kept on the WebhookEvent. Delivery statuses go
+into the StatusBatch, not the database: the inbox coalesces them across
+the drain batch (crm.services.delivery_status).
+
+Handlers run inside a savepoint; raising rolls their writes back and the
+inbox retries the event, so they must be safe to run again (dedup on
+message ids, "already done" checks). Celery tasks they start are queued
+on commit, once their writes are visible.
+
+HANDLERS maps WebhookEvent.provider to its handler.
+"""
+
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from crm.models import Brand, Contact, Deal, DealActivity, EmailLog, Pipeline, PipelineStage
+from crm.services import whatsapp_turns
+
+logger = logging.getLogger(__name__)
+
+OPT_OUT_KEYWORDS = {'STOP', 'UNSUBSCRIBE', 'CANCEL', 'END', 'QUIT'}
+
+
+# =============================================================================
+# Email replies
+# =============================================================================
+
+def handle_email_reply(data: dict, statuses) -> dict:
+    """Someone replied: move their deal to "Responded", pause autopilot and log it."""
+    from_email = data.get('from_email', '').lower().strip()
+    subject = data.get('subject', '')
+    body = data.get('body', '')
+
+    # Find contact by email
+    contact = Contact.objects.by_email(from_email).first()
+    if not contact:
+        return {
+            'status': 'ignored',
+            'message': f'No contact found for {from_email}'
+        }
+
+    # Find active deal for this contact
+    deal = Deal.objects.filter(
+        contact=contact,
+        status='active'
+    ).select_related('pipeline', 'current_stage').first()
+
+    if not deal:
+        # Update contact status anyway
+        contact.status = 'replied'
+        contact.save(update_fields=['status'])
+        return {
+            'status': 'contact_updated',
+            'message': f'No active deal, but updated contact status for {from_email}'
+        }
+
+    # Find "Responded" or "Replied" stage in pipeline
+    responded_stage = PipelineStage.objects.filter(
+        pipeline=deal.pipeline,
+        name__icontains='respond'
+    ).first()
+
+    if not responded_stage:
+        responded_stage = PipelineStage.objects.filter(
+            pipeline=deal.pipeline,
+            name__icontains='repl'
+        ).first()
+
+    if responded_stage and deal.current_stage != responded_stage:
+        deal.current_stage = responded_stage
+        deal.stage_entered_at = timezone.now()
+
+    # Update deal - pause autopilot so human can respond
+    deal.autopilot_paused = True
+    deal.last_contact_date = timezone.now()
+    deal.ai_notes = f"{deal.ai_notes or ''}\n\n[REPLY RECEIVED {timezone.now().strftime('%Y-%m-%d %H:%M')}]\nSubject: {subject}\n{body[:500]}..."
+    deal.save()
+
+    # Log activity
+    DealActivity.objects.create(
+        deal=deal,
+        activity_type='email_reply',
+        description=f"Reply received from {from_email}. Subject: {subject[:100]}"
+    )
+
+    # Update contact status
+    contact.status = 'replied'
+    contact.save(update_fields=['status'])
+
+    # Log email
+    EmailLog.objects.create(
+        deal=deal,
+        subject=f"Reply: {subject}",
+        body=body[:2000] if body else '',
+        to_email=deal.contact.email,
+        from_email=from_email,
+        replied=True,
+        replied_at=timezone.now(),
+    )
+
+    return {
+        'status': 'success',
+        'contact': from_email,
+        'deal_id': str(deal.id),
+        'stage_moved': responded_stage.name if responded_stage else None,
+        'message': f'Deal updated for {from_email}'
+    }
+
+
+# =============================================================================
+# ZeptoMail bounces and spam reports
+# =============================================================================
+
+SOFT_BOUNCE_THRESHOLD = 3  # Convert to hard bounce after this many
+
+
+def zeptomail_event_type(event_names) -> str:
+    if 'hardbounce' in event_names:
+        return 'hardbounce'
+    if 'softbounce' in event_names:
+        return 'softbounce'
+    if 'feedback_loop' in event_names or 'spam' in event_names:
+        return 'spam'
+    return 'unknown'
+
+
+def _affected_emails(message) -> set:
+    """Recipient addresses a ZeptoMail event message is about."""
+    affected_emails = set()
+
+    # From event_data details (bounce events)
+    for event_data in message.get('event_data', []):
+        for detail in event_data.get('details', []):
+            recipient = detail.get('bounced_recipient', '').lower().strip()
+            if recipient:
+                affected_emails.add(recipient)
+            # Feedback loop may use different field
+            recipient = detail.get('recipient', '').lower().strip()
+            if recipient:
+                affected_emails.add(recipient)
+
+    # Fallback: from email_info.to
+    if not affected_emails:
+        email_info = message.get('email_info', {})
+        for to_entry in email_info.get('to', []):
+            addr = to_entry.get('email_address', {}).get('address', '').lower().strip()
+            if addr:
+                affected_emails.add(addr)
+
+    return affected_emails
+
+
+def handle_zeptomail(data: dict, statuses) -> dict:
+    """
+    Hard bounce: mark bounced, close all deals. Soft bounce: count, escalate
+    to a hard bounce at SOFT_BOUNCE_THRESHOLD. Spam report: unsubscribe and
+    close all deals.
+    """
+    event_names = data.get('event_name', [])
+    event_type = zeptomail_event_type(event_names)
+
+    results = []
+    for message in data.get('event_message', []):
+        for email in _affected_emails(message):
+            if event_type == 'hardbounce':
+                result = _handle_hard_bounce(email)
+            elif event_type == 'softbounce':
+                result = _handle_soft_bounce(email)
+            elif event_type == 'spam':
+                result = _handle_spam_report(email)
+            else:
+                result = {'email': email, 'action': 'ignored', 'reason': f'unknown event: {event_names}'}
+            results.append(result)
+
+    return {
+        'status': 'processed',
+        'event': event_names,
+        'results': results,
+    }
+
+
+def _mark_bounced_and_close_deals(contact, reason_desc):
+    """Shared logic: mark contact bounced + close all active deals."""
+    contact.email_bounced = True
+    contact.bounced_at = timezone.now()
+    contact.save(update_fields=['email_bounced', 'bounced_at'])
+
+    active_deals = Deal.objects.filter(contact=contact, status='active')
+    deals_closed = 0
+    for deal in active_deals:
+        deal.status = 'lost'
+        deal.lost_reason = 'invalid_email'
+        deal.save(update_fields=['status', 'lost_reason'])
+        DealActivity.objects.create(
+            deal=deal,
+            activity_type='status_change',
+            description=f"[Webhook] {reason_desc} - deal auto-closed"
+        )
+        deals_closed += 1
+
+    return deals_closed
+
+
+def _handle_hard_bounce(email):
+    """Mark contact as bounced and close all active deals."""
+    contact = Contact.objects.by_email(email).first()
+    if not contact:
+        logger.info(f"Bounce webhook: no contact for {email}")
+        return {'email': email, 'action': 'ignored', 'reason': 'no_contact'}
+
+    if contact.email_bounced:
+        return {'email': email, 'action': 'already_bounced'}
+
+    deals_closed = _mark_bounced_and_close_deals(contact, "Hard bounce from ZeptoMail")
+
+    logger.warning(f"Hard bounce webhook: {email} - marked bounced, {deals_closed} deals closed")
+    return {'email': email, 'action': 'bounced', 'deals_closed': deals_closed}
+
+
+def _handle_soft_bounce(email):
+    """Track soft bounce count. Auto-escalate to hard bounce after threshold."""
+    contact = Contact.objects.by_email(email).first()
+    if not contact:
+        logger.info(f"Soft bounce webhook: no contact for {email}")
+        return {'email': email, 'action': 'ignored', 'reason': 'no_contact'}
+
+    if contact.email_bounced:
+        return {'email': email, 'action': 'already_bounced'}
+
+    contact.soft_bounce_count = (contact.soft_bounce_count or 0) + 1
+    contact.save(update_fields=['soft_bounce_count'])
+
+    # Auto-escalate to hard bounce after threshold
+    if contact.soft_bounce_count >= SOFT_BOUNCE_THRESHOLD:
+        deals_closed = _mark_bounced_and_close_deals(
+            contact, f"Soft bounce escalated to hard bounce ({contact.soft_bounce_count} soft bounces)"
+        )
+        logger.warning(f"Soft bounce escalated: {email} - {contact.soft_bounce_count} soft bounces → marked bounced, {deals_closed} deals closed")
+        return {'email': email, 'action': 'escalated_to_hard_bounce', 'soft_bounce_count': contact.soft_bounce_count, 'deals_closed': deals_closed}
+
+    logger.info(f"Soft bounce webhook: {email} - count now {contact.soft_bounce_count}/{SOFT_BOUNCE_THRESHOLD}")
+    return {'email': email, 'action': 'soft_bounce_tracked', 'soft_bounce_count': contact.soft_bounce_count}
+
+
+def _handle_spam_report(email):
+    """Recipient reported spam. Treat as unsubscribe and close all deals."""
+    contact = Contact.objects.by_email(email).first()
+    if not contact:
+        logger.info(f"Spam report webhook: no contact for {email}")
+        return {'email': email, 'action': 'ignored', 'reason': 'no_contact'}
+
+    if contact.spam_reported:
+        return {'email': email, 'action': 'already_reported'}
+
+    # Mark as spam reported + unsubscribed
+    contact.spam_reported = True
+    contact.spam_reported_at = timezone.now()
+    contact.is_unsubscribed = True
+    contact.unsubscribed_at = timezone.now()
+    contact.unsubscribe_reason = 'Spam report (ZeptoMail feedback loop)'
+    contact.status = 'unsubscribed'
+    contact.save(update_fields=[
+        'spam_reported', 'spam_reported_at',
+        'is_unsubscribed', 'unsubscribed_at', 'unsubscribe_reason', 'status'
+    ])
+
+    # Close all active deals
+    active_deals = Deal.objects.filter(contact=contact, status='active')
+    deals_closed = 0
+    for deal in active_deals:
+        deal.status = 'lost'
+        deal.lost_reason = 'unsubscribed'
+        deal.save(update_fields=['status', 'lost_reason'])
+        DealActivity.objects.create(
+            deal=deal,
+            activity_type='status_change',
+            description=f"[Webhook] Spam report - contact unsubscribed, deal auto-closed"
+        )
+        deals_closed += 1
+
+    logger.warning(f"Spam report webhook: {email} - unsubscribed, {deals_closed} deals closed")
+    return {'email': email, 'action': 'spam_unsubscribed', 'deals_closed': deals_closed}
+
+
+# =============================================================================
+# Desi Firms application events
+# =============================================================================
+
+# Events that mark the deal as won
+DESIFIRMS_WON_EVENTS = {'business_approved', 'event_approved', 'property_approved'}
+
+# Map: event_type → (target_pipeline_name, stage_name_to_advance_to)
+# Pipeline name uses icontains match. Stage name is exact.
+# For outreach pipelines (cold leads we emailed who then converted):
+#   user_registered → "Signed Up" / "Registered"
+#   business_created → "Listed"  (they listed = won)
+# For registered_users pipelines (users who came organically):
+#   business_created → "Listed"
+#   event_created → "Event Posted"
+DESIFIRMS_EVENT_STAGE_MAP = {
+    # Business journey
+    'business_created': {
+        'outreach_pipeline': 'Business Listings',
+        'outreach_stage': 'Signed Up',
+        'registration_stage': 'Business Listed',
+    },
+    'business_approved': {
+        'outreach_pipeline': 'Business Listings',
+        'outreach_stage': 'Listed',
+        'registration_stage': 'Listing Approved',
+    },
+    # Events journey
+    'event_created': {
+        'outreach_pipeline': 'Desi Firms Events',
+        'outreach_stage': 'Signed Up',
+        'registration_stage': 'Event Posted',
+    },
+    'event_approved': {
+        'outreach_pipeline': 'Desi Firms Events',
+        'outreach_stage': 'Event Listed',
+        'registration_stage': 'Listing Approved',
+    },
+    # Real estate journey — Agents & Agencies pipeline (outreach) or User Registration
+    'agency_created': {'stage': 'Agency Created', 'registration_stage': 'Agent/Agency Created'},
+    'agent_created': {'stage': 'Profile Complete', 'registration_stage': 'Agent/Agency Created'},
+    'agent_invitation_sent': {'stage': 'Team Invited'},
+    'agent_invitation_accepted': {'stage': 'Profile Complete'},
+    'agent_verified': {'stage': 'Verified'},
+    'property_submitted': {'stage': 'First Listing'},
+    'property_approved': {'stage': 'Active Lister', 'registration_stage': 'Listing Approved'},
+}
+
+
+def handle_desifirms(data: dict, statuses) -> dict:
+    """Registration creates contact + deal; progress events advance (or win) the deal."""
+    event_type = data.get('event_type', '')
+    email = data.get('email', '').lower().strip()
+
+    brand = Brand.objects.filter(slug='desifirms').first()
+    if not brand:
+        # Retried until the brand is set up (or the event is dead-lettered)
+        raise RuntimeError("Desi Firms brand not configured (no brand with slug 'desifirms')")
+
+    if event_type == 'user_registered':
+        return _handle_registration(data, email, brand)
+    elif event_type in DESIFIRMS_EVENT_STAGE_MAP:
+        mark_won = event_type in DESIFIRMS_WON_EVENTS
+        return _handle_progress(data, email, event_type, brand, mark_won)
+    else:
+        return {'status': 'ignored', 'message': f'Unknown event: {event_type}'}
+
+
+def _get_or_create_contact(email, brand, data):
+    """Get or create a contact, updating name if provided."""
+    name = data.get('name', '')
+    contact, created = Contact.objects.get_or_create(
+        email=email,
+        brand=brand,
+        defaults={
+            'name': name,
+            'source': 'desifirms_webhook',
+            'status': 'new',
+            'contact_type': 'lead',
+        }
+    )
+    if not created and name and not contact.name:
+        contact.name = name
+        contact.save(update_fields=['name'])
+    return contact, created
+
+
+def _handle_registration(data, email, brand):
+    """User registered on Desi Firms. Create contact + deal in User Registration pipeline."""
+    contact, _ = _get_or_create_contact(email, brand, data)
+    phone = data.get('phone', '')
+
+    # Check for existing active deal in ANY Desi Firms pipeline
+    existing_deal = Deal.objects.filter(
+        contact=contact, pipeline__brand=brand, status='active',
+    ).select_related('pipeline', 'current_stage').first()
+
+    if existing_deal:
+        # Already tracked (likely from outreach). Advance to "Signed Up" or "Registered"
+        registered_stage = PipelineStage.objects.filter(
+            pipeline=existing_deal.pipeline,
+            name__in=['Signed Up', 'Registered'],
+        ).order_by('-order').first()  # prefer Signed Up over Registered
+
+        if registered_stage and existing_deal.current_stage != registered_stage:
+            old_stage = existing_deal.current_stage.name if existing_deal.current_stage else 'None'
+            existing_deal.move_to_stage(registered_stage)
+            existing_deal.autopilot_paused = True
+            existing_deal.save(update_fields=['autopilot_paused'])
+            DealActivity.objects.create(
+                deal=existing_deal,
+                activity_type='stage_change',
+                description=f"[Webhook] User registered on Desi Firms: {old_stage} → {registered_stage.name}",
+            )
+
+        return {
+            'status': 'advanced',
+            'deal_id': str(existing_deal.id),
+            'pipeline': existing_deal.pipeline.name,
+        }
+
+    # No existing deal — create in User Registration pipeline
+    pipeline = Pipeline.objects.filter(
+        brand=brand, pipeline_type='user_registration', is_active=True,
+    ).first()
+    if not pipeline:
+        logger.warning("Desi Firms webhook: no user_registration pipeline found")
+        return {
+            'status': 'contact_created',
+            'contact_id': str(contact.id),
+        }
+
+    # Guard against duplicate webhooks: check if deal already exists in this pipeline
+    existing_reg_deal = Deal.objects.filter(
+        contact=contact, pipeline=pipeline,
+    ).first()
+    if existing_reg_deal:
+        logger.info(f"Desi Firms webhook: duplicate registration for {email}, deal {existing_reg_deal.id} already exists")
+        return {
+            'status': 'duplicate',
+            'deal_id': str(existing_reg_deal.id),
+        }
+
+    first_stage = PipelineStage.objects.filter(
+        pipeline=pipeline, name='Registered',
+    ).first()
+
+    notes = f"Registered on Desi Firms via webhook."
+    if phone:
+        notes += f"\nPhone: {phone}"
+
+    deal = Deal.objects.create(
+        contact=contact,
+        pipeline=pipeline,
+        current_stage=first_stage,
+        status='active',
+        autopilot_paused=True,  # Paused until we know their intent
+        ai_notes=notes,
+    )
+
+    DealActivity.objects.create(
+        deal=deal,
+        activity_type='status_change',
+        description=f"[Webhook] User registered on Desi Firms: {email} → {pipeline.name} (autopilot paused, welcome email queued)",
+    )
+
+    # Send welcome classification email (asks user to pick their intent)
+    from crm.tasks import send_registration_welcome_email
+    transaction.on_commit(lambda: send_registration_welcome_email.delay(str(deal.id)))
+
+    logger.info(f"Desi Firms webhook: created deal {deal.id} for {email} in {pipeline.name}")
+    return {
+        'status': 'success',
+        'contact_id': str(contact.id),
+        'deal_id': str(deal.id),
+    }
+
+
+def _handle_progress(data, email, event_type, brand, mark_won=False):
+    """User took an action on Desi Firms. Advance their deal to the right stage."""
+    contact, _ = _get_or_create_contact(email, brand, data)
+    detail = (
+        data.get('detail', '') or data.get('business_name', '') or
+        data.get('event_name', '') or data.get('property_address', '') or
+        data.get('agent_name', '') or ''
+    )
+
+    mapping = DESIFIRMS_EVENT_STAGE_MAP[event_type]
+
+    # Find the contact's active deal in any Desi Firms pipeline
+    deal = Deal.objects.filter(
+        contact=contact, pipeline__brand=brand, status='active',
+    ).select_related('pipeline', 'current_stage').first()
+
+    if not deal:
+        # No deal yet — auto-create in User Registration pipeline
+        pipeline = Pipeline.objects.filter(
+            brand=brand, pipeline_type='user_registration', is_active=True,
+        ).first()
+
+        if not pipeline:
+            logger.info(f"Desi Firms webhook: no user_registration pipeline for {event_type}")
+            return {'status': 'ignored', 'message': 'No matching pipeline'}
+
+        first_stage = PipelineStage.objects.filter(
+            pipeline=pipeline, name='Registered',
+        ).first()
+
+        deal = Deal.objects.create(
+            contact=contact,
+            pipeline=pipeline,
+            current_stage=first_stage,
+            status='active',
+            next_action_date=timezone.now(),
+            ai_notes=f"Auto-created from webhook: {event_type}\n{detail}",
+        )
+        DealActivity.objects.create(
+            deal=deal,
+            activity_type='status_change',
+            description=f"[Webhook] Auto-created deal for {email} ({event_type})",
+        )
+        logger.info(f"Desi Firms webhook: auto-created deal {deal.id} for {email}")
+
+    # Determine target stage name based on which pipeline the deal is in
+    if deal.pipeline.pipeline_type == 'user_registration':
+        # Deal is in the unified User Registration pipeline
+        target_stage_name = mapping.get('registration_stage')
+    elif 'outreach_pipeline' in mapping and mapping['outreach_pipeline'] in deal.pipeline.name:
+        # Deal is in an outreach pipeline (from email campaigns) — keep existing logic
+        target_stage_name = mapping['outreach_stage']
+    elif 'stage' in mapping:
+        # Deal is in Agents & Agencies or other specific pipeline
+        target_stage_name = mapping['stage']
+    else:
+        target_stage_name = None
+
+    # Advance to target stage
+    if target_stage_name:
+        target_stage = PipelineStage.objects.filter(
+            pipeline=deal.pipeline, name=target_stage_name,
+        ).first()
+        if target_stage and deal.current_stage != target_stage:
+            # Only advance forward, never backward
+            current_order = deal.current_stage.order if deal.current_stage else -1
+            if target_stage.order > current_order:
+                old_stage = deal.current_stage.name if deal.current_stage else 'None'
+                deal.move_to_stage(target_stage)
+                DealActivity.objects.create(
+                    deal=deal,
+                    activity_type='stage_change',
+                    description=f"[Webhook] {event_type}: {old_stage} → {target_stage.name}. {detail}",
+                )
+
+    # Infer intent from event if not already recorded
+    intent_map = {
+        'business_created': 'business', 'business_approved': 'business',
+        'event_created': 'business', 'event_approved': 'business',
+        'agency_created': 'realestate', 'agent_created': 'realestate',
+        'agent_verified': 'realestate', 'property_submitted': 'realestate',
+        'property_approved': 'realestate',
+    }
+    inferred_intent = intent_map.get(event_type)
+    if inferred_intent and deal.ai_notes and '[Intent]' not in deal.ai_notes:
+        deal.ai_notes = (deal.ai_notes or '') + f"\n[Intent] Inferred from {event_type}: {inferred_intent}"
+
+    if mark_won:
+        deal.status = 'won'
+        deal.save(update_fields=['status', 'ai_notes'])
+        DealActivity.objects.create(
+            deal=deal,
+            activity_type='status_change',
+            description=f"[Webhook] {event_type}: {detail}. Deal won!",
+        )
+    else:
+        # Pause autopilot — user is actively progressing on their own
+        if not deal.autopilot_paused:
+            deal.autopilot_paused = True
+            deal.save(update_fields=['autopilot_paused', 'ai_notes'])
+        else:
+            deal.save(update_fields=['ai_notes'])
+
+    logger.info(f"Desi Firms webhook: {event_type} for {email}, deal {deal.id}")
+    return {
+        'status': 'success',
+        'deal_id': str(deal.id),
+        'action': 'won' if mark_won else 'stage_advanced',
+    }
+
+
+# =============================================================================
+# Twilio
+# =============================================================================
+
+def handle_twilio_status(data: dict, statuses) -> dict:
+    """Delivery status callback: queue the EmailLog.delivery_status change."""
+    statuses.add(data.get('MessageSid', ''), data.get('MessageStatus', ''))
+    return {'status': data.get('MessageStatus', '')}
+
+
+def handle_twilio_inbound(data: dict, statuses) -> dict:
+    """Inbound SMS: STOP and friends opt the sender out and close phone-only deals."""
+    from_number = data.get('From', '')
+    body = data.get('Body', '').strip().upper()
+
+    if not from_number or body not in OPT_OUT_KEYWORDS:
+        return {'status': 'ignored'}
+
+    contacts = Contact.objects.by_phone(from_number)
+    updated = 0
+    deals_closed = 0
+    for contact in contacts:
+        if not contact.sms_opted_out:
+            contact.sms_opted_out = True
+            contact.sms_opted_out_at = timezone.now()
+            contact.save(update_fields=['sms_opted_out', 'sms_opted_out_at'])
+            updated += 1
+
+        # Close all active deals for this phone-only contact
+        active_deals = Deal.objects.filter(
+            contact=contact,
+            status='active',
+        ).select_related('contact')
+        for deal in active_deals:
+            # Only close deals where SMS is the channel (no email)
+            if not contact.email:
+                deal.status = 'lost'
+                deal.lost_reason = 'unsubscribed'
+                deal.save(update_fields=['status', 'lost_reason'])
+                DealActivity.objects.create(
+                    deal=deal,
+                    activity_type='status_change',
+                    description=f"[SMS Opt-Out] Contact replied STOP — deal auto-closed"
+                )
+                deals_closed += 1
+
+    logger.info(
+        f"SMS opt-out from {from_number}: {updated} contact(s) updated, {deals_closed} deal(s) closed"
+    )
+    return {'status': 'opted_out', 'contacts_updated': updated, 'deals_closed': deals_closed}
+
+
+# =============================================================================
+# Meta WhatsApp Cloud API
+# =============================================================================
+
+def handle_meta_whatsapp(data: dict, statuses) -> dict:
+    """Inbound messages and delivery statuses from a Meta webhook delivery."""
+    messages = status_count = 0
+    for entry in data.get('entry', []):
+        for change in entry.get('changes', []):
+            value = change.get('value', {})
+
+            # Process incoming messages
+            for message in value.get('messages', []):
+                _process_inbound_message(message, value)
+                messages += 1
+
+            # Delivery statuses (sent, delivered, read, failed). A failed
+            # delivery means the recipient isn't on WhatsApp: future sends
+            # route to SMS instead.
+            for status_update in value.get('statuses', []):
+                statuses.add(status_update.get('id', ''), status_update.get('status', ''), demote_on_failure=True)
+                status_count += 1
+
+    return {'messages': messages, 'statuses': status_count}
+
+
+def _process_inbound_message(message, value):
+    """Process a single inbound WhatsApp message."""
+    from_number = message.get('from', '')  # e.g. "61424538777"
+    msg_type = message.get('type', '')
+    msg_body = ''
+    if msg_type == 'text':
+        msg_body = message.get('text', {}).get('body', '').strip()
+
+    if not from_number:
+        return
+
+    # Normalise to E.164
+    if not from_number.startswith('+'):
+        from_number = f'+{from_number}'
+
+    # Dedup: skip if we already processed this message
+    msg_id = message.get('id', '')
+    if msg_id and EmailLog.objects.filter(message_sid=msg_id).exists():
+        logger.info(f"WhatsApp webhook: skipping duplicate message {msg_id}")
+        return
+
+    # Find contact
+    contact = Contact.objects.by_phone(from_number).first()
+
+    # Extract sender name from Meta payload
+    sender_name = ''
+    for c in value.get('contacts', []):
+        sender_name = c.get('profile', {}).get('name', '')
+        break
+
+    if not contact:
+        logger.info(
+            f"WhatsApp inbound from unknown number {from_number} "
+            f"(name: {sender_name}): {msg_body[:50]}"
+        )
+
+    # Handle opt-out (only if contact exists)
+    if contact and msg_body.upper() in OPT_OUT_KEYWORDS:
+        if not contact.sms_opted_out:
+            contact.sms_opted_out = True
+            contact.sms_opted_out_at = timezone.now()
+            contact.save(update_fields=['sms_opted_out', 'sms_opted_out_at'])
+            logger.info(f"WhatsApp opt-out from {from_number}")
+
+        # Close active deals for phone-only contacts
+        if not contact.email:
+            for deal in Deal.objects.filter(contact=contact, status='active'):
+                deal.status = 'lost'
+                deal.lost_reason = 'unsubscribed'
+                deal.save(update_fields=['status', 'lost_reason'])
+                DealActivity.objects.create(
+                    deal=deal,
+                    activity_type='status_change',
+                    description=f"[WhatsApp Opt-Out] Contact replied STOP — deal auto-closed"
+                )
+        return
+
+    # Mark as confirmed WhatsApp user
+    if contact and contact.has_whatsapp is not True:
+        contact.has_whatsapp = True
+        contact.save(update_fields=['has_whatsapp'])
+        logger.info(
+            f"Contact {from_number} ({contact.name}) confirmed on WhatsApp. "
+            f"Future messages will use WhatsApp."
+        )
+
+    # Save inbound message to EmailLog
+    EmailLog.objects.create(
+        channel='whatsapp',
+        subject='Inbound WhatsApp',
+        body=msg_body or f'[{msg_type} message]',
+        to_phone=from_number,
+        message_sid=msg_id,
+        delivery_status='received',
+        sent_at=timezone.now(),
+    )
+    logger.info(f"WhatsApp inbound saved: {from_number} msg_id={msg_id}")
+
+    # Queue an AI turn once the message is committed; a burst gets one reply
+    transaction.on_commit(lambda: whatsapp_turns.enqueue(from_number, sender_name))
+
+
+HANDLERS = {
+    'meta': handle_meta_whatsapp,
+    'twilio_status': handle_twilio_status,
+    'twilio_inbound': handle_twilio_inbound,
+    'zeptomail': handle_zeptomail,
+    'email_reply': handle_email_reply,
+    'desifirms': handle_desifirms,
+}
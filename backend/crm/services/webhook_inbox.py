@@ -0,0 +1,275 @@
+"""
+Webhook Inbox - Acknowledge-first storage of provider webhooks, processed later.
+
+The Meta, Twilio, ZeptoMail, email reply and Desi Firms webhook views only
+check auth and shape, then call accept(), which stores the raw payload as
+a WebhookEvent in a single INSERT and answers the provider. Nothing on the
+request path looks up contacts or touches deals, so a slow database can't
+push the response past the provider's timeout and trigger retries.
+
+- (provider, event_id) is unique: a retried delivery already received is
+  dropped by the insert. event_id is the provider's id where it sends one,
+  otherwise a hash of the body.
+- after commit, accept() queues drain_webhook_inbox on Celery (at most one
+  queued drain at a time), CRM_WEBHOOK_COALESCE_WINDOW seconds out so a
+  burst of callbacks lands in one batch; beat also runs it every minute
+  for retries
+- drains run one at a time under a Redis lock held for the whole drain; a
+  drain queued while another runs re-queues itself rather than wait on a
+  worker, so deliveries that arrive mid-drain are still picked up promptly
+- drain_inbox() takes due events in batches and runs each through its
+  provider's handler in crm.services.webhook_handlers inside its own
+  savepoint
+
+The queued flag and the drain lock live in Redis at CRM_WEBHOOK_STATE_URL
+rather than in Django's cache, which is per-process memory unless
+CACHE_URL is set. Without that Redis every delivery queues its own drain
+and drains are not serialized; on PostgreSQL skip-locked claims still keep
+concurrent drains on disjoint batches, on SQLite they can collide and the
+loser retries its batch on the next drain.
+- delivery statuses from the whole batch are coalesced per message and
+  written together (crm.services.delivery_status)
+- a handler that raises rolls back its own writes; the event is retried
+  with exponential backoff and dead-lettered after CRM_WEBHOOK_MAX_ATTEMPTS
+- inbox_metrics() reports backlog, lag and dead letters
+
+Settings: CRM_WEBHOOK_STATE_URL, CRM_WEBHOOK_DRAIN_BATCH,
+CRM_WEBHOOK_COALESCE_WINDOW, CRM_WEBHOOK_MAX_ATTEMPTS,
+CRM_WEBHOOK_RETRY_DELAY, CRM_WEBHOOK_LAG_WARNING.
+"""
+
+import hashlib
+import logging
+from datetime import timedelta
+
+import redis
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from core.services.redis_clients import get_client
+from crm.services.delivery_status import StatusBatch
+
+logger = logging.getLogger(__name__)
+
+# Set while a drain is queued; the drain clears it once it holds the drain lock
+DRAIN_QUEUED_KEY = 'crm:webhook-inbox:drain-queued'
+DRAIN_QUEUED_TIMEOUT = 60
+
+# Held for a whole drain, renewed every batch
+DRAIN_LOCK_KEY = 'crm:webhook-inbox:drain-lock'
+DRAIN_LOCK_TIMEOUT = 300
+
+DUE_STATUSES = ('pending', 'failed')
+
+
+def body_digest(body: bytes) -> str:
+    """Idempotency key for providers that don't send an event id."""
+    return hashlib.sha256(body).hexdigest()
+
+
+def accept(provider: str, event_id: str, payload) -> bool:
+    """
+    Store one delivery for processing. Returns False if this
+    (provider, event_id) was already received.
+    """
+    from crm.models import WebhookEvent
+
+    try:
+        with transaction.atomic():
+            WebhookEvent.objects.create(provider=provider, event_id=event_id[:255], payload=payload)
+    except IntegrityError:
+        logger.info(f"Webhook inbox: duplicate {provider} delivery {event_id}")
+        return False
+
+    transaction.on_commit(schedule_drain)
+    return True
+
+
+def _state_client():
+    """Redis client for the drain flag and lock, or None when CRM_WEBHOOK_STATE_URL is blank."""
+    return get_client(getattr(settings, 'CRM_WEBHOOK_STATE_URL', ''))
+
+
+def schedule_drain() -> None:
+    """Queue a drain unless one is already queued."""
+    client = _state_client()
+    if client is not None:
+        try:
+            if not client.set(DRAIN_QUEUED_KEY, 1, nx=True, ex=DRAIN_QUEUED_TIMEOUT):
+                return
+        except redis.RedisError as e:
+            logger.warning(f"Webhook inbox state unavailable, queueing a drain anyway: {e}")
+    _queue_drain()
+
+
+def _queue_drain() -> None:
+    try:
+        from crm.tasks import drain_webhook_inbox
+        # No publish retries: a down broker must not hold up the provider's response
+        drain_webhook_inbox.apply_async(
+            countdown=getattr(settings, 'CRM_WEBHOOK_COALESCE_WINDOW', 2), retry=False,
+        )
+    except Exception as e:
+        # The queued flag stays until it expires; beat drains the inbox meanwhile
+        logger.warning(f"Could not queue webhook inbox drain: {e}")
+
+
+def retry_delay(attempts: int) -> timedelta:
+    base = getattr(settings, 'CRM_WEBHOOK_RETRY_DELAY', 30)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 6 * 60 * 60))
+
+
+def _process(event, handlers, now, statuses) -> None:
+    """Run one event through its handler and record the outcome on it."""
+    event.attempts += 1
+    handler = handlers.get(event.provider)
+    if handler is None:
+        event.status = 'dead'
+        event.last_error = f"No handler for provider {event.provider!r}"
+        return
+
+    event_statuses = StatusBatch()
+    try:
+        with transaction.atomic():
+            event.result = handler(event.payload, event_statuses)
+    except Exception as e:
+        event.last_error = f"{type(e).__name__}: {e}"[:2000]
+        if event.attempts >= getattr(settings, 'CRM_WEBHOOK_MAX_ATTEMPTS', 8):
+            event.status = 'dead'
+            logger.error(f"Webhook inbox: {event.provider} event {event.id} dead-lettered after {event.attempts} attempts: {e}")
+        else:
+            event.status = 'failed'
+            event.next_attempt_at = now + retry_delay(event.attempts)
+            logger.warning(f"Webhook inbox: {event.provider} event {event.id} failed (attempt {event.attempts}): {e}")
+        return
+
+    statuses.merge(event_statuses)
+    event.status = 'done'
+    event.last_error = ''
+    event.processed_at = timezone.now()
+
+
+def drain_inbox(batch_size: int = None, max_batches: int = 50) -> dict:
+    """
+    Process due webhook events, oldest first, in up to max_batches batches
+    of batch_size. Returns counts of events by outcome, or {'busy': True}
+    if another drain holds the lock.
+    """
+    lock = None
+    client = _state_client()
+    if client is not None:
+        lock = client.lock(DRAIN_LOCK_KEY, timeout=DRAIN_LOCK_TIMEOUT)
+        try:
+            if not lock.acquire(blocking=False):
+                # The running drain may be past the deliveries that queued this one
+                if client.exists(DRAIN_QUEUED_KEY):
+                    _queue_drain()
+                return {'busy': True}
+            # Deliveries accepted from here on queue a fresh drain
+            client.delete(DRAIN_QUEUED_KEY)
+        except redis.RedisError as e:
+            logger.warning(f"Webhook inbox state unavailable, draining unserialized: {e}")
+            lock = None
+
+    try:
+        return _drain(lock, batch_size, max_batches)
+    finally:
+        if lock is not None:
+            try:
+                lock.release()
+            except redis.RedisError:
+                logger.warning("Webhook inbox drain lock expired before the drain finished")
+
+
+def _drain(lock, batch_size, max_batches) -> dict:
+    from crm.models import WebhookEvent
+    from crm.services.webhook_handlers import HANDLERS
+
+    batch_size = batch_size or getattr(settings, 'CRM_WEBHOOK_DRAIN_BATCH', 100)
+    totals = {'done': 0, 'failed': 0, 'dead': 0}
+
+    for _ in range(max_batches):
+        if lock is not None:
+            try:
+                lock.reacquire()
+            except redis.RedisError as e:
+                logger.warning(f"Could not renew the webhook inbox drain lock: {e}")
+        now = timezone.now()
+        with transaction.atomic():
+            events = WebhookEvent.objects.filter(
+                status__in=DUE_STATUSES, next_attempt_at__lte=now,
+            ).order_by('next_attempt_at', 'id')
+            if connection.features.has_select_for_update_skip_locked:
+                # Keeps drains that run without the Redis lock on disjoint batches
+                events = events.select_for_update(skip_locked=True)
+            events = list(events[:batch_size])
+            if not events:
+                break
+
+            statuses = StatusBatch()
+            for event in events:
+                _process(event, HANDLERS, now, statuses)
+                totals[event.status] += 1
+            statuses.apply()
+
+            WebhookEvent.objects.bulk_update(events, [
+                'status', 'attempts', 'last_error', 'result', 'next_attempt_at', 'processed_at',
+            ], batch_size=500)
+
+        if len(events) < batch_size:
+            break
+
+    if any(totals.values()):
+        logger.info(f"Webhook inbox drained: {totals}")
+
+    lag = oldest_pending_age()
+    if lag is not None and lag > getattr(settings, 'CRM_WEBHOOK_LAG_WARNING', 300):
+        logger.warning(f"Webhook inbox lagging: oldest pending delivery is {lag:.0f}s old")
+    return totals
+
+
+def oldest_pending_age():
+    """Seconds since the oldest unprocessed delivery arrived, or None if the inbox is empty."""
+    from crm.models import WebhookEvent
+
+    oldest = WebhookEvent.objects.filter(status__in=DUE_STATUSES).aggregate(oldest=Min('received_at'))['oldest']
+    return (timezone.now() - oldest).total_seconds() if oldest else None
+
+
+def inbox_metrics(window: timedelta = timedelta(hours=1)) -> dict:
+    """
+    Backlog and lag of the inbox:
+    - counts: {provider: {status: n}} over all stored events
+    - backlog: events waiting for a first attempt or a retry
+    - dead: dead letters awaiting attention
+    - oldest_pending_seconds: age of the oldest waiting event
+    - processed_recently / max_lag_seconds: events done within `window` and
+      the longest receive-to-processed delay among them
+    """
+    from crm.models import WebhookEvent
+
+    counts = {}
+    for row in WebhookEvent.objects.values('provider', 'status').annotate(n=Count('id')):
+        counts.setdefault(row['provider'], {})[row['status']] = row['n']
+
+    recent = list(WebhookEvent.objects.filter(
+        status='done', processed_at__gte=timezone.now() - window,
+    ).values_list('received_at', 'processed_at'))
+
+    return {
+        'counts': counts,
+        'backlog': sum(n for by_status in counts.values() for s, n in by_status.items() if s in DUE_STATUSES),
+        'dead': sum(by_status.get('dead', 0) for by_status in counts.values()),
+        'oldest_pending_seconds': oldest_pending_age(),
+        'processed_recently': len(recent),
+        'max_lag_seconds': max(((done - received).total_seconds() for received, done in recent), default=None),
+    }
+
+
+def requeue(queryset) -> int:
+    """Send failed or dead-lettered events back for another round of attempts."""
+    return queryset.filter(status__in=('failed', 'dead')).update(
+        status='pending', attempts=0, next_attempt_at=timezone.now(),
+    )
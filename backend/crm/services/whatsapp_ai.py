@@ -3,12 +3,26 @@ WhatsApp AI Auto-Responder for Desi Firms.
 
 Handles inbound WhatsApp messages with AI-generated responses,
 user classification, conversation tracking, and human handoff.
+
+Prompt layout keeps each reply's prompt small and cacheable:
+- the instructions and DESI_FIRMS_KNOWLEDGE form a fixed prefix
+  (STATIC_PROMPT), identical for every conversation and turn, so the
+  provider's prompt cache serves it
+- per-conversation state follows it: handoff instruction, the rolling
+  summary, the recent messages that fit WHATSAPP_AI_HISTORY_TOKENS, user
+  type and phase
+- when the unsummarized messages outgrow the budget, the oldest are folded
+  into WhatsAppConversation.conversation_summary with one small call (old
+  summary + those messages only), and summary_through records how far the
+  summary reaches
+- prompt and cached token counts of each reply are kept on the conversation
 """
 
 import json
 import logging
 import re
 from datetime import timedelta
+from django.conf import settings
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
@@ -16,6 +30,9 @@ logger = logging.getLogger(__name__)
 # Maximum active handoffs before team is considered "busy"
 MAX_ACTIVE_HANDOFFS = 5
 
+# Unsummarized messages read per reply
+HISTORY_SCAN_LIMIT = 40
+
 # Base URL
 BASE = 'https://desifirms.com.au'
 
@@ -146,8 +163,6 @@ CRITICAL RULES ABOUT LINKS:
 - Just tell the user what to do in plain language (e.g. "Just register and add your business!")
 - Clickable link buttons are automatically attached to your message by the system.
 
-{human_option_instruction}
-
 IMPORTANT RULES:
 - If asked about specific business listings, tell them to check the platform
 - If they send a message in Hindi/Urdu/Punjabi, respond in English but acknowledge you understand
@@ -155,13 +170,19 @@ IMPORTANT RULES:
 - Don't repeat the same info — keep the conversation progressing
 
 {knowledge}
+"""
 
-CONVERSATION HISTORY:
-{history}
+# Everything above the conversation context; must not vary between turns
+STATIC_PROMPT = SYSTEM_PROMPT.format(knowledge=DESI_FIRMS_KNOWLEDGE)
+
+CONVERSATION_CONTEXT = """{human_option_instruction}
 
-CONVERSATION SUMMARY:
+CONVERSATION SUMMARY (earlier messages):
 {summary}
 
+CONVERSATION HISTORY (most recent):
+{history}
+
 USER TYPE: {user_type}
 CONVERSATION PHASE: {phase}
 """
@@ -179,6 +200,11 @@ HUMAN_BUSY_INSTRUCTION = """HUMAN HANDOFF:
 - Keep helping them with AI — you have all the info they need about the platform"""
 
 
+def estimate_tokens(text):
+    """Rough token count for English chat text (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
 class WhatsAppAIService:
     """AI-powered WhatsApp auto-responder for Desi Firms."""
 
@@ -186,21 +212,31 @@ class WhatsAppAIService:
         from core.services.ai_client import AIContentEngine
         self.ai = AIContentEngine()
 
-    def handle_inbound(self, phone, message, sender_name=''):
-        """Main entry point for processing an inbound WhatsApp message."""
+    def handle_inbound(self, phone, message, sender_name='', received=1, received_at=None, superseded=None):
+        """
+        Main entry point for processing an inbound WhatsApp message.
+
+        `message` may join a burst of `received` messages, the newest logged
+        at `received_at` (see crm.services.whatsapp_turns). If `superseded()`
+        turns true before the reply goes out, the reply is dropped and the
+        conversation left unsaved, for a newer turn to answer.
+        """
         conversation = self._get_or_create_conversation(phone, sender_name)
 
-        # Don't respond if AI is deactivated (human took over)
+        # Don't respond if AI is deactivated (human took over). The messages
+        # still count as handled, so a later AI turn doesn't answer them again.
         if not conversation.ai_active:
             logger.info(f"WhatsApp AI inactive for {phone}, skipping")
+            conversation.last_inbound_at = received_at or timezone.now()
+            conversation.save(update_fields=['last_inbound_at', 'updated_at'])
             return None
 
         # Update stats
-        conversation.message_count += 1
-        conversation.last_inbound_at = timezone.now()
+        conversation.message_count += received
+        conversation.last_inbound_at = received_at or timezone.now()
 
         # Check if user explicitly asked for a human — always honour this
-        if self._is_human_request(message):
+        if any(self._is_human_request(line) for line in message.splitlines() or [message]):
             self.trigger_handoff(conversation, reason='User requested human')
             return None
 
@@ -211,10 +247,6 @@ class WhatsAppAIService:
         # Update phase based on message count
         self._update_phase(conversation)
 
-        # Regenerate summary every 5 messages
-        if conversation.message_count % 5 == 0 and conversation.message_count > 0:
-            self._regenerate_summary(conversation)
-
         # Generate AI response
         raw_response = self._generate_response(conversation, message)
         if not raw_response:
@@ -222,6 +254,10 @@ class WhatsAppAIService:
             conversation.save()
             return None
 
+        if superseded and superseded():
+            logger.info(f"WhatsApp AI reply to {phone} superseded by a newer message, dropped")
+            return None
+
         # Detect which buttons to attach based on context
         text, buttons = self._detect_buttons(raw_response, conversation, message)
 
@@ -355,9 +391,7 @@ class WhatsAppAIService:
         """Get or auto-create a Contact under desifirms brand."""
         from crm.models import Contact, Brand
 
-        contact = Contact.objects.filter(phone=phone).first()
-        if not contact and len(phone) >= 10:
-            contact = Contact.objects.filter(phone__endswith=phone[-10:]).first()
+        contact = Contact.objects.by_phone(phone).first()
 
         if contact:
             if contact.has_whatsapp is not True:
@@ -466,27 +500,87 @@ Reply with ONLY the classification word (business_owner, regular_user, or existi
 
         return '\n'.join(lines) if lines else '(No previous messages)'
 
-    def _generate_response(self, conversation, message):
-        """Generate an AI response using conversation context."""
-        if not self.ai.enabled:
-            return None
+    def _history_window(self, conversation):
+        """
+        Messages not yet in the summary that fit the history token budget,
+        oldest first. If they don't all fit, the oldest are folded into the
+        summary first, leaving half the budget so the next few turns fit
+        without another summary call.
+        """
+        from crm.models import EmailLog
+
+        budget = getattr(settings, 'WHATSAPP_AI_HISTORY_TOKENS', 600)
+
+        messages = EmailLog.objects.filter(channel='whatsapp', to_phone=conversation.phone)
+        if conversation.summary_through:
+            messages = messages.filter(sent_at__gt=conversation.summary_through)
+        messages = list(messages.order_by('-sent_at')[:HISTORY_SCAN_LIMIT])
+        messages.reverse()
 
-        history = self._build_conversation_history(conversation.phone, limit=10)
+        lines = [self._history_line(msg) for msg in messages]
+        if sum(estimate_tokens(line) for line in lines) > budget:
+            keep = self._fit(lines, budget // 2)
+            if keep < len(lines) and self._update_summary(conversation, lines[:-keep]):
+                conversation.summary_through = messages[-keep - 1].sent_at
+            else:
+                # Summary unavailable: drop the oldest without folding them in
+                keep = self._fit(lines, budget)
+            lines = lines[-keep:]
 
+        return '\n'.join(lines) if lines else '(No previous messages)'
+
+    @staticmethod
+    def _fit(lines, budget):
+        """How many of the newest lines fit in budget tokens (at least one)."""
+        keep, used = 1, estimate_tokens(lines[-1])
+        for line in reversed(lines[:-1]):
+            used += estimate_tokens(line)
+            if used > budget:
+                break
+            keep += 1
+        return keep
+
+    @staticmethod
+    def _history_line(msg):
+        role = 'Customer' if msg.delivery_status == 'received' else 'Desi Firms Assistant'
+        return f"{role}: {msg.body}"
+
+    def _build_system_prompt(self, conversation):
+        """STATIC_PROMPT followed by this conversation's state."""
         if self._team_has_capacity():
             human_instruction = HUMAN_AVAILABLE_INSTRUCTION
         else:
             human_instruction = HUMAN_BUSY_INSTRUCTION
 
-        system = SYSTEM_PROMPT.format(
-            knowledge=DESI_FIRMS_KNOWLEDGE,
-            history=history,
+        history = self._history_window(conversation)
+        return STATIC_PROMPT + '\n' + CONVERSATION_CONTEXT.format(
+            human_option_instruction=human_instruction,
             summary=conversation.conversation_summary or '(New conversation)',
+            history=history,
             user_type=conversation.get_user_type_display(),
             phase=conversation.get_phase_display(),
-            human_option_instruction=human_instruction,
         )
 
+    def _record_usage(self, conversation, usage):
+        """Keep the prompt token counts of this reply on the conversation."""
+        prompt_tokens = usage.get('prompt_tokens', 0) or 0
+        cached_tokens = usage.get('cached_tokens', 0) or 0
+        conversation.last_prompt_tokens = prompt_tokens
+        conversation.last_cached_tokens = cached_tokens
+        conversation.total_prompt_tokens += prompt_tokens
+        conversation.total_cached_tokens += cached_tokens
+        logger.info(
+            f"WhatsApp AI reply to {conversation.phone}: "
+            f"{prompt_tokens} prompt tokens ({cached_tokens} cached)"
+        )
+
+    def _generate_response(self, conversation, message):
+        """Generate an AI response using conversation context."""
+        if not self.ai.enabled:
+            return None
+
+        system = self._build_system_prompt(conversation)
+
         prompt = f"Customer says: \"{message}\"\n\nRespond naturally as the Desi Firms Smart Assistant. Keep it short and WhatsApp-friendly. NEVER include URLs or web addresses in your response."
 
         result = self.ai.generate(
@@ -496,6 +590,7 @@ Reply with ONLY the classification word (business_owner, regular_user, or existi
         )
 
         if result['success']:
+            self._record_usage(conversation, result.get('usage') or {})
             return result['output']
 
         logger.error(f"AI generation failed: {result.get('error')}")
@@ -607,21 +702,29 @@ Reply with ONLY the classification word (business_owner, regular_user, or existi
                 conversation.deal.current_stage = target_stage
                 conversation.deal.save(update_fields=['current_stage'])
 
-    def _regenerate_summary(self, conversation):
-        """AI-generated rolling summary of the conversation."""
+    def _update_summary(self, conversation, lines):
+        """Fold messages leaving the history window into the rolling summary."""
         if not self.ai.enabled:
-            return
-
-        history = self._build_conversation_history(conversation.phone, limit=20)
+            return False
 
+        current = conversation.conversation_summary or '(No summary yet)'
+        new_messages = '\n'.join(lines)
         result = self.ai.generate(
-            prompt=f"Summarize this WhatsApp conversation in 2-3 sentences. Focus on what the customer wants and their situation:\n\n{history}",
+            prompt=(
+                f"Current summary of this WhatsApp conversation:\n{current}\n\n"
+                f"Messages since then:\n{new_messages}\n\n"
+                "Rewrite the summary in 2-3 sentences to include these messages. "
+                "Focus on what the customer wants and their situation."
+            ),
             temperature=0.2,
             system_prompt="You summarize conversations concisely. Be factual and brief.",
         )
 
         if result['success']:
             conversation.conversation_summary = result['output']
+            return True
+        logger.warning(f"WhatsApp summary update failed for {conversation.phone}: {result.get('error')}")
+        return False
 
     def _notify_owner(self, conversation, message, ai_response, is_handoff=False):
         """Enhanced owner notification with user type and summary."""
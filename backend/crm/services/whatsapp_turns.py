@@ -0,0 +1,173 @@
+"""
+WhatsApp Turns - One AI reply per burst of inbound WhatsApp messages, one at a time per phone.
+
+Customers often send three or four short messages in a row. Answering each
+on its own ran several generations for the same phone at once, racing on
+WhatsAppConversation and sending overlapping replies. Instead:
+
+- every inbound message bumps a per-phone generation counter in Redis and
+  queues process_whatsapp_ai_response WHATSAPP_AI_DEBOUNCE
+  seconds out, tagged with that generation
+- a task whose generation is no longer the latest does nothing: the newer
+  task answers its messages too, so a burst becomes a single AI turn
+- a per-phone Redis lock (token-checked release) keeps turns single-flight
+  across workers; a task that finds the lock held re-queues itself instead
+  of waiting on a worker
+- a turn answers every inbound message logged since the previous turn
+  (WhatsAppConversation.last_inbound_at), in order, joined into one prompt
+- a message arriving while a reply is being generated supersedes it: the
+  reply is dropped unsent and unsaved, and the newer turn answers them all
+
+The counters and locks live in Redis at WHATSAPP_AI_STATE_URL rather than
+in Django's cache, which is per-process memory unless CACHE_URL is set and
+would neither debounce nor serialize between the drain and AI workers.
+Without that Redis (unset or unreachable) each message gets its own turn,
+unserialized, and an error is logged: a late duplicate beats no reply.
+
+Settings: WHATSAPP_AI_STATE_URL, WHATSAPP_AI_DEBOUNCE, WHATSAPP_AI_LOCK_TIMEOUT.
+"""
+
+import logging
+
+import redis
+from django.conf import settings
+
+from core.services.redis_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+# Most inbound messages joined into one turn (the newest are kept)
+MAX_BURST_MESSAGES = 10
+
+# Generation counters outlive any realistic burst
+GENERATION_TIMEOUT = 24 * 60 * 60
+
+
+def _generation_key(phone: str) -> str:
+    return f'crm:whatsapp-ai:generation:{phone}'
+
+
+def _lock_key(phone: str) -> str:
+    return f'crm:whatsapp-ai:turn-lock:{phone}'
+
+
+def _state_client():
+    """Redis client for turn state, or None when WHATSAPP_AI_STATE_URL is blank."""
+    return get_client(getattr(settings, 'WHATSAPP_AI_STATE_URL', ''), timeout=1)
+
+
+def current_generation(phone: str):
+    client = _state_client()
+    if client is None:
+        return None
+    try:
+        value = client.get(_generation_key(phone))
+    except redis.RedisError as e:
+        logger.error(f"WhatsApp turn state unavailable, can't debounce {phone}: {e}")
+        return None
+    return int(value) if value is not None else None
+
+
+def is_superseded(phone: str, generation) -> bool:
+    """True once a newer message than `generation` has arrived for this phone."""
+    if generation is None:
+        return False
+    current = current_generation(phone)
+    # A lost counter can't tell; answering twice beats never answering
+    return current is not None and current != generation
+
+
+def enqueue(phone: str, sender_name: str = '') -> None:
+    """Queue an AI turn for an inbound message, superseding any turn still waiting."""
+    generation = None
+    client = _state_client()
+    if client is None:
+        logger.error("WHATSAPP_AI_STATE_URL is not set: WhatsApp AI turns are not debounced or serialized")
+    else:
+        key = _generation_key(phone)
+        try:
+            pipe = client.pipeline()
+            pipe.incr(key)
+            pipe.expire(key, GENERATION_TIMEOUT)
+            generation, _ = pipe.execute()
+        except redis.RedisError as e:
+            logger.error(f"WhatsApp turn state unavailable, can't debounce {phone}: {e}")
+    schedule(phone, sender_name, generation)
+
+
+def schedule(phone: str, sender_name: str, generation, countdown: float = None) -> None:
+    from crm.tasks import process_whatsapp_ai_response
+
+    if countdown is None:
+        countdown = getattr(settings, 'WHATSAPP_AI_DEBOUNCE', 4)
+    try:
+        process_whatsapp_ai_response.apply_async(
+            args=(phone,),
+            kwargs={'sender_name': sender_name, 'generation': generation},
+            countdown=countdown,
+        )
+    except Exception as e:
+        logger.error(f"Failed to dispatch AI task for {phone}: {e}")
+
+
+def pending_messages(phone: str) -> list:
+    """Inbound messages logged since the conversation's last turn, oldest first."""
+    from crm.models import EmailLog, WhatsAppConversation
+
+    messages = EmailLog.objects.filter(channel='whatsapp', to_phone=phone, delivery_status='received')
+    answered_through = WhatsAppConversation.objects.filter(phone=phone).values_list(
+        'last_inbound_at', flat=True,
+    ).first()
+    if answered_through:
+        messages = messages.filter(sent_at__gt=answered_through)
+    messages = list(messages.order_by('-sent_at')[:MAX_BURST_MESSAGES])
+    messages.reverse()
+    return messages
+
+
+def run_turn(phone: str, sender_name: str = '', generation=None) -> str:
+    """
+    Answer the pending messages of one phone. Returns what happened:
+    'superseded', 'busy' (re-queued behind the running turn), 'empty',
+    'responded' or 'skipped' (AI inactive, handed off or failed).
+    """
+    from crm.services.whatsapp_ai import WhatsAppAIService
+
+    if is_superseded(phone, generation):
+        return 'superseded'
+
+    lock = None
+    client = _state_client()
+    if client is not None:
+        lock = client.lock(_lock_key(phone), timeout=getattr(settings, 'WHATSAPP_AI_LOCK_TIMEOUT', 120))
+        try:
+            if not lock.acquire(blocking=False):
+                schedule(phone, sender_name, generation)
+                return 'busy'
+        except redis.RedisError as e:
+            logger.error(f"WhatsApp turn state unavailable, answering {phone} unserialized: {e}")
+            lock = None
+
+    try:
+        messages = pending_messages(phone)
+        if not messages:
+            return 'empty'
+
+        response = WhatsAppAIService().handle_inbound(
+            phone,
+            '\n'.join(msg.body for msg in messages),
+            sender_name,
+            received=len(messages),
+            received_at=messages[-1].sent_at,
+            superseded=lambda: is_superseded(phone, generation),
+        )
+        if response:
+            return 'responded'
+        return 'superseded' if is_superseded(phone, generation) else 'skipped'
+    finally:
+        if lock is not None:
+            try:
+                # Deletes the key only if it still holds this turn's token
+                lock.release()
+            except redis.RedisError:
+                logger.warning(f"WhatsApp turn lock for {phone} expired before the turn finished")
@@ -1,9 +1,10 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 
 from core.models import ChatLead, ContactInquiry
 from .models import Contact, Deal, Pipeline, DealActivity
+from .services.stats_rollup import SOURCE_MODELS as STATS_SOURCES
 
 
 @receiver(post_save, sender=ChatLead)
@@ -114,3 +115,31 @@ def log_deal_stage_change(sender, instance, created, **kwargs):
         )
 
 
+@receiver(post_save, sender=Contact)
+def index_contact_for_search(sender, instance, raw=False, **kwargs):
+    """Keep the composer typeahead tokens in step with the contact."""
+    if raw:
+        return
+    from .services.contact_search import index_contact
+    index_contact(instance)
+
+
+@receiver(post_save, sender=Deal)
+@receiver(post_delete, sender=Deal)
+def refresh_contact_active_deal(sender, instance, **kwargs):
+    """Deal status changes move the contact in or out of typeahead results."""
+    if kwargs.get('raw'):
+        return
+    from .services.contact_search import refresh_active_deal_flags
+    refresh_active_deal_flags([instance.contact_id])
+
+
+def invalidate_stats(sender, **kwargs):
+    """Deal/contact/email changes invalidate the cached CRM stats rollup."""
+    from .services.stats_rollup import invalidate_crm_stats
+    invalidate_crm_stats()
+
+
+for _model in STATS_SOURCES:
+    post_save.connect(invalidate_stats, sender=_model, dispatch_uid=f'crm-stats-save:{_model}')
+    post_delete.connect(invalidate_stats, sender=_model, dispatch_uid=f'crm-stats-delete:{_model}')
@@ -9,8 +9,10 @@ Background tasks for AI-powered CRM automation:
 """
 
 import logging
+import threading
 from datetime import timedelta
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
 
@@ -81,20 +83,30 @@ def process_pending_deals(self):
     Process deals that need action based on next_action_date.
     Runs hourly during office hours (Mon-Fri 9AM-5PM).
     Engagement-aware with burnout detection and ghost handling.
+
+    Runs in three phases so no transaction is held open across an LLM call:
+    1. Read: safety guards (short per-deal transactions), engagement profiles
+       and AI context for the deals that still need a decision.
+    2. Decide: AI analysis for the batch, outside any transaction, fanned
+       out by DealDecisionExecutor (CRM_AI_CONCURRENCY workers).
+    3. Write: apply each decision atomically, skipping deals that changed
+       since phase 1 (e.g. a reply arrived or someone paused it).
     """
     if not is_office_hours():
         logger.info("process_pending_deals skipped: outside office hours")
         return {'processed': 0, 'errors': 0, 'skipped': 'outside_office_hours'}
 
-    from crm.models import Contact, Deal, DealActivity, PipelineStage
+    from crm.models import Deal
     from crm.services.ai_agent import CRMAIAgent
-    from crm.services.engagement_engine import get_engagement_profile
+    from crm.services.decision_executor import DealDecisionExecutor
+    from crm.services.engagement_engine import get_engagement_profiles
 
     logger.info("Starting process_pending_deals task")
 
     ai_agent = CRMAIAgent()
     processed = 0
     errors = 0
+    stale = 0
 
     # Find deals with next_action_date <= now and status active
     pending_deals = Deal.objects.filter(
@@ -102,226 +114,292 @@ def process_pending_deals(self):
         next_action_date__lte=timezone.now(),
         autopilot_paused=False,
     ).select_related('contact', 'pipeline', 'current_stage')[:50]
+    pending_deals = list(pending_deals)
+
+    # Engagement profiles for the whole batch in one set-based pass
+    profiles = get_engagement_profiles(pending_deals)
 
+    # === PHASE 1: READ (guards + AI context) ===
+    plans = []
     for deal in pending_deals:
         try:
+            profile = profiles[deal.id]
+            channel = _get_deal_channel(deal.contact)
             with transaction.atomic():
-                contact = deal.contact
-                channel = _get_deal_channel(contact)
-
-                # SAFETY: Skip deals with no contact channel at all
-                if channel == 'none':
-                    deal.autopilot_paused = True
-                    deal.ai_notes = (deal.ai_notes or '') + f"\n[{timezone.now().strftime('%Y-%m-%d')}] [Autopilot] No contact channel (no email or phone). Paused."
-                    deal.save(update_fields=['autopilot_paused', 'ai_notes'])
-                    processed += 1
-                    logger.info(f"Deal {deal.id}: No contact channel, paused")
-                    continue
+                handled = _apply_deal_guards(deal, channel, profile)
+            if handled:
+                processed += 1
+                continue
+            plans.append({
+                'deal': deal,
+                'channel': channel,
+                'profile': profile,
+                'context': ai_agent.build_deal_context(deal, engagement_profile=profile),
+                'version': _deal_version(deal),
+            })
+        except Exception as e:
+            logger.error(f"Error processing deal {deal.id}: {e}")
+            errors += 1
 
-                # SAFETY: Skip bounced contacts (email channel only)
-                if channel == 'email' and contact.email_bounced:
-                    deal.status = 'lost'
-                    deal.lost_reason = 'invalid_email'
-                    deal.save(update_fields=['status', 'lost_reason'])
-                    DealActivity.objects.create(
-                        deal=deal,
-                        activity_type='status_change',
-                        description=f"[Autopilot] Contact email bounced - deal auto-closed"
-                    )
-                    processed += 1
-                    logger.info(f"Deal {deal.id}: Contact email bounced, auto-closed")
-                    continue
+    # === PHASE 2: DECIDE (parallel LLM calls, no transaction open) ===
+    batch = DealDecisionExecutor(ai_agent).run(plans)
+    errors += batch.errors
 
-                # SAFETY: Skip unsubscribed contacts (email) or SMS opted-out (sms)
-                brand_slug = deal.pipeline.brand.slug if deal.pipeline and deal.pipeline.brand else None
-                if channel == 'email' and (contact.is_unsubscribed or (brand_slug and contact.is_unsubscribed_from_brand(brand_slug))):
-                    deal.status = 'lost'
-                    deal.lost_reason = 'unsubscribed'
-                    deal.save(update_fields=['status', 'lost_reason'])
-                    DealActivity.objects.create(
-                        deal=deal,
-                        activity_type='status_change',
-                        description=f"[Autopilot] Contact is unsubscribed - deal auto-closed"
-                    )
-                    processed += 1
-                    logger.info(f"Deal {deal.id}: Contact unsubscribed, auto-closed")
-                    continue
-                if channel == 'sms' and contact.sms_opted_out:
-                    deal.status = 'lost'
-                    deal.lost_reason = 'unsubscribed'
-                    deal.save(update_fields=['status', 'lost_reason'])
-                    DealActivity.objects.create(
-                        deal=deal,
-                        activity_type='status_change',
-                        description=f"[Autopilot] Contact SMS opted out - deal auto-closed"
-                    )
-                    processed += 1
-                    logger.info(f"Deal {deal.id}: Contact SMS opted out, auto-closed")
+    # === PHASE 3: WRITE (short atomic apply with optimistic check) ===
+    for plan in plans:
+        deal = plan['deal']
+        if 'result' not in plan:
+            continue
+        try:
+            with transaction.atomic():
+                deal = Deal.objects.select_for_update().select_related(
+                    'contact', 'pipeline', 'current_stage',
+                ).get(pk=deal.pk)
+                if _deal_version(deal) != plan['version']:
+                    stale += 1
+                    logger.info(f"Deal {deal.id}: changed since analysis, AI decision dropped")
                     continue
+                _apply_ai_decision(deal, plan['channel'], plan['profile'], plan['result'])
+            processed += 1
+        except Exception as e:
+            logger.error(f"Error processing deal {deal.id}: {e}")
+            errors += 1
 
-                # SAFETY: Domain-level reputation check (email only)
-                if channel == 'email' and '@' in contact.email:
-                    domain = contact.email.split('@')[1].lower()
-                    from django.db.models import Q
-                    bad_contacts_at_domain = Contact.objects.filter(
-                        Q(email_bounced=True) | Q(is_unsubscribed=True) | Q(spam_reported=True),
-                        email__iendswith=f'@{domain}',
-                        brand=deal.pipeline.brand,
-                    ).count()
-                    if bad_contacts_at_domain >= 3:
-                        deal.autopilot_paused = True
-                        deal.ai_notes = (deal.ai_notes or '') + f"\n[{timezone.now().strftime('%Y-%m-%d')}] [Autopilot] Domain reputation risk: {bad_contacts_at_domain} bounced/unsubscribed/spam contacts at @{domain}. Paused."
-                        deal.save(update_fields=['autopilot_paused', 'ai_notes'])
-                        processed += 1
-                        logger.info(f"Deal {deal.id}: Domain reputation risk at @{domain}, paused")
-                        continue
-
-                # Check if this is a "Follow Up 3 (Final)" stage that has expired
-                # If so, automatically move to "Not Interested" without AI analysis
-                stage_name = deal.current_stage.name.lower() if deal.current_stage else ''
-                if 'follow up 3' in stage_name or 'final' in stage_name:
-                    not_interested_stage = PipelineStage.objects.filter(
-                        pipeline=deal.pipeline,
-                        name__icontains='not interested'
-                    ).first()
-                    if not_interested_stage:
-                        deal.move_to_stage(not_interested_stage)
-                        deal.status = 'lost'
-                        deal.lost_reason = 'no_response'
-                        deal.save(update_fields=['status', 'lost_reason'])
-                        DealActivity.objects.create(
-                            deal=deal,
-                            activity_type='stage_change',
-                            description=f"Auto-closed: No response after final follow-up"
-                        )
-                        processed += 1
-                        logger.info(f"Deal {deal.id}: Auto-moved to Not Interested after final follow-up")
-                        continue
-
-                # === ENGAGEMENT-AWARE ROUTING ===
-                profile = get_engagement_profile(deal)
-
-                # Update engagement tier on deal
-                if deal.engagement_tier != profile.tier:
-                    deal.engagement_tier = profile.tier
-                    deal.save(update_fields=['engagement_tier'])
-
-                # GUARD: Ghost detection - stop wasting emails
-                if profile.tier == 'ghost' and profile.total_sent >= 3:
-                    not_interested_stage = PipelineStage.objects.filter(
-                        pipeline=deal.pipeline,
-                        name__icontains='not interested'
-                    ).first()
-                    if not_interested_stage:
-                        deal.move_to_stage(not_interested_stage)
-                        deal.status = 'lost'
-                        deal.lost_reason = 'no_response'
-                        deal.save(update_fields=['status', 'lost_reason'])
-                        DealActivity.objects.create(
-                            deal=deal,
-                            activity_type='stage_change',
-                            description=f"[Autopilot] Ghost detected: {profile.total_sent} emails sent, 0 opens. Auto-closed."
-                        )
-                        processed += 1
-                        logger.info(f"Deal {deal.id}: Ghost detected, moved to Not Interested")
-                        continue
-
-                # GUARD: Burnout risk - extend wait time
-                if profile.is_burnout_risk and profile.tier not in ('engaged', 'hot'):
-                    deal.next_action_date = timezone.now() + timedelta(days=7)
-                    deal.ai_notes = (deal.ai_notes or '') + f"\n[{timezone.now().strftime('%Y-%m-%d')}] [Autopilot] Burnout risk: {profile.consecutive_unopened} consecutive unopened. Extended wait 7 days."
-                    deal.save(update_fields=['next_action_date', 'ai_notes'])
-                    processed += 1
-                    logger.info(f"Deal {deal.id}: Burnout risk detected, extending wait")
-                    continue
+    logger.info(f"process_pending_deals completed: {processed} processed, {errors} errors, {stale} stale")
+    return {'processed': processed, 'errors': errors, 'stale': stale, 'ai_batch': batch.as_dict()}
 
-                # Pass engagement profile to AI for smarter analysis
-                result = ai_agent.analyze_deal(deal, engagement_profile=profile)
-                action = result.get('action', 'flag_for_review')
-                metadata = result.get('metadata', {})
-
-                logger.info(f"Deal {deal.id}: AI recommends '{action}' (tier: {profile.tier})")
-
-                if action == 'send_email':
-                    if channel == 'sms':
-                        # Phone-only contact → route to SMS task
-                        queue_deal_sms.delay(str(deal.id))
-                    elif channel == 'email':
-                        # Send time optimization: defer to preferred hour if known
-                        preferred_hour = contact.preferred_send_hour
-                        if preferred_hour is not None:
-                            now_local = timezone.localtime()
-                            current_hour = now_local.hour
-                            # If outside ±2hr window of preferred hour, defer
-                            hour_diff = abs(current_hour - preferred_hour)
-                            if hour_diff > 2 and hour_diff < 22:  # handle wrap-around
-                                # Defer to preferred hour today or tomorrow
-                                target = now_local.replace(hour=preferred_hour, minute=0, second=0, microsecond=0)
-                                if target <= now_local:
-                                    target += timedelta(days=1)
-                                deal.next_action_date = target
-                                deal.save(update_fields=['next_action_date'])
-                                logger.info(f"Deal {deal.id}: Deferred to preferred send hour {preferred_hour}:00")
-                                processed += 1
-                                continue
-
-                        email_type = metadata.get('email_type', 'followup')
-                        # A/B testing: check if stage has variant B subject
-                        ab_variant = ''
-                        if deal.current_stage and deal.current_stage.subject_variant_b:
-                            import random
-                            ab_variant = 'A' if random.random() > 0.5 else 'B'
-                        queue_deal_email.delay(str(deal.id), email_type, ab_variant=ab_variant)
-
-                elif action == 'move_stage':
-                    suggested_stage_name = metadata.get('suggested_stage', '')
-                    if suggested_stage_name:
-                        next_stage = PipelineStage.objects.filter(
-                            pipeline=deal.pipeline,
-                            name__icontains=suggested_stage_name
-                        ).first()
-                        if next_stage:
-                            deal.move_to_stage(next_stage)
-                            DealActivity.objects.create(
-                                deal=deal,
-                                activity_type='stage_change',
-                                description=f"AI moved to stage: {next_stage.name}",
-                                metadata={'reason': result.get('reasoning', '')}
-                            )
-
-                elif action == 'wait':
-                    wait_days = int(metadata.get('wait_days', 3))
-                    deal.next_action_date = timezone.now() + timedelta(days=wait_days)
-                    deal.save(update_fields=['next_action_date'])
 
-                elif action == 'change_approach':
-                    # AI says try something different - extend wait and note it
-                    wait_days = int(metadata.get('wait_days', 5))
-                    deal.next_action_date = timezone.now() + timedelta(days=wait_days)
-                    deal.ai_notes = (deal.ai_notes or '') + f"\n[{timezone.now().strftime('%Y-%m-%d')}] [Autopilot] Changing approach: {result.get('reasoning', '')}"
-                    deal.save(update_fields=['next_action_date', 'ai_notes'])
+def _deal_version(deal) -> tuple:
+    """
+    Snapshot of the deal state an AI decision depends on.
 
-                elif action == 'pause':
-                    deal.status = 'paused'
-                    deal.save(update_fields=['status'])
-                    DealActivity.objects.create(
-                        deal=deal,
-                        activity_type='status_change',
-                        description=f"AI paused deal: {result.get('reasoning', '')}",
-                    )
+    Compared between the read and write phases of process_pending_deals; any
+    difference (status/stage/pause change, rescheduling, a new reply) means
+    the decision was made on stale data.
+    """
+    from crm.models import EmailLog
+
+    replies = EmailLog.objects.filter(deal=deal, replied=True).count()
+    return (
+        deal.status,
+        deal.autopilot_paused,
+        deal.current_stage_id,
+        deal.next_action_date,
+        replies,
+    )
 
-                elif action == 'flag_for_review':
-                    deal.ai_notes = (deal.ai_notes or '') + f"\n[{timezone.now().strftime('%Y-%m-%d')}] Flagged for review: {result.get('reasoning', '')}"
-                    deal.save(update_fields=['ai_notes'])
 
-                processed += 1
+def _apply_deal_guards(deal, channel, profile) -> bool:
+    """
+    Run the autopilot safety guards for a deal.
 
-        except Exception as e:
-            logger.error(f"Error processing deal {deal.id}: {e}")
-            errors += 1
+    Returns True if a guard handled the deal (closed, paused or rescheduled
+    it) and no AI decision is needed.
+    """
+    from django.db.models import Q
+    from crm.models import Contact, DealActivity, PipelineStage
+
+    contact = deal.contact
+
+    # SAFETY: Skip deals with no contact channel at all
+    if channel == 'none':
+        deal.autopilot_paused = True
+        deal.ai_notes = (deal.ai_notes or '') + f"\n[{timezone.now().strftime('%Y-%m-%d')}] [Autopilot] No contact channel (no email or phone). Paused."
+        deal.save(update_fields=['autopilot_paused', 'ai_notes'])
+        logger.info(f"Deal {deal.id}: No contact channel, paused")
+        return True
+
+    # SAFETY: Skip bounced contacts (email channel only)
+    if channel == 'email' and contact.email_bounced:
+        deal.status = 'lost'
+        deal.lost_reason = 'invalid_email'
+        deal.save(update_fields=['status', 'lost_reason'])
+        DealActivity.objects.create(
+            deal=deal,
+            activity_type='status_change',
+            description=f"[Autopilot] Contact email bounced - deal auto-closed"
+        )
+        logger.info(f"Deal {deal.id}: Contact email bounced, auto-closed")
+        return True
+
+    # SAFETY: Skip unsubscribed contacts (email) or SMS opted-out (sms)
+    brand_slug = deal.pipeline.brand.slug if deal.pipeline and deal.pipeline.brand else None
+    if channel == 'email' and (contact.is_unsubscribed or (brand_slug and contact.is_unsubscribed_from_brand(brand_slug))):
+        deal.status = 'lost'
+        deal.lost_reason = 'unsubscribed'
+        deal.save(update_fields=['status', 'lost_reason'])
+        DealActivity.objects.create(
+            deal=deal,
+            activity_type='status_change',
+            description=f"[Autopilot] Contact is unsubscribed - deal auto-closed"
+        )
+        logger.info(f"Deal {deal.id}: Contact unsubscribed, auto-closed")
+        return True
+    if channel == 'sms' and contact.sms_opted_out:
+        deal.status = 'lost'
+        deal.lost_reason = 'unsubscribed'
+        deal.save(update_fields=['status', 'lost_reason'])
+        DealActivity.objects.create(
+            deal=deal,
+            activity_type='status_change',
+            description=f"[Autopilot] Contact SMS opted out - deal auto-closed"
+        )
+        logger.info(f"Deal {deal.id}: Contact SMS opted out, auto-closed")
+        return True
+
+    # SAFETY: Domain-level reputation check (email only)
+    if channel == 'email' and '@' in contact.email:
+        domain = contact.email.split('@')[1].lower()
+        bad_contacts_at_domain = Contact.objects.filter(
+            Q(email_bounced=True) | Q(is_unsubscribed=True) | Q(spam_reported=True),
+            email__iendswith=f'@{domain}',
+            brand=deal.pipeline.brand,
+        ).count()
+        if bad_contacts_at_domain >= 3:
+            deal.autopilot_paused = True
+            deal.ai_notes = (deal.ai_notes or '') + f"\n[{timezone.now().strftime('%Y-%m-%d')}] [Autopilot] Domain reputation risk: {bad_contacts_at_domain} bounced/unsubscribed/spam contacts at @{domain}. Paused."
+            deal.save(update_fields=['autopilot_paused', 'ai_notes'])
+            logger.info(f"Deal {deal.id}: Domain reputation risk at @{domain}, paused")
+            return True
+
+    # Check if this is a "Follow Up 3 (Final)" stage that has expired
+    # If so, automatically move to "Not Interested" without AI analysis
+    stage_name = deal.current_stage.name.lower() if deal.current_stage else ''
+    if 'follow up 3' in stage_name or 'final' in stage_name:
+        not_interested_stage = PipelineStage.objects.filter(
+            pipeline=deal.pipeline,
+            name__icontains='not interested'
+        ).first()
+        if not_interested_stage:
+            deal.move_to_stage(not_interested_stage)
+            deal.status = 'lost'
+            deal.lost_reason = 'no_response'
+            deal.save(update_fields=['status', 'lost_reason'])
+            DealActivity.objects.create(
+                deal=deal,
+                activity_type='stage_change',
+                description=f"Auto-closed: No response after final follow-up"
+            )
+            logger.info(f"Deal {deal.id}: Auto-moved to Not Interested after final follow-up")
+            return True
 
-    logger.info(f"process_pending_deals completed: {processed} processed, {errors} errors")
-    return {'processed': processed, 'errors': errors}
+    # === ENGAGEMENT-AWARE ROUTING ===
+
+    # Update engagement tier on deal
+    if deal.engagement_tier != profile.tier:
+        deal.engagement_tier = profile.tier
+        deal.save(update_fields=['engagement_tier'])
+
+    # GUARD: Ghost detection - stop wasting emails
+    if profile.tier == 'ghost' and profile.total_sent >= 3:
+        not_interested_stage = PipelineStage.objects.filter(
+            pipeline=deal.pipeline,
+            name__icontains='not interested'
+        ).first()
+        if not_interested_stage:
+            deal.move_to_stage(not_interested_stage)
+            deal.status = 'lost'
+            deal.lost_reason = 'no_response'
+            deal.save(update_fields=['status', 'lost_reason'])
+            DealActivity.objects.create(
+                deal=deal,
+                activity_type='stage_change',
+                description=f"[Autopilot] Ghost detected: {profile.total_sent} emails sent, 0 opens. Auto-closed."
+            )
+            logger.info(f"Deal {deal.id}: Ghost detected, moved to Not Interested")
+            return True
+
+    # GUARD: Burnout risk - extend wait time
+    if profile.is_burnout_risk and profile.tier not in ('engaged', 'hot'):
+        deal.next_action_date = timezone.now() + timedelta(days=7)
+        deal.ai_notes = (deal.ai_notes or '') + f"\n[{timezone.now().strftime('%Y-%m-%d')}] [Autopilot] Burnout risk: {profile.consecutive_unopened} consecutive unopened. Extended wait 7 days."
+        deal.save(update_fields=['next_action_date', 'ai_notes'])
+        logger.info(f"Deal {deal.id}: Burnout risk detected, extending wait")
+        return True
+
+    return False
+
+
+def _apply_ai_decision(deal, channel, profile, result):
+    """Apply an AI analyze_deal() result to a deal (write phase of process_pending_deals)."""
+    from crm.models import DealActivity, PipelineStage
+
+    contact = deal.contact
+    action = result.get('action', 'flag_for_review')
+    metadata = result.get('metadata', {})
+
+    logger.info(f"Deal {deal.id}: AI recommends '{action}' (tier: {profile.tier})")
+
+    if action == 'send_email':
+        if channel == 'sms':
+            # Phone-only contact → route to SMS task
+            queue_deal_sms.delay(str(deal.id))
+        elif channel == 'email':
+            # Send time optimization: defer to preferred hour if known
+            preferred_hour = contact.preferred_send_hour
+            if preferred_hour is not None:
+                now_local = timezone.localtime()
+                current_hour = now_local.hour
+                # If outside ±2hr window of preferred hour, defer
+                hour_diff = abs(current_hour - preferred_hour)
+                if hour_diff > 2 and hour_diff < 22:  # handle wrap-around
+                    # Defer to preferred hour today or tomorrow
+                    target = now_local.replace(hour=preferred_hour, minute=0, second=0, microsecond=0)
+                    if target <= now_local:
+                        target += timedelta(days=1)
+                    deal.next_action_date = target
+                    deal.save(update_fields=['next_action_date'])
+                    logger.info(f"Deal {deal.id}: Deferred to preferred send hour {preferred_hour}:00")
+                    return
+
+            email_type = metadata.get('email_type', 'followup')
+            # A/B testing: check if stage has variant B subject
+            ab_variant = ''
+            if deal.current_stage and deal.current_stage.subject_variant_b:
+                import random
+                ab_variant = 'A' if random.random() > 0.5 else 'B'
+            queue_deal_email.delay(str(deal.id), email_type, ab_variant=ab_variant)
+
+    elif action == 'move_stage':
+        suggested_stage_name = metadata.get('suggested_stage', '')
+        if suggested_stage_name:
+            next_stage = PipelineStage.objects.filter(
+                pipeline=deal.pipeline,
+                name__icontains=suggested_stage_name
+            ).first()
+            if next_stage:
+                deal.move_to_stage(next_stage)
+                DealActivity.objects.create(
+                    deal=deal,
+                    activity_type='stage_change',
+                    description=f"AI moved to stage: {next_stage.name}",
+                    metadata={'reason': result.get('reasoning', '')}
+                )
+
+    elif action == 'wait':
+        wait_days = int(metadata.get('wait_days', 3))
+        deal.next_action_date = timezone.now() + timedelta(days=wait_days)
+        deal.save(update_fields=['next_action_date'])
+
+    elif action == 'change_approach':
+        # AI says try something different - extend wait and note it
+        wait_days = int(metadata.get('wait_days', 5))
+        deal.next_action_date = timezone.now() + timedelta(days=wait_days)
+        deal.ai_notes = (deal.ai_notes or '') + f"\n[{timezone.now().strftime('%Y-%m-%d')}] [Autopilot] Changing approach: {result.get('reasoning', '')}"
+        deal.save(update_fields=['next_action_date', 'ai_notes'])
+
+    elif action == 'pause':
+        deal.status = 'paused'
+        deal.save(update_fields=['status'])
+        DealActivity.objects.create(
+            deal=deal,
+            activity_type='status_change',
+            description=f"AI paused deal: {result.get('reasoning', '')}",
+        )
+
+    elif action == 'flag_for_review':
+        deal.ai_notes = (deal.ai_notes or '') + f"\n[{timezone.now().strftime('%Y-%m-%d')}] Flagged for review: {result.get('reasoning', '')}"
+        deal.save(update_fields=['ai_notes'])
 
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
@@ -933,6 +1011,22 @@ def send_scheduled_emails(self):
     return {'sent': sent, 'errors': errors}
 
 
+@shared_task
+def flush_tracking_events():
+    """Fold buffered tracking pixel hits into EmailLog and deal timelines."""
+    from crm.services.tracking_buffer import flush_tracking_events as flush
+
+    return flush()
+
+
+@shared_task
+def drain_webhook_inbox():
+    """Process stored provider webhooks (retries included) through their handlers."""
+    from crm.services.webhook_inbox import drain_inbox
+
+    return drain_inbox()
+
+
 @shared_task(bind=True, max_retries=2, default_retry_delay=120)
 def check_email_replies(self):
     """
@@ -1288,6 +1382,20 @@ def check_scheduled_drafts():
         queued += 1
         logger.info(f"Queued scheduled draft {draft.id} for sending")
 
+    # Runs whose worker died: no checkpoint for a while, resume from their rows
+    stalled_before = timezone.now() - timedelta(
+        minutes=getattr(settings, 'CRM_CAMPAIGN_STALL_MINUTES', 15)
+    )
+    stalled = EmailDraft.objects.filter(
+        schedule_status='sending',
+        send_run_id__isnull=False,
+        send_progress_at__lt=stalled_before,
+    )
+    for draft in stalled:
+        send_scheduled_draft.delay(str(draft.id))
+        queued += 1
+        logger.warning(f"Re-queued stalled send run for draft {draft.id}")
+
     if queued:
         logger.info(f"Queued {queued} scheduled draft(s) for sending")
 
@@ -1299,12 +1407,21 @@ def send_scheduled_draft(self, draft_id: str):
     """
     Send a scheduled EmailDraft at its scheduled time.
 
+    Recipients are sent through CampaignExecutor, which records per-recipient
+    state. If the run outlives CRM_CAMPAIGN_TIME_BUDGET the task re-queues
+    itself, and a re-delivered or re-queued task resumes the same run
+    (draft.send_run_id) without re-sending. Each executor thread gets its own
+    email/messaging service and AI agent, since they hold unsynchronized
+    state (Zoho access tokens, HTTP sessions).
+
     Args:
         draft_id: UUID of the EmailDraft to send
     """
-    from crm.models import EmailDraft, Contact, Deal, PipelineStage
-    from crm.services.email_templates import get_styled_email
+    import uuid
+    from crm.models import EmailDraft, PipelineStage
     from crm.services.ai_agent import CRMAIAgent
+    from crm.services.campaign_executor import CampaignExecutor
+    from crm.services.recipient_resolver import resolve_recipients, sendable_recipients
 
     logger.info(f"Starting scheduled send for draft {draft_id}")
 
@@ -1314,15 +1431,21 @@ def send_scheduled_draft(self, draft_id: str):
         logger.error(f"EmailDraft {draft_id} not found")
         return {'success': False, 'error': 'Draft not found'}
 
-    # Check if still scheduled (not cancelled)
-    if draft.schedule_status != 'scheduled':
+    # Start a new run, or resume the one in progress
+    if draft.schedule_status == 'scheduled':
+        claimed = EmailDraft.objects.filter(id=draft.id, schedule_status='scheduled').update(
+            schedule_status='sending', send_run_id=uuid.uuid4(), send_progress_at=timezone.now(),
+        )
+        if not claimed:
+            logger.info(f"Draft {draft_id} was picked up by another worker")
+            return {'success': False, 'error': 'Draft no longer scheduled'}
+        draft.refresh_from_db()
+    elif draft.schedule_status == 'sending' and draft.send_run_id:
+        logger.info(f"Resuming send run {draft.send_run_id} for draft {draft_id}")
+    else:
         logger.info(f"Draft {draft_id} no longer scheduled (status: {draft.schedule_status})")
         return {'success': False, 'error': 'Draft no longer scheduled'}
 
-    # Update status to sending
-    draft.schedule_status = 'sending'
-    draft.save(update_fields=['schedule_status'])
-
     try:
         # Validate basics
         if not draft.pipeline:
@@ -1339,56 +1462,6 @@ def send_scheduled_draft(self, draft_id: str):
             if not subject or not body_text:
                 raise ValueError("No email content")
 
-        # Get all valid recipients
-        all_recipients = draft.get_all_recipients()
-        valid_recipients = []
-
-        if is_phone:
-            for recipient in all_recipients:
-                phone = recipient.get('phone', '')
-                if not phone:
-                    continue
-                contact = recipient.get('contact')
-                if not contact:
-                    contact = Contact.objects.filter(phone=phone, brand=draft.brand).first()
-                if contact and contact.sms_opted_out:
-                    continue
-                if contact and not draft.send_to_pipeline_contacts:
-                    if Deal.objects.filter(contact=contact, status='active').exists():
-                        continue
-                valid_recipients.append({
-                    'phone': phone,
-                    'name': recipient.get('name', ''),
-                    'company': recipient.get('company', ''),
-                    'contact': contact,
-                })
-        else:
-            for recipient in all_recipients:
-                recipient_email = Contact.normalize_email(recipient['email'])
-                if not recipient_email:
-                    continue
-                contact = recipient.get('contact')
-                if not contact:
-                    contact = Contact.objects.filter(
-                        email__iexact=recipient_email, brand=draft.brand
-                    ).first()
-                brand_slug = draft.brand.slug if draft.brand else None
-                if contact and (contact.is_unsubscribed or contact.is_unsubscribed_from_brand(brand_slug)):
-                    continue
-                if contact and not draft.send_to_pipeline_contacts:
-                    if Deal.objects.filter(contact=contact, status='active').exists():
-                        continue
-                valid_recipients.append({
-                    'email': recipient_email,
-                    'name': recipient.get('name', ''),
-                    'company': recipient.get('company', ''),
-                    'website': recipient.get('website', ''),
-                    'contact': contact,
-                })
-
-        if not valid_recipients:
-            raise ValueError("No valid recipients")
-
         # Get pipeline stage
         invited_stage = PipelineStage.objects.filter(
             pipeline=draft.pipeline,
@@ -1400,9 +1473,9 @@ def send_scheduled_draft(self, draft_id: str):
         if not invited_stage:
             raise ValueError("Pipeline has no stages")
 
-        sent_count = 0
-        failed_count = 0
-        total_deals = 0
+        # Service instances for the thread running send_one (this thread's are set below)
+        per_thread = threading.local()
+        brand = draft.brand
 
         if is_phone:
             # Phone channel: use messaging service
@@ -1422,119 +1495,71 @@ def send_scheduled_draft(self, draft_id: str):
             else:
                 sms_fallback = body_text
 
-            for recipient in valid_recipients:
-                try:
-                    to_phone = recipient['phone']
-                    if not _is_valid_au_mobile(to_phone):
-                        failed_count += 1
-                        continue
-                    result = messaging_service.send_smart(to=to_phone, body=body_text, sms_body=sms_fallback)
-                    channel_used = result.get('channel_used', 'sms')
-
-                    if result.get('success'):
-                        sent_count += 1
-
-                        # Find or create contact
-                        contact = recipient.get('contact')
-                        if not contact:
-                            contact = Contact.objects.filter(
-                                phone=to_phone, brand=draft.brand
-                            ).first()
-
-                        # Find or create deal in pipeline (same as email path)
-                        linked_deal = None
-                        if contact and draft.pipeline:
-                            linked_deal = Deal.objects.filter(
-                                contact=contact, pipeline=draft.pipeline, status='active'
-                            ).first()
-                            if linked_deal:
-                                linked_deal.emails_sent = (linked_deal.emails_sent or 0) + 1
-                                linked_deal.last_contact_date = timezone.now()
-                                followup_days = linked_deal.current_stage.days_until_followup if linked_deal.current_stage else 3
-                                linked_deal.next_action_date = timezone.now() + timedelta(days=followup_days)
-                                linked_deal.save(update_fields=['emails_sent', 'last_contact_date', 'next_action_date'])
-                            else:
-                                linked_deal = Deal.objects.create(
-                                    contact=contact,
-                                    pipeline=draft.pipeline,
-                                    current_stage=invited_stage,
-                                    status='active',
-                                    emails_sent=1,
-                                    last_contact_date=timezone.now(),
-                                    next_action_date=timezone.now() + timedelta(
-                                        days=invited_stage.days_until_followup or 3
-                                    ),
-                                    ai_notes=f"First contact via SMS Composer ({channel_used})"
-                                )
-                                total_deals += 1
-
-                        from crm.models import EmailLog
-                        EmailLog.objects.create(
-                            deal=linked_deal,
-                            channel=channel_used,
-                            subject='',
-                            body=body_text if channel_used == 'whatsapp' else sms_fallback,
-                            to_phone=to_phone,
-                            message_sid=result.get('message_sid', ''),
-                            delivery_status='sent',
-                            sent_at=timezone.now(),
-                            ai_generated=bool(draft.generated_body),
-                        )
-
-                        if contact:
-                            contact.last_sms_at = timezone.now()
-                            contact.sms_count = (contact.sms_count or 0) + 1
-                            if contact.status == 'new':
-                                contact.status = 'contacted'
-                            contact.save(update_fields=['last_sms_at', 'sms_count', 'status'])
-                    else:
-                        failed_count += 1
-                except Exception as e:
-                    logger.error(f"Error sending to {recipient['phone']}: {e}")
-                    failed_count += 1
+            provider = messaging_service.provider
+            per_thread.messaging_service = messaging_service
+
+            def send_one(recipient):
+                if not hasattr(per_thread, 'messaging_service'):
+                    per_thread.messaging_service = get_messaging_service(brand=brand)
+                return _send_scheduled_phone_to_recipient(
+                    draft, recipient, body_text, sms_fallback, invited_stage, per_thread.messaging_service
+                )
         else:
-            # Email channel: existing logic
             from crm.services.email_service import get_email_service
             email_service = get_email_service(brand=draft.brand)
             if not email_service.enabled:
                 raise ValueError(f"Email service not configured for {draft.brand.name}")
 
-            ai_agent = CRMAIAgent()
+            provider = email_service.provider
+            per_thread.email_service = email_service
+            per_thread.ai_agent = CRMAIAgent()
+
+            def send_one(recipient):
+                if not hasattr(per_thread, 'email_service'):
+                    per_thread.email_service = get_email_service(brand=brand)
+                    per_thread.ai_agent = CRMAIAgent()
+                return _send_scheduled_to_recipient(
+                    draft, recipient, subject, body_text,
+                    invited_stage, per_thread.email_service, per_thread.ai_agent
+                )
 
-            for recipient in valid_recipients:
-                try:
-                    result = _send_scheduled_to_recipient(
-                        draft, recipient, subject, body_text,
-                        invited_stage, email_service, ai_agent
-                    )
-                    if result['success']:
-                        sent_count += 1
-                        if result.get('deal_created'):
-                            total_deals += 1
-                    else:
-                        failed_count += 1
-                except Exception as e:
-                    logger.error(f"Error sending to {recipient['email']}: {e}")
-                    failed_count += 1
-
-        # Update draft tracking
-        draft.sent_count = (draft.sent_count or 0) + sent_count
-        draft.deals_created = (draft.deals_created or 0) + total_deals
+        executor = CampaignExecutor(draft, send_one, provider=provider)
+        if executor.has_rows():
+            executor.recover_interrupted()
+        else:
+            # Resolve contacts, unsubscribes and pipeline membership in bulk
+            valid_recipients = sendable_recipients(resolve_recipients(draft))
+            if not valid_recipients:
+                raise ValueError("No valid recipients")
+            executor.materialize(valid_recipients)
+
+        run = executor.run()
+
+        draft.refresh_from_db()
+        if draft.schedule_status != 'sending':
+            logger.info(f"Draft {draft_id} stopped mid-run (status: {draft.schedule_status})")
+            return {'success': False, 'error': f'Draft {draft.schedule_status}', **run}
+
+        if run['remaining']:
+            # Out of time budget: checkpoint is in the rows, carry on in a fresh task
+            send_scheduled_draft.apply_async(args=[draft_id], countdown=5)
+            logger.info(f"Draft {draft_id}: {run['remaining']} recipient(s) left, re-queued")
+            return {'success': True, 'resumed': True, **run}
+
+        # Update draft tracking (counters were bumped per recipient)
         draft.is_sent = True
         draft.sent_at = timezone.now()
         draft.schedule_status = 'completed'
-        draft.save(update_fields=[
-            'sent_count', 'deals_created', 'is_sent', 'sent_at', 'schedule_status'
-        ])
+        draft.save(update_fields=['is_sent', 'sent_at', 'schedule_status'])
 
         logger.info(f"Scheduled send completed for draft {draft_id}: "
-                   f"{sent_count} sent, {failed_count} failed, {total_deals} deals")
+                   f"{run['sent']} sent, {run['failed']} failed, {run['deals_created']} deals")
 
         return {
             'success': True,
-            'sent_count': sent_count,
-            'failed_count': failed_count,
-            'deals_created': total_deals
+            'sent_count': run['sent'],
+            'failed_count': run['failed'],
+            'deals_created': run['deals_created']
         }
 
     except Exception as e:
@@ -1545,6 +1570,77 @@ def send_scheduled_draft(self, draft_id: str):
         return {'success': False, 'error': str(e)}
 
 
+def _send_scheduled_phone_to_recipient(draft, recipient, body_text, sms_fallback, invited_stage,
+                                       messaging_service):
+    """Helper function to send an SMS/WhatsApp to a single recipient."""
+    from crm.models import Contact, Deal, EmailLog
+
+    to_phone = recipient['phone']
+    if not _is_valid_au_mobile(to_phone):
+        return {'success': False, 'error': 'Not a valid AU mobile'}
+
+    result = messaging_service.send_smart(to=to_phone, body=body_text, sms_body=sms_fallback)
+    channel_used = result.get('channel_used', 'sms')
+    if not result.get('success'):
+        return {'success': False, 'error': result.get('error')}
+
+    # Find or create contact
+    contact = recipient.get('contact')
+    if not contact:
+        contact = Contact.objects.filter(
+            phone=to_phone, brand=draft.brand
+        ).first()
+
+    # Find or create deal in pipeline (same as email path)
+    deal_created = False
+    linked_deal = None
+    if contact and draft.pipeline:
+        linked_deal = Deal.objects.filter(
+            contact=contact, pipeline=draft.pipeline, status='active'
+        ).first()
+        if linked_deal:
+            linked_deal.emails_sent = (linked_deal.emails_sent or 0) + 1
+            linked_deal.last_contact_date = timezone.now()
+            followup_days = linked_deal.current_stage.days_until_followup if linked_deal.current_stage else 3
+            linked_deal.next_action_date = timezone.now() + timedelta(days=followup_days)
+            linked_deal.save(update_fields=['emails_sent', 'last_contact_date', 'next_action_date'])
+        else:
+            linked_deal = Deal.objects.create(
+                contact=contact,
+                pipeline=draft.pipeline,
+                current_stage=invited_stage,
+                status='active',
+                emails_sent=1,
+                last_contact_date=timezone.now(),
+                next_action_date=timezone.now() + timedelta(
+                    days=invited_stage.days_until_followup or 3
+                ),
+                ai_notes=f"First contact via SMS Composer ({channel_used})"
+            )
+            deal_created = True
+
+    EmailLog.objects.create(
+        deal=linked_deal,
+        channel=channel_used,
+        subject='',
+        body=body_text if channel_used == 'whatsapp' else sms_fallback,
+        to_phone=to_phone,
+        message_sid=result.get('message_sid', ''),
+        delivery_status='sent',
+        sent_at=timezone.now(),
+        ai_generated=bool(draft.generated_body),
+    )
+
+    if contact:
+        contact.last_sms_at = timezone.now()
+        contact.sms_count = (contact.sms_count or 0) + 1
+        if contact.status == 'new':
+            contact.status = 'contacted'
+        contact.save(update_fields=['last_sms_at', 'sms_count', 'status'])
+
+    return {'success': True, 'deal_created': deal_created}
+
+
 def _send_scheduled_to_recipient(draft, recipient, subject, body_text, invited_stage,
                                   email_service, ai_agent):
     """Helper function to send to a single recipient."""
@@ -1598,10 +1694,7 @@ def _send_scheduled_to_recipient(draft, recipient, subject, body_text, invited_s
     # Create/update contact and deal
     deal_created = False
     if not contact:
-        contact = Contact.objects.filter(
-            email__iexact=recipient_email,
-            brand=draft.brand
-        ).first()
+        contact = Contact.objects.by_email(recipient_email).filter(brand=draft.brand).first()
 
     if not contact:
         try:
@@ -1618,10 +1711,7 @@ def _send_scheduled_to_recipient(draft, recipient, subject, body_text, invited_s
                     source='email_composer_scheduled'
                 )
         except Exception:
-            contact = Contact.objects.filter(
-                email__iexact=recipient_email,
-                brand=draft.brand
-            ).first()
+            contact = Contact.objects.by_email(recipient_email).filter(brand=draft.brand).first()
 
     if contact:
         contact.last_emailed_at = timezone.now()
@@ -1669,19 +1759,22 @@ def autopilot_engagement_scan():
     Runs at 8 AM daily, before the main email processing.
     """
     from crm.models import Deal, DealActivity, PipelineStage
-    from crm.services.engagement_engine import get_engagement_profile, compute_preferred_send_hour
+    from crm.services.engagement_engine import get_engagement_profiles, compute_preferred_send_hour
 
     logger.info("Starting autopilot_engagement_scan")
 
-    active_deals = Deal.objects.filter(
+    active_deals = list(Deal.objects.filter(
         status='active',
-    ).select_related('contact', 'pipeline', 'current_stage')
+    ).select_related('contact', 'pipeline', 'current_stage'))
+
+    # Engagement profiles for the whole active book in one set-based pass
+    profiles = get_engagement_profiles(active_deals)
 
     stats = {'total': 0, 'updated': 0, 'ghosts': 0, 'burnout': 0, 'hot': 0}
 
     for deal in active_deals:
         try:
-            profile = get_engagement_profile(deal)
+            profile = profiles[deal.id]
             stats['total'] += 1
 
             # Update tier if changed
@@ -2095,19 +2188,12 @@ def send_phone_campaign_async(self, draft_id: str):
             else:
                 sms_count += 1
 
-            # Find or create contact (try exact, then last 9 digits)
+            # Find or create contact (this brand first, then any)
             if not contact:
-                contact = Contact.objects.filter(phone=to_phone, brand=draft.brand).first()
-                if not contact:
-                    contact = Contact.objects.filter(phone=to_phone).first()
-                if not contact and len(to_phone) >= 9:
-                    contact = Contact.objects.filter(
-                        phone__endswith=to_phone[-9:], brand=draft.brand
-                    ).first()
-                    if not contact:
-                        contact = Contact.objects.filter(
-                            phone__endswith=to_phone[-9:]
-                        ).first()
+                contact = (
+                    Contact.objects.by_phone(to_phone).filter(brand=draft.brand).first()
+                    or Contact.objects.by_phone(to_phone).first()
+                )
 
             # Create contact if not found (phone-only)
             if not contact and draft.brand:
@@ -2270,18 +2356,20 @@ def send_get_started_followup(self, contact_id):
 
 
 @shared_task(bind=True, max_retries=2, default_retry_delay=10)
-def process_whatsapp_ai_response(self, phone, message, sender_name=''):
+def process_whatsapp_ai_response(self, phone, message='', sender_name='', generation=None):
     """
-    Process an inbound WhatsApp message with AI auto-responder.
-    Dispatched from MetaWhatsAppWebhookView on each inbound message.
+    Answer the inbound WhatsApp messages pending for a phone with the AI auto-responder.
+    Queued by crm.services.whatsapp_turns.enqueue() for each inbound message;
+    bursts collapse into one turn, run one at a time per phone. `message` is
+    unused (the turn reads the logged messages) and kept for tasks queued
+    before turns were debounced.
     """
     import traceback
     try:
-        from crm.services.whatsapp_ai import WhatsAppAIService
-        service = WhatsAppAIService()
-        response = service.handle_inbound(phone, message, sender_name)
-        logger.info(f"WhatsApp AI processed {phone}: {'responded' if response else 'skipped'}")
-        return {'success': True, 'responded': bool(response)}
+        from crm.services.whatsapp_turns import run_turn
+        outcome = run_turn(phone, sender_name, generation)
+        logger.info(f"WhatsApp AI processed {phone}: {outcome}")
+        return {'success': True, 'responded': outcome == 'responded', 'outcome': outcome}
     except Exception as exc:
         logger.error(
             f"WhatsApp AI task failed for {phone}: {exc}\n{traceback.format_exc()}"
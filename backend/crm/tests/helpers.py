@@ -6,6 +6,19 @@ from crm.models import (
 )
 
 
+class FakeClock:
+    """Manual clock for rate limiters: pass it as clock and its sleep() as sleep."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
 class CRMTestCase(TestCase):
     """Base test case with helper methods for creating CRM test data."""
 
@@ -0,0 +1,199 @@
+import threading
+import uuid
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from .helpers import CRMTestCase, FakeClock
+from crm.models import CampaignRecipient, Deal, EmailDraft
+from crm.services.campaign_executor import CampaignExecutor, RateLimiter
+
+
+class TestRateLimiter(SimpleTestCase):
+    """Test the per-provider token bucket."""
+
+    def test_bursts_then_paces(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=2, burst=2, clock=clock, sleep=clock.sleep)
+
+        self.assertEqual(limiter.acquire(), 0.0)
+        self.assertEqual(limiter.acquire(), 0.0)
+        self.assertAlmostEqual(limiter.acquire(), 0.5)
+        self.assertAlmostEqual(clock.now, 0.5)
+
+    def test_zero_rate_never_waits(self):
+        limiter = RateLimiter(rate=0)
+        for _ in range(100):
+            self.assertEqual(limiter.acquire(), 0.0)
+
+
+class TestCampaignExecutor(CRMTestCase):
+    """Test checkpointed campaign sending."""
+
+    def setUp(self):
+        self.brand = self._create_brand()
+        self.pipeline = self._create_pipeline(self.brand)
+        self.draft = EmailDraft.objects.create(
+            brand=self.brand, pipeline=self.pipeline,
+            schedule_status='sending', send_run_id=uuid.uuid4(),
+        )
+        self.recipients = [
+            {'email': f'r{i}@example.com', 'name': f'R{i}', 'company': '', 'website': '', 'contact': None}
+            for i in range(5)
+        ]
+        self.sent = []
+
+    def _send(self, recipient):
+        self.sent.append(recipient['email'])
+        return {'success': True, 'deal_created': recipient['email'] == 'r0@example.com'}
+
+    def _executor(self, send=None, **kwargs):
+        return CampaignExecutor(self.draft, send or self._send, max_workers=1, chunk_size=2, **kwargs)
+
+    def test_sends_all_and_reports_progress(self):
+        executor = self._executor()
+        executor.materialize(self.recipients)
+
+        run = executor.run()
+
+        self.assertEqual(run['sent'], 5)
+        self.assertEqual(run['remaining'], 0)
+        self.assertEqual(run['deals_created'], 1)
+        self.draft.refresh_from_db()
+        self.assertEqual(self.draft.sent_count, 5)
+        self.assertEqual(self.draft.deals_created, 1)
+        self.assertIsNotNone(self.draft.send_progress_at)
+
+    def test_resume_only_sends_remaining(self):
+        executor = self._executor()
+        executor.materialize(self.recipients)
+
+        calls = {'n': 0}
+
+        def flaky(recipient):
+            calls['n'] += 1
+            if calls['n'] == 3:
+                executor._stopped.set()  # Simulate the task running out of time
+            return self._send(recipient)
+
+        executor.send_one = flaky
+        first = executor.run()
+        self.assertEqual(first['sent'], 3)
+        self.assertEqual(first['remaining'], 2)
+
+        # Re-materializing on resume adds nothing
+        second_executor = self._executor()
+        self.assertEqual(second_executor.materialize(self.recipients), 5)
+        second = second_executor.run()
+
+        self.assertEqual(second['sent'], 5)
+        self.assertEqual(sorted(self.sent), sorted(r['email'] for r in self.recipients))
+
+    def test_failures_recorded_per_recipient(self):
+        def send(recipient):
+            if recipient['email'] == 'r1@example.com':
+                raise RuntimeError('provider down')
+            return {'success': True}
+
+        executor = self._executor(send=send)
+        executor.materialize(self.recipients)
+        run = executor.run()
+
+        self.assertEqual(run['failed'], 1)
+        row = CampaignRecipient.objects.get(address='r1@example.com')
+        self.assertEqual(row.status, 'failed')
+        self.assertIn('provider down', row.error)
+        self.draft.refresh_from_db()
+        self.assertEqual(self.draft.failed_count, 1)
+
+    def test_interrupted_rows_are_not_resent(self):
+        executor = self._executor()
+        executor.materialize(self.recipients)
+        CampaignRecipient.objects.filter(address='r0@example.com').update(status='sending')
+        CampaignRecipient.objects.filter(address='r0@example.com').update(
+            updated_at=timezone.now() - timedelta(minutes=10)
+        )
+
+        self.assertEqual(executor.recover_interrupted(), 1)
+        executor.run()
+
+        self.assertNotIn('r0@example.com', self.sent)
+        self.assertEqual(len(self.sent), 4)
+
+    def test_cancelled_draft_stops_before_next_chunk(self):
+        executor = self._executor()
+        executor.materialize(self.recipients)
+        EmailDraft.objects.filter(pk=self.draft.pk).update(schedule_status='cancelled')
+
+        run = executor.run()
+
+        self.assertEqual(self.sent, [])
+        self.assertEqual(run['remaining'], 5)
+
+
+class TestSendScheduledDraft(CRMTestCase):
+    """Test send_scheduled_draft end to end with a mock email service."""
+
+    def setUp(self):
+        self.brand = self._create_brand()
+        self.pipeline = self._create_pipeline(self.brand)
+        self._create_stage(self.pipeline, 'Invited', 0)
+        self.draft = EmailDraft.objects.create(
+            brand=self.brand, pipeline=self.pipeline,
+            generated_subject='Hello', generated_body='{{SALUTATION}} body',
+            manual_emails='a@example.com\nb@example.com',
+            schedule_status='scheduled', scheduled_for=timezone.now(),
+        )
+
+    @patch('crm.tasks._send_scheduled_to_recipient', return_value={'success': True, 'deal_created': True})
+    @patch('crm.services.ai_agent.CRMAIAgent')
+    @patch('crm.services.email_service.get_email_service')
+    def test_completes_and_retries_do_not_resend(self, mock_service, mock_agent, mock_send):
+        mock_service.return_value = MagicMock(enabled=True, provider='mock')
+        from crm.tasks import send_scheduled_draft
+
+        result = send_scheduled_draft(str(self.draft.id))
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['sent_count'], 2)
+        self.assertEqual(mock_send.call_count, 2)
+        self.draft.refresh_from_db()
+        self.assertEqual(self.draft.schedule_status, 'completed')
+        self.assertEqual(self.draft.sent_count, 2)
+
+        # A duplicate delivery of the task after completion is a no-op
+        again = send_scheduled_draft(str(self.draft.id))
+        self.assertFalse(again['success'])
+        self.assertEqual(mock_send.call_count, 2)
+        self.assertEqual(Deal.objects.count(), 0)
+
+    @patch('crm.tasks._send_scheduled_to_recipient', return_value={'success': True})
+    @patch('crm.services.ai_agent.CRMAIAgent')
+    @patch('crm.services.email_service.get_email_service')
+    def test_each_worker_thread_gets_its_own_services(self, mock_service, mock_agent, mock_send):
+        mock_service.side_effect = lambda brand=None: MagicMock(enabled=True, provider='mock')
+        mock_agent.side_effect = MagicMock
+        from crm.tasks import send_scheduled_draft
+
+        with patch('crm.services.campaign_executor.CampaignExecutor') as mock_executor:
+            mock_executor.return_value.run.return_value = {'remaining': 1}
+            send_scheduled_draft(str(self.draft.id))
+        send_one = mock_executor.call_args.args[1]
+
+        def send_twice():
+            send_one({'email': 'a@example.com'})
+            send_one({'email': 'b@example.com'})
+
+        send_twice()
+        worker = threading.Thread(target=send_twice)
+        worker.start()
+        worker.join()
+
+        services = [c.args[5] for c in mock_send.call_args_list]
+        agents = [c.args[6] for c in mock_send.call_args_list]
+        self.assertIs(services[0], services[1])
+        self.assertIs(services[2], services[3])
+        self.assertIsNot(services[0], services[2])
+        self.assertIsNot(agents[0], agents[2])
@@ -0,0 +1,97 @@
+import json
+from unittest.mock import patch
+
+from django.contrib import admin
+from django.test import RequestFactory
+
+from .helpers import CRMTestCase
+from crm.models import Contact, ContactSearchToken, Deal
+from crm.services.contact_search import search_contacts
+
+
+class TestContactSearch(CRMTestCase):
+    """Test the indexed composer typeahead."""
+
+    def setUp(self):
+        self.brand = self._create_brand()
+        self.other_brand = self._create_brand(name='Other', slug='other')
+        self.pipeline = self._create_pipeline(self.brand)
+        self.stage = self._create_stage(self.pipeline)
+
+        self.john = self._create_contact(self.brand, email='john@acme.com.au', name='John Smith',
+                                         company='Acme', phone='+61412345678')
+        self.jose = self._create_contact(self.brand, email='jose@example.com', name='José Núñez',
+                                         company='Widgets')
+        self.jane = self._create_contact(self.other_brand, email='jane@acme.com.au', name='Jane Doe',
+                                         company='Acme')
+
+    def _emails(self, query, **kwargs):
+        return [c.email for c in search_contacts(query, **kwargs)]
+
+    def test_prefix_and_multi_term(self):
+        self.assertEqual(self._emails('jo'), ['john@acme.com.au', 'jose@example.com'])
+        self.assertEqual(self._emails('jo acme'), ['john@acme.com.au'])
+        self.assertEqual(self._emails('SMITH'), ['john@acme.com.au'])
+
+    def test_accents_folded(self):
+        self.assertEqual(self._emails('nunez'), ['jose@example.com'])
+
+    def test_brand_partition(self):
+        self.assertEqual(self._emails('acme'), ['jane@acme.com.au', 'john@acme.com.au'])
+        self.assertEqual(self._emails('acme', brand_id=self.other_brand.id), ['jane@acme.com.au'])
+
+    def test_phone_digits(self):
+        self.assertEqual(self._emails('0412 345', channel='phone'), ['john@acme.com.au'])
+        self.assertEqual(self._emails('+61 412', channel='phone'), ['john@acme.com.au'])
+        self.assertEqual(self._emails('jo', channel='phone'), ['john@acme.com.au'])
+
+    def test_active_deal_and_unsubscribed_excluded(self):
+        deal = self._create_deal(self.john, self.pipeline, self.stage)
+        self.john.refresh_from_db()
+        self.assertTrue(self.john.has_active_deal)
+        self.assertEqual(self._emails('jo'), ['jose@example.com'])
+
+        deal.status = 'lost'
+        deal.save()
+        self.assertEqual(self._emails('jo'), ['john@acme.com.au', 'jose@example.com'])
+
+        Contact.objects.filter(pk=self.jose.pk).update(is_unsubscribed=True)
+        self.assertEqual(self._emails('jo'), ['john@acme.com.au'])
+
+    def test_index_follows_edits(self):
+        self.john.name = 'Jonathan Brown'
+        self.john.save()
+
+        self.assertEqual(self._emails('brown'), ['john@acme.com.au'])
+        self.assertEqual(self._emails('smith'), [])
+        self.assertFalse(ContactSearchToken.objects.filter(contact=self.john, token='smith').exists())
+
+    def test_search_endpoint(self):
+        response = self.client.get('/api/crm/contacts/search/', {'q': 'jo acme'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['email'] for c in response.json()['contacts']], ['john@acme.com.au'])
+
+    def test_bulk_status_changes_refresh_active_deal(self):
+        self._create_deal(self.john, self.pipeline, self.stage)
+        deal_admin = admin.site._registry[Deal]
+        request = RequestFactory().post('/')
+
+        with patch.object(deal_admin, 'message_user'):
+            deal_admin.pause_deals(request, Deal.objects.filter(contact=self.john))
+            self.assertEqual(self._emails('john'), ['john@acme.com.au'])
+
+            deal_admin.resume_deals(request, Deal.objects.filter(contact=self.john))
+            self.assertEqual(self._emails('john'), [])
+
+        self.client.post('/api/crm/webhooks/unsubscribe/', json.dumps({'email': 'john@acme.com.au'}),
+                         content_type='application/json')
+        self.john.refresh_from_db()
+        self.assertFalse(self.john.has_active_deal)
+
+        Deal.objects.filter(contact=self.john).update(status='lost', lost_reason='unsubscribed')
+        contact_admin = admin.site._registry[Contact]
+        with patch.object(contact_admin, 'message_user'):
+            contact_admin.resubscribe(request, Contact.objects.filter(pk=self.john.pk))
+        self.john.refresh_from_db()
+        self.assertTrue(self.john.has_active_deal)
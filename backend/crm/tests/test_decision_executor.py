@@ -0,0 +1,109 @@
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase
+
+from .helpers import FakeClock
+from crm.services.decision_executor import DealDecisionExecutor, TokenBudget
+
+
+def _plan(deal_id, brand_id=1, context='ctx'):
+    deal = SimpleNamespace(
+        id=deal_id, pipeline_id=1, pipeline=SimpleNamespace(brand_id=brand_id),
+    )
+    return {'deal': deal, 'profile': None, 'context': context}
+
+
+class TestTokenBudget(SimpleTestCase):
+    """Test the sliding one-minute TokenBudget."""
+
+    def test_unlimited_never_waits(self):
+        budget = TokenBudget(0)
+        self.assertEqual(budget.acquire(10 ** 9), 0.0)
+
+    def test_waits_for_window_when_exhausted(self):
+        clock = FakeClock()
+        budget = TokenBudget(1000, clock=clock, sleep=clock.sleep)
+        self.assertEqual(budget.acquire(800), 0.0)
+        waited = budget.acquire(400)
+        self.assertAlmostEqual(waited, 60.0)
+
+    def test_oversized_call_is_capped(self):
+        clock = FakeClock()
+        budget = TokenBudget(1000, clock=clock, sleep=clock.sleep)
+        self.assertEqual(budget.acquire(5000), 0.0)
+
+
+class TestDealDecisionExecutor(SimpleTestCase):
+    """Test parallel fan-out of analyze_deal calls."""
+
+    def _agent(self, delay=0.05, on_call=None):
+        agent = MagicMock()
+
+        def analyze(deal, **kwargs):
+            if on_call:
+                on_call(deal)
+            time.sleep(delay)
+            return {'action': 'wait', 'metadata': {'deal': deal.id}}
+
+        agent.analyze_deal.side_effect = analyze
+        return agent
+
+    def test_results_stored_on_plans(self):
+        plans = [_plan(i) for i in range(4)]
+        DealDecisionExecutor(self._agent(delay=0), max_workers=4, per_brand=4).run(plans)
+        for i, plan in enumerate(plans):
+            self.assertEqual(plan['result']['metadata']['deal'], i)
+
+    def test_runs_in_parallel(self):
+        plans = [_plan(i, brand_id=i) for i in range(4)]
+        metrics = DealDecisionExecutor(
+            self._agent(delay=0.1), max_workers=4, per_brand=1,
+        ).run(plans)
+        self.assertEqual(metrics.calls, 4)
+        self.assertLess(metrics.wall_time, metrics.total_latency)
+        self.assertGreater(metrics.speedup, 1.5)
+
+    def test_per_brand_cap(self):
+        active = {'now': 0, 'peak': 0}
+        lock = threading.Lock()
+
+        def on_call(deal):
+            with lock:
+                active['now'] += 1
+                active['peak'] = max(active['peak'], active['now'])
+
+        agent = self._agent(delay=0.05, on_call=on_call)
+        original = agent.analyze_deal.side_effect
+
+        def analyze(deal, **kwargs):
+            try:
+                return original(deal, **kwargs)
+            finally:
+                with lock:
+                    active['now'] -= 1
+
+        agent.analyze_deal.side_effect = analyze
+        plans = [_plan(i, brand_id=1) for i in range(6)]
+        DealDecisionExecutor(agent, max_workers=6, per_brand=2).run(plans)
+        self.assertLessEqual(active['peak'], 2)
+
+    def test_capped_brand_does_not_hold_workers(self):
+        started = []
+        agent = self._agent(delay=0.05, on_call=lambda deal: started.append(deal.id))
+        plans = [_plan(i, brand_id=1) for i in range(4)] + [_plan(99, brand_id=2)]
+        DealDecisionExecutor(agent, max_workers=2, per_brand=1).run(plans)
+        # Brand 2 runs alongside brand 1's first call, not after its backlog
+        self.assertIn(99, started[:2])
+        self.assertEqual(len(started), 5)
+
+    def test_errors_recorded_per_plan(self):
+        agent = MagicMock()
+        agent.analyze_deal.side_effect = RuntimeError('boom')
+        plans = [_plan(1)]
+        metrics = DealDecisionExecutor(agent, max_workers=1).run(plans)
+        self.assertEqual(metrics.errors, 1)
+        self.assertNotIn('result', plans[0])
+        self.assertEqual(plans[0]['error'], 'boom')
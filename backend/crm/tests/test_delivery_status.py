@@ -0,0 +1,109 @@
+import json
+
+from django.test import override_settings
+
+from .helpers import CRMTestCase
+from crm.models import EmailLog
+from crm.services.delivery_status import StatusBatch
+from crm.services.webhook_inbox import drain_inbox
+
+WHATSAPP_URL = '/api/crm/webhooks/whatsapp/'
+TWILIO_STATUS_URL = '/api/crm/webhooks/twilio/status/'
+
+
+def _meta_statuses(*statuses):
+    return json.dumps({
+        'object': 'whatsapp_business_account',
+        'entry': [{'changes': [{'value': {
+            'statuses': [{'id': sid, 'status': status} for sid, status in statuses],
+        }}]}],
+    })
+
+
+@override_settings(META_WHATSAPP_APP_SECRET='')
+class TestDeliveryStatus(CRMTestCase):
+    """Test coalesced delivery status reconciliation."""
+
+    def setUp(self):
+        self.brand = self._create_brand()
+        self.contact = self._create_contact(self.brand, phone='+61412345678', has_whatsapp=True)
+
+    def _log(self, sid, channel='whatsapp', status='sent', **kwargs):
+        return self._create_email_log(
+            None, message_sid=sid, channel=channel, delivery_status=status, to_phone='+61412345678', **kwargs,
+        )
+
+    def _status(self, sid):
+        return EmailLog.objects.get(message_sid=sid).delivery_status
+
+    def test_callbacks_coalesced_to_furthest_status(self):
+        self._log('wamid.1')
+        self._log('wamid.2')
+        self._log('SM1', channel='sms', status='queued')
+
+        # Separate deliveries, out of order
+        self.client.post(WHATSAPP_URL, _meta_statuses(('wamid.1', 'read')), content_type='application/json')
+        self.client.post(WHATSAPP_URL, _meta_statuses(('wamid.1', 'delivered'), ('wamid.2', 'delivered')),
+                         content_type='application/json')
+        self.client.post(WHATSAPP_URL, _meta_statuses(('wamid.1', 'sent')), content_type='application/json')
+        for status in ('sent', 'delivered'):
+            self.client.post(TWILIO_STATUS_URL, {'MessageSid': 'SM1', 'MessageStatus': status})
+
+        drain_inbox()
+        self.assertEqual(
+            (self._status('wamid.1'), self._status('wamid.2'), self._status('SM1')),
+            ('read', 'delivered', 'delivered'),
+        )
+
+    def test_one_update_for_the_batch(self):
+        for i in range(50):
+            self._log(f'wamid.{i}')
+        statuses = StatusBatch()
+        for i in range(50):
+            statuses.add(f'wamid.{i}', 'sent')
+            statuses.add(f'wamid.{i}', 'delivered')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(statuses.apply()['logs_updated'], 50)
+        self.assertEqual(EmailLog.objects.filter(delivery_status='delivered').count(), 50)
+
+    def test_late_callback_never_moves_status_back(self):
+        self._log('wamid.read', status='read')
+        self._log('wamid.in', status='received')
+
+        statuses = StatusBatch()
+        statuses.add('wamid.read', 'sent')
+        statuses.add('wamid.in', 'delivered')
+        statuses.apply()
+
+        self.assertEqual(self._status('wamid.read'), 'read')
+        self.assertEqual(self._status('wamid.in'), 'received')
+
+    def test_failed_whatsapp_delivery_demotes_contact(self):
+        self._log('wamid.failed')
+        other = self._create_contact(self.brand, email='other@test.com', phone='+61400000000', has_whatsapp=True)
+        self._create_email_log(
+            None, message_sid='wamid.recovered', channel='whatsapp', delivery_status='sent', to_phone=other.phone,
+        )
+
+        self.client.post(
+            WHATSAPP_URL,
+            _meta_statuses(('wamid.failed', 'failed'), ('wamid.recovered', 'failed'), ('wamid.recovered', 'delivered')),
+            content_type='application/json',
+        )
+        drain_inbox()
+
+        self.contact.refresh_from_db()
+        other.refresh_from_db()
+        self.assertFalse(self.contact.has_whatsapp)
+        self.assertTrue(other.has_whatsapp)
+
+    def test_failed_sms_does_not_demote(self):
+        self._log('SM2', channel='sms')
+
+        self.client.post(TWILIO_STATUS_URL, {'MessageSid': 'SM2', 'MessageStatus': 'failed'})
+        drain_inbox()
+
+        self.assertEqual(self._status('SM2'), 'failed')
+        self.contact.refresh_from_db()
+        self.assertTrue(self.contact.has_whatsapp)
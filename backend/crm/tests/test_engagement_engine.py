@@ -5,6 +5,7 @@ from django.utils import timezone
 from .helpers import CRMTestCase
 from crm.services.engagement_engine import (
     get_engagement_profile,
+    get_engagement_profiles,
     compute_preferred_send_hour,
     get_engagement_summary_for_ai,
 )
@@ -115,6 +116,14 @@ class TestGetEngagementProfile(CRMTestCase):
         profile = get_engagement_profile(self.deal)
         self.assertAlmostEqual(profile.click_rate, 0.5)
 
+    def test_machine_opens_not_counted(self):
+        now = timezone.now()
+        self._create_email_log(self.deal, opened=True, opened_at=now)
+        self._create_email_log(self.deal, opened=True, opened_at=now, machine_open=True)
+        profile = get_engagement_profile(self.deal)
+        self.assertEqual(profile.total_opened, 1)
+        self.assertAlmostEqual(profile.open_rate, 0.5)
+
     # --- Behavioral signals ---
 
     def test_consecutive_unopened_count(self):
@@ -218,6 +227,74 @@ class TestGetEngagementProfile(CRMTestCase):
         self.assertEqual(profile.tier, 'warm')
 
 
+class TestGetEngagementProfiles(CRMTestCase):
+    """Test the batch get_engagement_profiles() path against the per-deal one."""
+
+    def setUp(self):
+        self.brand = self._create_brand()
+        self.pipeline = self._create_pipeline(self.brand)
+        self.stage = self._create_stage(self.pipeline)
+
+    def _deal(self, email):
+        contact = self._create_contact(self.brand, email=email)
+        return self._create_deal(contact, self.pipeline, self.stage)
+
+    def test_matches_per_deal_profiles(self):
+        now = timezone.now()
+        empty = self._deal('empty@example.com')
+        ghost = self._deal('ghost@example.com')
+        for i in range(3):
+            self._create_email_log(ghost, opened=False, sent_at=now - timedelta(days=i))
+        hot = self._deal('hot@example.com')
+        self._create_email_log(
+            hot, opened=True, opened_at=now - timedelta(days=1),
+            clicked=True, clicked_at=now - timedelta(days=1),
+            sent_at=now - timedelta(days=2),
+        )
+        self._create_email_log(hot, opened=False, sent_at=now - timedelta(days=1))
+        self._create_email_log(
+            hot, opened=True, opened_at=now - timedelta(days=9),
+            sent_at=now - timedelta(days=10),
+        )
+        engaged = self._deal('engaged@example.com')
+        self._create_email_log(
+            engaged, replied=True, replied_at=now - timedelta(days=3),
+            opened=True, opened_at=now - timedelta(days=4),
+            sent_at=now - timedelta(days=5),
+        )
+        sms = self._deal('sms@example.com')
+        for i in range(3):
+            self._create_email_log(sms, channel='sms', sent_at=now - timedelta(days=i))
+
+        deals = [empty, ghost, hot, engaged, sms]
+        profiles = get_engagement_profiles(deals)
+
+        self.assertEqual(set(profiles), {d.id for d in deals})
+        for deal in deals:
+            self.assertEqual(profiles[deal.id], get_engagement_profile(deal))
+
+    def test_single_query_for_batch(self):
+        deals = [self._deal(f'd{i}@example.com') for i in range(5)]
+        for deal in deals:
+            self._create_email_log(deal, opened=False)
+        with self.assertNumQueries(1):
+            profiles = get_engagement_profiles(deals)
+        self.assertEqual(len(profiles), 5)
+
+    def test_accepts_deal_ids(self):
+        deal = self._deal('ids@example.com')
+        self._create_email_log(deal, opened=False)
+        profiles = get_engagement_profiles([deal.id])
+        self.assertEqual(profiles[deal.id].total_sent, 1)
+
+    def test_unsent_logs_ignored(self):
+        deal = self._deal('unsent@example.com')
+        self._create_email_log(deal, sent_at=None)
+        profiles = get_engagement_profiles([deal])
+        self.assertEqual(profiles[deal.id].total_sent, 0)
+        self.assertEqual(profiles[deal.id].tier, 'cold')
+
+
 class TestComputePreferredSendHour(CRMTestCase):
     """Test compute_preferred_send_hour()."""
 
@@ -124,6 +124,37 @@ class TestContactSaveAutoPopulation(CRMTestCase):
         self.assertEqual(contact.website, '')
 
 
+class TestContactByPhone(CRMTestCase):
+    """Test phone_e164 population and ContactQuerySet.by_phone()."""
+
+    def setUp(self):
+        self.brand = self._create_brand()
+
+    def test_phone_e164_populated_on_save(self):
+        contact = self._create_contact(self.brand, phone='0412 345 678')
+        self.assertEqual(contact.phone_e164, '+61412345678')
+
+    def test_matches_any_stored_format(self):
+        local = self._create_contact(self.brand, email='a@test.com', phone='0412 345 678')
+        spaced = self._create_contact(self.brand, email='b@test.com', phone='+61 412-345-678')
+        self._create_contact(self.brand, email='c@test.com', phone='0400 000 000')
+
+        matches = set(Contact.objects.by_phone('whatsapp:+61412345678'))
+        self.assertEqual(matches, {local, spaced})
+
+    def test_unparseable_number_falls_back_to_exact_match(self):
+        contact = self._create_contact(self.brand, phone='ext. 12')
+        self.assertEqual(list(Contact.objects.by_phone('ext. 12')), [contact])
+        self.assertFalse(Contact.objects.by_phone('').exists())
+
+    def test_update_fields_phone_refreshes_e164(self):
+        contact = self._create_contact(self.brand, phone='0412 345 678')
+        contact.phone = '0400 000 000'
+        contact.save(update_fields=['phone'])
+        contact.refresh_from_db()
+        self.assertEqual(contact.phone_e164, '+61400000000')
+
+
 class TestDealMoveToStage(CRMTestCase):
     """Test Deal.move_to_stage method."""
 
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .helpers import CRMTestCase
+from crm.models import Deal
+
+
+class TestPipelineBoard(CRMTestCase):
+    """Test the Kanban board's grouped counts and lazy card pages."""
+
+    def setUp(self):
+        self.brand = self._create_brand()
+        self.pipeline = self._create_pipeline(self.brand)
+        self.first = self._create_stage(self.pipeline, name='New', order=0)
+        self.second = self._create_stage(self.pipeline, name='Contacted', order=1)
+        self.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(self.user)
+
+        # Distinct updated_at values, oldest first (auto_now is bypassed with update())
+        base = timezone.now() - timedelta(days=1)
+        for i in range(5):
+            contact = self._create_contact(self.brand, email=f'new{i}@example.com', name=f'New {i}')
+            deal = self._create_deal(contact, self.pipeline, self.first)
+            Deal.objects.filter(pk=deal.pk).update(updated_at=base + timedelta(minutes=i))
+        won = self._create_contact(self.brand, email='won@example.com')
+        self._create_deal(won, self.pipeline, self.second, status='won')
+        for reason, email in [('no_response', 'quiet@example.com'), ('unsubscribed', 'out@example.com'),
+                              ('invalid_email', 'bad@example.com')]:
+            contact = self._create_contact(self.brand, email=email)
+            self._create_deal(contact, self.pipeline, self.second, status='lost', lost_reason=reason)
+
+    def _deals_url(self, **params):
+        return f'/api/crm/board/{self.pipeline.id}/deals/?{urlencode(params)}'
+
+    def test_board_renders_counts_without_cards(self):
+        response = self.client.get(f'/api/crm/board/{self.pipeline.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        context = response.context
+        self.assertEqual([c['count'] for c in context['columns']], [5, 1])
+        self.assertEqual(context['total_active'], 5)
+        self.assertEqual(context['total_won'], 1)
+        self.assertEqual(context['total_lost'], 3)
+        self.assertEqual(context['lost_counts'], {'noresponse': 1, 'unsub': 1, 'bounced': 1})
+        self.assertNotContains(response, 'new0@example.com')
+
+    def test_column_pages_by_keyset(self):
+        first = self.client.get(self._deals_url(stage=self.first.id, limit=2)).json()
+        self.assertEqual([d['name'] for d in first['deals']], ['New 4', 'New 3'])
+        self.assertTrue(first['next_cursor'])
+
+        second = self.client.get(self._deals_url(stage=self.first.id, limit=2, cursor=first['next_cursor'])).json()
+        self.assertEqual([d['name'] for d in second['deals']], ['New 2', 'New 1'])
+
+        last = self.client.get(self._deals_url(stage=self.first.id, limit=2, cursor=second['next_cursor'])).json()
+        self.assertEqual([d['name'] for d in last['deals']], ['New 0'])
+        self.assertIsNone(last['next_cursor'])
+
+    def test_limit_clamped(self):
+        for limit in (0, -5):
+            response = self.client.get(self._deals_url(stage=self.first.id, limit=limit))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([d['name'] for d in response.json()['deals']], ['New 4'])
+
+        data = self.client.get(self._deals_url(stage=self.first.id, limit=1000)).json()
+        self.assertEqual(len(data['deals']), 5)
+
+    def test_lost_tab_page(self):
+        data = self.client.get(self._deals_url(lost='noresponse')).json()
+        self.assertEqual([d['email'] for d in data['deals']], ['quiet@example.com'])
+        self.assertEqual(data['deals'][0]['lost_reason'], 'No Response')
+
+    def test_bad_requests_rejected(self):
+        self.assertEqual(self.client.get(self._deals_url()).status_code, 400)
+        self.assertEqual(self.client.get(self._deals_url(stage=self.first.id, cursor='junk')).status_code, 400)
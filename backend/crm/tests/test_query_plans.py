@@ -0,0 +1,123 @@
+"""
+Query-plan regression tests for the CRM's hot queries.
+
+Each query below runs on every autopilot pass, webhook or board render.
+The test asks the database for its plan and fails if the named table is
+read with a full scan instead of an index (or, for paged queries, sorted
+instead of read in index order), so dropping or reshaping one of the
+Meta.indexes in crm.models shows up here rather than in production.
+"""
+
+import re
+import uuid
+
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase
+from django.utils import timezone
+
+from crm.models import Contact, Deal, EmailLog
+
+
+def _plan(queryset) -> str:
+    """EXPLAIN output for a queryset (PostgreSQL: with seq scans discouraged)."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+    return queryset.explain()
+
+
+def _full_scans(plan: str, table: str) -> list:
+    if connection.vendor == 'postgresql':
+        pattern = rf'Seq Scan on {table}\b'
+    else:
+        # "SCAN crm_deal" is a table scan; "SEARCH ... USING INDEX" is fine
+        pattern = rf'\bSCAN (TABLE )?{table}\b(?! USING (COVERING )?INDEX)'
+    return re.findall(pattern, plan)
+
+
+def _sorts(plan: str) -> list:
+    if connection.vendor == 'postgresql':
+        return re.findall(r'\bSort\b', plan)
+    return re.findall(r'USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY', plan)
+
+
+class TestHotQueryPlans(TestCase):
+    """Every hot CRM query must be answered from an index."""
+
+    def assertIndexed(self, queryset, table):
+        plan = _plan(queryset)
+        self.assertFalse(
+            _full_scans(plan, table),
+            f"Full scan of {table}:\n{plan}\n\nSQL: {queryset.query}",
+        )
+
+    def test_autopilot_due_deals(self):
+        # crm.tasks.process_pending_deals
+        qs = Deal.objects.filter(
+            status='active', next_action_date__lte=timezone.now(), autopilot_paused=False,
+        )
+        self.assertIndexed(qs, 'crm_deal')
+
+    def assertIndexOrdered(self, queryset, table):
+        self.assertIndexed(queryset, table)
+        plan = _plan(queryset)
+        self.assertFalse(_sorts(plan), f"Sort of {table}:\n{plan}\n\nSQL: {queryset.query}")
+
+    def test_board_column_page(self):
+        # crm.views.pipeline_board_deals: a deep keyset page of one stage column
+        qs = Deal.objects.filter(
+            pipeline_id=1, current_stage_id=1, status__in=('active', 'won', 'paused'),
+        ).filter(
+            Q(updated_at__lt=timezone.now()) | Q(updated_at=timezone.now(), id__lt=uuid.uuid4()),
+        ).order_by('-updated_at', '-id')[:51]
+        self.assertIndexOrdered(qs, 'crm_deal')
+
+    def test_board_stage_column(self):
+        # crm.views.pipeline_board
+        qs = Deal.objects.filter(pipeline_id=1, current_stage_id=1, status='active')
+        self.assertIndexed(qs, 'crm_deal')
+
+    def test_active_deals_for_contact(self):
+        # Webhooks, recipient resolution
+        qs = Deal.objects.filter(contact_id__in=[1, 2, 3], status='active')
+        self.assertIndexed(qs, 'crm_deal')
+
+    def test_deal_email_history(self):
+        # Engagement profiles, deal context
+        qs = EmailLog.objects.filter(deal_id__in=[uuid.uuid4(), uuid.uuid4()], sent_at__isnull=False).order_by('sent_at')
+        self.assertIndexed(qs, 'crm_emaillog')
+
+    def test_delivery_status_callback(self):
+        # Twilio/Meta status webhooks
+        self.assertIndexed(EmailLog.objects.filter(message_sid='SM123'), 'crm_emaillog')
+
+    def test_zoho_reply_dedup(self):
+        # crm.tasks.check_email_replies
+        self.assertIndexed(EmailLog.objects.filter(zoho_message_id='abc'), 'crm_emaillog')
+
+    def test_whatsapp_thread(self):
+        # WhatsApp inbox / AI conversation history
+        qs = EmailLog.objects.filter(channel='whatsapp', to_phone='+61412345678').order_by('-sent_at')
+        self.assertIndexed(qs, 'crm_emaillog')
+
+    def test_contact_by_email_and_brand(self):
+        # Webhooks, CSV import, scheduled sends
+        self.assertIndexed(Contact.objects.by_email('Someone@Example.com').filter(brand_id=1), 'crm_contact')
+        self.assertIndexed(Contact.objects.by_email('someone@example.com'), 'crm_contact')
+
+    def test_contact_by_exact_phone(self):
+        # Phone campaign recipients, numbers that don't normalize
+        self.assertIndexed(Contact.objects.filter(phone='+61412345678'), 'crm_contact')
+
+    def test_contact_by_phone(self):
+        # Inbound SMS/WhatsApp routing, however the number was stored
+        self.assertIndexed(Contact.objects.by_phone('whatsapp:+61412345678'), 'crm_contact')
+        self.assertIndexed(Contact.objects.by_phone('0412 345 678').filter(brand_id=1), 'crm_contact')
+
+    def test_harness_detects_full_scan(self):
+        # Guard against the check silently passing everything
+        plan = _plan(Contact.objects.filter(Q(company__icontains='acme')))
+        self.assertTrue(_full_scans(plan, 'crm_contact'), plan)
+        plan = _plan(Deal.objects.filter(pipeline_id=1).order_by('lost_reason'))
+        self.assertTrue(_sorts(plan), plan)
@@ -0,0 +1,82 @@
+from .helpers import CRMTestCase
+from crm.models import EmailDraft
+from crm.services.recipient_resolver import resolve_recipients, sendable_recipients
+
+
+class TestResolveRecipients(CRMTestCase):
+    """Test bulk recipient resolution for EmailDraft campaigns."""
+
+    def setUp(self):
+        self.brand = self._create_brand()
+        self.pipeline = self._create_pipeline(self.brand)
+        self.stage = self._create_stage(self.pipeline)
+        self.draft = EmailDraft.objects.create(brand=self.brand, pipeline=self.pipeline)
+
+    def _statuses(self, resolved):
+        return {r['email']: r['status'] for r in resolved}
+
+    def test_manual_emails_matched_to_contacts_and_filtered(self):
+        known = self._create_contact(self.brand, email='known@example.com')
+        self._create_contact(self.brand, email='gone@example.com', is_unsubscribed=True)
+        self._create_contact(self.brand, email='brandout@example.com', unsubscribed_brands=['testbrand'])
+        busy = self._create_contact(self.brand, email='busy@example.com')
+        self._create_deal(busy, self.pipeline, self.stage)
+        self.draft.manual_emails = '\n'.join([
+            'Known <KNOWN@example.com>',
+            'gone@example.com',
+            'brandout@example.com',
+            'busy@example.com',
+            'new@example.com',
+        ])
+        self.draft.save()
+
+        with self.assertNumQueries(3):
+            resolved = resolve_recipients(self.draft)
+
+        self.assertEqual(self._statuses(resolved), {
+            'known@example.com': 'ok',
+            'gone@example.com': 'blocked',
+            'brandout@example.com': 'blocked',
+            'busy@example.com': 'pipeline',
+            'new@example.com': 'ok',
+        })
+        sendable = sendable_recipients(resolved)
+        self.assertEqual([r['email'] for r in sendable], ['known@example.com', 'new@example.com'])
+        self.assertEqual(sendable[0]['contact'], known)
+        self.assertIsNone(sendable[1]['contact'])
+        self.assertNotIn('status', sendable[0])
+
+    def test_pipeline_contacts_kept_when_enabled(self):
+        busy = self._create_contact(self.brand, email='busy@example.com')
+        self._create_deal(busy, self.pipeline, self.stage)
+        self.draft.send_to_pipeline_contacts = True
+        self.draft.save()
+        self.draft.contacts.add(busy)
+
+        resolved = resolve_recipients(self.draft)
+
+        self.assertEqual(self._statuses(resolved), {'busy@example.com': 'ok'})
+
+    def test_duplicates_collapsed_after_normalising(self):
+        contact = self._create_contact(self.brand, email='dup@example.com')
+        self.draft.manual_emails = 'DUP@example.com\ndup@example.com'
+        self.draft.save()
+        self.draft.contacts.add(contact)
+
+        resolved = resolve_recipients(self.draft)
+
+        self.assertEqual(len(resolved), 1)
+        self.assertEqual(resolved[0]['contact'], contact)
+
+    def test_phone_recipients_respect_sms_opt_out(self):
+        self._create_contact(self.brand, email='sms@example.com', phone='+61412345678', sms_opted_out=True)
+        self.draft.channel = 'phone'
+        self.draft.manual_phones = '+61412345678\n+61412345679'
+        self.draft.save()
+
+        resolved = resolve_recipients(self.draft)
+
+        self.assertEqual(
+            {r['phone']: r['status'] for r in resolved},
+            {'+61412345678': 'blocked', '+61412345679': 'ok'},
+        )
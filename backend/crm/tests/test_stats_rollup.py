@@ -0,0 +1,89 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory
+
+from .helpers import CRMTestCase
+from crm.models import AIDecisionLog, EmailDraft
+from crm.services.stats_rollup import compute_crm_stats, get_crm_stats, pipeline_counts
+
+
+class TestStatsRollup(CRMTestCase):
+    """Test the cached CRM stats rollup."""
+
+    def setUp(self):
+        cache.clear()
+        self.brand = self._create_brand()
+        self.pipeline = self._create_pipeline(self.brand)
+        self.first = self._create_stage(self.pipeline, name='New', order=0)
+        self.second = self._create_stage(self.pipeline, name='Contacted', order=1)
+        self.other = self._create_pipeline(self.brand, name='Backlinks', pipeline_type='backlink')
+
+        contacts = [self._create_contact(self.brand, email=f'c{i}@example.com') for i in range(4)]
+        self._create_contact(self.brand, email='partner@example.com', contact_type='partner')
+        self.deal = self._create_deal(contacts[0], self.pipeline, self.first)
+        self._create_deal(contacts[1], self.pipeline, self.first)
+        self._create_deal(contacts[2], self.pipeline, self.second)
+        self._create_deal(contacts[3], self.pipeline, self.second, status='won')
+        self._create_email_log(self.deal, opened=True)
+        self._create_email_log(self.deal, replied=True)
+        EmailDraft.objects.create(brand=self.brand, pipeline=self.pipeline, schedule_status='scheduled')
+
+    def test_counts_in_fixed_queries(self):
+        with self.assertNumQueries(5):
+            stats = compute_crm_stats()
+
+        counts = pipeline_counts(stats, self.pipeline.id)
+        self.assertEqual(counts['total'], 4)
+        self.assertEqual(counts['active'], 3)
+        self.assertEqual(counts['won'], 1)
+        self.assertEqual(counts['stages'], {self.first.id: 2, self.second.id: 1})
+        self.assertEqual(pipeline_counts(stats, self.other.id)['total'], 0)
+
+        self.assertEqual(stats['deals']['by_status'], {'active': 3, 'won': 1})
+        self.assertEqual(stats['contacts']['total'], 5)
+        self.assertEqual(stats['contacts']['by_type'].get('partner'), 1)
+        self.assertEqual(stats['emails']['total_sent'], 2)
+        self.assertEqual(stats['emails']['opened'], 1)
+        self.assertEqual(stats['emails']['replied'], 1)
+        self.assertEqual(stats['emails']['sent_week'], 2)
+        self.assertEqual(stats['drafts']['scheduled'], 1)
+
+    def test_cached_until_deal_changes(self):
+        get_crm_stats()
+        with self.assertNumQueries(0):
+            get_crm_stats()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.deal.status = 'lost'
+            self.deal.save()
+
+        stats = get_crm_stats()
+        self.assertEqual(pipeline_counts(stats, self.pipeline.id)['lost'], 1)
+        self.assertEqual(pipeline_counts(stats, self.pipeline.id)['active'], 2)
+
+    def test_stats_endpoint_uses_rollup(self):
+        AIDecisionLog.objects.create(deal=self.deal, decision_type='compose_email', reasoning='test')
+        response = self.client.get('/api/crm/stats/')
+
+        data = response.json()
+        pipeline = next(p for p in data['pipelines'] if p['id'] == self.pipeline.id)
+        self.assertEqual(pipeline['active_deals'], 3)
+        self.assertEqual([s['deals_count'] for s in pipeline['stages']], [2, 1])
+        self.assertEqual(data['contacts']['partners'], 1)
+        self.assertEqual(data['emails']['total_sent'], 2)
+        self.assertEqual(data['ai']['total_decisions'], 1)
+
+    def test_pipeline_dashboard_uses_rollup(self):
+        from crm.views import pipeline_dashboard
+
+        request = RequestFactory().get('/admin/crm/dashboard/')
+        request.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        with patch('crm.views.render') as render:
+            pipeline_dashboard(request)
+
+        context = render.call_args[0][2]
+        item = next(i for i in context['pipeline_data'] if i['pipeline'] == self.pipeline)
+        self.assertEqual(item['total_active'], 3)
+        self.assertEqual([s['count'] for s in item['stages']], [2, 1])
@@ -290,6 +290,45 @@ class TestProcessPendingDeals(CRMTestCase):
         deal.refresh_from_db()
         self.assertEqual(deal.engagement_tier, 'cold')
 
+    @patch('crm.tasks.is_office_hours', return_value=True)
+    @patch('crm.services.ai_agent.CRMAIAgent')
+    def test_ai_called_outside_transaction(self, MockAgent, mock_hours):
+        """The AI call must not run inside a deal write transaction."""
+        from django.db import connection
+        baseline = len(connection.atomic_blocks)
+        depths = []
+
+        def analyze(deal, **kwargs):
+            depths.append(len(connection.atomic_blocks))
+            return {'action': 'wait', 'metadata': {'wait_days': '3'}}
+
+        MockAgent.return_value.analyze_deal.side_effect = analyze
+        self._create_deal(self.contact, self.pipeline, self.stage1)
+
+        self._run_task()
+        self.assertEqual(depths, [baseline])
+
+    @patch('crm.tasks.is_office_hours', return_value=True)
+    @patch('crm.services.ai_agent.CRMAIAgent')
+    def test_stale_decision_not_applied(self, MockAgent, mock_hours):
+        """A reply arriving during the AI call drops the decision."""
+        deal = self._create_deal(self.contact, self.pipeline, self.stage1)
+        log = self._create_email_log(deal, opened=True, opened_at=timezone.now())
+
+        def analyze(deal, **kwargs):
+            EmailLog.objects.filter(pk=log.pk).update(
+                replied=True, replied_at=timezone.now(),
+            )
+            return {'action': 'pause', 'metadata': {}, 'reasoning': 'stale'}
+
+        MockAgent.return_value.analyze_deal.side_effect = analyze
+
+        result = self._run_task()
+        deal.refresh_from_db()
+        self.assertEqual(deal.status, 'active')
+        self.assertEqual(result['stale'], 1)
+        self.assertEqual(result['processed'], 0)
+
 
 # =============================================================================
 # queue_deal_email
@@ -0,0 +1,259 @@
+import uuid
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import OperationalError
+from django.test import override_settings
+from django.utils import timezone
+
+from .helpers import CRMTestCase
+from crm.models import DealActivity, EmailLog, TrackingEvent
+from crm.services.click_tracking import click_url, rewrite_links, sign_click
+from crm.services.tracking_buffer import PROCESSING_KEY, REDIS_KEY, flush_tracking_events, is_machine_hit
+
+BROWSER_UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36'
+
+
+class FakeLock:
+    def __init__(self, fake, name):
+        self.fake, self.name = fake, name
+
+    def acquire(self, blocking=True):
+        if self.name in self.fake.locks:
+            return False
+        self.fake.locks.add(self.name)
+        return True
+
+    def release(self):
+        self.fake.locks.discard(self.name)
+
+
+class FakeRedis:
+    """Just enough of redis.Redis for the list buffer."""
+
+    def __init__(self):
+        self.lists = {}
+        self.locks = set()
+        self._ops = []
+
+    def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, value.encode())
+
+    def rpoplpush(self, src, dst):
+        items = self.lists.get(src, [])
+        if not items:
+            return None
+        item = items.pop()
+        self.lists.setdefault(dst, []).insert(0, item)
+        return item
+
+    def lrange(self, key, start, end):
+        items = self.lists.get(key, [])
+        return items[start:] if end == -1 else items[start:end + 1]
+
+    def delete(self, key):
+        return self.lists.pop(key, None) is not None
+
+    def lock(self, name, timeout=None):
+        return FakeLock(self, name)
+
+    def pipeline(self):
+        fake = self
+
+        class Pipeline:
+            def __init__(self):
+                self.ops = []
+
+            def rpoplpush(self, src, dst):
+                self.ops.append(lambda: fake.rpoplpush(src, dst))
+
+            def execute(self):
+                return [op() for op in self.ops]
+
+        return Pipeline()
+
+
+@override_settings(CRM_TRACKING_BUFFER_URL='')
+class TestTrackingBuffer(CRMTestCase):
+    """Test buffered open/click tracking and the batch flusher."""
+
+    def setUp(self):
+        self.brand = self._create_brand()
+        self.pipeline = self._create_pipeline(self.brand)
+        self.stage = self._create_stage(self.pipeline)
+        self.contact = self._create_contact(self.brand)
+        self.deal = self._create_deal(self.contact, self.pipeline, self.stage)
+        self.log = self._create_email_log(self.deal, sent_at=timezone.now() - timedelta(hours=1))
+
+    def _hit(self, email_log=None, user_agent=BROWSER_UA, **kwargs):
+        return TrackingEvent.objects.create(
+            tracking_id=(email_log or self.log).tracking_id, user_agent=user_agent, **kwargs
+        )
+
+    def test_pixel_only_buffers_the_hit(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                f'/api/crm/track/{self.log.tracking_id}/open.gif', HTTP_USER_AGENT=BROWSER_UA
+            )
+
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        event = TrackingEvent.objects.get()
+        self.assertEqual(event.tracking_id, self.log.tracking_id)
+        self.assertEqual(event.user_agent, BROWSER_UA)
+        self.log.refresh_from_db()
+        self.assertFalse(self.log.opened)
+
+    def test_repeated_opens_folded_once(self):
+        first = timezone.now() - timedelta(minutes=5)
+        self._hit(occurred_at=first)
+        self._hit()
+        self._hit()
+
+        result = flush_tracking_events()
+
+        self.assertEqual(result, {'events': 3, 'logs_updated': 1, 'activities': 1})
+        self.log.refresh_from_db()
+        self.assertTrue(self.log.opened)
+        self.assertEqual(self.log.opened_at, first)
+        self.assertEqual(self.log.open_count, 3)
+        self.assertFalse(self.log.machine_open)
+        self.assertFalse(TrackingEvent.objects.exists())
+
+        self._hit()
+        flush_tracking_events()
+        self.log.refresh_from_db()
+        self.assertEqual(self.log.open_count, 4)
+        self.assertEqual(self.log.opened_at, first)
+        self.assertEqual(DealActivity.objects.filter(activity_type='email_opened').count(), 1)
+
+    def test_machine_open_flagged_then_cleared_by_real_read(self):
+        self._hit(user_agent='Mozilla/5.0')  # Apple MPP prefetch
+        flush_tracking_events()
+
+        self.log.refresh_from_db()
+        self.assertTrue(self.log.opened)
+        self.assertTrue(self.log.machine_open)
+        activity = DealActivity.objects.get(activity_type='email_opened')
+        self.assertTrue(activity.metadata['machine_open'])
+
+        read_at = timezone.now()
+        self._hit(occurred_at=read_at)
+        flush_tracking_events()
+
+        self.log.refresh_from_db()
+        self.assertFalse(self.log.machine_open)
+        self.assertEqual(self.log.opened_at, read_at)
+        self.assertEqual(DealActivity.objects.filter(activity_type='email_opened').count(), 2)
+
+    def test_flush_is_batched(self):
+        logs = [self.log] + [self._create_email_log(self.deal) for _ in range(4)]
+        for email_log in logs:
+            self._hit(email_log, occurred_at=email_log.sent_at + timedelta(minutes=1))
+        TrackingEvent.objects.create(tracking_id=uuid.uuid4(), user_agent=BROWSER_UA)  # Unknown id, discarded
+
+        # Select, logs, bulk update, activity insert, delete (+ savepoint)
+        with self.assertNumQueries(7):
+            result = flush_tracking_events()
+
+        self.assertEqual(result['events'], 6)
+        self.assertEqual(EmailLog.objects.filter(opened=True).count(), 5)
+        self.assertFalse(TrackingEvent.objects.exists())
+
+    def test_is_machine_hit(self):
+        sent_at = timezone.now()
+        self.assertTrue(is_machine_hit('', sent_at))
+        self.assertTrue(is_machine_hit('Proofpoint URL Defense', sent_at))
+        self.assertTrue(is_machine_hit(BROWSER_UA, sent_at + timedelta(seconds=2), sent_at))
+        self.assertFalse(is_machine_hit(BROWSER_UA, sent_at + timedelta(minutes=3), sent_at))
+
+    def test_click_redirects_and_buffers(self):
+        url = 'https://example.com/pricing?plan=pro&ref=email'
+        path = click_url('', self.log.tracking_id, url)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(path, HTTP_USER_AGENT=BROWSER_UA)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], url)
+        event = TrackingEvent.objects.get()
+        self.assertEqual((event.kind, event.url), ('click', url))
+
+    def test_tampered_click_token_rejected(self):
+        token = sign_click(self.log.tracking_id, 'https://example.com/')
+        response = self.client.get(f'/api/crm/track/c/{token[:-2]}xx/')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(TrackingEvent.objects.exists())
+
+    def test_human_click_marks_clicked_and_opened(self):
+        self._hit(user_agent='Proofpoint', kind='click', url='https://example.com/')  # Scanner
+        flush_tracking_events()
+        self.log.refresh_from_db()
+        self.assertFalse(self.log.clicked)
+        self.assertEqual(self.log.click_count, 1)
+
+        clicked_at = timezone.now()
+        self._hit(kind='click', url='https://example.com/', occurred_at=clicked_at)
+        self._hit(kind='click', url='https://example.com/other')
+        flush_tracking_events()
+
+        self.log.refresh_from_db()
+        self.assertTrue(self.log.clicked)
+        self.assertEqual(self.log.clicked_at, clicked_at)
+        self.assertEqual(self.log.click_count, 3)
+        self.assertTrue(self.log.opened)
+        self.assertEqual(self.log.opened_at, clicked_at)
+        activity = DealActivity.objects.get(activity_type='email_clicked')
+        self.assertEqual(activity.metadata['url'], 'https://example.com/')
+
+    def test_redis_buffer_skips_database_until_flush(self):
+        fake = FakeRedis()
+        with patch('crm.services.tracking_buffer._buffer_client', return_value=fake):
+            with self.assertNumQueries(0):
+                self.client.get(f'/api/crm/track/{self.log.tracking_id}/open.gif', HTTP_USER_AGENT=BROWSER_UA)
+                self.client.get(click_url('', self.log.tracking_id, 'https://example.com/'), HTTP_USER_AGENT=BROWSER_UA)
+            self.assertEqual(len(fake.lists[REDIS_KEY]), 2)
+
+            result = flush_tracking_events()
+
+        self.assertEqual(result['events'], 2)
+        self.assertEqual(fake.lists[REDIS_KEY], [])
+        self.log.refresh_from_db()
+        self.assertTrue(self.log.opened)
+        self.assertTrue(self.log.clicked)
+
+    def test_redis_batch_kept_when_insert_fails(self):
+        fake = FakeRedis()
+        with patch('crm.services.tracking_buffer._buffer_client', return_value=fake):
+            self.client.get(f'/api/crm/track/{self.log.tracking_id}/open.gif', HTTP_USER_AGENT=BROWSER_UA)
+            with patch.object(TrackingEvent.objects, 'bulk_create', side_effect=OperationalError('database is locked')):
+                with self.assertRaises(OperationalError):
+                    flush_tracking_events()
+            self.assertEqual(len(fake.lists[PROCESSING_KEY]), 1)
+            self.assertFalse(fake.locks)
+
+            result = flush_tracking_events()
+
+        self.assertEqual(result['events'], 1)
+        self.assertNotIn(PROCESSING_KEY, fake.lists)
+        self.log.refresh_from_db()
+        self.assertEqual(self.log.open_count, 1)
+
+
+class TestRewriteLinks(CRMTestCase):
+    """Test link rewriting for click tracking."""
+
+    def test_rewrites_links_except_unsubscribe(self):
+        tracking_id = uuid.uuid4()
+        body = (
+            '<p><a href="https://example.com/a?x=1&amp;y=2">A</a> '
+            "<a class='btn' href='http://example.com/b'>B</a> "
+            '<a href="mailto:hi@example.com">Mail</a> '
+            '<a href="https://codeteki.au/api/crm/unsubscribe/?email=x">Unsubscribe</a></p>'
+        )
+
+        rewritten = rewrite_links(body, 'https://codeteki.au', tracking_id)
+
+        self.assertIn(click_url('https://codeteki.au', tracking_id, 'https://example.com/a?x=1&y=2'), rewritten)
+        self.assertIn(f"href='{click_url('https://codeteki.au', tracking_id, 'http://example.com/b')}'", rewritten)
+        self.assertIn('href="mailto:hi@example.com"', rewritten)
+        self.assertIn('href="https://codeteki.au/api/crm/unsubscribe/?email=x"', rewritten)
@@ -0,0 +1,237 @@
+import hashlib
+import hmac
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+
+from .helpers import CRMTestCase
+from crm.models import Contact, EmailLog, WebhookEvent
+from crm.services.webhook_inbox import DRAIN_LOCK_KEY, drain_inbox, inbox_metrics, requeue
+
+BOUNCE_URL = '/api/crm/webhooks/bounce/'
+WHATSAPP_URL = '/api/crm/webhooks/whatsapp/'
+
+
+def _bounce(email):
+    return json.dumps({
+        'event_name': ['hardbounce'],
+        'event_message': [{'event_data': [{'details': [{'bounced_recipient': email}]}]}],
+    })
+
+
+def _whatsapp_message(msg_id, body='Hi there'):
+    return json.dumps({
+        'object': 'whatsapp_business_account',
+        'entry': [{'changes': [{'value': {
+            'contacts': [{'profile': {'name': 'Priya'}}],
+            'messages': [{'from': '61412345678', 'id': msg_id, 'type': 'text', 'text': {'body': body}}],
+        }}]}],
+    })
+
+
+class FakeLock:
+    """Token-checked lock, like redis.lock.Lock."""
+
+    def __init__(self, fake, name):
+        self.fake, self.name = fake, name
+        self.token = object()
+
+    def acquire(self, blocking=True):
+        if self.name in self.fake.values:
+            return False
+        self.fake.values[self.name] = self.token
+        return True
+
+    def reacquire(self):
+        return True
+
+    def release(self):
+        if self.fake.values.get(self.name) is self.token:
+            del self.fake.values[self.name]
+
+
+class FakeRedis:
+    """Just enough of redis.Redis for the drain flag and lock."""
+
+    def __init__(self):
+        self.values = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def exists(self, key):
+        return int(key in self.values)
+
+    def delete(self, key):
+        return int(self.values.pop(key, None) is not None)
+
+    def lock(self, name, timeout=None):
+        return FakeLock(self, name)
+
+
+@override_settings(ZEPTOMAIL_WEBHOOK_KEY='', META_WHATSAPP_APP_SECRET='')
+class TestWebhookInbox(CRMTestCase):
+    """Test acknowledge-first storage and the inbox drain."""
+
+    def setUp(self):
+        cache.clear()
+        self.redis = FakeRedis()
+        patcher = patch('crm.services.webhook_inbox._state_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.brand = self._create_brand()
+        self.contact = self._create_contact(self.brand, email='bounce@test.com', phone='+61412345678')
+
+    def _post(self, url, body, **extra):
+        return self.client.post(url, body, content_type='application/json', **extra)
+
+    def test_acknowledged_before_processing(self):
+        resp = self._post(BOUNCE_URL, _bounce('bounce@test.com'))
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['status'], 'accepted')
+        event = WebhookEvent.objects.get(provider='zeptomail')
+        self.assertEqual(event.status, 'pending')
+        self.contact.refresh_from_db()
+        self.assertFalse(self.contact.email_bounced)
+
+        self.assertEqual(drain_inbox(), {'done': 1, 'failed': 0, 'dead': 0})
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'done')
+        self.assertEqual(event.result['results'][0]['action'], 'bounced')
+        self.contact.refresh_from_db()
+        self.assertTrue(self.contact.email_bounced)
+
+    def test_provider_retry_dropped_at_insert(self):
+        self._post(BOUNCE_URL, _bounce('bounce@test.com'))
+        resp = self._post(BOUNCE_URL, _bounce('bounce@test.com'))
+
+        self.assertEqual(resp.json()['status'], 'duplicate')
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    @patch('crm.tasks.drain_webhook_inbox.apply_async')
+    def test_burst_queues_one_drain(self, apply_async):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._post(BOUNCE_URL, _bounce('bounce@test.com'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self._post(BOUNCE_URL, _bounce('other@test.com'))
+        apply_async.assert_called_once()
+
+        # The drain clears the queued flag as it starts
+        drain_inbox()
+        with self.captureOnCommitCallbacks(execute=True):
+            self._post(BOUNCE_URL, _bounce('third@test.com'))
+        self.assertEqual(apply_async.call_count, 2)
+
+    @patch('crm.tasks.drain_webhook_inbox.apply_async')
+    def test_drain_queued_while_another_runs_requeues(self, apply_async):
+        self.redis.values[DRAIN_LOCK_KEY] = 'running-drain'
+        with self.captureOnCommitCallbacks(execute=True):
+            self._post(BOUNCE_URL, _bounce('bounce@test.com'))
+
+        self.assertEqual(drain_inbox(), {'busy': True})
+        self.assertEqual(apply_async.call_count, 2)
+        self.assertEqual(WebhookEvent.objects.get().status, 'pending')
+
+        # Once the running drain is done, the re-queued one processes the delivery
+        del self.redis.values[DRAIN_LOCK_KEY]
+        self.assertEqual(drain_inbox(), {'done': 1, 'failed': 0, 'dead': 0})
+        self.assertNotIn(DRAIN_LOCK_KEY, self.redis.values)
+
+        # A busy beat drain with nothing queued doesn't re-queue
+        self.redis.values[DRAIN_LOCK_KEY] = 'running-drain'
+        self.assertEqual(drain_inbox(), {'busy': True})
+        self.assertEqual(apply_async.call_count, 2)
+
+    @patch('crm.tasks.drain_webhook_inbox.apply_async')
+    def test_without_state_redis_every_delivery_queues_a_drain(self, apply_async):
+        with patch('crm.services.webhook_inbox._state_client', return_value=None):
+            for email in ('bounce@test.com', 'other@test.com'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self._post(BOUNCE_URL, _bounce(email))
+            self.assertEqual(apply_async.call_count, 2)
+            self.assertEqual(drain_inbox()['done'], 2)
+
+    @override_settings(CRM_WEBHOOK_MAX_ATTEMPTS=2)
+    def test_failures_retry_with_backoff_then_dead_letter(self):
+        def failing(payload, statuses):
+            Contact.objects.create(brand=self.brand, email='partial@test.com')
+            raise ValueError('provider payload changed')
+
+        self._post(BOUNCE_URL, _bounce('bounce@test.com'))
+        with patch.dict('crm.services.webhook_handlers.HANDLERS', {'zeptomail': failing}):
+            self.assertEqual(drain_inbox()['failed'], 1)
+            event = WebhookEvent.objects.get()
+            self.assertEqual(event.attempts, 1)
+            self.assertGreater(event.next_attempt_at, timezone.now())
+            self.assertIn('provider payload changed', event.last_error)
+            # The handler's writes were rolled back with it
+            self.assertFalse(Contact.objects.filter(email='partial@test.com').exists())
+
+            # Not due yet
+            self.assertEqual(drain_inbox(), {'done': 0, 'failed': 0, 'dead': 0})
+
+            WebhookEvent.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+            self.assertEqual(drain_inbox()['dead'], 1)
+
+        self.assertEqual(inbox_metrics()['dead'], 1)
+        self.assertEqual(requeue(WebhookEvent.objects.all()), 1)
+        self.assertEqual(drain_inbox()['done'], 1)
+
+    def test_metrics(self):
+        self._post(BOUNCE_URL, _bounce('bounce@test.com'))
+        WebhookEvent.objects.update(received_at=timezone.now() - timedelta(minutes=5))
+
+        metrics = inbox_metrics()
+        self.assertEqual(metrics['backlog'], 1)
+        self.assertEqual(metrics['counts'], {'zeptomail': {'pending': 1}})
+        self.assertGreaterEqual(metrics['oldest_pending_seconds'], 300)
+
+        drain_inbox()
+        metrics = inbox_metrics()
+        self.assertEqual(metrics['backlog'], 0)
+        self.assertIsNone(metrics['oldest_pending_seconds'])
+        self.assertEqual(metrics['processed_recently'], 1)
+        self.assertGreaterEqual(metrics['max_lag_seconds'], 300)
+
+    @patch('crm.tasks.process_whatsapp_ai_response.apply_async')
+    def test_whatsapp_message_processed_by_drain(self, apply_async):
+        self._post(WHATSAPP_URL, _whatsapp_message('wamid.1'))
+        self.assertFalse(EmailLog.objects.filter(message_sid='wamid.1').exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            drain_inbox()
+
+        self.assertTrue(EmailLog.objects.filter(message_sid='wamid.1', delivery_status='received').exists())
+        self.contact.refresh_from_db()
+        self.assertTrue(self.contact.has_whatsapp)
+        apply_async.assert_called_once()
+        self.assertEqual(apply_async.call_args.kwargs['args'], ('+61412345678',))
+        self.assertEqual(apply_async.call_args.kwargs['kwargs']['sender_name'], 'Priya')
+
+    @override_settings(META_WHATSAPP_APP_SECRET='app-secret')
+    def test_whatsapp_signature(self):
+        body = _whatsapp_message('wamid.2')
+        signature = 'sha256=' + hmac.new(b'app-secret', body.encode(), hashlib.sha256).hexdigest()
+
+        self.assertEqual(self._post(WHATSAPP_URL, body, HTTP_X_HUB_SIGNATURE_256='sha256=bad').status_code, 403)
+        self.assertFalse(WebhookEvent.objects.exists())
+        self.assertEqual(self._post(WHATSAPP_URL, body, HTTP_X_HUB_SIGNATURE_256=signature).status_code, 200)
+        self.assertTrue(WebhookEvent.objects.filter(provider='meta').exists())
+
+    def test_twilio_status_callbacks(self):
+        self._create_email_log(None, message_sid='SM123', channel='sms')
+
+        for status in ('sent', 'delivered', 'delivered'):
+            self.client.post('/api/crm/webhooks/twilio/status/', {'MessageSid': 'SM123', 'MessageStatus': status})
+        self.assertEqual(WebhookEvent.objects.filter(provider='twilio_status').count(), 2)
+
+        drain_inbox()
+        self.assertEqual(EmailLog.objects.get(message_sid='SM123').delivery_status, 'delivered')
@@ -4,7 +4,20 @@ from django.test import override_settings
 from django.utils import timezone
 
 from .helpers import CRMTestCase
-from crm.models import Contact, Deal, DealActivity, EmailLog, Pipeline, PipelineStage
+from crm.models import Contact, Deal, DealActivity, EmailLog, Pipeline, PipelineStage, WebhookEvent
+from crm.services.webhook_inbox import drain_inbox
+
+
+def _deliver(client, url, body, **extra):
+    """POST a webhook, then process the inbox as the drain task would."""
+    resp = client.post(url, body, **extra)
+    drain_inbox()
+    return resp
+
+
+def _last_result():
+    """What the handler did with the most recent delivery."""
+    return WebhookEvent.objects.latest('id').result
 
 
 # =============================================================================
@@ -21,8 +34,8 @@ class TestDesiFirmsWebhookAuth(CRMTestCase):
         headers = {}
         if auth is not None:
             headers['HTTP_AUTHORIZATION'] = auth
-        return self.client.post(
-            self.URL, json.dumps(data), content_type='application/json', **headers,
+        return _deliver(
+            self.client, self.URL, json.dumps(data), content_type='application/json', **headers,
         )
 
     @override_settings(DESIFIRMS_WEBHOOK_KEY='secret-key')
@@ -64,7 +77,7 @@ class TestDesiFirmsWebhookValidation(CRMTestCase):
 
     def _post(self, data=None, raw=None):
         body = raw if raw is not None else json.dumps(data)
-        return self.client.post(self.URL, body, content_type='application/json')
+        return _deliver(self.client, self.URL, body, content_type='application/json')
 
     def test_invalid_json(self):
         resp = self._post(raw='not json')
@@ -78,10 +91,13 @@ class TestDesiFirmsWebhookValidation(CRMTestCase):
         resp = self._post({'email': 'test@test.com'})
         self.assertEqual(resp.status_code, 400)
 
-    def test_no_brand_returns_500(self):
-        # No desifirms brand exists
+    def test_no_brand_is_retried(self):
+        # No desifirms brand exists: accepted, then retried until one is set up
         resp = self._post({'event_type': 'user_registered', 'email': 't@t.com'})
-        self.assertEqual(resp.status_code, 500)
+        self.assertEqual(resp.status_code, 200)
+        event = WebhookEvent.objects.get(provider='desifirms')
+        self.assertEqual(event.status, 'failed')
+        self.assertIn('brand not configured', event.last_error)
 
 
 class TestDesiFirmsWebhookRegistration(CRMTestCase):
@@ -99,8 +115,8 @@ class TestDesiFirmsWebhookRegistration(CRMTestCase):
         self.stage2 = self._create_stage(self.pipeline, 'Nudge 1', 1)
 
     def _post(self, data):
-        return self.client.post(
-            self.URL, json.dumps(data), content_type='application/json',
+        return _deliver(
+            self.client, self.URL, json.dumps(data), content_type='application/json',
         )
 
     def test_creates_contact_and_deal(self):
@@ -204,7 +220,7 @@ class TestDesiFirmsWebhookRegistration(CRMTestCase):
             'email': 'nopipe@test.com',
             'pipeline_hint': 'business',
         })
-        data = resp.json()
+        data = _last_result()
         self.assertEqual(data['status'], 'contact_created')
         self.assertTrue(
             Contact.objects.filter(email='nopipe@test.com').exists()
@@ -243,8 +259,8 @@ class TestDesiFirmsWebhookProgress(CRMTestCase):
         self.stage_listed = self._create_stage(self.pipeline, 'Listed', 1)
 
     def _post(self, data):
-        return self.client.post(
-            self.URL, json.dumps(data), content_type='application/json',
+        return _deliver(
+            self.client, self.URL, json.dumps(data), content_type='application/json',
         )
 
     def _setup_contact_with_deal(self, email='progress@test.com'):
@@ -398,8 +414,8 @@ class TestDesiFirmsWebhookContactUpdate(CRMTestCase):
         contact.refresh_from_db()
         self.assertEqual(contact.name, '')
 
-        self.client.post(
-            self.URL,
+        _deliver(
+            self.client, self.URL,
             json.dumps({
                 'event_type': 'user_registered',
                 'email': 'noname@test.com',
@@ -432,7 +448,7 @@ class TestEmailReplyWebhook(CRMTestCase):
 
     def _post(self, data=None, raw=None):
         body = raw if raw is not None else json.dumps(data)
-        return self.client.post(self.URL, body, content_type='application/json')
+        return _deliver(self.client, self.URL, body, content_type='application/json')
 
     def test_invalid_json(self):
         resp = self._post(raw='bad json')
@@ -447,7 +463,7 @@ class TestEmailReplyWebhook(CRMTestCase):
             'from_email': 'nobody@nowhere.com',
             'subject': 'Re: test',
         })
-        data = resp.json()
+        data = _last_result()
         self.assertEqual(data['status'], 'ignored')
 
     def test_no_active_deal(self):
@@ -456,7 +472,7 @@ class TestEmailReplyWebhook(CRMTestCase):
             'from_email': 'inactive@test.com',
             'subject': 'Re: hello',
         })
-        data = resp.json()
+        data = _last_result()
         self.assertEqual(data['status'], 'contact_updated')
         contact.refresh_from_db()
         self.assertEqual(contact.status, 'replied')
@@ -533,8 +549,8 @@ class TestZeptoMailBounceWebhook(CRMTestCase):
         headers = {}
         if auth is not None:
             headers['HTTP_AUTHORIZATION'] = auth
-        return self.client.post(
-            self.URL, json.dumps(data), content_type='application/json', **headers,
+        return _deliver(
+            self.client, self.URL, json.dumps(data), content_type='application/json', **headers,
         )
 
     def _bounce_payload(self, email, event_type='hardbounce'):
@@ -580,8 +596,8 @@ class TestZeptoMailBounceWebhook(CRMTestCase):
     # --- Validation ---
 
     def test_invalid_json(self):
-        resp = self.client.post(
-            self.URL, 'bad json', content_type='application/json',
+        resp = _deliver(
+            self.client, self.URL, 'bad json', content_type='application/json',
         )
         self.assertEqual(resp.status_code, 400)
 
@@ -619,13 +635,13 @@ class TestZeptoMailBounceWebhook(CRMTestCase):
             bounced_at=timezone.now(),
         )
         resp = self._post(self._bounce_payload('idem@test.com'))
-        data = resp.json()
+        data = _last_result()
         result = data['results'][0]
         self.assertEqual(result['action'], 'already_bounced')
 
     def test_hard_bounce_unknown_email(self):
         resp = self._post(self._bounce_payload('unknown@nowhere.com'))
-        data = resp.json()
+        data = _last_result()
         result = data['results'][0]
         self.assertEqual(result['action'], 'ignored')
 
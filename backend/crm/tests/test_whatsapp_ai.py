@@ -0,0 +1,276 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import redis
+from django.test import override_settings
+from django.utils import timezone
+
+from .helpers import CRMTestCase
+from crm.models import WhatsAppConversation
+from crm.services import whatsapp_turns
+from crm.services.whatsapp_ai import STATIC_PROMPT, WhatsAppAIService
+
+PHONE = '+61412345678'
+
+
+class FakeAI:
+    """Stands in for AIContentEngine; records the calls it gets."""
+
+    enabled = True
+
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, *, prompt, temperature=0.2, system_prompt=None, cache=None):
+        self.calls.append({'prompt': prompt, 'system_prompt': system_prompt})
+        if system_prompt.startswith('You summarize'):
+            return {'success': True, 'output': f'Summary #{len(self.summary_calls)}', 'usage': {}}
+        return {
+            'success': True,
+            'output': 'Happy to help!',
+            'usage': {'prompt_tokens': 1500, 'completion_tokens': 20, 'cached_tokens': 1280},
+        }
+
+    @property
+    def summary_calls(self):
+        return [c for c in self.calls if c['system_prompt'].startswith('You summarize')]
+
+
+@override_settings(WHATSAPP_AI_HISTORY_TOKENS=100)
+@patch.object(WhatsAppAIService, '_team_has_capacity', return_value=True)
+class TestWhatsAppConversationMemory(CRMTestCase):
+    """Test the rolling summary, history budget and prompt layout of WhatsApp AI replies."""
+
+    def setUp(self):
+        self.service = WhatsAppAIService.__new__(WhatsAppAIService)
+        self.service.ai = FakeAI()
+        self.conversation = WhatsAppConversation.objects.create(phone=PHONE)
+        self.start = timezone.now() - timedelta(hours=1)
+        self.sent = 0
+
+    def _message(self, body, inbound=True):
+        self.sent += 1
+        return self._create_email_log(
+            None, channel='whatsapp', to_phone=PHONE, body=body,
+            delivery_status='received' if inbound else 'sent',
+            sent_at=self.start + timedelta(minutes=self.sent),
+        )
+
+    def _reply(self, message='Hello'):
+        self.service._generate_response(self.conversation, message)
+        return self.service.ai.calls[-1]['system_prompt']
+
+    def test_system_prompt_starts_with_static_prefix(self, _):
+        self._message('Hi, I run a restaurant')
+        system = self._reply()
+
+        self.assertTrue(system.startswith(STATIC_PROMPT))
+        self.assertIn('Customer: Hi, I run a restaurant', system[len(STATIC_PROMPT):])
+
+        other = WhatsAppConversation.objects.create(phone='+61400000000', user_type='business_owner')
+        self.service._generate_response(other, 'Hello')
+        self.assertTrue(self.service.ai.calls[-1]['system_prompt'].startswith(STATIC_PROMPT))
+
+    def test_history_within_budget_is_not_summarized(self, _):
+        self._message('Hi')
+        self._message('Hello! What are you looking for?', inbound=False)
+        self._reply()
+
+        self.assertEqual(self.service.ai.summary_calls, [])
+        self.assertIsNone(self.conversation.summary_through)
+
+    def test_overflow_folded_into_summary_incrementally(self, _):
+        for i in range(10):
+            self._message(f'Message number {i} ' + 'x' * 60, inbound=i % 2 == 0)
+        system = self._reply()
+
+        # Oldest messages folded, newest kept verbatim
+        self.assertEqual(len(self.service.ai.summary_calls), 1)
+        folded = self.service.ai.summary_calls[0]['prompt']
+        self.assertIn('Message number 0', folded)
+        self.assertNotIn('Message number 9', folded)
+        self.assertIn('Summary #1', system)
+        self.assertIn('Message number 9', system)
+        self.assertNotIn('Message number 0', system)
+        self.assertIsNotNone(self.conversation.summary_through)
+
+        # The next turn fits in the room left: no second summary call
+        self._message('One more question')
+        self._reply()
+        self.assertEqual(len(self.service.ai.summary_calls), 1)
+
+        # Later folds only send the new messages alongside the current summary
+        for i in range(10, 16):
+            self._message(f'Message number {i} ' + 'x' * 60)
+        self._reply()
+        self.assertEqual(len(self.service.ai.summary_calls), 2)
+        folded = self.service.ai.summary_calls[1]['prompt']
+        self.assertIn('Summary #1', folded)
+        self.assertNotIn('Message number 0', folded)
+
+    def test_prompt_tokens_recorded(self, _):
+        self._message('Hi')
+        self._reply()
+        self._reply()
+        self.conversation.save()
+        self.conversation.refresh_from_db()
+
+        self.assertEqual(self.conversation.last_prompt_tokens, 1500)
+        self.assertEqual(self.conversation.last_cached_tokens, 1280)
+        self.assertEqual(self.conversation.total_prompt_tokens, 3000)
+        self.assertEqual(self.conversation.total_cached_tokens, 2560)
+
+
+class FakeLock:
+    """Token-checked lock, like redis.lock.Lock."""
+
+    def __init__(self, fake, name):
+        self.fake, self.name = fake, name
+        self.token = object()
+
+    def acquire(self, blocking=True):
+        if self.name in self.fake.values:
+            return False
+        self.fake.values[self.name] = self.token
+        return True
+
+    def release(self):
+        if self.fake.values.get(self.name) is not self.token:
+            raise redis.exceptions.LockNotOwnedError("not owned")
+        del self.fake.values[self.name]
+
+
+class FakeRedis:
+    """Just enough of redis.Redis for turn counters and locks."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        value = self.values.get(key)
+        return str(value).encode() if value is not None else None
+
+    def pipeline(self):
+        fake = self
+
+        class Pipeline:
+            def __init__(self):
+                self.ops = []
+
+            def incr(self, key):
+                def op():
+                    fake.values[key] = fake.values.get(key, 0) + 1
+                    return fake.values[key]
+                self.ops.append(op)
+
+            def expire(self, key, seconds):
+                self.ops.append(lambda: True)
+
+            def execute(self):
+                return [op() for op in self.ops]
+
+        return Pipeline()
+
+    def lock(self, name, timeout=None):
+        return FakeLock(self, name)
+
+
+@patch('crm.tasks.process_whatsapp_ai_response.apply_async')
+@patch.object(WhatsAppAIService, '_team_has_capacity', return_value=True)
+@patch.object(WhatsAppAIService, '_send_response', return_value=True)
+@patch('core.services.ai_client.AIContentEngine', FakeAI)
+class TestWhatsAppTurns(CRMTestCase):
+    """Test debounced, single-flight AI turns per phone."""
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch('crm.services.whatsapp_turns._state_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.start = timezone.now() - timedelta(minutes=5)
+        self.sent = 0
+
+    def _inbound(self, body):
+        """Log an inbound message and queue its turn, as the Meta webhook handler does."""
+        self.sent += 1
+        self._create_email_log(
+            None, channel='whatsapp', to_phone=PHONE, body=body, delivery_status='received',
+            sent_at=self.start + timedelta(seconds=self.sent),
+        )
+        whatsapp_turns.enqueue(PHONE, 'Priya')
+
+    def _generations(self, apply_async):
+        return [c.kwargs['kwargs']['generation'] for c in apply_async.call_args_list]
+
+    def test_burst_answered_in_one_turn(self, send, _, apply_async):
+        for body in ('Hi', 'I run a restaurant', 'in Parramatta'):
+            self._inbound(body)
+
+        first, second, last = self._generations(apply_async)
+        self.assertEqual(whatsapp_turns.run_turn(PHONE, 'Priya', first), 'superseded')
+        self.assertEqual(whatsapp_turns.run_turn(PHONE, 'Priya', second), 'superseded')
+        self.assertEqual(whatsapp_turns.run_turn(PHONE, 'Priya', last), 'responded')
+
+        send.assert_called_once()
+        conversation = WhatsAppConversation.objects.get(phone=PHONE)
+        self.assertEqual(conversation.message_count, 3)
+        self.assertEqual(conversation.last_inbound_at, self.start + timedelta(seconds=3))
+
+        # Only messages after the answered ones make the next turn
+        self._inbound('Is it free?')
+        self.assertEqual([m.body for m in whatsapp_turns.pending_messages(PHONE)], ['Is it free?'])
+
+    def test_messages_during_handoff_not_answered_later(self, send, _, apply_async):
+        WhatsAppConversation.objects.create(phone=PHONE, ai_active=False, phase='handoff')
+        for body in ('Thanks for calling', 'Will do'):
+            self._inbound(body)
+        self.assertEqual(whatsapp_turns.run_turn(PHONE, 'Priya', self._generations(apply_async)[-1]), 'skipped')
+        send.assert_not_called()
+
+        WhatsAppConversation.objects.filter(phone=PHONE).update(ai_active=True, phase='engaged')
+        self._inbound('One more thing')
+        self.assertEqual([m.body for m in whatsapp_turns.pending_messages(PHONE)], ['One more thing'])
+
+    def test_turn_requeued_while_another_runs(self, send, _, apply_async):
+        self._inbound('Hi')
+        generation = self._generations(apply_async)[0]
+        self.redis.values[whatsapp_turns._lock_key(PHONE)] = 'other-worker'
+
+        self.assertEqual(whatsapp_turns.run_turn(PHONE, 'Priya', generation), 'busy')
+        send.assert_not_called()
+        self.assertEqual(self._generations(apply_async), [generation, generation])
+
+    def test_reply_dropped_when_superseded_mid_generation(self, send, _, apply_async):
+        self._inbound('Hi')
+        generation = self._generations(apply_async)[0]
+
+        def generate_while_customer_types(conversation, message):
+            self._inbound('Are you there?')
+            return 'Hello!'
+
+        with patch.object(WhatsAppAIService, '_generate_response', side_effect=generate_while_customer_types):
+            self.assertEqual(whatsapp_turns.run_turn(PHONE, 'Priya', generation), 'superseded')
+
+        send.assert_not_called()
+        self.assertIsNone(WhatsAppConversation.objects.get(phone=PHONE).last_inbound_at)
+        self.assertEqual([m.body for m in whatsapp_turns.pending_messages(PHONE)], ['Hi', 'Are you there?'])
+        self.assertNotIn(whatsapp_turns._lock_key(PHONE), self.redis.values)
+
+    def test_expired_lock_not_released_from_under_its_new_owner(self, send, _, apply_async):
+        self._inbound('Hi')
+        lock_key = whatsapp_turns._lock_key(PHONE)
+
+        def lock_expires_and_is_taken(conversation, message):
+            self.redis.values[lock_key] = 'next-turn'
+            return 'Hello!'
+
+        with patch.object(WhatsAppAIService, '_generate_response', side_effect=lock_expires_and_is_taken):
+            whatsapp_turns.run_turn(PHONE, 'Priya', self._generations(apply_async)[0])
+
+        self.assertEqual(self.redis.values[lock_key], 'next-turn')
+
+    def test_without_state_redis_every_message_answered(self, send, _, apply_async):
+        with patch('crm.services.whatsapp_turns._state_client', return_value=None):
+            self._inbound('Hi')
+            self.assertEqual(self._generations(apply_async), [None])
+            self.assertEqual(whatsapp_turns.run_turn(PHONE, 'Priya', None), 'responded')
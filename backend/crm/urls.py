@@ -11,6 +11,7 @@ API endpoints:
 - /api/crm/ai-activity/
 - /api/crm/stats/
 - /api/crm/track/<tracking_id>/open.gif
+- /api/crm/track/c/<token>/       - Signed click redirect
 
 Webhooks:
 - /api/crm/webhooks/reply/       - Email reply notifications
@@ -32,7 +33,7 @@ from .views import (
     EmailSequenceListView,
     AIActivityView,
     CRMStatsView,
-    EmailTrackingPixelView,
+    EmailTrackingPixelView, EmailClickRedirectView,
     EmailReplyWebhookView,
     UnsubscribeWebhookView,
     ZeptoMailBounceWebhookView,
@@ -45,6 +46,7 @@ from .views import (
     # Dashboard views
     pipeline_dashboard,
     pipeline_board,
+    pipeline_board_deals,
     move_deal_stage,
     reactivate_deal,
     whatsapp_inbox,
@@ -58,6 +60,7 @@ urlpatterns = [
     # Dashboard (Kanban views)
     path('dashboard/', pipeline_dashboard, name='pipeline_dashboard'),
     path('board/<int:pipeline_id>/', pipeline_board, name='pipeline_board'),
+    path('board/<int:pipeline_id>/deals/', pipeline_board_deals, name='pipeline_board_deals'),
     path('board/move-deal/', move_deal_stage, name='move_deal_stage'),
     path('board/reactivate-deal/', reactivate_deal, name='reactivate_deal'),
 
@@ -89,6 +92,7 @@ urlpatterns = [
 
     # Email Tracking
     path('track/<uuid:tracking_id>/open.gif', EmailTrackingPixelView.as_view(), name='tracking-pixel'),
+    path('track/c/<str:token>/', EmailClickRedirectView.as_view(), name='tracking-click'),
 
     # Webhooks (for Zoho/email service callbacks)
     path('webhooks/reply/', EmailReplyWebhookView.as_view(), name='webhook-reply'),
@@ -16,7 +16,8 @@ from datetime import timedelta
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
-from django.http import JsonResponse, HttpResponse
+from django.core import signing
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
@@ -28,6 +29,12 @@ from .models import (
     EmailSequence, SequenceStep, EmailLog,
     AIDecisionLog, BacklinkOpportunity, DealActivity
 )
+from .services.click_tracking import unsign_click
+from .services.contact_search import refresh_active_deal_flags, search_contacts
+from .services.stats_rollup import get_crm_stats, pipeline_counts
+from .services.tracking_buffer import record_click, record_open
+from .services.webhook_handlers import OPT_OUT_KEYWORDS
+from .services.webhook_inbox import accept as accept_webhook, body_digest
 
 
 def _serialize_contact(contact):
@@ -494,60 +501,50 @@ class CRMStatsView(View):
     """Get CRM statistics."""
 
     def get(self, request):
-        # Pipeline stats
-        pipelines = Pipeline.objects.filter(is_active=True).annotate(
-            total_deals=Count('deals'),
-            active_deals=Count('deals', filter=Q(deals__status='active')),
-            won_deals=Count('deals', filter=Q(deals__status='won')),
-            lost_deals=Count('deals', filter=Q(deals__status='lost')),
-        )
+        stats = get_crm_stats()
 
+        # Pipeline stats
         pipeline_stats = []
-        for p in pipelines:
-            stage_stats = []
-            for stage in p.stages.order_by('order'):
-                stage_stats.append({
-                    'id': stage.id,
-                    'name': stage.name,
-                    'deals_count': Deal.objects.filter(
-                        pipeline=p,
-                        current_stage=stage,
-                        status='active'
-                    ).count()
-                })
-
+        for p in Pipeline.objects.filter(is_active=True).prefetch_related('stages'):
+            counts = pipeline_counts(stats, p.id)
             pipeline_stats.append({
                 'id': p.id,
                 'name': p.name,
                 'pipeline_type': p.pipeline_type,
-                'total_deals': p.total_deals,
-                'active_deals': p.active_deals,
-                'won_deals': p.won_deals,
-                'lost_deals': p.lost_deals,
-                'stages': stage_stats,
+                'total_deals': counts['total'],
+                'active_deals': counts['active'],
+                'won_deals': counts['won'],
+                'lost_deals': counts['lost'],
+                'stages': [
+                    {
+                        'id': stage.id,
+                        'name': stage.name,
+                        'deals_count': counts['stages'].get(stage.id, 0),
+                    }
+                    for stage in p.stages.all()
+                ],
             })
 
         # Contact stats
+        by_type = stats['contacts']['by_type']
         contact_stats = {
-            'total': Contact.objects.count(),
-            'leads': Contact.objects.filter(contact_type='lead').count(),
-            'backlink_targets': Contact.objects.filter(contact_type='backlink_target').count(),
-            'partners': Contact.objects.filter(contact_type='partner').count(),
+            'total': stats['contacts']['total'],
+            'leads': by_type.get('lead', 0),
+            'backlink_targets': by_type.get('backlink_target', 0),
+            'partners': by_type.get('partner', 0),
         }
 
         # Email stats
         email_stats = {
-            'total_sent': EmailLog.objects.filter(sent_at__isnull=False).count(),
-            'opened': EmailLog.objects.filter(opened=True).count(),
-            'replied': EmailLog.objects.filter(replied=True).count(),
+            'total_sent': stats['emails']['total_sent'],
+            'opened': stats['emails']['opened'],
+            'replied': stats['emails']['replied'],
         }
 
         # AI stats
         ai_stats = {
-            'total_decisions': AIDecisionLog.objects.count(),
-            'today': AIDecisionLog.objects.filter(
-                created_at__date=timezone.now().date()
-            ).count(),
+            'total_decisions': stats['ai']['total_decisions'],
+            'today': stats['ai']['today'],
         }
 
         return JsonResponse({
@@ -559,39 +556,61 @@ class CRMStatsView(View):
 
 
 class EmailTrackingPixelView(View):
-    """Track email opens via tracking pixel."""
+    """
+    Track email opens via tracking pixel.
+
+    Only buffers the hit; crm.tasks.flush_tracking_events folds it into the
+    EmailLog and deal timeline.
+    """
 
     def get(self, request, tracking_id):
         try:
-            email_log = EmailLog.objects.get(tracking_id=tracking_id)
-            if not email_log.opened:
-                email_log.opened = True
-                email_log.opened_at = timezone.now()
-                email_log.save()
-
-                # Log activity for pipeline emails
-                if email_log.deal:
-                    DealActivity.objects.create(
-                        deal=email_log.deal,
-                        activity_type='email_opened',
-                        description=f"Email opened: {email_log.subject}",
-                    )
-
-        except EmailLog.DoesNotExist:
-            pass
+            record_open(tracking_id, request)
+        except Exception as e:
+            # Never break the image over a tracking failure
+            logger.warning(f"Could not record open for {tracking_id}: {e}")
 
         # Return 1x1 transparent GIF
         gif_data = b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x80\x00\x00\xff\xff\xff\x00\x00\x00\x21\xf9\x04\x01\x00\x00\x00\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02\x44\x01\x00\x3b'
         return HttpResponse(gif_data, content_type='image/gif')
 
 
+class EmailClickRedirectView(View):
+    """
+    Redirect a tracked link to its destination.
+
+    The signed token carries the destination, so there is no lookup; the
+    click is buffered for crm.tasks.flush_tracking_events.
+    """
+
+    def get(self, request, token):
+        try:
+            tracking_id, url = unsign_click(token)
+        except (signing.BadSignature, ValueError):
+            raise Http404("Unknown link")
+
+        try:
+            record_click(tracking_id, url, request)
+        except Exception as e:
+            logger.warning(f"Could not record click for {tracking_id}: {e}")
+
+        return HttpResponseRedirect(url)
+
+
+def _accepted(provider, event_id, payload):
+    """Store a webhook delivery in the inbox and acknowledge it."""
+    created = accept_webhook(provider, event_id, payload)
+    return JsonResponse({'status': 'accepted' if created else 'duplicate'})
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class EmailReplyWebhookView(View):
     """
     Webhook endpoint for email reply notifications.
     Called by Zoho Mail (or other email service) when someone replies.
 
-    Updates pipeline stage to "Responded" and logs activity.
+    Updates pipeline stage to "Responded" and logs activity (via the
+    webhook inbox: crm.services.webhook_handlers.handle_email_reply).
 
     Expected payload:
     {
@@ -609,90 +628,10 @@ class EmailReplyWebhookView(View):
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
 
-        from_email = data.get('from_email', '').lower().strip()
-        subject = data.get('subject', '')
-        body = data.get('body', '')
-
-        if not from_email:
+        if not data.get('from_email', '').strip():
             return JsonResponse({'error': 'from_email required'}, status=400)
 
-        # Find contact by email
-        contact = Contact.objects.filter(email__iexact=from_email).first()
-        if not contact:
-            return JsonResponse({
-                'status': 'ignored',
-                'message': f'No contact found for {from_email}'
-            })
-
-        # Find active deal for this contact
-        deal = Deal.objects.filter(
-            contact=contact,
-            status='active'
-        ).select_related('pipeline', 'current_stage').first()
-
-        if not deal:
-            # Update contact status anyway
-            contact.status = 'replied'
-            contact.save(update_fields=['status'])
-            return JsonResponse({
-                'status': 'contact_updated',
-                'message': f'No active deal, but updated contact status for {from_email}'
-            })
-
-        # Find "Responded" or "Replied" stage in pipeline
-        responded_stage = PipelineStage.objects.filter(
-            pipeline=deal.pipeline,
-            name__icontains='respond'
-        ).first()
-
-        if not responded_stage:
-            responded_stage = PipelineStage.objects.filter(
-                pipeline=deal.pipeline,
-                name__icontains='repl'
-            ).first()
-
-        # Move deal to responded stage
-        old_stage_name = deal.current_stage.name if deal.current_stage else 'Unknown'
-
-        if responded_stage and deal.current_stage != responded_stage:
-            deal.current_stage = responded_stage
-            deal.stage_entered_at = timezone.now()
-
-        # Update deal - pause autopilot so human can respond
-        deal.autopilot_paused = True
-        deal.last_contact_date = timezone.now()
-        deal.ai_notes = f"{deal.ai_notes or ''}\n\n[REPLY RECEIVED {timezone.now().strftime('%Y-%m-%d %H:%M')}]\nSubject: {subject}\n{body[:500]}..."
-        deal.save()
-
-        # Log activity
-        DealActivity.objects.create(
-            deal=deal,
-            activity_type='email_reply',
-            description=f"Reply received from {from_email}. Subject: {subject[:100]}"
-        )
-
-        # Update contact status
-        contact.status = 'replied'
-        contact.save(update_fields=['status'])
-
-        # Log email
-        EmailLog.objects.create(
-            deal=deal,
-            subject=f"Reply: {subject}",
-            body=body[:2000] if body else '',
-            to_email=deal.contact.email,
-            from_email=from_email,
-            replied=True,
-            replied_at=timezone.now(),
-        )
-
-        return JsonResponse({
-            'status': 'success',
-            'contact': from_email,
-            'deal_id': str(deal.id),
-            'stage_moved': responded_stage.name if responded_stage else None,
-            'message': f'Deal updated for {from_email}'
-        })
+        return _accepted('email_reply', data.get('message_id') or body_digest(request.body), data)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -722,7 +661,7 @@ class UnsubscribeWebhookView(View):
             return JsonResponse({'error': 'email required'}, status=400)
 
         # Find contact
-        contact = Contact.objects.filter(email__iexact=email).first()
+        contact = Contact.objects.by_email(email).first()
         if not contact:
             return JsonResponse({
                 'status': 'ignored',
@@ -741,6 +680,8 @@ class UnsubscribeWebhookView(View):
             contact=contact,
             status='active'
         ).update(status='paused')
+        if deals_paused:
+            refresh_active_deal_flags([contact.id])
 
         return JsonResponse({
             'status': 'success',
@@ -761,6 +702,9 @@ class ZeptoMailBounceWebhookView(View):
     - softbounce: Temporary failure → track count, auto-escalate to hard bounce after 3
     - feedback_loop: Spam report → treat as unsubscribe, close all deals
 
+    Deliveries are stored in the webhook inbox and processed by
+    crm.services.webhook_handlers.handle_zeptomail.
+
     Configure in ZeptoMail: Settings > Webhooks > Add webhook URL:
     https://yourdomain.com/api/crm/webhooks/bounce/
     Enable: Hard bounced, Soft bounced, Feedback loop
@@ -769,8 +713,6 @@ class ZeptoMailBounceWebhookView(View):
     in ZeptoMail's "Authorization headers" field.
     """
 
-    SOFT_BOUNCE_THRESHOLD = 3  # Convert to hard bounce after this many
-
     def post(self, request):
         import logging
         logger = logging.getLogger(__name__)
@@ -788,162 +730,10 @@ class ZeptoMailBounceWebhookView(View):
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
 
-        event_names = data.get('event_name', [])
-        event_messages = data.get('event_message', [])
-
-        if not event_messages:
+        if not data.get('event_message', []):
             return JsonResponse({'error': 'No event_message'}, status=400)
 
-        # Determine event type
-        event_type = 'unknown'
-        if 'hardbounce' in event_names:
-            event_type = 'hardbounce'
-        elif 'softbounce' in event_names:
-            event_type = 'softbounce'
-        elif 'feedback_loop' in event_names or 'spam' in event_names:
-            event_type = 'spam'
-
-        results = []
-        for message in event_messages:
-            # Extract affected recipient emails
-            affected_emails = set()
-
-            # From event_data details (bounce events)
-            for event_data in message.get('event_data', []):
-                for detail in event_data.get('details', []):
-                    recipient = detail.get('bounced_recipient', '').lower().strip()
-                    if recipient:
-                        affected_emails.add(recipient)
-                    # Feedback loop may use different field
-                    recipient = detail.get('recipient', '').lower().strip()
-                    if recipient:
-                        affected_emails.add(recipient)
-
-            # Fallback: from email_info.to
-            if not affected_emails:
-                email_info = message.get('email_info', {})
-                for to_entry in email_info.get('to', []):
-                    addr = to_entry.get('email_address', {}).get('address', '').lower().strip()
-                    if addr:
-                        affected_emails.add(addr)
-
-            for email in affected_emails:
-                if event_type == 'hardbounce':
-                    result = self._handle_hard_bounce(email, logger)
-                elif event_type == 'softbounce':
-                    result = self._handle_soft_bounce(email, logger)
-                elif event_type == 'spam':
-                    result = self._handle_spam_report(email, logger)
-                else:
-                    result = {'email': email, 'action': 'ignored', 'reason': f'unknown event: {event_names}'}
-                results.append(result)
-
-        return JsonResponse({
-            'status': 'processed',
-            'event': event_names,
-            'results': results,
-        })
-
-    def _mark_bounced_and_close_deals(self, contact, reason_desc, logger):
-        """Shared logic: mark contact bounced + close all active deals."""
-        contact.email_bounced = True
-        contact.bounced_at = timezone.now()
-        contact.save(update_fields=['email_bounced', 'bounced_at'])
-
-        active_deals = Deal.objects.filter(contact=contact, status='active')
-        deals_closed = 0
-        for deal in active_deals:
-            deal.status = 'lost'
-            deal.lost_reason = 'invalid_email'
-            deal.save(update_fields=['status', 'lost_reason'])
-            DealActivity.objects.create(
-                deal=deal,
-                activity_type='status_change',
-                description=f"[Webhook] {reason_desc} - deal auto-closed"
-            )
-            deals_closed += 1
-
-        return deals_closed
-
-    def _handle_hard_bounce(self, email, logger):
-        """Mark contact as bounced and close all active deals."""
-        contact = Contact.objects.filter(email__iexact=email).first()
-        if not contact:
-            logger.info(f"Bounce webhook: no contact for {email}")
-            return {'email': email, 'action': 'ignored', 'reason': 'no_contact'}
-
-        if contact.email_bounced:
-            return {'email': email, 'action': 'already_bounced'}
-
-        deals_closed = self._mark_bounced_and_close_deals(
-            contact, "Hard bounce from ZeptoMail", logger
-        )
-
-        logger.warning(f"Hard bounce webhook: {email} - marked bounced, {deals_closed} deals closed")
-        return {'email': email, 'action': 'bounced', 'deals_closed': deals_closed}
-
-    def _handle_soft_bounce(self, email, logger):
-        """Track soft bounce count. Auto-escalate to hard bounce after threshold."""
-        contact = Contact.objects.filter(email__iexact=email).first()
-        if not contact:
-            logger.info(f"Soft bounce webhook: no contact for {email}")
-            return {'email': email, 'action': 'ignored', 'reason': 'no_contact'}
-
-        if contact.email_bounced:
-            return {'email': email, 'action': 'already_bounced'}
-
-        contact.soft_bounce_count = (contact.soft_bounce_count or 0) + 1
-        contact.save(update_fields=['soft_bounce_count'])
-
-        # Auto-escalate to hard bounce after threshold
-        if contact.soft_bounce_count >= self.SOFT_BOUNCE_THRESHOLD:
-            deals_closed = self._mark_bounced_and_close_deals(
-                contact, f"Soft bounce escalated to hard bounce ({contact.soft_bounce_count} soft bounces)", logger
-            )
-            logger.warning(f"Soft bounce escalated: {email} - {contact.soft_bounce_count} soft bounces → marked bounced, {deals_closed} deals closed")
-            return {'email': email, 'action': 'escalated_to_hard_bounce', 'soft_bounce_count': contact.soft_bounce_count, 'deals_closed': deals_closed}
-
-        logger.info(f"Soft bounce webhook: {email} - count now {contact.soft_bounce_count}/{self.SOFT_BOUNCE_THRESHOLD}")
-        return {'email': email, 'action': 'soft_bounce_tracked', 'soft_bounce_count': contact.soft_bounce_count}
-
-    def _handle_spam_report(self, email, logger):
-        """Recipient reported spam. Treat as unsubscribe and close all deals."""
-        contact = Contact.objects.filter(email__iexact=email).first()
-        if not contact:
-            logger.info(f"Spam report webhook: no contact for {email}")
-            return {'email': email, 'action': 'ignored', 'reason': 'no_contact'}
-
-        if contact.spam_reported:
-            return {'email': email, 'action': 'already_reported'}
-
-        # Mark as spam reported + unsubscribed
-        contact.spam_reported = True
-        contact.spam_reported_at = timezone.now()
-        contact.is_unsubscribed = True
-        contact.unsubscribed_at = timezone.now()
-        contact.unsubscribe_reason = 'Spam report (ZeptoMail feedback loop)'
-        contact.status = 'unsubscribed'
-        contact.save(update_fields=[
-            'spam_reported', 'spam_reported_at',
-            'is_unsubscribed', 'unsubscribed_at', 'unsubscribe_reason', 'status'
-        ])
-
-        # Close all active deals
-        active_deals = Deal.objects.filter(contact=contact, status='active')
-        deals_closed = 0
-        for deal in active_deals:
-            deal.status = 'lost'
-            deal.lost_reason = 'unsubscribed'
-            deal.save(update_fields=['status', 'lost_reason'])
-            DealActivity.objects.create(
-                deal=deal,
-                activity_type='status_change',
-                description=f"[Webhook] Spam report - contact unsubscribed, deal auto-closed"
-            )
-            deals_closed += 1
-
-        logger.warning(f"Spam report webhook: {email} - unsubscribed, {deals_closed} deals closed")
-        return {'email': email, 'action': 'spam_unsubscribed', 'deals_closed': deals_closed}
+        return _accepted('zeptomail', body_digest(request.body), data)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -976,52 +766,10 @@ class DesiFirmsWebhookView(View):
       fallback   → 'registered_users'
 
     Auth: Authorization header must match DESIFIRMS_WEBHOOK_KEY setting.
+    Deliveries are stored in the webhook inbox and processed by
+    crm.services.webhook_handlers.handle_desifirms.
     """
 
-    # Events that mark the deal as won
-    WON_EVENTS = {'business_approved', 'event_approved', 'property_approved'}
-
-    # Map: event_type → (target_pipeline_name, stage_name_to_advance_to)
-    # Pipeline name uses icontains match. Stage name is exact.
-    # For outreach pipelines (cold leads we emailed who then converted):
-    #   user_registered → "Signed Up" / "Registered"
-    #   business_created → "Listed"  (they listed = won)
-    # For registered_users pipelines (users who came organically):
-    #   business_created → "Listed"
-    #   event_created → "Event Posted"
-    EVENT_STAGE_MAP = {
-        # Business journey
-        'business_created': {
-            'outreach_pipeline': 'Business Listings',
-            'outreach_stage': 'Signed Up',
-            'registration_stage': 'Business Listed',
-        },
-        'business_approved': {
-            'outreach_pipeline': 'Business Listings',
-            'outreach_stage': 'Listed',
-            'registration_stage': 'Listing Approved',
-        },
-        # Events journey
-        'event_created': {
-            'outreach_pipeline': 'Desi Firms Events',
-            'outreach_stage': 'Signed Up',
-            'registration_stage': 'Event Posted',
-        },
-        'event_approved': {
-            'outreach_pipeline': 'Desi Firms Events',
-            'outreach_stage': 'Event Listed',
-            'registration_stage': 'Listing Approved',
-        },
-        # Real estate journey — Agents & Agencies pipeline (outreach) or User Registration
-        'agency_created': {'stage': 'Agency Created', 'registration_stage': 'Agent/Agency Created'},
-        'agent_created': {'stage': 'Profile Complete', 'registration_stage': 'Agent/Agency Created'},
-        'agent_invitation_sent': {'stage': 'Team Invited'},
-        'agent_invitation_accepted': {'stage': 'Profile Complete'},
-        'agent_verified': {'stage': 'Verified'},
-        'property_submitted': {'stage': 'First Listing'},
-        'property_approved': {'stage': 'Active Lister', 'registration_stage': 'Listing Approved'},
-    }
-
     def post(self, request):
         import logging
         logger = logging.getLogger(__name__)
@@ -1045,270 +793,7 @@ class DesiFirmsWebhookView(View):
         if not email or not event_type:
             return JsonResponse({'error': 'email and event_type required'}, status=400)
 
-        from crm.models import Brand
-
-        brand = Brand.objects.filter(slug='desifirms').first()
-        if not brand:
-            logger.error("Desi Firms webhook: no brand with slug 'desifirms'")
-            return JsonResponse({'error': 'Desi Firms brand not configured'}, status=500)
-
-        if event_type == 'user_registered':
-            return self._handle_registration(data, email, brand, logger)
-        elif event_type in self.EVENT_STAGE_MAP:
-            mark_won = event_type in self.WON_EVENTS
-            return self._handle_progress(data, email, event_type, brand, logger, mark_won)
-        else:
-            return JsonResponse({'status': 'ignored', 'message': f'Unknown event: {event_type}'})
-
-    def _get_or_create_contact(self, email, brand, data):
-        """Get or create a contact, updating name if provided."""
-        name = data.get('name', '')
-        contact, created = Contact.objects.get_or_create(
-            email=email,
-            brand=brand,
-            defaults={
-                'name': name,
-                'source': 'desifirms_webhook',
-                'status': 'new',
-                'contact_type': 'lead',
-            }
-        )
-        if not created and name and not contact.name:
-            contact.name = name
-            contact.save(update_fields=['name'])
-        return contact, created
-
-    def _find_nudge_pipeline(self, brand, pipeline_hint):
-        """Find the right Registered Users pipeline by name hint."""
-        from crm.models import Pipeline
-
-        name_map = {
-            'business': 'Registered Users - Business',
-            'events': 'Registered Users - Events',
-            'realestate': 'Registered Users - Real Estate',
-        }
-        name = name_map.get(pipeline_hint, '')
-        if name:
-            p = Pipeline.objects.filter(brand=brand, name=name, is_active=True).first()
-            if p:
-                return p
-
-        # Fallback: Agents & Agencies for realestate, or Registered Users - Business
-        if pipeline_hint == 'realestate':
-            return Pipeline.objects.filter(
-                brand=brand, name__icontains='Agents', is_active=True,
-            ).first()
-
-        # Default to Business registered users (not Real Estate or Events)
-        return Pipeline.objects.filter(
-            brand=brand, name='Registered Users - Business', is_active=True,
-        ).first() or Pipeline.objects.filter(
-            brand=brand, pipeline_type='registered_users', is_active=True,
-        ).first()
-
-    def _handle_registration(self, data, email, brand, logger):
-        """User registered on Desi Firms. Create contact + deal in User Registration pipeline."""
-        from crm.models import Pipeline, PipelineStage
-
-        contact, _ = self._get_or_create_contact(email, brand, data)
-        phone = data.get('phone', '')
-
-        # Check for existing active deal in ANY Desi Firms pipeline
-        existing_deal = Deal.objects.filter(
-            contact=contact, pipeline__brand=brand, status='active',
-        ).select_related('pipeline', 'current_stage').first()
-
-        if existing_deal:
-            # Already tracked (likely from outreach). Advance to "Signed Up" or "Registered"
-            registered_stage = PipelineStage.objects.filter(
-                pipeline=existing_deal.pipeline,
-                name__in=['Signed Up', 'Registered'],
-            ).order_by('-order').first()  # prefer Signed Up over Registered
-
-            if registered_stage and existing_deal.current_stage != registered_stage:
-                old_stage = existing_deal.current_stage.name if existing_deal.current_stage else 'None'
-                existing_deal.move_to_stage(registered_stage)
-                existing_deal.autopilot_paused = True
-                existing_deal.save(update_fields=['autopilot_paused'])
-                DealActivity.objects.create(
-                    deal=existing_deal,
-                    activity_type='stage_change',
-                    description=f"[Webhook] User registered on Desi Firms: {old_stage} → {registered_stage.name}",
-                )
-
-            return JsonResponse({
-                'status': 'advanced',
-                'deal_id': str(existing_deal.id),
-                'pipeline': existing_deal.pipeline.name,
-            })
-
-        # No existing deal — create in User Registration pipeline
-        pipeline = Pipeline.objects.filter(
-            brand=brand, pipeline_type='user_registration', is_active=True,
-        ).first()
-        if not pipeline:
-            logger.warning("Desi Firms webhook: no user_registration pipeline found")
-            return JsonResponse({
-                'status': 'contact_created',
-                'contact_id': str(contact.id),
-            })
-
-        # Guard against duplicate webhooks: check if deal already exists in this pipeline
-        existing_reg_deal = Deal.objects.filter(
-            contact=contact, pipeline=pipeline,
-        ).first()
-        if existing_reg_deal:
-            logger.info(f"Desi Firms webhook: duplicate registration for {email}, deal {existing_reg_deal.id} already exists")
-            return JsonResponse({
-                'status': 'duplicate',
-                'deal_id': str(existing_reg_deal.id),
-            })
-
-        first_stage = PipelineStage.objects.filter(
-            pipeline=pipeline, name='Registered',
-        ).first()
-
-        notes = f"Registered on Desi Firms via webhook."
-        if phone:
-            notes += f"\nPhone: {phone}"
-
-        deal = Deal.objects.create(
-            contact=contact,
-            pipeline=pipeline,
-            current_stage=first_stage,
-            status='active',
-            autopilot_paused=True,  # Paused until we know their intent
-            ai_notes=notes,
-        )
-
-        DealActivity.objects.create(
-            deal=deal,
-            activity_type='status_change',
-            description=f"[Webhook] User registered on Desi Firms: {email} → {pipeline.name} (autopilot paused, welcome email queued)",
-        )
-
-        # Send welcome classification email (asks user to pick their intent)
-        from crm.tasks import send_registration_welcome_email
-        send_registration_welcome_email.delay(str(deal.id))
-
-        logger.info(f"Desi Firms webhook: created deal {deal.id} for {email} in {pipeline.name}")
-        return JsonResponse({
-            'status': 'success',
-            'contact_id': str(contact.id),
-            'deal_id': str(deal.id),
-        }, status=201)
-
-    def _handle_progress(self, data, email, event_type, brand, logger, mark_won=False):
-        """User took an action on Desi Firms. Advance their deal to the right stage."""
-        from crm.models import Pipeline, PipelineStage
-
-        contact, _ = self._get_or_create_contact(email, brand, data)
-        detail = (
-            data.get('detail', '') or data.get('business_name', '') or
-            data.get('event_name', '') or data.get('property_address', '') or
-            data.get('agent_name', '') or ''
-        )
-
-        mapping = self.EVENT_STAGE_MAP[event_type]
-
-        # Find the contact's active deal in any Desi Firms pipeline
-        deal = Deal.objects.filter(
-            contact=contact, pipeline__brand=brand, status='active',
-        ).select_related('pipeline', 'current_stage').first()
-
-        if not deal:
-            # No deal yet — auto-create in User Registration pipeline
-            pipeline = Pipeline.objects.filter(
-                brand=brand, pipeline_type='user_registration', is_active=True,
-            ).first()
-
-            if not pipeline:
-                logger.info(f"Desi Firms webhook: no user_registration pipeline for {event_type}")
-                return JsonResponse({'status': 'ignored', 'message': 'No matching pipeline'})
-
-            first_stage = PipelineStage.objects.filter(
-                pipeline=pipeline, name='Registered',
-            ).first()
-
-            deal = Deal.objects.create(
-                contact=contact,
-                pipeline=pipeline,
-                current_stage=first_stage,
-                status='active',
-                next_action_date=timezone.now(),
-                ai_notes=f"Auto-created from webhook: {event_type}\n{detail}",
-            )
-            DealActivity.objects.create(
-                deal=deal,
-                activity_type='status_change',
-                description=f"[Webhook] Auto-created deal for {email} ({event_type})",
-            )
-            logger.info(f"Desi Firms webhook: auto-created deal {deal.id} for {email}")
-
-        # Determine target stage name based on which pipeline the deal is in
-        if deal.pipeline.pipeline_type == 'user_registration':
-            # Deal is in the unified User Registration pipeline
-            target_stage_name = mapping.get('registration_stage')
-        elif 'outreach_pipeline' in mapping and mapping['outreach_pipeline'] in deal.pipeline.name:
-            # Deal is in an outreach pipeline (from email campaigns) — keep existing logic
-            target_stage_name = mapping['outreach_stage']
-        elif 'stage' in mapping:
-            # Deal is in Agents & Agencies or other specific pipeline
-            target_stage_name = mapping['stage']
-        else:
-            target_stage_name = None
-
-        # Advance to target stage
-        if target_stage_name:
-            target_stage = PipelineStage.objects.filter(
-                pipeline=deal.pipeline, name=target_stage_name,
-            ).first()
-            if target_stage and deal.current_stage != target_stage:
-                # Only advance forward, never backward
-                current_order = deal.current_stage.order if deal.current_stage else -1
-                if target_stage.order > current_order:
-                    old_stage = deal.current_stage.name if deal.current_stage else 'None'
-                    deal.move_to_stage(target_stage)
-                    DealActivity.objects.create(
-                        deal=deal,
-                        activity_type='stage_change',
-                        description=f"[Webhook] {event_type}: {old_stage} → {target_stage.name}. {detail}",
-                    )
-
-        # Infer intent from event if not already recorded
-        intent_map = {
-            'business_created': 'business', 'business_approved': 'business',
-            'event_created': 'business', 'event_approved': 'business',
-            'agency_created': 'realestate', 'agent_created': 'realestate',
-            'agent_verified': 'realestate', 'property_submitted': 'realestate',
-            'property_approved': 'realestate',
-        }
-        inferred_intent = intent_map.get(event_type)
-        if inferred_intent and deal.ai_notes and '[Intent]' not in deal.ai_notes:
-            deal.ai_notes = (deal.ai_notes or '') + f"\n[Intent] Inferred from {event_type}: {inferred_intent}"
-
-        if mark_won:
-            deal.status = 'won'
-            deal.save(update_fields=['status', 'ai_notes'])
-            DealActivity.objects.create(
-                deal=deal,
-                activity_type='status_change',
-                description=f"[Webhook] {event_type}: {detail}. Deal won!",
-            )
-        else:
-            # Pause autopilot — user is actively progressing on their own
-            if not deal.autopilot_paused:
-                deal.autopilot_paused = True
-                deal.save(update_fields=['autopilot_paused', 'ai_notes'])
-            else:
-                deal.save(update_fields=['ai_notes'])
-
-        logger.info(f"Desi Firms webhook: {event_type} for {email}, deal {deal.id}")
-        return JsonResponse({
-            'status': 'success',
-            'deal_id': str(deal.id),
-            'action': 'won' if mark_won else 'stage_advanced',
-        })
+        return _accepted('desifirms', data.get('event_id') or body_digest(request.body), data)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -1328,26 +813,7 @@ class ContactSearchView(View):
         if len(query) < 2:
             return JsonResponse({'contacts': []})
 
-        contacts = Contact.objects.filter(
-            Q(name__icontains=query) |
-            Q(email__icontains=query) |
-            Q(company__icontains=query) |
-            Q(phone__icontains=query),
-            is_unsubscribed=False
-        ).exclude(
-            deals__status='active'
-        ).order_by('name')
-
-        if brand_id:
-            contacts = contacts.filter(brand_id=brand_id)
-
-        # Filter by channel capability
-        if channel == 'phone':
-            contacts = contacts.exclude(phone='').filter(sms_opted_out=False)
-        else:
-            contacts = contacts.exclude(email='')
-
-        contacts = contacts.distinct()[:limit]
+        contacts = search_contacts(query, brand_id=brand_id, channel=channel, limit=limit)
 
         return JsonResponse({
             'contacts': [
@@ -1478,6 +944,7 @@ class GenerateAIEmailView(View):
 # =============================================================================
 
 from django.shortcuts import render, get_object_or_404
+from django.urls import reverse
 from django.contrib.admin.views.decorators import staff_member_required
 from django.views.decorators.http import require_POST
 
@@ -1489,30 +956,19 @@ def pipeline_dashboard(request):
     """
     from django.contrib import admin
 
-    pipelines = Pipeline.objects.prefetch_related(
-        'stages', 'deals'
-    ).order_by('brand__name', 'name')
+    stats = get_crm_stats()
+    pipelines = Pipeline.objects.prefetch_related('stages').order_by('brand__name', 'name')
 
     pipeline_data = []
     for pipeline in pipelines:
-        stages_with_counts = []
-        for stage in pipeline.stages.order_by('order'):
-            count = Deal.objects.filter(
-                pipeline=pipeline,
-                current_stage=stage,
-                status='active'
-            ).count()
-            stages_with_counts.append({
-                'stage': stage,
-                'count': count,
-            })
-
-        total_active = Deal.objects.filter(pipeline=pipeline, status='active').count()
-
+        counts = pipeline_counts(stats, pipeline.id)
         pipeline_data.append({
             'pipeline': pipeline,
-            'stages': stages_with_counts,
-            'total_active': total_active,
+            'stages': [
+                {'stage': stage, 'count': counts['stages'].get(stage.id, 0)}
+                for stage in pipeline.stages.all()
+            ],
+            'total_active': counts['active'],
         })
 
     # Get admin context for Unfold sidebar
@@ -1524,46 +980,52 @@ def pipeline_dashboard(request):
     return render(request, 'admin/crm/pipeline_dashboard.html', context)
 
 
+# Statuses shown as cards in the board's stage columns
+BOARD_STATUSES = ('active', 'won', 'paused')
+
+# Lost-deal tabs under the board: tab key -> lost_reason values
+REACTIVATABLE_LOST_REASONS = ('no_response', 'not_interested', 'competitor', 'budget', 'timing', 'other', '')
+LOST_DEAL_GROUPS = {
+    'noresponse': REACTIVATABLE_LOST_REASONS,
+    'unsub': ('unsubscribed',),
+    'bounced': ('invalid_email',),
+}
+
+BOARD_PAGE_SIZE = 25
+BOARD_MAX_PAGE_SIZE = 100
+
+
 @staff_member_required
 def pipeline_board(request, pipeline_id):
     """
     Kanban board view for a single pipeline.
-    Shows stages as columns with deal cards.
+
+    Renders stage columns and totals from one grouped count query; the deal
+    cards in each column and the lost-deal tabs are fetched on demand from
+    pipeline_board_deals.
     """
     from django.contrib import admin
 
     pipeline = get_object_or_404(Pipeline, id=pipeline_id)
-    stages = pipeline.stages.order_by('order')
-
-    # Build columns with deals (include active, won, and paused deals)
-    columns = []
-    for stage in stages:
-        deals = Deal.objects.filter(
-            pipeline=pipeline,
-            current_stage=stage,
-            status__in=['active', 'won', 'paused']  # Show active, won, and paused deals
-        ).select_related('contact').order_by('-updated_at')[:50]
-
-        columns.append({
-            'stage': stage,
-            'deals': deals,
-            'count': deals.count(),
-        })
-
-    # Stats
-    total_active = Deal.objects.filter(pipeline=pipeline, status='active').count()
-    total_won = Deal.objects.filter(pipeline=pipeline, status='won').count()
-    total_paused = Deal.objects.filter(pipeline=pipeline, status='paused').count()
-
-    # Split lost deals into categories — query each separately to avoid cutoff
-    lost_qs = Deal.objects.filter(pipeline=pipeline, status='lost').select_related('contact').order_by('-updated_at')
-
-    reactivatable_reasons = {'no_response', 'not_interested', 'competitor', 'budget', 'timing', 'other', ''}
-    inactive_deals = list(lost_qs.filter(lost_reason__in=reactivatable_reasons)[:200])
-    unsubscribed_deals = list(lost_qs.filter(lost_reason='unsubscribed')[:200])
-    bounced_deals = list(lost_qs.filter(lost_reason='invalid_email')[:200])
+    stages = list(pipeline.stages.order_by('order'))
+
+    stage_counts = {}
+    status_counts = {}
+    lost_counts = dict.fromkeys(LOST_DEAL_GROUPS, 0)
+    rows = (
+        Deal.objects.filter(pipeline=pipeline).order_by()
+        .values_list('current_stage_id', 'status', 'lost_reason').annotate(n=Count('id'))
+    )
+    for stage_id, status, lost_reason, n in rows:
+        status_counts[status] = status_counts.get(status, 0) + n
+        if status in BOARD_STATUSES:
+            stage_counts[stage_id] = stage_counts.get(stage_id, 0) + n
+        elif status == 'lost':
+            for group, reasons in LOST_DEAL_GROUPS.items():
+                if lost_reason in reasons:
+                    lost_counts[group] += n
 
-    total_lost = lost_qs.count()
+    columns = [{'stage': stage, 'count': stage_counts.get(stage.id, 0)} for stage in stages]
 
     # Get admin context for Unfold sidebar
     context = {
@@ -1571,18 +1033,89 @@ def pipeline_board(request, pipeline_id):
         'title': f'{pipeline.name}',
         'pipeline': pipeline,
         'columns': columns,
-        'total_active': total_active,
-        'total_won': total_won,
-        'total_lost': total_lost,
-        'total_paused': total_paused,
-        'unsubscribed_deals': unsubscribed_deals,
-        'bounced_deals': bounced_deals,
-        'inactive_deals': inactive_deals,
-        'today': timezone.now().date(),
+        'total_active': status_counts.get('active', 0),
+        'total_won': status_counts.get('won', 0),
+        'total_lost': status_counts.get('lost', 0),
+        'total_paused': status_counts.get('paused', 0),
+        'lost_counts': lost_counts,
+        'page_size': BOARD_PAGE_SIZE,
     }
     return render(request, 'admin/crm/pipeline_board.html', context)
 
 
+def _board_card(deal, now):
+    contact = deal.contact
+    return {
+        'id': str(deal.id),
+        'url': reverse('admin:crm_deal_change', args=[deal.id]),
+        'name': contact.name if contact else '',
+        'email': contact.email if contact else '',
+        'status': deal.status,
+        'lost_reason': deal.get_lost_reason_display() if deal.lost_reason else '',
+        'emails_sent': deal.emails_sent,
+        'next_action_date': deal.next_action_date.isoformat() if deal.next_action_date else None,
+        'overdue': bool(deal.next_action_date and deal.next_action_date < now),
+        'updated_at': deal.updated_at.isoformat(),
+    }
+
+
+@staff_member_required
+def pipeline_board_deals(request, pipeline_id):
+    """
+    One page of deal cards for a board column or lost-deal tab (JSON).
+
+    Query params: stage=<stage id> or lost=<noresponse|unsub|bounced>,
+    cursor (from the previous page's next_cursor), limit. Deals are ordered
+    newest updated_at first and paged by keyset (updated_at, id). Stage
+    columns are read in that order off crm_deal_board_recent, so deep pages
+    cost the same as the first.
+    """
+    import uuid
+    from django.utils.dateparse import parse_datetime
+
+    deals = Deal.objects.filter(pipeline_id=pipeline_id)
+    stage_id = request.GET.get('stage')
+    lost_group = request.GET.get('lost')
+    if stage_id and stage_id.isdigit():
+        deals = deals.filter(current_stage_id=stage_id, status__in=BOARD_STATUSES)
+    elif lost_group in LOST_DEAL_GROUPS:
+        deals = deals.filter(status='lost', lost_reason__in=LOST_DEAL_GROUPS[lost_group])
+    else:
+        return JsonResponse({'error': 'stage or lost is required'}, status=400)
+
+    try:
+        limit = max(1, min(int(request.GET.get('limit', BOARD_PAGE_SIZE)), BOARD_MAX_PAGE_SIZE))
+    except ValueError:
+        limit = BOARD_PAGE_SIZE
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        updated_at, _, last_id = cursor.partition('|')
+        try:
+            updated_at = parse_datetime(updated_at)
+            last_id = uuid.UUID(last_id)
+        except ValueError:
+            updated_at = None
+        if updated_at is None:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+        deals = deals.filter(Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=last_id))
+
+    page = list(deals.select_related('contact').order_by('-updated_at', '-id')[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    now = timezone.now()
+    next_cursor = None
+    if has_more:
+        last = page[-1]
+        next_cursor = f"{last.updated_at.isoformat()}|{last.id}"
+
+    return JsonResponse({
+        'deals': [_board_card(deal, now) for deal in page],
+        'next_cursor': next_cursor,
+    })
+
+
 @staff_member_required
 @require_POST
 def move_deal_stage(request):
@@ -1755,7 +1288,7 @@ class RegistrationIntentView(View):
         if not brand:
             return redirect(fallback_url)
 
-        contact = Contact.objects.filter(email__iexact=email, brand=brand).first()
+        contact = Contact.objects.by_email(email).filter(brand=brand).first()
         if not contact:
             return redirect(INTENT_REDIRECTS.get(intent, fallback_url))
 
@@ -1845,7 +1378,7 @@ class UnsubscribeView(View):
         # Find and unsubscribe contact from this specific brand
         from crm.models import Brand
         brand = Brand.objects.filter(slug__iexact=brand_slug).first()
-        contact = Contact.objects.filter(email__iexact=email, brand=brand).first() if brand else None
+        contact = Contact.objects.by_email(email).filter(brand=brand).first() if brand else None
 
         if contact:
             # Use brand-specific unsubscribe (doesn't affect other brands)
@@ -1901,9 +1434,9 @@ def check_can_email(email: str, brand_slug: str = None) -> dict:
     if brand_slug:
         from crm.models import Brand
         brand = Brand.objects.filter(slug__iexact=brand_slug).first()
-        contact = Contact.objects.filter(email__iexact=email, brand=brand).first() if brand else None
+        contact = Contact.objects.by_email(email).filter(brand=brand).first() if brand else None
     else:
-        contact = Contact.objects.filter(email__iexact=email).first()
+        contact = Contact.objects.by_email(email).first()
     if not contact:
         return {'can_email': True, 'reason': ''}
 
@@ -1928,31 +1461,46 @@ def check_can_email(email: str, brand_slug: str = None) -> dict:
 # TWILIO WEBHOOKS
 # =============================================================================
 
+def _valid_twilio_signature(request) -> bool:
+    """Check X-Twilio-Signature when TWILIO_VALIDATE_WEBHOOKS is on."""
+    if not getattr(settings, 'TWILIO_VALIDATE_WEBHOOKS', False):
+        return True
+    from twilio.request_validator import RequestValidator
+    validator = RequestValidator(settings.TWILIO_AUTH_TOKEN)
+    return validator.validate(
+        request.build_absolute_uri(), request.POST.dict(), request.headers.get('X-Twilio-Signature', ''),
+    )
+
+
+def _valid_meta_signature(request) -> bool:
+    """Check X-Hub-Signature-256 when META_WHATSAPP_APP_SECRET is set."""
+    secret = getattr(settings, 'META_WHATSAPP_APP_SECRET', '')
+    if not secret:
+        return True
+    expected = 'sha256=' + hmac.new(secret.encode(), request.body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, request.headers.get('X-Hub-Signature-256', ''))
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class TwilioStatusWebhookView(View):
     """
     Twilio delivery status callback.
-    Updates EmailLog.delivery_status for SMS/WhatsApp messages.
+    Updates EmailLog.delivery_status for SMS/WhatsApp messages (via the
+    webhook inbox).
     """
 
     def post(self, request):
+        if not _valid_twilio_signature(request):
+            return JsonResponse({'error': 'Invalid signature'}, status=403)
+
         message_sid = request.POST.get('MessageSid', '')
         status = request.POST.get('MessageStatus', '')
 
         if not message_sid:
             return JsonResponse({'error': 'Missing MessageSid'}, status=400)
 
-        from .models import EmailLog
-        updated = EmailLog.objects.filter(message_sid=message_sid).update(
-            delivery_status=status
-        )
-
-        if updated:
-            import logging
-            logging.getLogger(__name__).info(
-                f"Twilio status update: {message_sid} -> {status}"
-            )
-
+        # One callback per status change of a message
+        accept_webhook('twilio_status', f"{message_sid}:{status}", request.POST.dict())
         return JsonResponse({'ok': True})
 
 
@@ -1960,55 +1508,22 @@ class TwilioStatusWebhookView(View):
 class TwilioInboundWebhookView(View):
     """
     Twilio inbound SMS webhook.
-    Handles STOP/opt-out messages.
+    Handles STOP/opt-out messages (via the webhook inbox).
     """
 
     def post(self, request):
+        if not _valid_twilio_signature(request):
+            return HttpResponse('Forbidden', status=403)
+
         from_number = request.POST.get('From', '')
         body = request.POST.get('Body', '').strip().upper()
 
-        if not from_number:
-            return HttpResponse('', status=200)
-
-        # Handle opt-out keywords
-        opt_out_keywords = {'STOP', 'UNSUBSCRIBE', 'CANCEL', 'END', 'QUIT'}
-        if body in opt_out_keywords:
-            from .models import Contact, Deal, DealActivity
-            # Clean number format (Twilio sends with + prefix)
-            clean_number = from_number.replace('whatsapp:', '')
-            contacts = Contact.objects.filter(
-                Q(phone=clean_number) | Q(phone__endswith=clean_number[-10:])
-            )
-            updated = 0
-            deals_closed = 0
-            for contact in contacts:
-                if not contact.sms_opted_out:
-                    contact.sms_opted_out = True
-                    contact.sms_opted_out_at = timezone.now()
-                    contact.save(update_fields=['sms_opted_out', 'sms_opted_out_at'])
-                    updated += 1
-
-                # Close all active deals for this phone-only contact
-                active_deals = Deal.objects.filter(
-                    contact=contact,
-                    status='active',
-                ).select_related('contact')
-                for deal in active_deals:
-                    # Only close deals where SMS is the channel (no email)
-                    if not contact.email:
-                        deal.status = 'lost'
-                        deal.lost_reason = 'unsubscribed'
-                        deal.save(update_fields=['status', 'lost_reason'])
-                        DealActivity.objects.create(
-                            deal=deal,
-                            activity_type='status_change',
-                            description=f"[SMS Opt-Out] Contact replied STOP — deal auto-closed"
-                        )
-                        deals_closed += 1
-
-            import logging
-            logging.getLogger(__name__).info(
-                f"SMS opt-out from {from_number}: {updated} contact(s) updated, {deals_closed} deal(s) closed"
+        # Only opt-out keywords need handling
+        if from_number and body in OPT_OUT_KEYWORDS:
+            accept_webhook(
+                'twilio_inbound',
+                request.POST.get('MessageSid') or body_digest(request.body),
+                request.POST.dict(),
             )
 
         return HttpResponse('', status=200)
@@ -2025,6 +1540,8 @@ class MetaWhatsAppWebhookView(View):
 
     When a contact messages the DESI FIRMS WhatsApp number, we mark them
     as has_whatsapp=True so send_smart() switches to WhatsApp for them.
+    POSTs are stored in the webhook inbox and processed by
+    crm.services.webhook_handlers.handle_meta_whatsapp.
     """
 
     def get(self, request):
@@ -2043,10 +1560,14 @@ class MetaWhatsAppWebhookView(View):
         return HttpResponse('Forbidden', status=403)
 
     def post(self, request):
-        """Process inbound WhatsApp messages from Meta."""
+        """Store the delivery for the webhook inbox; handlers process it later."""
         import logging
         logger = logging.getLogger(__name__)
 
+        if not _valid_meta_signature(request):
+            logger.warning("WhatsApp webhook: invalid signature")
+            return JsonResponse({'error': 'Invalid signature'}, status=403)
+
         try:
             data = json.loads(request.body)
         except (json.JSONDecodeError, ValueError):
@@ -2059,152 +1580,10 @@ class MetaWhatsAppWebhookView(View):
 
         logger.info(f"WhatsApp webhook POST received: {len(data.get('entry', []))} entries")
 
-        for entry in data.get('entry', []):
-            for change in entry.get('changes', []):
-                value = change.get('value', {})
-
-                # Process incoming messages
-                for message in value.get('messages', []):
-                    try:
-                        self._process_inbound_message(message, value, logger)
-                    except Exception as e:
-                        msg_id = message.get('id', 'unknown')
-                        logger.error(
-                            f"WhatsApp webhook: error processing message {msg_id}: {e}",
-                            exc_info=True,
-                        )
-
-                # Process delivery statuses (sent, delivered, read, failed)
-                for status_update in value.get('statuses', []):
-                    try:
-                        msg_id = status_update.get('id', '')
-                        delivery_status = status_update.get('status', '')
-                        if msg_id and delivery_status:
-                            EmailLog.objects.filter(message_sid=msg_id).update(
-                                delivery_status=delivery_status
-                            )
-                            # If delivery failed, mark contact as not on WhatsApp
-                            # so future sends route to SMS instead
-                            if delivery_status == 'failed':
-                                log_entry = EmailLog.objects.filter(
-                                    message_sid=msg_id, channel='whatsapp'
-                                ).first()
-                                if log_entry and log_entry.to_phone:
-                                    from crm.models import Contact
-                                    Contact.objects.filter(
-                                        phone=log_entry.to_phone, has_whatsapp=True
-                                    ).update(has_whatsapp=False)
-                                    logger.info(
-                                        f"WhatsApp delivery failed for {log_entry.to_phone} — "
-                                        f"marked has_whatsapp=False, future sends will use SMS"
-                                    )
-                    except Exception as e:
-                        logger.error(f"WhatsApp webhook: status update error: {e}")
-
+        # Meta retries resend the same body
+        accept_webhook('meta', body_digest(request.body), data)
         return JsonResponse({'ok': True})
 
-    def _process_inbound_message(self, message, value, logger):
-        """Process a single inbound WhatsApp message. Isolated so one bad message can't crash the webhook."""
-        from_number = message.get('from', '')  # e.g. "61424538777"
-        msg_type = message.get('type', '')
-        msg_body = ''
-        if msg_type == 'text':
-            msg_body = message.get('text', {}).get('body', '').strip()
-
-        if not from_number:
-            return
-
-        # Normalise to E.164
-        if not from_number.startswith('+'):
-            from_number = f'+{from_number}'
-
-        # Dedup: skip if we already processed this message
-        msg_id = message.get('id', '')
-        if msg_id and EmailLog.objects.filter(message_sid=msg_id).exists():
-            logger.info(f"WhatsApp webhook: skipping duplicate message {msg_id}")
-            return
-
-        # Find contact
-        contact = Contact.objects.filter(phone=from_number).first()
-        if not contact:
-            contact = Contact.objects.filter(
-                phone__endswith=from_number[-10:]
-            ).first()
-
-        # Extract sender name from Meta payload
-        sender_name = ''
-        for c in value.get('contacts', []):
-            sender_name = c.get('profile', {}).get('name', '')
-            break
-
-        if not contact:
-            logger.info(
-                f"WhatsApp inbound from unknown number {from_number} "
-                f"(name: {sender_name}): {msg_body[:50]}"
-            )
-
-        # Handle opt-out (only if contact exists)
-        opt_out_keywords = {'STOP', 'UNSUBSCRIBE', 'CANCEL', 'END', 'QUIT'}
-        if contact and msg_body.upper() in opt_out_keywords:
-            if not contact.sms_opted_out:
-                contact.sms_opted_out = True
-                contact.sms_opted_out_at = timezone.now()
-                contact.save(update_fields=['sms_opted_out', 'sms_opted_out_at'])
-                logger.info(f"WhatsApp opt-out from {from_number}")
-
-            # Close active deals for phone-only contacts
-            if not contact.email:
-                from .models import Deal, DealActivity
-                for deal in Deal.objects.filter(contact=contact, status='active'):
-                    deal.status = 'lost'
-                    deal.lost_reason = 'unsubscribed'
-                    deal.save(update_fields=['status', 'lost_reason'])
-                    DealActivity.objects.create(
-                        deal=deal,
-                        activity_type='status_change',
-                        description=f"[WhatsApp Opt-Out] Contact replied STOP — deal auto-closed"
-                    )
-            return
-
-        # Mark as confirmed WhatsApp user
-        if contact:
-            was_new = contact.has_whatsapp is not True
-            if was_new:
-                contact.has_whatsapp = True
-                contact.save(update_fields=['has_whatsapp'])
-                logger.info(
-                    f"Contact {from_number} ({contact.name}) confirmed on WhatsApp. "
-                    f"Future messages will use WhatsApp."
-                )
-        else:
-            was_new = True
-
-        # Save inbound message to EmailLog
-        EmailLog.objects.create(
-            channel='whatsapp',
-            subject='Inbound WhatsApp',
-            body=msg_body or f'[{msg_type} message]',
-            to_phone=from_number,
-            message_sid=msg_id,
-            delivery_status='received',
-            sent_at=timezone.now(),
-        )
-        logger.info(f"WhatsApp inbound saved: {from_number} msg_id={msg_id}")
-
-        # Dispatch AI auto-responder (async — must not break webhook)
-        try:
-            from crm.tasks import process_whatsapp_ai_response
-            process_whatsapp_ai_response.delay(
-                from_number,
-                msg_body or f'[{msg_type} message]',
-                sender_name,
-            )
-        except Exception as e:
-            logger.error(f"Failed to dispatch AI task for {from_number}: {e}")
-
-        # Owner notification now handled by AI service (only on handoff)
-        # No per-message notification — would be too noisy
-
     def _notify_owner(self, contact, from_number, msg_body, is_new_whatsapp):
         """Send WhatsApp + email notification to owner about inbound message."""
         import os
@@ -2279,9 +1658,7 @@ def whatsapp_inbox(request):
             continue
 
         # Find contact
-        contact = Contact.objects.filter(phone=phone).first()
-        if not contact:
-            contact = Contact.objects.filter(phone__endswith=phone[-10:]).first() if len(phone) >= 10 else None
+        contact = Contact.objects.by_phone(phone).first()
 
         # Get last message
         last_msg = EmailLog.objects.filter(
@@ -2318,9 +1695,7 @@ def whatsapp_inbox(request):
                 'id', 'body', 'sent_at', 'delivery_status', 'subject'
             )[:200]
         )
-        selected_contact = Contact.objects.filter(phone=selected_phone).first()
-        if not selected_contact and len(selected_phone) >= 10:
-            selected_contact = Contact.objects.filter(phone__endswith=selected_phone[-10:]).first()
+        selected_contact = Contact.objects.by_phone(selected_phone).first()
 
         # Load WhatsApp conversation state
         from crm.models import WhatsAppConversation
@@ -158,22 +158,74 @@ export default function ChatWidget() {
     return newId;
   };
 
+  const appendAssistantToken = (text, isFirst) => {
+    setMessages((prev) => {
+      if (isFirst) {
+        return [...prev, { role: "assistant", content: text, timestamp: new Date(), streaming: true }];
+      }
+      const last = prev[prev.length - 1];
+      return [...prev.slice(0, -1), { ...last, content: last.content + text }];
+    });
+  };
+
+  // Reads the Server-Sent Events reply (start / token / done) from the message endpoint
+  const readReplyStream = async (response) => {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let started = false;
+    let final = null;
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const frames = buffer.split("\n\n");
+      buffer = frames.pop();
+      for (const frame of frames) {
+        const eventLine = frame.split("\n").find((line) => line.startsWith("event: "));
+        const dataLine = frame.split("\n").find((line) => line.startsWith("data: "));
+        if (!eventLine || !dataLine) continue;
+        const event = eventLine.slice(7);
+        const data = JSON.parse(dataLine.slice(6));
+        if (event === "token") {
+          appendAssistantToken(data.text, !started);
+          started = true;
+        } else if (event === "done") {
+          final = data;
+        }
+      }
+    }
+    return { ...(final || {}), streamed: started };
+  };
+
   const chatMutation = useMutation({
     mutationFn: async (message) => {
       const convId = await ensureConversation();
       const response = await fetch("/api/chatbot/message/", {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message, conversationId: convId, sessionId }),
+        headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
+        body: JSON.stringify({ message, conversationId: convId, sessionId, stream: true }),
       });
       if (!response.ok) {
         const errorText = await response.text();
         throw new Error(errorText || "Chat error");
       }
+      if (response.body && (response.headers.get("Content-Type") || "").includes("text/event-stream")) {
+        return readReplyStream(response);
+      }
       const payload = await response.json();
       return payload?.data || payload;
     },
     onSuccess: (data) => {
+      if (data.streamed) {
+        // Tokens are already on screen; settle the message with the final text
+        setMessages((prev) => {
+          const last = prev[prev.length - 1];
+          return [...prev.slice(0, -1), { ...last, content: data.response ?? last.content, streaming: false }];
+        });
+        return;
+      }
       setMessages((prev) => [...prev, { role: "assistant", content: data.response, timestamp: new Date() }]);
     },
     onError: (error) => {
@@ -361,7 +413,7 @@ export default function ChatWidget() {
                     </div>
                   </div>
                 ))}
-                {chatMutation.isPending && (
+                {chatMutation.isPending && !messages[messages.length - 1]?.streaming && (
                   <div className="flex justify-start animate-fade-in">
                     <div className="bg-white text-gray-800 rounded-2xl px-4 py-3 mr-4 border border-gray-200 shadow-sm">
                       <div className="flex items-center space-x-3">